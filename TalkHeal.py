@@ -3,7 +3,9 @@ from auth.auth_utils import init_db
 from components.login_page import show_login_page
 from core.utils import save_conversations, load_conversations,set_authenticated_user
 from components.mood_dashboard import MoodTracker, render_mood_dashboard
-import plotly.express as px
+from core.lazy import lazy_import
+
+px = lazy_import("plotly.express")
 
 st.set_page_config(page_title="TalkHeal", page_icon="💬", layout="wide")
 no_sidebar_style = """
@@ -571,7 +573,7 @@ else:
                     col1, col2 = st.columns(2)
 
                     with col1:
-                        avg_mood = recent_df['mood_level'].apply(tracker.get_mood_numeric).mean()
+                        avg_mood = recent_df['mood_numeric'].mean()
                         st.metric("Average Mood (7 days)", f"{avg_mood:.1f}/5")
 
                     with col2:
@@ -586,7 +588,7 @@ else:
 
                     # Quick chart
                     st.markdown("#### Mood Trend (Last 7 Days)")
-                    fig = px.line(recent_df, x='date', y=recent_df['mood_level'].apply(tracker.get_mood_numeric), 
+                    fig = px.line(recent_df, x='date', y='mood_numeric', 
                                  markers=True, line_shape='linear')
                     fig.update_layout(
                         xaxis_title="Date",
@@ -8,7 +8,9 @@ from auth.auth_utils import init_db
 from components.login_page import show_login_page
 from core.utils import save_conversations, load_conversations, set_authenticated_user
 from components.mood_dashboard import MoodTracker, render_mood_dashboard
-import plotly.express as px
+from core.lazy import lazy_import
+
+px = lazy_import("plotly.express")
 
 st.set_page_config(page_title="TalkHeal", page_icon="💬", layout="wide")
 
@@ -1,13 +1,9 @@
 import streamlit as st
-import base64
+from core.theme_assets import theme_background_css
 from core.audio import speech_to_text, text_to_speech
 import streamlit as st
 
 
-def get_base64_of_bin_file(image_path):
-    with open(image_path, "rb") as f:
-        return base64.b64encode(f.read()).decode()
-
 def set_background_for_theme(selected_palette="pink"):
     from core.theme import get_current_theme
 
@@ -18,28 +14,14 @@ def set_background_for_theme(selected_palette="pink"):
     
     is_dark = current_theme["name"] == "Dark"
 
-    # --- Map light themes to background images ---
-    palette_color = {
-        "light": "static_files/pink.png",
-        "calm blue": "static_files/blue.png",
-        "mint": "static_files/mint.png",
-        "lavender": "static_files/lavender.png",
-        "pink": "static_files/pink.png"
-    }
-
-    # --- Select background based on theme ---
-    if is_dark:
-        background_image_path = "static_files/dark.png"
-    else:
-        background_image_path = palette_color.get(selected_palette.lower(), "static_files/pink.png")
-
-    encoded_string = get_base64_of_bin_file(background_image_path)
+    # --- Background image for the palette, served by URL (see core/theme_assets.py) ---
+    background_css = theme_background_css(selected_palette, is_dark)
     st.markdown(
         f"""
         <style>
         /* Entire app background */
         html, body, [data-testid="stApp"] {{
-            background-image: url("data:image/png;base64,{encoded_string}");
+            {background_css}
             background-size: cover;
             background-position: center;
             background-repeat: no-repeat;
@@ -2,9 +2,10 @@ import sqlite3
 import bcrypt
 from datetime import datetime
 from auth.password_validator import PasswordValidator
+from core import db
 
 def init_db():
-    conn = sqlite3.connect("users.db")
+    conn = db.get_connection(db.USERS_DB)
     cursor = conn.cursor()
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS users (
@@ -40,9 +41,6 @@ def init_db():
         cursor.execute("ALTER TABLE users ADD COLUMN verified BOOLEAN DEFAULT 0")
     except sqlite3.OperationalError:
         pass  # Column already exists
-    
-    conn.commit()
-    conn.close()
 
 def hash_password(password):
     return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
@@ -51,56 +49,40 @@ def check_password(password, hashed):
     return bcrypt.checkpw(password.encode(), hashed.encode())
 
 def register_user(name, email, password, provider='email', provider_id=None, profile_picture=None, verified=False):
-    conn = sqlite3.connect("users.db")
-    cursor = conn.cursor()
+    conn = db.get_connection(db.USERS_DB)
     
     # Hash password only if provided (OAuth users don't need passwords)
     hashed_pw = hash_password(password) if password else None
     current_time = datetime.now().isoformat()
     
     try:
-        cursor.execute("""
+        conn.execute("""
             INSERT INTO users (name, email, password, updated_at, provider, provider_id, profile_picture, verified) 
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """, (name, email, hashed_pw, current_time, provider, provider_id, profile_picture, verified))
-        conn.commit()
         return True, "User registered successfully"
     except sqlite3.IntegrityError:
         return False, "Email already registered"
-    finally:
-        conn.close()
 
 def authenticate_user(email, password):
-    conn = sqlite3.connect("users.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT name, password FROM users WHERE email = ?", (email,))
-    result = cursor.fetchone()
-    conn.close()
+    result = db.execute(db.USERS_DB, "SELECT name, password FROM users WHERE email = ?", (email,)).fetchone()
     if result and check_password(password, result[1]):
         user = {"name": result[0], "email": email}
         return True, user
     return False, None
 
 def check_user(email):
-    conn = sqlite3.connect("users.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
-    result = cursor.fetchone()
-    conn.close()
+    result = db.execute(db.USERS_DB, "SELECT * FROM users WHERE email = ?", (email,)).fetchone()
     if result:
         return True , result[4]
     return False , None
 
 def get_user_by_email(email):
     """Get user data by email for OAuth authentication"""
-    conn = sqlite3.connect("users.db")
-    cursor = conn.cursor()
-    cursor.execute("""
+    result = db.execute(db.USERS_DB, """
         SELECT id, name, email, provider, provider_id, profile_picture, verified, updated_at 
         FROM users WHERE email = ?
-    """, (email,))
-    result = cursor.fetchone()
-    conn.close()
+    """, (email,)).fetchone()
     
     if result:
         return {
@@ -119,42 +101,29 @@ def reset_password(email, new_password):
     hashed_pw = hash_password(new_password)
     current_time = datetime.now().isoformat()
     try:
-        conn = sqlite3.connect("users.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
-        result = cursor.fetchone()
+        with db.transaction(db.USERS_DB) as conn:
+            result = conn.execute("SELECT * FROM users WHERE email = ?", (email,)).fetchone()
 
-        if not result:
-            conn.close()
-            return False, "User with this email does not exist."
+            if not result:
+                return False, "User with this email does not exist."
 
-        cursor.execute("UPDATE users SET password = ? , updated_at = ? WHERE email = ?", (hashed_pw, current_time, email))
-        conn.commit()
-        conn.close()
+            conn.execute("UPDATE users SET password = ? , updated_at = ? WHERE email = ?", (hashed_pw, current_time, email))
         return True, "Password updated successfully."
     except sqlite3.Error as e:
-        conn.close()
         return False, f"Database error: {str(e)}"
 
 def verify_token_count(email, token_updated_at):
     try:
-        conn = sqlite3.connect("users.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT updated_at FROM users WHERE email = ?", (email,))
-        result = cursor.fetchone()
+        result = db.execute(db.USERS_DB, "SELECT updated_at FROM users WHERE email = ?", (email,)).fetchone()
         if not result:
-            conn.close()
             return False, "User with this email does not exist."
 
         db_updated_at = result[0]
 
         if str(db_updated_at) != str(token_updated_at):
-            conn.close()
             return False, "Reset link is no longer valid (token outdated)."
 
-        conn.close()
         return True, None
 
     except sqlite3.Error as e:
-        conn.close()
-        return False, f"Database error: {str(e)}"
\ No newline at end of file
+        return False, f"Database error: {str(e)}"
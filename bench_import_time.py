@@ -0,0 +1,151 @@
+"""
+Import-time benchmark for the app's entry points and pages.
+
+For each page, the module-level import statements are extracted and run in a
+fresh interpreter under ``python -X importtime``, so the number is what a new
+Streamlit worker pays before the page body runs. Modules the bare
+interpreter already imports at startup are not counted.
+
+Usage:
+    python bench_import_time.py                      # all pages
+    python bench_import_time.py pages/Yoga.py        # selected pages
+    python bench_import_time.py --json bench.json    # save results
+    python bench_import_time.py --baseline bench.json  # compare with a saved run
+"""
+
+import argparse
+import ast
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+
+ROOT_DIR = Path(__file__).resolve().parent
+ENTRY_POINTS = ("TalkHeal.py",)
+TOP_MODULES = 5
+
+
+def page_files(root=ROOT_DIR):
+    """List the app's entry points and pages."""
+    pages = [root / name for name in ENTRY_POINTS if (root / name).exists()]
+    return pages + sorted((root / "pages").glob("*.py"))
+
+
+def module_imports(path):
+    """
+    Extract the import statements a module runs when it is loaded.
+    Imports inside functions are skipped; those at module level (including
+    inside top-level ``if``/``try`` blocks) are kept.
+    Args:
+        path (Path): Python source file.
+    Returns:
+        list: Source lines of the import statements, in order.
+    """
+    tree = ast.parse(Path(path).read_text(encoding="utf-8"))
+    statements = []
+
+    def visit(body):
+        for node in body:
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                if not (isinstance(node, ast.ImportFrom) and node.level):
+                    statements.append(ast.unparse(node))
+            elif isinstance(node, (ast.If, ast.Try, ast.With)):
+                visit(node.body)
+                visit(getattr(node, "orelse", []))
+                for handler in getattr(node, "handlers", []):
+                    visit(handler.body)
+                visit(getattr(node, "finalbody", []))
+
+    visit(tree.body)
+    return statements
+
+
+def parse_importtime(stderr):
+    """
+    Parse ``-X importtime`` output.
+    Args:
+        stderr (str): The interpreter's stderr.
+    Returns:
+        list: ``(module, self_us, cumulative_us, depth)`` tuples in output order.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        except ValueError:
+            continue
+        # Nested imports are indented by two more spaces per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def _run(statements, root):
+    # Each import is guarded so one missing optional dependency doesn't hide the rest
+    code = "\n".join(f"try:\n    {s}\nexcept Exception:\n    pass" for s in statements) or "pass"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=root, capture_output=True, text=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def measure(path, runs=3, root=ROOT_DIR, startup_modules=None):
+    """
+    Measure the import cost of one page.
+    Args:
+        path (Path): The page file.
+        runs (int): Fresh-interpreter runs; the median is reported.
+        root (Path): Working directory for the runs.
+        startup_modules (set, optional): Modules imported by a bare interpreter.
+    Returns:
+        dict: ``total_ms`` and the heaviest top-level ``modules`` (name -> ms).
+    """
+    if startup_modules is None:
+        startup_modules = {row[0] for row in _run([], root)}
+    statements = module_imports(path)
+    totals, heaviest = [], {}
+    for _ in range(runs):
+        rows = [row for row in _run(statements, root) if row[0] not in startup_modules]
+        totals.append(sum(row[1] for row in rows) / 1000)
+        top_depth = min((row[3] for row in rows), default=0)
+        for name, _, cumulative, depth in rows:
+            if depth == top_depth:
+                heaviest.setdefault(name, []).append(cumulative / 1000)
+    modules = {name: round(statistics.median(times), 1) for name, times in heaviest.items()}
+    top = dict(sorted(modules.items(), key=lambda item: -item[1])[:TOP_MODULES])
+    return {"total_ms": round(statistics.median(totals), 1), "modules": top}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the import cost of each page.")
+    parser.add_argument("pages", nargs="*", help="page files (default: entry points and pages/)")
+    parser.add_argument("--runs", type=int, default=3, help="runs per page (median is reported)")
+    parser.add_argument("--json", dest="json_path", help="write the results to this file")
+    parser.add_argument("--baseline", help="compare with results saved by --json")
+    args = parser.parse_args(argv)
+
+    pages = [Path(p).resolve() for p in args.pages] or page_files()
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else {}
+    startup_modules = {row[0] for row in _run([], ROOT_DIR)}
+
+    results = {}
+    for path in pages:
+        name = path.relative_to(ROOT_DIR).as_posix()
+        result = results[name] = measure(path, args.runs, ROOT_DIR, startup_modules)
+        line = f"{name:<40} {result['total_ms']:>9.1f} ms"
+        if name in baseline:
+            line += f"  ({result['total_ms'] - baseline[name]['total_ms']:+.1f} ms)"
+        top = ", ".join(f"{module} {ms:.0f}" for module, ms in result["modules"].items())
+        print(f"{line}  {top}")
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
 
 # analytics.py: Provides analytics and insights for mood/activity data.
 import pandas as pd
-import plotly.graph_objs as go
-from typing import Tuple, List, Dict, Any
+from typing import Tuple, List, Dict, Any, Optional
+
+from core.feature_matrix import ACTIVITY_PREFIX, correlation_report
+from core.lazy import lazy_import
+
+go = lazy_import("plotly.graph_objs")
 
 # Example: mood_log should be a DataFrame with columns: ['timestamp', 'mood_score']
 # timestamp: datetime, mood_score: int or float
@@ -67,23 +71,28 @@ def analyze_mood_trends(mood_log: pd.DataFrame) -> Dict[str, Any]:
         "charts": [chart]
     }
 
-def analyze_activity_mood_correlation(mood_data: pd.DataFrame) -> Dict[str, Any]:
+def analyze_activity_mood_correlation(mood_data: pd.DataFrame, versions: Optional[tuple] = None) -> Dict[str, Any]:
     """
     Analyze the correlation between activities and mood levels.
     Returns a dictionary with top activities, insights, recommendations, and a chart.
 
     Args:
-        mood_data (pd.DataFrame): DataFrame with columns ['mood_level', 'activities']
+        mood_data (pd.DataFrame): DataFrame with columns ['mood_level', 'activities'] and
+            ['timestamp'] or ['date']
+        versions (tuple, optional): Version of mood_data; the daily correlations are
+            reused while it is unchanged (see core.feature_matrix)
 
     Returns:
-        dict: {"top_activities": list, "activity_insights": list, "activity_recommendations": list, "activity_chart": plotly.Figure}
+        dict: {"top_activities": list, "activity_insights": list, "activity_recommendations": list,
+               "activity_chart": plotly.Figure, "activity_correlations": dict}
     """
     if mood_data.empty or 'activities' not in mood_data.columns:
         return {
             "top_activities": [],
             "activity_insights": [],
             "activity_recommendations": [],
-            "activity_chart": None
+            "activity_chart": None,
+            "activity_correlations": {}
         }
 
     # Convert mood levels to numeric values for analysis
@@ -110,7 +119,8 @@ def analyze_activity_mood_correlation(mood_data: pd.DataFrame) -> Dict[str, Any]
             "top_activities": [],
             "activity_insights": ["No activity data available for analysis."],
             "activity_recommendations": [],
-            "activity_chart": None
+            "activity_chart": None,
+            "activity_correlations": {}
         }
 
     # Calculate average mood for each activity
@@ -162,6 +172,24 @@ def analyze_activity_mood_correlation(mood_data: pd.DataFrame) -> Dict[str, Any]
         insights.append("📊 Need more activity data to analyze mood correlations.")
         recommendations.append("🎯 Track your activities with mood entries to discover patterns.")
 
+    # Day-level correlation: mood on days with an activity vs days without it
+    activity_correlations = {}
+    if 'timestamp' in mood_data.columns or 'date' in mood_data.columns:
+        target = correlation_report(mood_data, versions=versions)["target"]
+        if target is not None:
+            target = target[target.index.str.startswith(ACTIVITY_PREFIX) & target['r'].notna()]
+            activity_correlations = {
+                name[len(ACTIVITY_PREFIX):]: {"r": float(row['r']), "p": float(row['p']), "days": int(row['n'])}
+                for name, row in target.iterrows()
+            }
+    significant = {name: c for name, c in activity_correlations.items() if c['p'] < 0.05 and c['r'] > 0}
+    if significant:
+        name = max(significant, key=lambda a: significant[a]['r'])
+        insights.append(
+            f"📈 Days with **{name}** have reliably better mood than days without it "
+            f"(r = {significant[name]['r']:.2f}, p = {significant[name]['p']:.3f}, {significant[name]['days']} days)."
+        )
+
     # Create a bar chart for activity-mood correlation
     if not activity_stats.empty:
         import plotly.express as px
@@ -192,5 +220,6 @@ def analyze_activity_mood_correlation(mood_data: pd.DataFrame) -> Dict[str, Any]
         "top_activities": top_activities,
         "activity_insights": insights,
         "activity_recommendations": recommendations,
-        "activity_chart": chart
+        "activity_chart": chart,
+        "activity_correlations": activity_correlations
     }
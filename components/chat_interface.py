@@ -24,7 +24,8 @@ def generate_response(user_input, personality):
 import streamlit as st
 import streamlit.components.v1 as components
 from datetime import datetime
-from core.utils import get_current_time, get_ai_response, save_conversations, save_feedback, get_feedback
+from core.utils import get_current_time, stream_ai_response, clean_ai_response, save_conversations, save_feedback, get_feedback
+from core.context_builder import build_chat_prompt, refine_chat_summary
 import requests
 import textwrap
 
@@ -606,7 +607,7 @@ def render_chat_interface():
         ">
             {msg['message']}
             <div class="message-time" style="font-size:12px; color: #666; opacity: 0.76; margin-top: 4px; text-align: right;">
-                {msg['time']}
+                {"Reply interrupted · " if msg.get("interrupted") else ""}{msg['time']}
             </div>
         </div>
                     """, unsafe_allow_html=True)
@@ -788,34 +789,23 @@ def handle_chat_input(model, system_prompt):
 
             save_conversations(st.session_state.conversations)
 
-            # Format memory
-            def format_memory(convo_history, max_turns=10):
-                context = ""
-                for msg in convo_history[-max_turns*2:]:  # user + bot per turn
-                    sender = "User" if msg["sender"] == "user" else "Bot"
-                    context += f"{sender}: {msg['message']}\n"
-                return context
-
             try:
-                with st.spinner("TalkHeal is thinking..."):
-                    memory = format_memory(active_convo["messages"])
-                    # Create a comprehensive prompt combining system prompt and conversation context
-                    full_prompt = f"{system_prompt}\n\nConversation Context:\n{memory}\n\nUser: {user_input.strip()}"
-                    ai_response = get_ai_response(full_prompt, model)
-
-                    active_convo["messages"].append({
-                        "sender": "bot",
-                        "message": ai_response,
-                        "time": get_current_time()
-                    })
-
-            except ValueError as e:
-                st.error("I'm having trouble understanding your message. Could you please rephrase it?")
-                active_convo["messages"].append({
+                # Newest turns within the token budget; older ones are folded into a stored summary
+                prompt = build_chat_prompt(active_convo, system_prompt, user_input.strip())
+                # Render tokens as they arrive; the complete reply is saved once streaming ends
+                status = {}
+                ai_response = clean_ai_response(st.write_stream(stream_ai_response(user_input.strip(), model, prompt=prompt, status=status)))
+
+                bot_message = {
                     "sender": "bot",
-                    "message": "I'm having trouble understanding your message. Could you please rephrase it?",
+                    "message": ai_response,
                     "time": get_current_time()
-                })
+                }
+                if status.get("interrupted"):
+                    # Keep what arrived, flagged so it isn't mistaken for a complete reply
+                    bot_message["interrupted"] = True
+                active_convo["messages"].append(bot_message)
+
             except requests.RequestException as e:
                 st.error("Network connection issue. Please check your internet connection.")
                 active_convo["messages"].append({
@@ -831,6 +821,8 @@ def handle_chat_input(model, system_prompt):
                     "time": get_current_time()
                 })
 
+            # The reply is on screen; now let the model rewrite any draft summary for the next turn
+            refine_chat_summary(active_convo, model)
             save_conversations(st.session_state.conversations)
             st.rerun()
 
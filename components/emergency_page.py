@@ -1,9 +1,9 @@
 import streamlit as st
-from geopy.geocoders import Nominatim
 import urllib.parse
 from .sidebar import GLOBAL_RESOURCES
 import geopy.exc
 import requests
+from core import geo
 
 
 def render_emergency_page():
@@ -23,7 +23,6 @@ def render_emergency_page():
     """, unsafe_allow_html=True)
 
     st.subheader("Find Local Resources Near You")
-    geolocator = Nominatim(user_agent="talkheal_app")
     location_query = st.text_input(
         "Enter your City, State, or Country", placeholder="e.g., London, UK")
 
@@ -31,14 +30,11 @@ def render_emergency_page():
         if location_query:
             with st.spinner(f"Searching for '{location_query}'..."):
                 try:
-                    location = geolocator.geocode(location_query)
+                    # Shared geocoder; repeated searches are served from cache
+                    location = geo.geocode(location_query)
                     if location:
                         # Store the essential location info
-                        st.session_state.location_info = {
-                            'lat': location.latitude,
-                            'lon': location.longitude,
-                            'name': location.address
-                        }
+                        st.session_state.location_info = dict(location)
                     else:
                         st.error(
                             f"Could not find a location for '{location_query}'. Please try again.")
@@ -2,10 +2,14 @@ import streamlit as st
 import time
 from datetime import datetime, timedelta
 import random
-import pygame
 import requests
 import os
 import threading
+from core.assets import audio_file
+from core.lazy import is_loaded, lazy_import
+
+# pygame is only needed once a session plays music
+pygame = lazy_import("pygame")
 
 # Focus session configurations
 FOCUS_DURATIONS = [
@@ -44,11 +48,20 @@ AUDIO_URLS = {
     "tibetan_bowls": "https://www.soundjay.com/misc/sounds/white-noise-1.mp3"
 }
 
-# Initialize pygame mixer
-try:
-    pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
-except:
-    st.warning("Audio playback may not work properly. Please ensure pygame is installed.")
+
+def get_music_player(start=False):
+    """
+    Get pygame's music player, importing pygame and starting the mixer on first playback.
+    Args:
+        start (bool): Initialize the mixer if needed; otherwise return None until it has been.
+    Returns:
+        pygame.mixer.music or None
+    """
+    if not start and not is_loaded("pygame"):
+        return None
+    if not pygame.mixer.get_init():
+        pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
+    return pygame.mixer.music
 
 # Updated calming background options with 7 music types
 BACKGROUND_OPTIONS = [
@@ -91,7 +104,8 @@ def download_audio_file(audio_type):
     wav_filepath = os.path.join(AUDIO_FILES_DIR, wav_filename)
     
     if os.path.exists(wav_filepath):
-        return wav_filepath
+        # Prefer the Opus build from `python -m core.assets` when there is one
+        return audio_file(wav_filepath)[0]
     
     # Check for MP3 files
     mp3_filename = f"{audio_type}.mp3"
@@ -130,9 +144,10 @@ def play_audio(audio_type):
         return
     
     try:
-        pygame.mixer.music.load(filepath)
-        pygame.mixer.music.set_volume(0.3)
-        pygame.mixer.music.play(-1)  # -1 means loop indefinitely
+        music = get_music_player(start=True)
+        music.load(filepath)
+        music.set_volume(0.3)
+        music.play(-1)  # -1 means loop indefinitely
         st.session_state.audio_playing = True
         st.success(f"🎵 Now playing: {audio_type.replace('_', ' ').title()} background music")
     except Exception as e:
@@ -143,7 +158,9 @@ def play_audio(audio_type):
 def stop_audio():
     """Stop audio playback"""
     try:
-        pygame.mixer.music.stop()
+        music = get_music_player()
+        if music:
+            music.stop()
         st.session_state.audio_playing = False
         st.info("🔇 Audio stopped")
     except Exception as e:
@@ -153,7 +170,9 @@ def stop_audio():
 def pause_audio():
     """Pause audio playback"""
     try:
-        pygame.mixer.music.pause()
+        music = get_music_player()
+        if music:
+            music.pause()
         st.session_state.audio_playing = False
         st.info("⏸️ Audio paused")
     except Exception as e:
@@ -163,7 +182,9 @@ def pause_audio():
 def unpause_audio():
     """Unpause audio playback"""
     try:
-        pygame.mixer.music.unpause()
+        music = get_music_player()
+        if music:
+            music.unpause()
         st.session_state.audio_playing = True
         st.success("▶️ Audio resumed")
     except Exception as e:
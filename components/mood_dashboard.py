@@ -1,181 +1,82 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import json
-import os
 from collections import Counter, defaultdict
 from components.analytics import analyze_mood_trends, analyze_activity_mood_correlation
-from components.predictive_analytics import predict_mood_trends
-from components.weather_correlation import render_weather_mood_analysis
 from components.physio_correlation import correlate_mood_with_physio
-from core.wearable_store import load_user_wearables
+from core.forecast_service import get_forecast_service, history_start
+from core.lazy import lazy_import
+from core.mood_frame import MOOD_LABELS, MOOD_NUMERIC, get_mood_frame
+from core.mood_store import build_entry, get_mood_store
+from core.wearable_store import data_version as wearable_version, load_daily
+
+# Charting and the forecasting/weather backends load when a dashboard tab first uses them
+px = lazy_import("plotly.express")
+predictive_analytics = lazy_import("components.predictive_analytics")
+weather_correlation = lazy_import("components.weather_correlation")
+
+# How often the forecast section checks for a finished fit
+FORECAST_POLL_SECONDS = 2
 
 class MoodTracker:
-    def __init__(self):
-        self.data_file = "data/mood_data.json"
-        self.ensure_data_directory()
-        self.load_mood_data()
-    
-    def ensure_data_directory(self):
-        """Ensure the data directory exists"""
-        os.makedirs("data", exist_ok=True)
-    
-    def load_mood_data(self):
-        """Load mood data from JSON file"""
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r') as f:
-                    st.session_state.mood_data = json.load(f)
-                # Migrate existing data to include new fields
-                self.migrate_old_data()
-            except:
-                st.session_state.mood_data = []
-        else:
-            st.session_state.mood_data = []
-    
-    def migrate_old_data(self):
-        """Migrate old mood data to include new fields"""
-        for entry in st.session_state.mood_data:
-            # Add context_reason if missing
-            if 'context_reason' not in entry:
-                entry['context_reason'] = "No specific reason"
-            
-            # Add activities if missing
-            if 'activities' not in entry:
-                entry['activities'] = []
-            
-            # Ensure activities is a list
-            if not isinstance(entry['activities'], list):
-                entry['activities'] = []
-        
-        # Save migrated data
-        self.save_mood_data()
-    
-    def save_mood_data(self):
-        """Save mood data to JSON file"""
-        with open(self.data_file, 'w') as f:
-            json.dump(st.session_state.mood_data, f, indent=2)
-    
+    """Mood entries of one user, read from and appended to the shared mood store."""
+
+    def __init__(self, user_key=None, store=None):
+        # Without an explicit key the current session's user is used on every call,
+        # so a tracker kept in session state follows a later login
+        self._user_key = user_key
+        self.store = store or get_mood_store()
+
+    @property
+    def user_key(self):
+        if self._user_key is not None:
+            return self._user_key
+        from core.utils import get_user_key
+        return get_user_key()
+
+    @property
+    def mood_frame(self):
+        """The cached DataFrame of this user's entries (see core.mood_frame)"""
+        return get_mood_frame(self.store, self.user_key)
+
+    @property
+    def data_version(self):
+        """Changes whenever this user's entries change; use it as a memoization key"""
+        return (self.user_key, self.mood_frame.version)
+
+    def _since(self, days):
+        return None if days is None else datetime.now() - timedelta(days=days)
+
+    def get_entries(self, days=None):
+        """Get this user's entries (oldest first), optionally only the last N days"""
+        return self.store.entries(self.user_key, since=self._since(days))
+
     def add_mood_entry(self, mood_level, notes="", context_reason="", activities=None, timestamp=None):
         """Add a new mood entry with enhanced context"""
-        if timestamp is None:
-            timestamp = datetime.now().isoformat()
-        
-        if activities is None:
-            activities = []
-        
-        entry = {
-            "timestamp": timestamp,
-            "mood_level": mood_level,
-            "notes": notes,
-            "context_reason": context_reason,
-            "activities": activities,
-            "date": datetime.fromisoformat(timestamp).strftime("%Y-%m-%d"),
-            "time": datetime.fromisoformat(timestamp).strftime("%H:%M"),
-            "day_of_week": datetime.fromisoformat(timestamp).strftime("%A")
-        }
-        
-        st.session_state.mood_data.append(entry)
-        self.save_mood_data()
+        entry = build_entry(mood_level, notes, context_reason, activities, timestamp)
+        self.store.add(self.user_key, entry)
+        self.mood_frame.append(entry)
+        return entry
     
     def get_mood_dataframe(self, days=30):
-        """Get mood data as pandas DataFrame for the last N days"""
-        if not st.session_state.mood_data:
-            return pd.DataFrame()
-        
-        cutoff_date = datetime.now() - timedelta(days=days)
-        recent_data = [
-            entry for entry in st.session_state.mood_data
-            if datetime.fromisoformat(entry["timestamp"]) >= cutoff_date
-        ]
-        
-        if not recent_data:
-            return pd.DataFrame()
-        
-        df = pd.DataFrame(recent_data)
-        df['datetime'] = pd.to_datetime(df['timestamp'])
-        df['date'] = pd.to_datetime(df['date'])
-        return df.sort_values('datetime')
-    
-    def export_mood_data_csv(self, days=None):
-        """Export mood data as CSV string for the specified number of days"""
-        if days is not None:
-            df = self.get_mood_dataframe(days)
-        else:
-            # Export all data
-            if not st.session_state.mood_data:
-                return ""
-            df = pd.DataFrame(st.session_state.mood_data)
-            df['datetime'] = pd.to_datetime(df['timestamp'])
-            df['date'] = pd.to_datetime(df['date'])
-            df = df.sort_values('datetime')
-        
+        """Get mood data as pandas DataFrame for the last N days (a copy of the cached window)"""
+        df = self.mood_frame.window(days)
         if df.empty:
-            return ""
-        
-        # Convert activities list to comma-separated string for CSV
-        df_export = df.copy()
-        df_export['activities'] = df_export['activities'].apply(lambda x: ', '.join(x) if isinstance(x, list) else str(x))
-        
-        # Select and reorder columns for export
-        export_columns = ['date', 'time', 'day_of_week', 'mood_level', 'notes', 'context_reason', 'activities', 'timestamp']
-        df_export = df_export[export_columns]
-        
-        return df_export.to_csv(index=False)
-    
-    def export_mood_data_json(self, days=None):
-        """Export mood data as JSON string for the specified number of days"""
-        if days is not None:
-            df = self.get_mood_dataframe(days)
-            if df.empty:
-                return "[]"
-            export_data = df.to_dict('records')
-        else:
-            # Export all data
-            if not st.session_state.mood_data:
-                return "[]"
-            export_data = st.session_state.mood_data
-        
-        return json.dumps(export_data, indent=2)
+            return pd.DataFrame()
+        return df.copy()
     
     def get_mood_numeric(self, mood_level):
         """Convert mood level to numeric value for analysis"""
-        mood_mapping = {
-            "very_low": 1,
-            "low": 2,
-            "okay": 3,
-            "good": 4,
-            "great": 5
-        }
-        return mood_mapping.get(mood_level, 3)
+        return MOOD_NUMERIC.get(mood_level, 3)
     
     def get_mood_label(self, mood_level):
         """Convert mood level to display label"""
-        mood_labels = {
-            "very_low": "😔 Very Low",
-            "low": "😐 Low",
-            "okay": "😊 Okay",
-            "good": "😄 Good",
-            "great": "🌟 Great"
-        }
-        return mood_labels.get(mood_level, mood_level)
+        return MOOD_LABELS.get(mood_level, mood_level)
     
     def export_mood_data_csv(self, days=None):
         """Export mood data as CSV string for download"""
-        if not st.session_state.mood_data:
-            return ""
-        
-        # Filter data if days specified
-        data_to_export = st.session_state.mood_data
-        if days is not None:
-            cutoff_date = datetime.now() - timedelta(days=days)
-            data_to_export = [
-                entry for entry in st.session_state.mood_data
-                if datetime.fromisoformat(entry["timestamp"]) >= cutoff_date
-            ]
-        
+        data_to_export = self.get_entries(days)
         if not data_to_export:
             return ""
         
@@ -199,18 +100,7 @@ class MoodTracker:
     
     def export_mood_data_json(self, days=None):
         """Export mood data as JSON string for download"""
-        if not st.session_state.mood_data:
-            return "[]"
-        
-        # Filter data if days specified
-        data_to_export = st.session_state.mood_data
-        if days is not None:
-            cutoff_date = datetime.now() - timedelta(days=days)
-            data_to_export = [
-                entry for entry in st.session_state.mood_data
-                if datetime.fromisoformat(entry["timestamp"]) >= cutoff_date
-            ]
-        
+        data_to_export = self.get_entries(days)
         if not data_to_export:
             return "[]"
         
@@ -222,35 +112,19 @@ class MoodTracker:
             enhanced_entry['mood_label'] = self.get_mood_label(entry['mood_level'])
             enhanced_data.append(enhanced_entry)
         
-        # Sort by timestamp (most recent first)
-        enhanced_data.sort(key=lambda x: x['timestamp'], reverse=True)
+        # Most recent first
+        enhanced_data.reverse()
         
         return json.dumps(enhanced_data, indent=2)
     
     def get_export_summary(self, days=None):
         """Get summary of data being exported"""
-        if not st.session_state.mood_data:
-            return {"total_entries": 0, "date_range": "No data", "file_size": "0 KB"}
+        total_entries, first, last = self.store.summary(self.user_key, since=self._since(days))
+        if not total_entries:
+            date_range = "No data" if days is None else "No data in range"
+            return {"total_entries": 0, "date_range": date_range, "file_size": "0 KB"}
         
-        # Filter data if days specified
-        data_to_export = st.session_state.mood_data
-        if days is not None:
-            cutoff_date = datetime.now() - timedelta(days=days)
-            data_to_export = [
-                entry for entry in st.session_state.mood_data
-                if datetime.fromisoformat(entry["timestamp"]) >= cutoff_date
-            ]
-        
-        if not data_to_export:
-            return {"total_entries": 0, "date_range": "No data in range", "file_size": "0 KB"}
-        
-        total_entries = len(data_to_export)
-        
-        # Get date range
-        timestamps = [datetime.fromisoformat(entry["timestamp"]) for entry in data_to_export]
-        start_date = min(timestamps).strftime("%Y-%m-%d")
-        end_date = max(timestamps).strftime("%Y-%m-%d")
-        date_range = f"{start_date} to {end_date}"
+        date_range = f"{first[:10]} to {last[:10]}"
         
         # Estimate file size (rough calculation)
         json_size = len(self.export_mood_data_json(days)) / 1024  # KB
@@ -259,8 +133,8 @@ class MoodTracker:
         return {
             "total_entries": total_entries,
             "date_range": date_range,
-            "json_size": ".1f",
-            "csv_size": ".1f"
+            "json_size": f"{json_size:.1f}",
+            "csv_size": f"{csv_size:.1f}"
         }
 
 def render_mood_dashboard():
@@ -369,10 +243,6 @@ def render_mood_history(tracker):
         st.markdown(f'<div style="color: black;">No {mood_filter.lower()} mood entries found for the selected period.</div>', unsafe_allow_html=True)
         return
     
-    # Add numeric mood values for charts
-    df['mood_numeric'] = df['mood_level'].apply(tracker.get_mood_numeric)
-    df['mood_label'] = df['mood_level'].apply(tracker.get_mood_label)
-    
     # Line chart for mood over time
     st.markdown("#### 📈 Mood Trend Over Time")
     fig_line = px.line(
@@ -562,7 +432,7 @@ def render_mood_history(tracker):
                     date_range = f"{preview_df['date'].min().strftime('%Y-%m-%d')} to {preview_df['date'].max().strftime('%Y-%m-%d')}"
                     st.metric("Date Range", date_range)
                 with col_c:
-                    avg_mood = preview_df['mood_level'].apply(tracker.get_mood_numeric).mean()
+                    avg_mood = preview_df['mood_numeric'].mean()
                     st.metric("Avg Mood", f"{avg_mood:.1f}/5")
                 
                 # Show sample of data
@@ -638,8 +508,6 @@ def render_mood_analytics(tracker):
         st.info("No mood data available for analytics.")
         return
     
-    df['mood_numeric'] = df['mood_level'].apply(tracker.get_mood_numeric)
-    
     # Key statistics
     col1, col2, col3, col4 = st.columns(4)
     
@@ -715,7 +583,6 @@ def render_mood_analytics(tracker):
     
     # Mood heatmap by time
     st.markdown("#### 🕐 Mood by Time of Day")
-    df['hour'] = pd.to_datetime(df['time']).dt.hour
     hour_mood = df.groupby('hour')['mood_numeric'].mean()
     
     fig_hour = px.bar(
@@ -846,6 +713,100 @@ def render_mood_analytics(tracker):
                 st.plotly_chart(fig_context, use_container_width=True)
                 st.markdown("</div>", unsafe_allow_html=True)
 
+def get_mood_forecast(tracker, analytics_df, forecast_days=7, alert_threshold=2.8):
+    """Get the mood forecast without fitting models in this rerun; returns (results, pending)"""
+    mood_series = predictive_analytics.prepare_time_series_data(analytics_df)
+    if not mood_series.empty:
+        # Same window as the nightly batch, so its precomputed forecast matches
+        mood_series = mood_series[mood_series.index >= pd.Timestamp(history_start())]
+    if len(mood_series) < 7:
+        return {
+            'forecast': None, 'alerts': [], 'dips': [], 'charts': [],
+            'model_info': 'Need at least 7 days of mood data for forecasting'
+        }, False
+
+    dates = [d.isoformat() for d in mood_series.index]
+    payload, status = get_forecast_service().request(tracker.user_key, dates, mood_series.tolist(), forecast_days)
+    pending = status == "pending"
+    if payload is None:
+        return {
+            'forecast': None, 'alerts': [], 'dips': [], 'charts': [],
+            'model_info': 'Preparing your forecast, it will appear here in a moment...'
+        }, pending
+    return predictive_analytics.build_prediction(mood_series, payload, alert_threshold), pending
+
+def render_mood_forecast(tracker, analytics_df):
+    """Render predictions and alerts from the last good forecast, refreshing while a fit runs"""
+    predictive_results, pending = get_mood_forecast(tracker, analytics_df)
+    if pending != st.session_state.get("forecast_pending", False):
+        st.session_state.forecast_pending = pending
+        if hasattr(st, "fragment"):
+            # Start or stop polling (see render_mood_forecast_section)
+            st.rerun()
+    if pending and predictive_results['forecast'] is not None:
+        st.caption("🔄 Updating your forecast with your latest entries...")
+    elif pending and not hasattr(st, "fragment"):
+        st.button("🔄 Check for updated forecast", key="refresh_forecast")
+    
+    if predictive_results['forecast'] is not None:
+        # Display alerts
+        if predictive_results['alerts']:
+            st.markdown("**🚨 Predictive Alerts:**")
+            for alert in predictive_results['alerts']:
+                if "High Risk" in alert:
+                    st.error(alert)
+                else:
+                    st.warning(alert)
+        else:
+            st.success("✅ No significant mood dips predicted in the next 7 days!")
+        
+        # Display forecast chart
+        if predictive_results['charts']:
+            st.markdown("**📊 7-Day Mood Forecast:**")
+            with st.container():
+                st.markdown("""
+                <div style="
+                    background: rgba(255, 255, 255, 0.1);
+                    border: 1px solid rgba(255, 255, 255, 0.2);
+                    border-radius: 10px;
+                    padding: 20px;
+                    margin: 10px 0;
+                    backdrop-filter: blur(10px);
+                    box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
+                ">
+                """, unsafe_allow_html=True)
+                st.plotly_chart(predictive_results['charts'][0], use_container_width=True)
+                st.markdown("</div>", unsafe_allow_html=True)
+        
+        # Model information
+        st.markdown(f"**🤖 Model Info:** {predictive_results['model_info']}")
+        
+        # Forecast summary
+        forecast_avg = predictive_results['forecast'].mean()
+        historical_avg = predictive_results.get('historical_avg', 3.0)
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Historical Avg Mood", f"{historical_avg:.1f}/5")
+        with col2:
+            st.metric("Predicted Avg Mood", f"{forecast_avg:.1f}/5", 
+                     f"{forecast_avg - historical_avg:+.1f}")
+        with col3:
+            dip_count = len(predictive_results['dips'])
+            st.metric("Predicted Dips", dip_count)
+            
+    else:
+        st.info(f"🤔 {predictive_results['model_info']}")
+
+def render_mood_forecast_section(tracker, analytics_df):
+    """Render the forecast in a fragment that polls for the result while a fit runs"""
+    fragment = getattr(st, "fragment", None)
+    if fragment is None:
+        render_mood_forecast(tracker, analytics_df)
+        return
+    polling = st.session_state.get("forecast_pending", False)
+    fragment(run_every=FORECAST_POLL_SECONDS if polling else None)(render_mood_forecast)(tracker, analytics_df)
+
 def render_mood_insights(tracker):
     """Render mood insights and reflections"""
     st.markdown("### 💡 Mood Insights & Reflections")
@@ -855,8 +816,8 @@ def render_mood_insights(tracker):
     if df.empty:
         st.info("No mood data available for insights.")
         return
-    
-    df['mood_numeric'] = df['mood_level'].apply(tracker.get_mood_numeric)
+    # Identifies this 30-day window for the cached correlations
+    insights_version = (tracker.data_version, 30, datetime.now().date().isoformat())
     
     # Advanced Analytics Integration
     st.markdown("#### 🔍 Advanced Mood Analytics")
@@ -903,58 +864,7 @@ def render_mood_insights(tracker):
     # Predictive Analytics Section
     st.markdown("#### 🔮 Mood Predictions & Alerts")
     
-    # Get predictive results
-    predictive_results = predict_mood_trends(analytics_df, forecast_days=7, alert_threshold=2.8)
-    
-    if predictive_results['forecast'] is not None:
-        # Display alerts
-        if predictive_results['alerts']:
-            st.markdown("**🚨 Predictive Alerts:**")
-            for alert in predictive_results['alerts']:
-                if "High Risk" in alert:
-                    st.error(alert)
-                else:
-                    st.warning(alert)
-        else:
-            st.success("✅ No significant mood dips predicted in the next 7 days!")
-        
-        # Display forecast chart
-        if predictive_results['charts']:
-            st.markdown("**📊 7-Day Mood Forecast:**")
-            with st.container():
-                st.markdown("""
-                <div style="
-                    background: rgba(255, 255, 255, 0.1);
-                    border: 1px solid rgba(255, 255, 255, 0.2);
-                    border-radius: 10px;
-                    padding: 20px;
-                    margin: 10px 0;
-                    backdrop-filter: blur(10px);
-                    box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-                ">
-                """, unsafe_allow_html=True)
-                st.plotly_chart(predictive_results['charts'][0], use_container_width=True)
-                st.markdown("</div>", unsafe_allow_html=True)
-        
-        # Model information
-        st.markdown(f"**🤖 Model Info:** {predictive_results['model_info']}")
-        
-        # Forecast summary
-        forecast_avg = predictive_results['forecast'].mean()
-        historical_avg = predictive_results.get('historical_avg', 3.0)
-        
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("Historical Avg Mood", f"{historical_avg:.1f}/5")
-        with col2:
-            st.metric("Predicted Avg Mood", f"{forecast_avg:.1f}/5", 
-                     f"{forecast_avg - historical_avg:+.1f}")
-        with col3:
-            dip_count = len(predictive_results['dips'])
-            st.metric("Predicted Dips", dip_count)
-            
-    else:
-        st.info(f"🤔 {predictive_results['model_info']}")
+    render_mood_forecast_section(tracker, analytics_df)
     
     st.markdown("---")
     
@@ -996,7 +906,7 @@ def render_mood_insights(tracker):
     st.markdown("#### 📝 Contextual Insights")
     
     # Filter entries with notes
-    entries_with_notes = [entry for entry in st.session_state.mood_data if entry.get('notes', '').strip()]
+    entries_with_notes = [entry for entry in tracker.get_entries() if entry.get('notes', '').strip()]
     
     if entries_with_notes:
         # Analyze notes for patterns
@@ -1036,7 +946,7 @@ def render_mood_insights(tracker):
     st.markdown("#### 🏃‍♂️ Activity-Mood Correlation Analysis")
     
     # Get activity correlation results
-    activity_results = analyze_activity_mood_correlation(df)
+    activity_results = analyze_activity_mood_correlation(df, versions=insights_version)
     
     # Display activity insights
     if activity_results['activity_insights']:
@@ -1072,7 +982,7 @@ def render_mood_insights(tracker):
     
     # Weather-Mood Correlation Analysis
     st.markdown("---")
-    render_weather_mood_analysis(df)
+    weather_correlation.render_weather_mood_analysis(df, data_version=insights_version)
     
     # Recommendations
     st.markdown("#### 💭 Personalized Recommendations")
@@ -1124,12 +1034,12 @@ def render_physio_correlation(tracker):
     if df.empty:
         st.info("Add some mood entries to enable correlation analysis.")
         return
-    df['mood_numeric'] = df['mood_level'].apply(tracker.get_mood_numeric)
     # Load wearable data for user
     email = st.session_state.get("user_profile", {}).get("email")
-    wearable = load_user_wearables(email)
-    records = wearable.get("records", [])
-    results = correlate_mood_with_physio(df[['date', 'mood_numeric']], records)
+    since = (datetime.now() - timedelta(days=30)).date().isoformat()
+    days = load_daily(email, since=since)
+    versions = (tracker.data_version, wearable_version(email), since)
+    results = correlate_mood_with_physio(df[['date', 'mood_numeric']], days, versions=versions)
     if results['insights']:
         st.markdown("**Insights:**")
         for i in results['insights']:
@@ -1,70 +1,82 @@
 import pandas as pd
 import numpy as np
 from typing import Dict, Any, Optional
-import plotly.express as px
+from core.lazy import lazy_import
+from core.feature_matrix import TARGET, correlation_report
+from core.wearable_store import METRICS
 
+px = lazy_import("plotly.express")
 
-def _prepare_wearable_df(records) -> pd.DataFrame:
-	if not records:
-		return pd.DataFrame()
-	df = pd.DataFrame(records)
-	if df.empty:
-		return df
-	df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-	df = df.dropna(subset=["timestamp"]).sort_values("timestamp")
-	# Daily aggregation
-	df["date"] = df["timestamp"].dt.date
-	daily = df.groupby("date").agg({
-		"hrv_ms": "mean",
-		"resting_hr": "mean",
-		"sleep_minutes": "sum",
-		"sleep_efficiency": "mean",
-		"steps": "sum",
-		"active_minutes": "sum"
-	}).reset_index()
-	return daily
+METRIC_NAMES = {
+	"hrv_ms": "HRV",
+	"resting_hr": "resting heart rate",
+	"sleep_minutes": "sleep duration",
+	"sleep_efficiency": "sleep efficiency",
+	"steps": "step count",
+	"active_minutes": "active minutes",
+}
 
 
-def _prepare_mood_df(mood_df: pd.DataFrame) -> pd.DataFrame:
-	if mood_df is None or mood_df.empty:
-		return pd.DataFrame()
-	df = mood_df.copy()
-	df["date"] = pd.to_datetime(df["date"]).dt.date
-	return df.groupby("date").agg({"mood_numeric": "mean"}).reset_index()
-
-
-def correlate_mood_with_physio(mood_df: pd.DataFrame, wearable_records: list, min_days: int = 7) -> Dict[str, Any]:
+def correlate_mood_with_physio(mood_df: pd.DataFrame, wearable_records: list, min_days: int = 7,
+							   versions: Optional[tuple] = None) -> Dict[str, Any]:
+	"""
+	Correlate daily mood with wearable metrics.
+	Args:
+		mood_df (pd.DataFrame): Mood entries with ``date`` and ``mood_numeric``.
+		wearable_records (list): Daily rollups from
+			``core.wearable_store.load_daily`` (preferred) or raw records,
+			which are aggregated per day here.
+		min_days (int): Days of overlapping data required.
+		versions (tuple, optional): Versions of the mood and wearable data;
+			the correlations are reused while they are unchanged.
+	Returns:
+		dict: ``insights``, ``alerts``, ``charts``, ``correlations`` and
+		``p_values``.
+	"""
 	result: Dict[str, Any] = {
 		"insights": [],
 		"alerts": [],
 		"charts": [],
-		"correlations": {}
+		"correlations": {},
+		"p_values": {}
 	}
-	wearable_daily = _prepare_wearable_df(wearable_records)
-	mood_daily = _prepare_mood_df(mood_df)
-	if wearable_daily.empty or mood_daily.empty:
+	report = correlation_report(mood_df, wearable_days=wearable_records, versions=versions,
+								min_samples=max(min_days // 2, 3))
+	matrix = report["matrix"]
+	metrics = [m for m in METRICS if m in matrix.columns]
+	if report["target"] is None or not metrics:
 		result["insights"].append("Not enough data to correlate mood with physiology yet.")
 		return result
-	merged = pd.merge(mood_daily, wearable_daily, on="date", how="inner")
+	merged = matrix[matrix[TARGET].notna() & matrix[metrics].notna().any(axis=1)]
 	if len(merged) < min_days:
 		result["insights"].append("Collect at least a week of wearable and mood data for reliable insights.")
 		return result
-	metrics = ["hrv_ms", "resting_hr", "sleep_minutes", "sleep_efficiency", "steps", "active_minutes"]
+	target = report["target"]
+	for m in metrics:
+		corr = target.at[m, "r"]
+		if not np.isfinite(corr):
+			continue
+		result["correlations"][m] = float(corr)
+		result["p_values"][m] = float(target.at[m, "p"])
+		if m == "hrv_ms" and corr > 0.2:
+			result["insights"].append("Higher HRV appears associated with better mood.")
+		elif m == "resting_hr" and corr < -0.2:
+			result["insights"].append("Higher resting heart rate may relate to lower mood.")
+		elif m == "sleep_minutes" and corr > 0.2:
+			result["insights"].append("More sleep tends to correlate with better mood.")
+		elif m == "steps" and corr > 0.2:
+			result["insights"].append("Higher daily steps correlate with improved mood.")
+	# Delayed effects: a metric that relates to mood more strongly a day or more later
+	lagged = report["lagged"]
 	for m in metrics:
-		if m in merged.columns and merged[m].notna().sum() >= min_days // 2:
-			corr = merged[["mood_numeric", m]].dropna().corr().iloc[0, 1]
-			result["correlations"][m] = float(corr)
-			if np.isfinite(corr):
-				if m == "hrv_ms" and corr > 0.2:
-					result["insights"].append("Higher HRV appears associated with better mood.")
-				elif m == "resting_hr" and corr < -0.2:
-					result["insights"].append("Higher resting heart rate may relate to lower mood.")
-				elif m == "sleep_minutes" and corr > 0.2:
-					result["insights"].append("More sleep tends to correlate with better mood.")
-				elif m == "steps" and corr > 0.2:
-					result["insights"].append("Higher daily steps correlate with improved mood.")
+		later = lagged["r"][m].iloc[1:].abs()
+		if later.notna().any():
+			lag = int(later.idxmax())
+			same_day = abs(target.at[m, "r"]) if np.isfinite(target.at[m, "r"]) else 0.0
+			if later[lag] > max(same_day, 0.3) and lagged["p"].at[lag, m] < 0.05:
+				result["insights"].append(f"Changes in your {METRIC_NAMES[m]} tend to show up in your mood about {lag} day(s) later.")
 	# Alerts based on thresholds rolling window
-	merged_sorted = merged.sort_values("date")
+	merged_sorted = merged.sort_index()
 	window = min(7, len(merged_sorted))
 	if window >= 5:
 		recent = merged_sorted.tail(window)
@@ -86,6 +98,6 @@ def correlate_mood_with_physio(mood_df: pd.DataFrame, wearable_records: list, mi
 				result["alerts"].append("Low activity this week; consider light walks to support mood.")
 	# Chart: scatter mood vs HRV if available
 	if "hrv_ms" in merged.columns and merged["hrv_ms"].notna().sum() >= min_days // 2:
-		fig = px.scatter(merged, x="hrv_ms", y="mood_numeric", trendline="ols", title="Mood vs HRV")
+		fig = px.scatter(merged, x="hrv_ms", y=TARGET, trendline="ols", title="Mood vs HRV")
 		result["charts"].append(fig)
 	return result
@@ -75,7 +75,8 @@ def forecast_arima(mood_series: pd.Series, forecast_days: int = 7) -> Dict[str,
                                      periods=forecast_days, freq='D')
 
         return {
-            'forecast': pd.Series(forecast, index=forecast_index),
+            # Positional values: predict() may return an integer-indexed series
+            'forecast': pd.Series(np.asarray(forecast), index=forecast_index),
             'confidence_intervals': conf_int,
             'model_type': 'ARIMA',
             'order': order,
@@ -162,6 +163,17 @@ def detect_mood_dips(forecast: pd.Series, confidence_intervals: Optional[np.ndar
 
     return dips
 
+def detect_mood_dips_batch(forecasts: np.ndarray, threshold: float = 2.5,
+                           severe_threshold: float = 2.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Detect dips across many forecasts at once.
+    forecasts is a (users, days) array; returns boolean (users, days) masks
+    of dips and of severe dips, matching detect_mood_dips day by day.
+    """
+    forecasts = np.asarray(forecasts, dtype=float)
+    dips = forecasts < threshold
+    return dips, dips & (forecasts < severe_threshold)
+
 def generate_predictive_alerts(dips: List[Dict[str, Any]], historical_avg: float) -> List[str]:
     """Generate personalized alerts based on predicted mood dips"""
     alerts = []
@@ -260,40 +272,36 @@ def create_forecast_chart(historical_data: pd.Series, forecast: pd.Series,
 
     return fig
 
-def predict_mood_trends(mood_log: pd.DataFrame, forecast_days: int = 7,
-                       alert_threshold: float = 2.5) -> Dict[str, Any]:
-    """
-    Main function to predict mood trends and generate alerts
-    """
-    if mood_log.empty:
-        return {
-            'forecast': None,
-            'alerts': [],
-            'dips': [],
-            'charts': [],
-            'model_info': 'Insufficient data for forecasting'
-        }
-
-    # Prepare data
-    mood_series = prepare_time_series_data(mood_log)
-    if mood_series.empty:
-        return {
-            'forecast': None,
-            'alerts': [],
-            'dips': [],
-            'charts': [],
-            'model_info': 'Need at least 7 days of mood data for forecasting'
-        }
-
-    historical_avg = mood_series.mean()
-
-    # Try ARIMA first, fallback to Prophet
+def fit_forecast(mood_series: pd.Series, forecast_days: int = 7) -> Dict[str, Any]:
+    """Fit ARIMA, falling back to Prophet; returns {} if neither fits"""
     forecast_result = forecast_arima(mood_series, forecast_days)
-
     if not forecast_result:
         forecast_result = forecast_prophet(mood_series, forecast_days)
+    return forecast_result
 
+def forecast_payload(dates: List[str], values: List[float], forecast_days: int = 7) -> Dict[str, Any]:
+    """
+    Fit a forecast for a daily series given as plain lists.
+    This is the entry point for worker processes, so the input and the
+    result are plain (picklable, JSON-friendly) values.
+    """
+    mood_series = pd.Series(values, index=pd.DatetimeIndex(dates))
+    forecast_result = fit_forecast(mood_series, forecast_days)
     if not forecast_result:
+        return {'model_type': None}
+    forecast = forecast_result['forecast']
+    conf_int = forecast_result.get('confidence_intervals')
+    return {
+        'model_type': forecast_result['model_type'],
+        'dates': [d.isoformat() for d in forecast.index],
+        'values': [float(v) for v in np.asarray(forecast.values, dtype=float)],
+        'confidence_intervals': None if conf_int is None else np.asarray(conf_int, dtype=float).tolist(),
+    }
+
+def build_prediction(mood_series: pd.Series, payload: Dict[str, Any],
+                     alert_threshold: float = 2.5) -> Dict[str, Any]:
+    """Turn a forecast payload into alerts, dips and a chart for the dashboard"""
+    if not payload or not payload.get('model_type'):
         return {
             'forecast': None,
             'alerts': [],
@@ -302,8 +310,11 @@ def predict_mood_trends(mood_log: pd.DataFrame, forecast_days: int = 7,
             'model_info': 'Forecasting models failed to fit the data'
         }
 
-    forecast = forecast_result['forecast']
-    confidence_intervals = forecast_result.get('confidence_intervals')
+    historical_avg = mood_series.mean()
+    forecast = pd.Series(payload['values'], index=pd.DatetimeIndex(payload['dates']))
+    confidence_intervals = payload.get('confidence_intervals')
+    if confidence_intervals is not None:
+        confidence_intervals = np.asarray(confidence_intervals)
 
     # Detect mood dips
     dips = detect_mood_dips(forecast, confidence_intervals, alert_threshold)
@@ -319,6 +330,35 @@ def predict_mood_trends(mood_log: pd.DataFrame, forecast_days: int = 7,
         'alerts': alerts,
         'dips': dips,
         'charts': [chart],
-        'model_info': f"Using {forecast_result['model_type']} model",
+        'model_info': f"Using {payload['model_type']} model",
         'historical_avg': historical_avg
-    }
\ No newline at end of file
+    }
+
+def predict_mood_trends(mood_log: pd.DataFrame, forecast_days: int = 7,
+                       alert_threshold: float = 2.5) -> Dict[str, Any]:
+    """
+    Main function to predict mood trends and generate alerts.
+    Fits synchronously; the dashboard uses core.forecast_service instead.
+    """
+    if mood_log.empty:
+        return {
+            'forecast': None,
+            'alerts': [],
+            'dips': [],
+            'charts': [],
+            'model_info': 'Insufficient data for forecasting'
+        }
+
+    # Prepare data
+    mood_series = prepare_time_series_data(mood_log)
+    if mood_series.empty:
+        return {
+            'forecast': None,
+            'alerts': [],
+            'dips': [],
+            'charts': [],
+            'model_info': 'Need at least 7 days of mood data for forecasting'
+        }
+
+    dates = [d.isoformat() for d in mood_series.index]
+    return build_prediction(mood_series, forecast_payload(dates, mood_series.tolist(), forecast_days), alert_threshold)
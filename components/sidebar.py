@@ -1,11 +1,11 @@
 import streamlit as st
 from datetime import datetime
-from core.utils import create_new_conversation
+from core.utils import create_new_conversation, delete_conversation, has_more_conversations, load_more_conversations
 from core.theme import get_current_theme, toggle_theme, set_palette, PALETTES
 from components.mood_dashboard import render_mood_dashboard_button, MoodTracker
 from components.profile import render_profile_section
 from streamlit_js_eval import streamlit_js_eval
-import requests
+from core import geo
 import random
 
 # --- Structured Emergency Resources ---
@@ -22,19 +22,9 @@ GLOBAL_RESOURCES = [
      "url": "https://www.childhelplineinternational.org/"}
 ]
 
-def get_country_from_coords(lat, lon):
-    try:
-        url = f"https://geocode.maps.co/reverse?lat={lat}&lon={lon}"
-        resp = requests.get(url, timeout=5)
-        if resp.status_code == 200:
-            data = resp.json()
-            return data.get("address", {}).get("country_code", "").upper()
-    except:
-        pass
-    return None
-
 def get_user_country():
-    # 1. Try to get user's actual browser location (via JS)
+    # Browser coordinates resolve offline; without them fall back to the
+    # (cached) IP lookup
     coords = streamlit_js_eval(
         js_expressions="""
             new Promise((resolve, reject) => {
@@ -49,21 +39,7 @@ def get_user_country():
         """,
         key="get_coords"
     )
-
-    if coords and "latitude" in coords and "longitude" in coords:
-        country = get_country_from_coords(coords["latitude"], coords["longitude"])
-        if country:
-            return country
-
-    # 2. Fallback to IP-based location using ipapi.co (no key required)
-    try:
-        resp = requests.get("https://ipapi.co/json/", timeout=3)
-        if resp.status_code == 200:
-            return resp.json().get("country_code", "").upper()
-    except:
-        pass
-
-    return None  # final fallback if everything fails
+    return geo.user_country(coords if isinstance(coords, dict) else None)
 
 country_helplines = {
     "US": [
@@ -541,7 +517,9 @@ def render_sidebar():
         if st.session_state.conversations:
             st.markdown("**📚 Recent Conversations:**")
             if "delete_candidate" not in st.session_state:
-                for i, convo in enumerate(st.session_state.conversations):
+                # Only loaded pages of titles are in memory; message bodies load when a conversation is opened
+                visible = st.session_state.conversations
+                for i, convo in enumerate(visible):
                     is_active = i == st.session_state.active_conversation
                     button_style_icon = "🟢" if is_active else "📝"
 
@@ -568,15 +546,17 @@ def render_sidebar():
                                 use_container_width=True,
                                 disabled=not convo["messages"]
                             )
+                if has_more_conversations():
+                    if st.button("Show more", key="convo_show_more", use_container_width=True):
+                        load_more_conversations()
+                        st.rerun()
             else:
                 st.warning("⚠️ Are you sure you want to delete this conversation?")
                 col_confirm, col_cancel = st.columns(2)
 
                 if col_confirm.button("Yes, delete", key="confirm_delete"):
-                    del st.session_state.conversations[st.session_state.delete_candidate]
-
-                    from core.utils import save_conversations
-                    save_conversations(st.session_state.conversations)
+                    # Deletes this conversation only; others stay even if not loaded here
+                    delete_conversation(st.session_state.conversations[st.session_state.delete_candidate]["id"])
 
                     del st.session_state.delete_candidate
                     st.session_state.active_conversation = -1
@@ -1,3 +1,4 @@
+import os
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple, Optional, Any
@@ -6,50 +7,34 @@ from datetime import datetime, timedelta
 import plotly.graph_objs as go
 import plotly.express as px
 
+from core import geo
+from core.feature_matrix import TARGET, correlation_report, frame_version
+from core.weather_store import get_weather_store
+
 # Weather data libraries
 try:
     from meteostat import Point, Daily
     import timezonefinder
     WEATHER_AVAILABLE = True
 except ImportError:
-    WEATHER_AVAILABLE = False
+    # The offline stub provider needs neither
+    WEATHER_AVAILABLE = bool(os.getenv("TALKHEAL_FAKE_WEATHER"))
 
 def get_weather_data(latitude: float, longitude: float, start_date: datetime, end_date: datetime) -> Optional[pd.DataFrame]:
     """
-    Fetch historical weather data for a location and date range
+    Get historical daily weather for a location and date range.
+    Served from the local weather cache; only days not cached yet are fetched.
     """
     if not WEATHER_AVAILABLE:
         return None
 
     try:
-        # Create Point for location
-        location = Point(latitude, longitude)
-
-        # Get daily weather data
-        data = Daily(location, start_date, end_date)
-        weather_df = data.fetch()
-
-        if weather_df.empty:
+        days = get_weather_store().daily(latitude, longitude, start_date, end_date)
+        if not days:
             return None
 
-        # Reset index to have date as column
-        weather_df = weather_df.reset_index()
-
-        # Rename columns for clarity
-        weather_df = weather_df.rename(columns={
-            'tavg': 'temp_avg',
-            'tmin': 'temp_min',
-            'tmax': 'temp_max',
-            'prcp': 'precipitation',
-            'wspd': 'wind_speed',
-            'pres': 'pressure'
-        })
-
-        # Convert temperature from Celsius to Fahrenheit if needed
-        # weather_df['temp_avg_f'] = weather_df['temp_avg'] * 9/5 + 32
-        # weather_df['temp_min_f'] = weather_df['temp_min'] * 9/5 + 32
-        # weather_df['temp_max_f'] = weather_df['temp_max'] * 9/5 + 32
-
+        weather_df = pd.DataFrame.from_records(days)
+        weather_df.insert(0, 'time', pd.to_datetime(weather_df.pop('date')))
         return weather_df
 
     except Exception as e:
@@ -60,64 +45,40 @@ def get_user_location() -> Optional[Tuple[float, float]]:
     """
     Get user's approximate location using IP geolocation
     """
-    try:
-        import requests
-
-        # Using ipapi.co for free geolocation (no API key required)
-        response = requests.get('https://ipapi.co/json/', timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            lat = data.get('latitude')
-            lon = data.get('longitude')
-            if lat and lon:
-                return float(lat), float(lon)
-    except Exception as e:
-        print(f"Error getting location: {e}")
+    location = geo.user_location()
+    if location:
+        return location
 
     # Fallback to a default location (e.g., New York City)
     return 40.7128, -74.0060
 
-def analyze_weather_mood_correlation(mood_data: pd.DataFrame, weather_data: pd.DataFrame) -> Dict[str, Any]:
+def analyze_weather_mood_correlation(mood_data: pd.DataFrame, weather_data: pd.DataFrame, versions: Optional[tuple] = None) -> Dict[str, Any]:
     """
-    Analyze correlation between weather conditions and mood
+    Analyze correlation between weather conditions and mood.
+    Correlations come from the shared feature matrix (core.feature_matrix);
+    pass ``versions`` identifying the inputs to reuse results across reruns.
     """
     if mood_data.empty or weather_data is None or weather_data.empty:
         return {"correlations": {}, "insights": [], "charts": []}
 
     try:
-        # Prepare mood data
-        mood_df = mood_data.copy()
-        mood_df['timestamp'] = pd.to_datetime(mood_df['timestamp'])
-        mood_df['date'] = mood_df['timestamp'].dt.date
-        mood_df['mood_numeric'] = mood_df['mood_level'].map({
-            'very_low': 1, 'low': 2, 'okay': 3, 'good': 4, 'great': 5
-        })
-
-        # Aggregate mood by date
-        daily_mood = mood_df.groupby('date')['mood_numeric'].mean().reset_index()
-        daily_mood['date'] = pd.to_datetime(daily_mood['date'])
-
-        # Prepare weather data
-        weather_df = weather_data.copy()
-        weather_df['time'] = pd.to_datetime(weather_df['time'])
-        weather_df['date'] = weather_df['time'].dt.date
-        weather_df['date'] = pd.to_datetime(weather_df['date'])
-
-        # Merge mood and weather data
-        merged_df = pd.merge(daily_mood, weather_df, on='date', how='inner')
+        report = correlation_report(mood_data, weather_df=weather_data, versions=versions)
+        matrix = report["matrix"]
+        weather_vars = [var for var in ['temp_avg', 'temp_min', 'temp_max', 'precipitation', 'wind_speed'] if var in matrix.columns]
+        if report["target"] is None or not weather_vars:
+            return {"correlations": {}, "insights": [], "charts": []}
+
+        # Days with both a mood entry and weather
+        merged_df = matrix[matrix[TARGET].notna() & matrix[weather_vars].notna().any(axis=1)]
 
         if merged_df.empty:
             return {"correlations": {}, "insights": [], "charts": []}
 
-        # Calculate correlations
-        correlations = {}
-        weather_vars = ['temp_avg', 'temp_min', 'temp_max', 'precipitation', 'wind_speed']
-
-        for var in weather_vars:
-            if var in merged_df.columns:
-                corr = merged_df['mood_numeric'].corr(merged_df[var])
-                if not pd.isna(corr):
-                    correlations[var] = corr
+        # Correlations with too few overlapping days are NaN and left out
+        target = report["target"].loc[weather_vars]
+        target = target[target["r"].notna()]
+        correlations = target["r"].to_dict()
+        p_values = target["p"].to_dict()
 
         # Generate insights
         insights = []
@@ -201,6 +162,7 @@ def analyze_weather_mood_correlation(mood_data: pd.DataFrame, weather_data: pd.D
             "correlations": correlations,
             "insights": insights,
             "charts": [chart for chart in [correlation_chart, temp_mood_chart] if chart is not None],
+            "p_values": p_values,
             "data_points": len(merged_df)
         }
 
@@ -208,9 +170,11 @@ def analyze_weather_mood_correlation(mood_data: pd.DataFrame, weather_data: pd.D
         print(f"Error in weather-mood correlation analysis: {e}")
         return {"correlations": {}, "insights": [], "charts": []}
 
-def render_weather_mood_analysis(mood_data: pd.DataFrame):
+def render_weather_mood_analysis(mood_data: pd.DataFrame, data_version: Optional[tuple] = None):
     """
-    Render the weather-mood correlation analysis in the dashboard
+    Render the weather-mood correlation analysis in the dashboard.
+    ``data_version`` identifies ``mood_data`` (see MoodTracker.data_version)
+    so the correlations are only recomputed when the mood or weather changes.
     """
     st.markdown("### 🌤️ Weather-Mood Correlation Analysis")
 
@@ -243,7 +207,8 @@ def render_weather_mood_analysis(mood_data: pd.DataFrame):
 
     # Analyze correlation
     with st.spinner("Analyzing weather-mood patterns..."):
-        analysis_results = analyze_weather_mood_correlation(mood_data, weather_data)
+        versions = None if data_version is None else (data_version, frame_version(weather_data))
+        analysis_results = analyze_weather_mood_correlation(mood_data, weather_data, versions)
 
     if not analysis_results["correlations"]:
         st.info("Not enough overlapping mood and weather data for correlation analysis. Try tracking your mood for a longer period.")
@@ -287,7 +252,8 @@ def render_weather_mood_analysis(mood_data: pd.DataFrame):
         corr_df['Strength'] = corr_df['Correlation'].apply(
             lambda x: 'Strong' if abs(x) > 0.5 else 'Moderate' if abs(x) > 0.3 else 'Weak'
         )
-        st.dataframe(corr_df.style.format({'Correlation': '{:.3f}'}))
+        corr_df['p-value'] = pd.Series(analysis_results.get("p_values", {}))
+        st.dataframe(corr_df.style.format({'Correlation': '{:.3f}', 'p-value': '{:.3f}'}))
 
     # Data summary
     st.markdown(f"**📊 Analysis Summary:** {analysis_results.get('data_points', 0)} days of overlapping mood and weather data analyzed")
\ No newline at end of file
@@ -0,0 +1,312 @@
+"""
+Batched JSON-lines activity log.
+
+``log()`` only puts the event on a bounded in-memory queue; a daemon thread
+drains the queue in batches and appends them to ``logs/activity_YYYYMMDD.jsonl``
+with one write per file per batch. When a day's file grows past ``max_bytes``
+it is rotated to ``activity_YYYYMMDD.<n>.jsonl`` and a fresh file is started.
+
+Events are never dropped: if the queue stays full (the writer cannot keep
+up), the caller writes the event itself. A batch whose write fails (disk
+full, permissions, a failed rotation) is kept in memory and retried with a
+backoff of ``RETRY_DELAY`` doubling up to ``MAX_RETRY_DELAY``, ahead of any
+newer events. Pending events are flushed at exit.
+
+Reading goes through :meth:`ActivityLogger.iter_events` and the aggregation
+helpers built on it, which also understand the older ``activity_YYYYMMDD.json``
+array files.
+"""
+
+import atexit
+import json
+import os
+import queue
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+
+LOG_DIR = "logs"
+MAX_BYTES = 5 * 1024 * 1024
+QUEUE_SIZE = 10000
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 1.0
+# How long log() waits for queue space before writing synchronously
+PUT_TIMEOUT = 0.5
+# Backoff between retries of a failed write
+RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 60.0
+
+_FILE_PATTERN = re.compile(r"^activity_(\d{8})(?:\.(\d+))?\.(jsonl|json)$")
+
+
+class ActivityLogger:
+    """Queue-backed activity log writer with size and date based rotation."""
+
+    def __init__(self, log_dir=LOG_DIR, max_bytes=MAX_BYTES, queue_size=QUEUE_SIZE,
+                 batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.log_dir = log_dir
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._write_lock = threading.Lock()
+        # Events whose write failed, oldest first; guarded by _write_lock
+        self._retry = []
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._closed = False
+
+    # --- writing ---
+
+    def log(self, entry):
+        """
+        Queue one event for writing.
+        Args:
+            entry (dict): JSON-serializable event; a ``timestamp`` ISO string
+                decides which day's file it lands in (defaults to now).
+        """
+        entry.setdefault("timestamp", datetime.now().isoformat())
+        line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+        day = entry["timestamp"][:10].replace("-", "")
+
+        if self._closed:
+            self._write_now([(day, line)])
+            return
+        self._ensure_thread()
+        try:
+            self._queue.put((day, line), timeout=PUT_TIMEOUT)
+        except queue.Full:
+            self._write_now([(day, line)])
+
+    def flush(self):
+        """Block until every queued event has been written (or kept for a retry if writing fails)."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+            if self._retry:
+                self._write_now([])
+        else:
+            self._drain()
+
+    def close(self):
+        """Flush pending events and stop the writer thread."""
+        self._closed = True
+        self._drain()
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="activity-log-writer", daemon=True)
+                self._thread.start()
+
+    def _write_now(self, batch):
+        try:
+            self._write_batch(batch)
+            return True
+        except Exception as e:
+            print(f"[ActivityLogger] Error writing activity log, keeping {len(self._retry)} events for a retry: {e}")
+            return False
+
+    def _run(self):
+        delay, retry_at = 0.0, 0.0
+        while True:
+            timeout = self.flush_interval
+            if self._retry:
+                timeout = max(0.0, min(timeout, retry_at - time.monotonic()))
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                if self._retry and time.monotonic() >= retry_at:
+                    if self._write_now([]):
+                        delay = 0.0
+                    else:
+                        delay = min(max(delay * 2, RETRY_DELAY), MAX_RETRY_DELAY)
+                        retry_at = time.monotonic() + delay
+                continue
+            if item is None:
+                self._queue.task_done()
+                return
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    self._queue.task_done()
+                    break
+                batch.append(item)
+            try:
+                if self._retry and time.monotonic() < retry_at:
+                    # Still backing off; queue behind the failed events
+                    with self._write_lock:
+                        self._retry.extend(batch)
+                elif self._write_now(batch):
+                    delay = 0.0
+                else:
+                    delay = min(max(delay * 2, RETRY_DELAY), MAX_RETRY_DELAY)
+                    retry_at = time.monotonic() + delay
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._queue.task_done()
+            if item is not None:
+                batch.append(item)
+        if batch or self._retry:
+            self._write_now(batch)
+
+    def _write_batch(self, batch):
+        with self._write_lock:
+            # Earlier failed events go first; whatever isn't written is kept for the next try
+            by_day = {}
+            for day, line in self._retry + list(batch):
+                by_day.setdefault(day, []).append(line)
+            pending = list(by_day.items())
+            self._retry = []
+            try:
+                os.makedirs(self.log_dir, exist_ok=True)
+                while pending:
+                    day, lines = pending[0]
+                    path = self._current_path(day)
+                    self._rotate_if_needed(day, path)
+                    data = "".join(lines).encode("utf-8")
+                    # One O_APPEND write per batch keeps lines whole across processes
+                    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                    try:
+                        os.write(fd, data)
+                    finally:
+                        os.close(fd)
+                    pending.pop(0)
+            except Exception:
+                self._retry = [(day, line) for day, lines in pending for line in lines]
+                raise
+
+    def _current_path(self, day):
+        return os.path.join(self.log_dir, f"activity_{day}.jsonl")
+
+    def _rotate_if_needed(self, day, path):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        if size < self.max_bytes:
+            return
+        segment = 1 + max((index for d, index, _ in self._files() if d == day and index), default=0)
+        os.replace(path, os.path.join(self.log_dir, f"activity_{day}.{segment}.jsonl"))
+
+    # --- reading ---
+
+    def _files(self):
+        """Return (day, segment, path) for every log file, oldest first."""
+        if not os.path.isdir(self.log_dir):
+            return []
+        found = []
+        for name in os.listdir(self.log_dir):
+            match = _FILE_PATTERN.match(name)
+            if match:
+                day, segment, ext = match.groups()
+                # Legacy .json arrays first, then rotated segments, then the live file
+                order = (-1 if ext == "json" else int(segment) if segment else float("inf"))
+                found.append((day, order, int(segment) if segment else 0, os.path.join(self.log_dir, name)))
+        found.sort()
+        return [(day, segment, path) for day, _, segment, path in found]
+
+    def iter_events(self, start=None, end=None, activity=None, user=None):
+        """
+        Iterate logged events in chronological file order.
+        Args:
+            start (date, optional): First day to include.
+            end (date, optional): Last day to include.
+            activity (str, optional): Only events with this activity type.
+            user (str, optional): Only events for this (hashed) user.
+        Yields:
+            dict: Logged events.
+        """
+        self.flush()
+        start_key = start.strftime("%Y%m%d") if start else None
+        end_key = end.strftime("%Y%m%d") if end else None
+        for day, _, path in self._files():
+            if (start_key and day < start_key) or (end_key and day > end_key):
+                continue
+            for event in _read_events(path):
+                if activity is not None and event.get("activity") != activity:
+                    continue
+                if user is not None and event.get("user") != user:
+                    continue
+                yield event
+
+    def count_by_activity(self, start=None, end=None, user=None):
+        """
+        Count events per activity type.
+        Returns:
+            Counter: activity type -> number of events.
+        """
+        return Counter(event.get("activity") for event in self.iter_events(start, end, user=user))
+
+    def count_by_day(self, start=None, end=None, activity=None):
+        """
+        Count events per day.
+        Returns:
+            Counter: ISO date string -> number of events.
+        """
+        return Counter(
+            str(event.get("timestamp", ""))[:10]
+            for event in self.iter_events(start, end, activity=activity)
+        )
+
+
+def _read_events(path):
+    if path.endswith(".json"):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                yield from json.load(f)
+        except (OSError, ValueError):
+            return
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # A torn final line from a crash; skip it
+                continue
+
+
+_logger = None
+_logger_lock = threading.Lock()
+
+
+def get_activity_logger():
+    """
+    Get the process-wide activity logger, creating it on first use.
+    Returns:
+        ActivityLogger: The shared logger.
+    """
+    global _logger
+    if _logger is None:
+        with _logger_lock:
+            if _logger is None:
+                _logger = ActivityLogger()
+                atexit.register(_logger.close)
+    return _logger
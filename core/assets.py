@@ -0,0 +1,377 @@
+"""
+Offline build of web-ready static assets, and lookups through its manifest.
+
+``python -m core.assets`` scans ``static_files/``, ``assets/`` and
+``audio_files/`` and writes content-hashed outputs to ``static/assets/``
+(served at ``app/static/assets/``):
+
+* images become WebP at a set of responsive widths, never wider than the
+  source (needs Pillow);
+* WAV audio becomes Opus in an Ogg container (needs ``ffmpeg`` on PATH);
+* anything else is copied under a hashed name.
+
+Files with identical content are built once and share outputs. The build is
+incremental: sources whose size and mtime match the previous manifest are not
+re-hashed, and outputs that already exist for a content hash are not
+re-encoded. Outputs that the previous manifest recorded and no source
+references any more are removed; other files in the output directory are
+never touched.
+
+Pages keep using source paths (``"static_files/Home_Pink.png"``) and resolve
+them with :func:`image_path`, :func:`image_url` or :func:`audio_file`. Each
+falls back to the source file when there is no built variant, so an unbuilt
+checkout still works.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SOURCE_DIRS = ("static_files", "assets", "audio_files")
+BUILD_DIR = ROOT_DIR / "static" / "assets"
+MANIFEST_NAME = "manifest.json"
+STATIC_URL = "app/static"
+BUILD_URL = f"{STATIC_URL}/assets"
+MANIFEST_VERSION = 1
+
+IMAGE_WIDTHS = (1920, 1280, 960, 640, 320)
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".bmp"}
+AUDIO_EXTENSIONS = {".wav"}
+WEBP_QUALITY = 80
+OPUS_BITRATE = "64k"
+HASH_LENGTH = 12
+
+_manifest_lock = threading.Lock()
+_manifest_cache = {}
+
+
+def source_key(path, root=ROOT_DIR):
+    """
+    Normalize a source path to its manifest key.
+    Args:
+        path (str): Path relative to the project root, or absolute.
+        root (Path): Project root.
+    Returns:
+        str: Root-relative POSIX path, e.g. ``"static_files/pink.png"``.
+    """
+    path = str(path)
+    if os.path.isabs(path):
+        path = os.path.relpath(path, root)
+    return Path(os.path.normpath(path)).as_posix()
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _iter_sources(root, source_dirs):
+    for directory in source_dirs:
+        base = Path(root) / directory
+        if not base.is_dir():
+            continue
+        for path in sorted(base.rglob("*")):
+            if path.is_file() and not path.name.startswith("."):
+                yield path
+
+
+def _output_name(source, content_hash, suffix):
+    stem = source.stem.replace(" ", "_")
+    return f"{stem}-{content_hash[:HASH_LENGTH]}{suffix}"
+
+
+def _entry_files(entry):
+    return list(entry.get("variants", {}).values()) if entry.get("kind") == "image" else [entry.get("file")]
+
+
+def _outputs_exist(entry, out_dir):
+    return all(name and (out_dir / name).exists() for name in _entry_files(entry))
+
+
+def _write_atomic(target, write):
+    tmp = target.with_name(target.name + ".tmp")
+    write(tmp)
+    os.replace(tmp, target)
+
+
+def _build_image(source, content_hash, out_dir):
+    from PIL import Image
+
+    with Image.open(source) as image:
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        widths = sorted({min(image.width, IMAGE_WIDTHS[0])} | {w for w in IMAGE_WIDTHS if w < image.width}, reverse=True)
+        variants = {}
+        for width in widths:
+            name = _output_name(source, content_hash, f"-{width}.webp")
+            target = out_dir / name
+            if not target.exists():
+                variant = image
+                if image.width > width:
+                    variant = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+                _write_atomic(target, lambda tmp: variant.save(tmp, "WEBP", quality=WEBP_QUALITY, method=6))
+            variants[str(width)] = name
+        return {"kind": "image", "width": image.width, "height": image.height, "variants": variants}
+
+
+def _build_audio(source, content_hash, out_dir):
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        return None
+    name = _output_name(source, content_hash, ".ogg")
+    target = out_dir / name
+    if not target.exists():
+        _write_atomic(target, lambda tmp: subprocess.run(
+            [ffmpeg, "-v", "error", "-y", "-i", str(source), "-c:a", "libopus", "-b:a", OPUS_BITRATE,
+             "-f", "ogg", str(tmp)],
+            check=True, capture_output=True,
+        ))
+    return {"kind": "audio", "file": name, "mime": "audio/ogg"}
+
+
+def _copy_file(source, content_hash, out_dir):
+    name = _output_name(source, content_hash, source.suffix.lower())
+    target = out_dir / name
+    if not target.exists():
+        _write_atomic(target, lambda tmp: shutil.copyfile(source, tmp))
+    return {"kind": "file", "file": name}
+
+
+def _build_output(source, content_hash, out_dir):
+    suffix = source.suffix.lower()
+    if suffix in IMAGE_EXTENSIONS:
+        try:
+            return _build_image(source, content_hash, out_dir)
+        except ImportError:
+            return None
+    if suffix in AUDIO_EXTENSIONS:
+        return _build_audio(source, content_hash, out_dir)
+    return _copy_file(source, content_hash, out_dir)
+
+
+def _output_size(entry, out_dir):
+    return sum((out_dir / name).stat().st_size for name in _entry_files(entry) if (out_dir / name).exists())
+
+
+def build(root=ROOT_DIR, source_dirs=SOURCE_DIRS, out_dir=None, prune=True):
+    """
+    Build optimized, content-hashed assets and write the manifest.
+    Args:
+        root (Path): Project root containing the source directories.
+        source_dirs (tuple): Directories (relative to root) to scan.
+        out_dir (Path, optional): Output directory; defaults to ``static/assets`` under root.
+        prune (bool): Delete outputs of the previous build that no source references any more.
+    Returns:
+        dict: Counts of built, reused, duplicate and skipped sources, plus source and output bytes.
+    """
+    root = Path(root)
+    out_dir = Path(out_dir) if out_dir else root / "static" / "assets"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_file = out_dir / MANIFEST_NAME
+    previous = read_manifest(manifest_file)
+    old_sources, old_outputs = previous.get("sources", {}), previous.get("outputs", {})
+
+    sources, outputs = {}, {}
+    report = {"built": 0, "reused": 0, "duplicates": 0, "skipped": 0, "bytes_in": 0, "bytes_out": 0}
+    for path in _iter_sources(root, source_dirs):
+        key = source_key(path, root)
+        stat = path.stat()
+        old = old_sources.get(key)
+        if old and old["size"] == stat.st_size and old["mtime_ns"] == stat.st_mtime_ns:
+            content_hash = old["sha256"]
+        else:
+            content_hash = _file_sha256(path)
+        sources[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": content_hash}
+        report["bytes_in"] += stat.st_size
+
+        if content_hash in outputs:
+            report["duplicates"] += 1
+            continue
+        entry = old_outputs.get(content_hash)
+        if entry and _outputs_exist(entry, out_dir):
+            report["reused"] += 1
+        else:
+            try:
+                entry = _build_output(path, content_hash, out_dir)
+            except Exception as e:
+                print(f"[assets] Error: could not build {key}: {e}")
+                entry = None
+            if entry is None:
+                report["skipped"] += 1
+                continue
+            report["built"] += 1
+        outputs[content_hash] = entry
+        report["bytes_out"] += _output_size(entry, out_dir)
+
+    # Sources without an output (skipped) resolve to themselves
+    sources = {key: info for key, info in sources.items() if info["sha256"] in outputs}
+    manifest = {"version": MANIFEST_VERSION, "sources": sources, "outputs": outputs}
+    _write_atomic(manifest_file, lambda tmp: tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True)))
+
+    if prune:
+        # Only files this build wrote before are candidates, so pointing --out at a
+        # directory with other content never deletes it
+        keep = {name for entry in outputs.values() for name in _entry_files(entry)}
+        stale = {name for entry in old_outputs.values() for name in _entry_files(entry)} - keep
+        for name in filter(None, stale):
+            path = out_dir / Path(name).name
+            if path.is_file():
+                path.unlink()
+    return report
+
+
+def read_manifest(path=BUILD_DIR / MANIFEST_NAME):
+    """
+    Load a manifest, reusing the parsed copy until the file changes.
+    Args:
+        path (Path): Manifest file.
+    Returns:
+        dict: The manifest, or an empty one if it is missing or unreadable.
+    """
+    path = Path(path)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return {}
+    with _manifest_lock:
+        cached = _manifest_cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    try:
+        manifest = json.loads(path.read_text())
+    except (OSError, ValueError) as e:
+        print(f"[assets] Error: could not read {path}: {e}")
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    with _manifest_lock:
+        _manifest_cache[path] = (mtime, manifest)
+    return manifest
+
+
+def lookup(source, manifest_path=BUILD_DIR / MANIFEST_NAME):
+    """
+    Find the built output entry for a source file.
+    Args:
+        source (str): Source path, e.g. ``"static_files/pink.png"``.
+        manifest_path (Path): Manifest file.
+    Returns:
+        dict or None: The output entry (``kind`` plus ``variants`` or ``file``).
+    """
+    manifest = read_manifest(manifest_path)
+    info = manifest.get("sources", {}).get(source_key(source))
+    return manifest.get("outputs", {}).get(info["sha256"]) if info else None
+
+
+def pick_variant(variants, width=None):
+    """
+    Choose the smallest variant at least ``width`` pixels wide.
+    Args:
+        variants (dict): width (str or int) -> file name.
+        width (int, optional): Display width; None picks the largest variant.
+    Returns:
+        tuple: (width, file name).
+    """
+    ordered = sorted((int(w), name) for w, name in variants.items())
+    if width:
+        for candidate in ordered:
+            if candidate[0] >= width:
+                return candidate
+    return ordered[-1]
+
+
+def image_variants(source, manifest_path=BUILD_DIR / MANIFEST_NAME):
+    """
+    Get the URLs of all built widths of an image.
+    Args:
+        source (str): Source image path.
+        manifest_path (Path): Manifest file.
+    Returns:
+        dict: width (int) -> URL; empty when the image has not been built.
+    """
+    entry = lookup(source, manifest_path)
+    if not entry or entry["kind"] != "image":
+        return {}
+    return {int(w): f"{BUILD_URL}/{name}" for w, name in entry["variants"].items()}
+
+
+def image_url(source, width=None, manifest_path=BUILD_DIR / MANIFEST_NAME):
+    """
+    URL of the best built variant of an image, for HTML and CSS.
+    Args:
+        source (str): Source image path.
+        width (int, optional): Display width in CSS pixels (doubled for high-DPI screens).
+        manifest_path (Path): Manifest file.
+    Returns:
+        str or None: The URL, or None when the image has not been built.
+    """
+    entry = lookup(source, manifest_path)
+    if not entry:
+        return None
+    if entry["kind"] != "image":
+        return f"{BUILD_URL}/{entry['file']}"
+    return f"{BUILD_URL}/{pick_variant(entry['variants'], width * 2 if width else None)[1]}"
+
+
+def image_path(source, width=None, manifest_path=BUILD_DIR / MANIFEST_NAME):
+    """
+    Local path of the best built variant of an image, for ``st.image``.
+    Args:
+        source (str): Source image path.
+        width (int, optional): Display width in CSS pixels (doubled for high-DPI screens).
+        manifest_path (Path): Manifest file.
+    Returns:
+        str: Path of the variant, or ``source`` itself when none was built.
+    """
+    entry = lookup(source, manifest_path)
+    if not entry or entry["kind"] != "image":
+        return source
+    name = pick_variant(entry["variants"], width * 2 if width else None)[1]
+    path = Path(manifest_path).parent / name
+    return str(path) if path.exists() else source
+
+
+def audio_file(source, manifest_path=BUILD_DIR / MANIFEST_NAME):
+    """
+    Local path and MIME type of the compressed version of an audio file.
+    Args:
+        source (str): Source audio path, e.g. ``"audio_files/rain_sounds.wav"``.
+        manifest_path (Path): Manifest file.
+    Returns:
+        tuple: (path, mime type); the source and ``audio/wav`` when not built.
+    """
+    entry = lookup(source, manifest_path)
+    if entry and entry["kind"] == "audio":
+        path = Path(manifest_path).parent / entry["file"]
+        if path.exists():
+            return str(path), entry["mime"]
+    return source, "audio/wav"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build optimized static assets and their manifest.")
+    parser.add_argument("--out", default=None, help="output directory (default: static/assets)")
+    parser.add_argument("--no-prune", action="store_true", help="keep previously built outputs no longer referenced")
+    args = parser.parse_args(argv)
+
+    report = build(out_dir=args.out, prune=not args.no_prune)
+    print(
+        f"Built {report['built']}, reused {report['reused']}, "
+        f"deduplicated {report['duplicates']}, skipped {report['skipped']}"
+    )
+    print(f"Sources {report['bytes_in'] / 1e6:.1f} MB -> outputs {report['bytes_out'] / 1e6:.1f} MB")
+    if report["skipped"]:
+        print("Skipped files need Pillow (images) or ffmpeg (audio); pages use the originals for them.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
 import streamlit as st
-import google.generativeai as genai
 from google.generativeai import types as genai_types
+import os
 from pathlib import Path
 import requests
+from core.llm_gateway import get_gateway
 
 # ---------- Logo and Page Config ----------
 logo_path = str(Path(__file__).resolve().parent.parent / "static_files" / "TalkHealLogo.png")
@@ -53,12 +54,14 @@ st.subheader(f"🗣️ Current Chatbot Tone: **{st.session_state['selected_tone'
 
 # ---------- Gemini Configuration ----------
 def configure_gemini():
+    if os.getenv("TALKHEAL_FAKE_LLM"):
+        return get_gateway()
     try:
         api_key = st.secrets["GEMINI_API_KEY"]
         if not api_key or api_key == "YOUR_API_KEY_HERE":
             raise ValueError("API key is missing or not set properly.")
-        genai.configure(api_key=api_key)
-        return genai.GenerativeModel('gemini-2.0-flash')
+        # One client per process, shared by every rerun and session
+        return get_gateway(api_key, 'gemini-2.0-flash')
     except KeyError:
         st.error("❌ Gemini API key not found. Please set it in `.streamlit/secrets.toml` as GEMINI_API_KEY.")
     except Exception as e:
@@ -0,0 +1,225 @@
+"""
+Token-budgeted prompt construction for chat turns.
+
+A prompt is the system prompt, a rolling summary of older turns, as many of
+the newest turns as fit in the budget, and the new user message. Turns that
+no longer fit are folded into the summary, which is stored on the
+conversation dict (``conversation["context_summary"]``) and persisted with
+it, so each turn only summarizes messages that were not folded before.
+
+Folding happens in batches: when the history overflows, the oldest turns are
+folded until the rest use at most ``FOLD_TARGET`` of the history budget. The
+following turns then fit again without another summarization call.
+
+Building a prompt never waits on the model. Without an explicit summarizer,
+turns are folded into a quick extractive draft, and
+:func:`refine_chat_summary` replaces the draft with a model-written summary
+once the reply has been shown; the next turn uses that stored summary.
+"""
+
+import math
+
+from core import llm
+
+
+DEFAULT_BUDGET_TOKENS = 2000
+# Share of the budget reserved for the rolling summary
+SUMMARY_SHARE = 0.25
+# After folding, recent turns use at most this share of their budget
+FOLD_TARGET = 0.6
+SUMMARY_KEY = "context_summary"
+
+SUMMARY_PROMPT = """Update the running summary of a supportive conversation between a user and TalkHeal.
+Keep what matters for continuing it: the user's feelings, situation, names and anything they asked to remember.
+Write at most {max_words} words of plain text.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}
+
+Updated summary:"""
+
+
+def count_tokens(text):
+    """
+    Estimate the number of tokens in a text (about four characters per token).
+    Args:
+        text (str): Any text.
+    Returns:
+        int: Estimated token count.
+    """
+    return math.ceil(len(text or "") / 4)
+
+
+def format_message(message):
+    """Render one stored message as a transcript line."""
+    sender = "User" if message.get("sender") == "user" else "TalkHeal"
+    return f"{sender}: {message.get('message', '')}"
+
+
+def extractive_summary(summary, messages, max_tokens):
+    """
+    Summarize without a model by keeping the start of each user message.
+    Args:
+        summary (str): The existing summary.
+        messages (list): Messages to fold in.
+        max_tokens (int): Size limit for the result.
+    Returns:
+        str: The updated summary, trimmed from the front to fit.
+    """
+    lines = [summary] if summary else []
+    for message in messages:
+        if message.get("sender") == "user":
+            text = " ".join(str(message.get("message", "")).split())
+            lines.append(f"User said: {text[:120]}")
+    text = "\n".join(lines)
+    max_chars = max_tokens * 4
+    return text[-max_chars:] if len(text) > max_chars else text
+
+
+def model_summarizer(model):
+    """
+    Build a summarizer that asks the chat model to update the summary.
+    Falls back to :func:`extractive_summary` if the call fails.
+    Args:
+        model: A ``GenerativeModel`` (or compatible fake).
+    Returns:
+        callable: ``summarize(summary, messages, max_tokens) -> str``.
+    """
+    def summarize(summary, messages, max_tokens):
+        prompt = SUMMARY_PROMPT.format(
+            max_words=max(20, int(max_tokens * 0.75)),
+            summary=summary or "(none yet)",
+            messages="\n".join(format_message(m) for m in messages),
+        )
+        try:
+            text = " ".join(model.generate_content(prompt).text.split())
+        except Exception as e:
+            print(f"[context_builder] Summary failed, using extractive fallback: {e}")
+            return extractive_summary(summary, messages, max_tokens)
+        return text[:max_tokens * 4]
+
+    return summarize
+
+
+class ContextBuilder:
+    """
+    Builds prompts that stay within a token budget.
+    Args:
+        budget_tokens (int): Total prompt budget, including the system prompt.
+        summarizer (callable, optional): ``summarize(summary, messages, max_tokens)``
+            called while building. Without one, folded turns get an
+            :func:`extractive_summary` draft for :meth:`refine` to replace.
+    """
+
+    def __init__(self, budget_tokens=DEFAULT_BUDGET_TOKENS, summarizer=None):
+        self.budget_tokens = budget_tokens
+        self.summarizer = summarizer
+        self.summary_budget = int(budget_tokens * SUMMARY_SHARE)
+
+    def build(self, conversation, system_prompt, user_message):
+        """
+        Build the prompt for the next reply.
+        Args:
+            conversation (dict): The conversation; its messages may already end with ``user_message``.
+            system_prompt (str): Instructions for the model (tone and support rules).
+            user_message (str): The message to answer.
+        Returns:
+            str: The prompt. ``conversation["context_summary"]`` is updated when turns are folded.
+        """
+        messages = list(conversation.get("messages", []))
+        if messages and messages[-1].get("sender") == "user" and messages[-1].get("message") == user_message:
+            messages = messages[:-1]
+
+        state = conversation.get(SUMMARY_KEY) or {"text": "", "upto": 0}
+        summary, upto = state.get("text", ""), min(state.get("upto", 0), len(messages))
+
+        history_budget = max(
+            0, self.budget_tokens - self.summary_budget - count_tokens(system_prompt) - count_tokens(user_message) - 16
+        )
+
+        lines = [format_message(m) for m in messages[upto:]]
+        costs = [count_tokens(line) + 1 for line in lines]
+        if sum(costs) > history_budget:
+            # Fold the oldest unsummarized turns until the rest fit comfortably
+            keep_cost, keep = 0, 0
+            for cost in reversed(costs):
+                if keep_cost + cost > history_budget * FOLD_TARGET:
+                    break
+                keep_cost += cost
+                keep += 1
+            fold = len(lines) - keep
+            new_state = {}
+            if self.summarizer is None:
+                # Keep where the draft starts so refine() can summarize the whole span properly
+                new_state["draft"] = state.get("draft") or {"text": summary, "from": upto}
+                summary = extractive_summary(summary, messages[upto:upto + fold], self.summary_budget)
+            else:
+                summary = self.summarizer(summary, messages[upto:upto + fold], self.summary_budget)
+            upto += fold
+            lines = lines[fold:]
+            conversation[SUMMARY_KEY] = dict(new_state, text=summary, upto=upto)
+
+        parts = [system_prompt.strip()]
+        if summary:
+            parts.append(f"Summary of the earlier conversation:\n{summary}")
+        if lines:
+            parts.append("Recent conversation:\n" + "\n".join(lines))
+        parts.append(f"User: {user_message}\nTalkHeal:")
+        return "\n\n".join(parts)
+
+    def refine(self, conversation, summarizer):
+        """
+        Replace an extractive draft summary with one from the given summarizer.
+        Args:
+            conversation (dict): The conversation, as updated by :meth:`build`.
+            summarizer (callable): ``summarize(summary, messages, max_tokens)``.
+        Returns:
+            bool: True if a draft was replaced.
+        """
+        state = conversation.get(SUMMARY_KEY) or {}
+        draft = state.get("draft")
+        if not draft:
+            return False
+        messages = conversation.get("messages", [])
+        folded = messages[draft["from"]:state["upto"]]
+        summary = summarizer(draft["text"], folded, self.summary_budget)
+        conversation[SUMMARY_KEY] = {"text": summary, "upto": state["upto"]}
+        return True
+
+
+def build_chat_prompt(conversation, system_prompt, user_message, budget_tokens=DEFAULT_BUDGET_TOKENS):
+    """
+    Build the prompt for a chat turn with the TalkHeal support rules included once.
+    Older turns that no longer fit are folded into a draft summary without
+    calling the model; pass the conversation to :func:`refine_chat_summary`
+    after the reply.
+    Args:
+        conversation (dict): The active conversation.
+        system_prompt (str): The tone/personality prompt.
+        user_message (str): The message to answer.
+        budget_tokens (int): Total prompt budget.
+    Returns:
+        str: The prompt.
+    """
+    builder = ContextBuilder(budget_tokens=budget_tokens)
+    instructions = f"{system_prompt}\n\n{llm.SUPPORT_INSTRUCTIONS}" if system_prompt else llm.SUPPORT_INSTRUCTIONS
+    return builder.build(conversation, instructions, user_message)
+
+
+def refine_chat_summary(conversation, model, budget_tokens=DEFAULT_BUDGET_TOKENS):
+    """
+    Have the chat model rewrite the draft summary left by :func:`build_chat_prompt`.
+    Call it once the reply has been shown; the next turn's prompt uses the result.
+    Args:
+        conversation (dict): The active conversation.
+        model: Chat model used to summarize; None leaves the draft in place.
+        budget_tokens (int): Total prompt budget, as passed to build_chat_prompt.
+    Returns:
+        bool: True if the stored summary changed.
+    """
+    if model is None:
+        return False
+    return ContextBuilder(budget_tokens=budget_tokens).refine(conversation, model_summarizer(model))
@@ -0,0 +1,636 @@
+"""
+SQLite-backed conversation repository.
+
+Conversations and messages live in ``data/conversations.db`` (WAL mode, via
+the shared connections in core.db) in two tables keyed by ``(user_key, id)``.
+The sidebar only needs conversation
+metadata, so :meth:`ConversationRepository.load_conversations` returns titles
+and message counts, and message bodies are fetched the first time a
+conversation is opened.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+from core import conversation_store, db
+from core.conversation_store import DATA_DIR, LazyMessages
+
+
+DB_PATH = os.path.join(DATA_DIR, "conversations.db")
+
+# Columns stored natively; any other conversation/message keys go into the `extra` JSON column.
+CONVERSATION_COLUMNS = ("id", "user_key", "title", "date")
+MESSAGE_COLUMNS = ("sender", "message", "time")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    user_key TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    title TEXT,
+    date TEXT,
+    extra TEXT,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (user_key, id)
+);
+
+CREATE TABLE IF NOT EXISTS messages (
+    user_key TEXT NOT NULL,
+    convo_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    sender TEXT,
+    message TEXT,
+    time TEXT,
+    extra TEXT,
+    PRIMARY KEY (user_key, convo_id, seq)
+);
+
+CREATE TABLE IF NOT EXISTS migrations (
+    user_key TEXT PRIMARY KEY,
+    migrated_at TEXT NOT NULL
+);
+"""
+
+
+# Full-text index over message bodies, kept in sync with `messages` by triggers
+# so every append is indexed incrementally. The ``owner`` column holds the
+# user key as one hex token, so a search matches only that user's postings
+# instead of filtering every user's hits afterwards.
+FTS_SCHEMA = """
+CREATE VIEW messages_fts_source AS
+    SELECT rowid AS id, message, hex(user_key) AS owner FROM messages;
+CREATE VIRTUAL TABLE messages_fts USING fts5(
+    message, owner, content='messages_fts_source', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER messages_fts_insert AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts(rowid, message, owner) VALUES (new.rowid, new.message, hex(new.user_key));
+END;
+CREATE TRIGGER messages_fts_delete AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts(messages_fts, rowid, message, owner)
+    VALUES ('delete', old.rowid, old.message, hex(old.user_key));
+END;
+CREATE TRIGGER messages_fts_update AFTER UPDATE OF message, user_key ON messages BEGIN
+    INSERT INTO messages_fts(messages_fts, rowid, message, owner)
+    VALUES ('delete', old.rowid, old.message, hex(old.user_key));
+    INSERT INTO messages_fts(rowid, message, owner) VALUES (new.rowid, new.message, hex(new.user_key));
+END;
+INSERT INTO messages_fts(messages_fts) VALUES ('rebuild');
+"""
+
+# The first index had no owner column; it is dropped and rebuilt
+DROP_FTS = """
+DROP TRIGGER IF EXISTS messages_fts_insert;
+DROP TRIGGER IF EXISTS messages_fts_delete;
+DROP TRIGGER IF EXISTS messages_fts_update;
+DROP TABLE IF EXISTS messages_fts;
+DROP VIEW IF EXISTS messages_fts_source;
+"""
+
+# Private-use markers passed to snippet(); they never occur in chat text and
+# are stripped out again to compute highlight offsets.
+_HL_START, _HL_END = "\ue000", "\ue001"
+SNIPPET_TOKENS = 16
+
+
+def _fts_query(query):
+    """Turn free text into a safe FTS5 query: every word must match, the last as a prefix."""
+    tokens = re.findall(r"\w+", query.lower())
+    if not tokens:
+        return None
+    terms = [f'"{t}"' for t in tokens[:-1]] + [f'"{tokens[-1]}"*']
+    return " ".join(terms)
+
+
+def _owner_token(user_key):
+    # Same value as hex(user_key) in FTS_SCHEMA
+    return str(user_key).encode("utf-8").hex().upper()
+
+
+def _like_pattern(text):
+    """A LIKE pattern matching ``text`` literally anywhere (use with ESCAPE '\\')."""
+    return "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _highlight_offsets(marked):
+    """Strip highlight markers from a snippet and return (text, [(start, end), ...])."""
+    text, offsets, start = [], [], None
+    pos = 0
+    for ch in marked:
+        if ch == _HL_START:
+            start = pos
+        elif ch == _HL_END:
+            if start is not None:
+                offsets.append((start, pos))
+            start = None
+        else:
+            text.append(ch)
+            pos += 1
+    return "".join(text), offsets
+
+
+def _split(record, columns):
+    """Split a dict into native column values and a JSON blob of the rest."""
+    extra = {k: v for k, v in record.items() if k not in columns and k != "messages"}
+    return [record.get(c) for c in columns], (json.dumps(extra) if extra else None)
+
+
+def _merge(row, columns, extra):
+    record = dict(zip(columns, row))
+    if extra:
+        record.update(json.loads(extra))
+    return record
+
+
+class ConversationRepository:
+    """
+    Stores every user's conversations in one SQLite database.
+    Connections come from core.db; use :func:`get_repository` for the shared instance.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        # user_key -> {convo id: metadata} as last written
+        self._persisted = {}
+        db.ensure_schema(db_path, SCHEMA)
+        self.has_fts = self._init_fts()
+
+    def _init_fts(self):
+        """Create the full-text index if this SQLite build has FTS5."""
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'messages_fts'").fetchone():
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(messages_fts)")}
+            if "owner" in columns:
+                return True
+            conn.executescript(DROP_FTS)
+        try:
+            conn.executescript(FTS_SCHEMA)
+            return True
+        except sqlite3.OperationalError as e:
+            print(f"[ConversationRepository] FTS5 unavailable, search falls back to LIKE: {e}")
+            return False
+
+    def _conn(self):
+        return db.get_connection(self.db_path)
+
+    # ---------- paginated reads ----------
+    def count_conversations(self, user_key):
+        """
+        Count a user's conversations.
+        Args:
+            user_key (str): The user's email or IP.
+        Returns:
+            int: Number of stored conversations.
+        """
+        row = self._conn().execute(
+            "SELECT COUNT(*) FROM conversations WHERE user_key = ?", (user_key,)
+        ).fetchone()
+        return row[0]
+
+    def list_conversations(self, user_key, limit=None, offset=0, before_id=None):
+        """
+        List conversation metadata (no message bodies), newest first.
+        Args:
+            user_key (str): The user's email or IP.
+            limit (int, optional): Page size; all conversations when None.
+            offset (int): Number of conversations to skip.
+            before_id (int, optional): Keyset paging: only ids below this one,
+                i.e. the page after the one ending at ``before_id``.
+        Returns:
+            list: Dicts with id, title, date, message_count and any extra fields.
+        """
+        rows = self._conn().execute(
+            """
+            SELECT id, user_key, title, date, extra, message_count
+            FROM conversations WHERE user_key = ? AND id < ?
+            ORDER BY id DESC LIMIT ? OFFSET ?
+            """,
+            (user_key, (1 << 62) if before_id is None else before_id, -1 if limit is None else limit, offset),
+        ).fetchall()
+        conversations = []
+        for row in rows:
+            convo = _merge(row[:4], CONVERSATION_COLUMNS, row[4])
+            convo["message_count"] = row[5]
+            conversations.append(convo)
+        return conversations
+
+    def get_conversation(self, user_key, convo_id):
+        """
+        Get one conversation's metadata by id.
+        Args:
+            user_key (str): The user's email or IP.
+            convo_id (int): The conversation ID.
+        Returns:
+            dict or None: Metadata dict, or None if not found.
+        """
+        row = self._conn().execute(
+            "SELECT id, user_key, title, date, extra, message_count FROM conversations WHERE user_key = ? AND id = ?",
+            (user_key, convo_id),
+        ).fetchone()
+        if not row:
+            return None
+        convo = _merge(row[:4], CONVERSATION_COLUMNS, row[4])
+        convo["message_count"] = row[5]
+        return convo
+
+    def statistics(self, user_key):
+        """
+        Count a user's conversations and messages without loading them.
+        Args:
+            user_key (str): The user's email or IP.
+        Returns:
+            dict: ``conversations``, ``messages`` and ``user_messages``.
+        """
+        conn = self._conn()
+        conversations, messages = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(message_count), 0) FROM conversations WHERE user_key = ?", (user_key,)
+        ).fetchone()
+        user_messages = conn.execute(
+            "SELECT COUNT(*) FROM messages WHERE user_key = ? AND sender = 'user'", (user_key,)
+        ).fetchone()[0]
+        return {"conversations": conversations, "messages": messages, "user_messages": user_messages}
+
+    def get_messages(self, user_key, convo_id, limit=None, offset=0):
+        """
+        Fetch a page of messages for one conversation, oldest first.
+        Args:
+            user_key (str): The user's email or IP.
+            convo_id (int): The conversation ID.
+            limit (int, optional): Page size; all messages when None.
+            offset (int): Number of messages to skip.
+        Returns:
+            list: Message dicts.
+        """
+        rows = self._conn().execute(
+            """
+            SELECT sender, message, time, extra FROM messages
+            WHERE user_key = ? AND convo_id = ?
+            ORDER BY seq LIMIT ? OFFSET ?
+            """,
+            (user_key, convo_id, -1 if limit is None else limit, offset),
+        ).fetchall()
+        return [_merge(row[:3], MESSAGE_COLUMNS, row[3]) for row in rows]
+
+    def next_conversation_id(self, user_key):
+        """
+        Get the next free conversation id for a user.
+        Args:
+            user_key (str): The user's email or IP.
+        Returns:
+            int: One past the highest stored id.
+        """
+        row = self._conn().execute(
+            "SELECT MAX(id) FROM conversations WHERE user_key = ?", (user_key,)
+        ).fetchone()
+        return (row[0] or 0) + 1
+
+    def search(self, user_key, query, limit=50):
+        """
+        Full-text search over a user's messages and conversation titles.
+        Args:
+            user_key (str): The user's email or IP.
+            query (str): Free-text query; every word must match, the last one as a prefix.
+            limit (int): Maximum number of matching messages to return.
+        Returns:
+            list: One dict per conversation, best match first, with ``convo_id``,
+            ``title``, ``date``, ``score`` and ``matches``. Each match has the
+            truncated ``message``, ``time``, a ``snippet`` and ``highlights``
+            as (start, end) offsets into the snippet.
+        """
+        fts_query = _fts_query(query)
+        if not fts_query:
+            return []
+        conn = self._conn()
+        pattern = _like_pattern(query)
+        if self.has_fts:
+            # The owner term restricts the match itself to this user's postings
+            rows = conn.execute(
+                f"""
+                SELECT m.convo_id, m.message, m.time,
+                       snippet(messages_fts, 0, ?, ?, '...', {SNIPPET_TOKENS}), bm25(messages_fts, 1.0, 0.0)
+                FROM messages_fts
+                JOIN messages m ON m.rowid = messages_fts.rowid
+                WHERE messages_fts MATCH ? AND m.user_key = ?
+                ORDER BY bm25(messages_fts, 1.0, 0.0)
+                LIMIT ?
+                """,
+                (_HL_START, _HL_END, f'owner : "{_owner_token(user_key)}" AND message : ({fts_query})', user_key, limit),
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                """
+                SELECT convo_id, message, time, message, 0.0 FROM messages
+                WHERE user_key = ? AND message LIKE ? ESCAPE '\\' ORDER BY convo_id DESC, seq LIMIT ?
+                """,
+                (user_key, pattern, limit),
+            ).fetchall()
+
+        results = {}
+        for convo_id, message, time, marked, score in rows:
+            entry = results.get(convo_id)
+            if entry is None:
+                entry = results[convo_id] = {"convo_id": convo_id, "score": score, "matches": []}
+            snippet, highlights = _highlight_offsets(marked or "")
+            entry["matches"].append({
+                "message": (message or "")[:100] + "...",
+                "time": time,
+                "snippet": snippet,
+                "highlights": highlights,
+                "score": score,
+            })
+
+        # Conversations whose title matches rank after message hits.
+        title_rows = conn.execute(
+            "SELECT id FROM conversations WHERE user_key = ? AND title LIKE ? ESCAPE '\\' ORDER BY id DESC",
+            (user_key, pattern),
+        ).fetchall()
+        for (convo_id,) in title_rows:
+            results.setdefault(convo_id, {"convo_id": convo_id, "score": 0.0, "matches": []})
+        if not results:
+            return []
+
+        ids = list(results)
+        titles = {
+            convo_id: (title, date)
+            for convo_id, title, date in conn.execute(
+                f"SELECT id, title, date FROM conversations WHERE user_key = ? AND id IN ({', '.join('?' * len(ids))})",
+                (user_key, *ids),
+            )
+        }
+        ordered = sorted(results.values(), key=lambda r: r["score"])
+        for entry in ordered:
+            entry["title"], entry["date"] = titles.get(entry["convo_id"], (None, None))
+        return ordered
+
+    # ---------- writes ----------
+    def _write_conversation(self, conn, user_key, convo, message_count):
+        values, extra = _split(convo, CONVERSATION_COLUMNS)
+        now = datetime.now().isoformat()
+        conn.execute(
+            """
+            INSERT INTO conversations (user_key, id, title, date, extra, message_count, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_key, id) DO UPDATE SET
+                title = excluded.title,
+                date = excluded.date,
+                extra = excluded.extra,
+                message_count = excluded.message_count,
+                updated_at = excluded.updated_at
+            """,
+            (user_key, values[0], values[2], values[3], extra, message_count, now, now),
+        )
+
+    def _write_messages(self, conn, user_key, convo_id, messages, start_seq):
+        rows = []
+        for seq, msg in enumerate(messages, start=start_seq):
+            values, extra = _split(msg, MESSAGE_COLUMNS)
+            rows.append((user_key, convo_id, seq, *values, extra))
+        # A real upsert (not INSERT OR REPLACE) so the FTS update trigger fires.
+        conn.executemany(
+            """
+            INSERT INTO messages (user_key, convo_id, seq, sender, message, time, extra)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_key, convo_id, seq) DO UPDATE SET
+                sender = excluded.sender,
+                message = excluded.message,
+                time = excluded.time,
+                extra = excluded.extra
+            """,
+            rows,
+        )
+
+    def _persisted_state(self, user_key):
+        return self._persisted.setdefault(user_key, {})
+
+    def _persisted_entry(self, user_key, convo_id):
+        # Last written metadata of one conversation, read by primary key the
+        # first time it is saved in this process
+        state = self._persisted_state(user_key)
+        if convo_id not in state:
+            convo = self.get_conversation(user_key, convo_id)
+            if convo is None:
+                return None
+            convo.pop("message_count")
+            state[convo_id] = convo
+        return state[convo_id]
+
+    def _stored_count(self, conn, user_key, convo_id):
+        # One past the highest stored position, read inside the write transaction
+        # so messages saved meanwhile by another tab are appended after, not over
+        return conn.execute(
+            "SELECT COALESCE(MAX(seq) + 1, 0) FROM messages WHERE user_key = ? AND convo_id = ?",
+            (user_key, convo_id),
+        ).fetchone()[0]
+
+    def create_conversation(self, user_key, convo):
+        """
+        Insert a new conversation (and any initial messages).
+        Args:
+            user_key (str): The user's email or IP.
+            convo (dict): Conversation dict with an ``id``.
+        """
+        with self._lock:
+            messages = list(convo.get("messages", []))
+            with db.transaction(self.db_path) as conn:
+                self._write_conversation(conn, user_key, convo, len(messages))
+                self._write_messages(conn, user_key, convo["id"], messages, 0)
+            meta = {k: v for k, v in convo.items() if k != "messages"}
+            self._persisted_state(user_key)[convo["id"]] = meta
+            # Track what is saved so later saves only append this session's new messages
+            convo["messages"] = LazyMessages(lambda: messages, len(messages))
+
+    def save_conversations(self, user_key, conversations):
+        """
+        Persist conversations from memory, writing only what changed.
+        New messages are appended after the highest stored position and
+        changed metadata is upserted, in one transaction. Messages are never
+        removed here, so two tabs adding to one conversation both keep theirs;
+        use :meth:`replace_messages` to delete messages. Conversations not in
+        the list are left alone too: a session only holds a page of them, and
+        other tabs may have created more. Use :meth:`delete_conversation` to
+        delete one.
+
+        The new messages of a :class:`LazyMessages` list are those after its
+        ``saved`` count; for a plain list, those beyond the stored count.
+        Args:
+            user_key (str): The user's email or IP.
+            conversations (list): Conversation dicts to save.
+        """
+        with self._lock:
+            state = self._persisted_state(user_key)
+            seen, saved = set(), []
+            with db.transaction(self.db_path) as conn:
+                for convo in conversations:
+                    convo_id = convo.get("id")
+                    if not isinstance(convo_id, int) or convo_id in seen:
+                        convo_id = max(seen | {self.next_conversation_id(user_key) - 1}) + 1
+                        convo["id"] = convo_id
+                    seen.add(convo_id)
+
+                    old_meta = self._persisted_entry(user_key, convo_id)
+                    stored = self._stored_count(conn, user_key, convo_id)
+                    messages = convo.get("messages", [])
+                    if isinstance(messages, LazyMessages):
+                        new = messages[messages.saved:] if messages.is_loaded else []
+                    else:
+                        new = list(messages[stored:])
+                    if new:
+                        self._write_messages(conn, user_key, convo_id, new, stored)
+                        if isinstance(messages, LazyMessages):
+                            saved.append((messages, len(messages)))
+
+                    meta = {k: v for k, v in convo.items() if k != "messages"}
+                    if meta != old_meta or new:
+                        self._write_conversation(conn, user_key, meta, stored + len(new))
+                        state[convo_id] = meta
+            for messages, count in saved:
+                messages.saved = count
+
+    def replace_messages(self, user_key, convo_id, messages):
+        """
+        Overwrite all stored messages of a conversation, e.g. after deleting some.
+        Args:
+            user_key (str): The user's email or IP.
+            convo_id (int): The conversation ID.
+            messages (list): The complete new message list.
+        """
+        with self._lock:
+            messages = list(messages)
+            with db.transaction(self.db_path) as conn:
+                conn.execute("DELETE FROM messages WHERE user_key = ? AND convo_id = ?", (user_key, convo_id))
+                self._write_messages(conn, user_key, convo_id, messages, 0)
+                conn.execute(
+                    "UPDATE conversations SET message_count = ?, updated_at = ? WHERE user_key = ? AND id = ?",
+                    (len(messages), datetime.now().isoformat(), user_key, convo_id),
+                )
+
+    def delete_conversation(self, user_key, convo_id):
+        """
+        Delete one conversation and its messages.
+        Args:
+            user_key (str): The user's email or IP.
+            convo_id (int): The conversation ID.
+        Returns:
+            bool: True if the conversation existed.
+        """
+        with self._lock:
+            with db.transaction(self.db_path) as conn:
+                conn.execute("DELETE FROM messages WHERE user_key = ? AND convo_id = ?", (user_key, convo_id))
+                deleted = conn.execute(
+                    "DELETE FROM conversations WHERE user_key = ? AND id = ?", (user_key, convo_id)
+                ).rowcount
+            self._persisted_state(user_key).pop(convo_id, None)
+            return deleted > 0
+
+    def delete_user(self, user_key):
+        """
+        Delete every conversation belonging to a user.
+        Args:
+            user_key (str): The user's email or IP.
+        """
+        with self._lock:
+            with db.transaction(self.db_path) as conn:
+                conn.execute("DELETE FROM messages WHERE user_key = ?", (user_key,))
+                conn.execute("DELETE FROM conversations WHERE user_key = ?", (user_key,))
+            self._persisted[user_key] = {}
+
+    # ---------- session helpers ----------
+    def load_conversations(self, user_key, limit=None, offset=0, before_id=None):
+        """
+        Load a page of conversation metadata for the session; messages are fetched on open.
+        Args:
+            user_key (str): The user's email or IP.
+            limit (int, optional): Page size; all conversations when None.
+            offset (int): Number of conversations to skip.
+            before_id (int, optional): Only conversations older than this id (keyset paging).
+        Returns:
+            list: Conversation dicts whose ``messages`` are :class:`LazyMessages`.
+        """
+        self.migrate_user(user_key)
+        return [
+            self._lazy(user_key, convo)
+            for convo in self.list_conversations(user_key, limit=limit, offset=offset, before_id=before_id)
+        ]
+
+    def open_conversation(self, user_key, convo_id):
+        """
+        Get one conversation by primary key, with messages fetched on first use.
+        Args:
+            user_key (str): The user's email or IP.
+            convo_id (int): The conversation ID.
+        Returns:
+            dict or None: Conversation dict whose ``messages`` are :class:`LazyMessages`.
+        """
+        convo = self.get_conversation(user_key, convo_id)
+        return self._lazy(user_key, convo) if convo else None
+
+    def _lazy(self, user_key, convo):
+        count = convo.pop("message_count")
+        convo["messages"] = LazyMessages(lambda cid=convo["id"]: self.get_messages(user_key, cid), count)
+        return convo
+
+    def snapshot(self, user_key):
+        """
+        Materialize every conversation of a user with its messages.
+        Args:
+            user_key (str): The user's email or IP.
+        Returns:
+            list: Plain conversation dicts, newest first.
+        """
+        conversations = []
+        for convo in self.list_conversations(user_key):
+            convo.pop("message_count")
+            convo["messages"] = self.get_messages(user_key, convo["id"])
+            conversations.append(convo)
+        return conversations
+
+    def migrate_user(self, user_key, base_dir=DATA_DIR):
+        """
+        Import a user's file-based history (append-only logs or the older single
+        JSON file) the first time they are seen.
+        Args:
+            user_key (str): The user's email or IP.
+            base_dir (str): Directory holding the file-based conversation data.
+        """
+        if self._conn().execute("SELECT 1 FROM migrations WHERE user_key = ?", (user_key,)).fetchone():
+            return
+        with self._lock:
+            found = conversation_store.has_history(user_key, base_dir)
+            conversations = conversation_store.read_history(user_key, base_dir) if found else []
+            with db.transaction(self.db_path) as conn:
+                for convo in conversations:
+                    messages = convo.get("messages", [])
+                    self._write_conversation(conn, user_key, convo, len(messages))
+                    self._write_messages(conn, user_key, convo["id"], messages, 0)
+                conn.execute(
+                    "INSERT OR IGNORE INTO migrations (user_key, migrated_at) VALUES (?, ?)",
+                    (user_key, datetime.now().isoformat()),
+                )
+            self._persisted.pop(user_key, None)
+            if found:
+                conversation_store.retire_history(user_key, base_dir)
+
+
+_repository = None
+_repository_lock = threading.Lock()
+
+
+def get_repository(db_path=DB_PATH):
+    """
+    Return the process-wide conversation repository.
+    Args:
+        db_path (str): Path of the SQLite database.
+    Returns:
+        ConversationRepository: The shared repository.
+    """
+    global _repository
+    with _repository_lock:
+        if _repository is None or _repository.db_path != db_path:
+            _repository = ConversationRepository(db_path)
+        return _repository
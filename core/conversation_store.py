@@ -0,0 +1,204 @@
+"""
+File-based conversation history, read once for migration.
+
+Conversations live in the SQLite conversation repository
+(:mod:`core.conversation_repository`). Older deployments kept them in files
+under ``data/``, in one of two layouts:
+
+* ``conversations_<user>.json``  - the whole history in a single JSON file
+* ``conversations_<user>/``      - ``meta.jsonl`` (an operation log of ``put`` /
+                                   ``delete`` metadata records) plus one
+                                   ``<id>.jsonl`` message log per conversation
+
+:func:`read_history` reads either layout so the repository can import it.
+This module also holds :class:`LazyMessages`, the message list the
+repository hands out before the messages are read.
+"""
+
+import json
+import os
+from collections import UserList
+
+
+DATA_DIR = "data"
+META_FILE = "meta.jsonl"
+
+
+def safe_user_key(user_key):
+    """
+    Turn an email or IP into a filesystem-safe identifier.
+    Args:
+        user_key (str): The user's email or IP address.
+    Returns:
+        str: Identifier safe to use in a file name.
+    """
+    key = str(user_key or "anonymous")
+    return key.replace("@", "_at_").replace(".", "_dot_").replace(":", "_").replace("/", "_")
+
+
+def legacy_path(user_key, base_dir=DATA_DIR):
+    """Path of the single JSON history file for a user."""
+    # The old naming only escaped emails; IP-keyed files kept their dots.
+    key = str(user_key)
+    if "@" in key:
+        key = key.replace("@", "_at_").replace(".", "_dot_")
+    return os.path.join(base_dir, f"conversations_{key}.json")
+
+
+def log_dir(user_key, base_dir=DATA_DIR):
+    """Directory of the per-conversation logs for a user."""
+    return os.path.join(base_dir, f"conversations_{safe_user_key(user_key)}")
+
+
+def _read_jsonl(path):
+    """Yield decoded records from a JSON-lines file, skipping a torn trailing line."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # A crash mid-append can leave a partial last line; ignore it.
+                continue
+
+
+def _read_json_file(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            conversations = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"[conversation_store] Could not read {path}: {e}")
+        return []
+    used_ids = set()
+    for convo in conversations:
+        convo_id = convo.get("id")
+        if not isinstance(convo_id, int) or convo_id in used_ids:
+            convo["id"] = max(used_ids, default=0) + 1
+        used_ids.add(convo["id"])
+        convo.setdefault("messages", [])
+    return conversations
+
+
+def _read_log_dir(path):
+    meta, counts = {}, {}
+    for record in _read_jsonl(os.path.join(path, META_FILE)):
+        convo_id = record.get("id")
+        if record.get("op") == "delete":
+            meta.pop(convo_id, None)
+            counts.pop(convo_id, None)
+        else:
+            meta[convo_id] = record.get("meta", {})
+            counts[convo_id] = record.get("count", 0)
+    # The metadata record was written after the messages it counts, so a crash in
+    # between left extra lines that the next save appended again. Only the first
+    # ``count`` lines of a log are committed history.
+    return [
+        {**meta[convo_id], "messages": list(_read_jsonl(os.path.join(path, f"{convo_id}.jsonl")))[:counts[convo_id]]}
+        for convo_id in sorted(meta, reverse=True)
+    ]
+
+
+def has_history(user_key, base_dir=DATA_DIR):
+    """
+    Check whether a user has file-based history to migrate.
+    Args:
+        user_key (str): The user's email or IP address.
+        base_dir (str): Directory holding conversation data.
+    Returns:
+        bool: True if either file layout exists for the user.
+    """
+    return os.path.isdir(log_dir(user_key, base_dir)) or os.path.exists(legacy_path(user_key, base_dir))
+
+
+def read_history(user_key, base_dir=DATA_DIR):
+    """
+    Read a user's file-based history, from the log directory if present,
+    otherwise from the single JSON file.
+    Args:
+        user_key (str): The user's email or IP address.
+        base_dir (str): Directory holding conversation data.
+    Returns:
+        list: Plain conversation dicts with unique integer ids.
+    """
+    path = log_dir(user_key, base_dir)
+    if os.path.exists(os.path.join(path, META_FILE)):
+        return _read_log_dir(path)
+    legacy = legacy_path(user_key, base_dir)
+    if os.path.exists(legacy):
+        return _read_json_file(legacy)
+    return []
+
+
+def retire_history(user_key, base_dir=DATA_DIR):
+    """
+    Move a user's migrated files aside (``.migrated`` suffix) so they are not read again.
+    Args:
+        user_key (str): The user's email or IP address.
+        base_dir (str): Directory holding conversation data.
+    """
+    for path in (log_dir(user_key, base_dir), legacy_path(user_key, base_dir)):
+        if os.path.exists(path):
+            os.replace(path, path + ".migrated")
+
+
+class LazyMessages(UserList):
+    """
+    Message list that loads its messages only when they are used.
+
+    ``len()`` and truthiness are answered from the stored message count so the
+    sidebar can list conversations without reading any messages. ``saved`` is
+    how many leading messages are already stored; the rest are appended on
+    the next save.
+    """
+
+    def __init__(self, loader, count):
+        self._loader = loader
+        self._count = count
+        self._data = None
+        self.saved = count
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = list(self._loader())
+            self.saved = len(self._data)
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = list(value)
+
+    @property
+    def is_loaded(self):
+        return self._data is not None
+
+    def __len__(self):
+        if self._data is None:
+            return self._count
+        return len(self._data)
+
+    # UserList rebuilds slices and copies through the constructor; hand back plain lists.
+    def __getitem__(self, i):
+        return self.data[i]
+
+    def __add__(self, other):
+        return self.data + list(other)
+
+    def __radd__(self, other):
+        return list(other) + self.data
+
+    def __mul__(self, n):
+        return self.data * n
+
+    __rmul__ = __mul__
+
+    def copy(self):
+        return list(self.data)
+
+    def __reduce_ex__(self, protocol):
+        # Pickle (e.g. session state snapshots) as a plain list.
+        return (list, (list(self.data),))
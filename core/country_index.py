@@ -0,0 +1,237 @@
+"""
+Compact offline index for coordinate -> country lookups.
+
+* ``COUNTRY_BOXES``: bounding boxes, ``(country_code, south, west, north,
+  east)`` in degrees (a few countries have more than one). They narrow a
+  point down to the countries it could be in.
+* ``CITY_POINTS``: ``(country_code, latitude, longitude)`` of capitals and
+  major cities. Where boxes overlap, the country of the nearest city wins,
+  which settles most border regions where people actually live.
+
+It is exact enough to pick a helpline list, not for anything finer.
+"""
+
+COUNTRY_BOXES = (
+    # North and Central America
+    ("US", 24.4, -124.8, 49.4, -66.9),
+    ("US", 51.2, -179.2, 71.4, -129.9),
+    ("US", 18.9, -160.3, 22.3, -154.8),
+    ("CA", 41.7, -141.0, 83.1, -52.6),
+    ("MX", 14.5, -118.4, 32.7, -86.7),
+    ("GT", 13.7, -92.2, 17.8, -88.2),
+    ("CU", 19.8, -85.0, 23.3, -74.1),
+    # South America
+    ("BR", -33.8, -74.0, 5.3, -34.8),
+    ("AR", -55.1, -73.6, -21.8, -53.6),
+    ("CL", -56.0, -75.7, -17.5, -66.4),
+    ("CO", -4.2, -79.0, 12.5, -66.9),
+    ("PE", -18.4, -81.4, 0.0, -68.7),
+    ("VE", 0.6, -73.4, 12.2, -59.8),
+    ("EC", -5.0, -81.1, 1.4, -75.2),
+    ("BO", -22.9, -69.6, -9.7, -57.5),
+    ("PY", -27.6, -62.6, -19.3, -54.3),
+    ("UY", -35.0, -58.4, -30.1, -53.1),
+    # Europe
+    ("GB", 49.9, -8.2, 60.9, 1.8),
+    ("IE", 51.4, -10.5, 55.4, -6.0),
+    ("FR", 41.3, -5.1, 51.1, 9.6),
+    ("ES", 36.0, -9.3, 43.8, 3.3),
+    ("PT", 36.9, -9.5, 42.2, -6.2),
+    ("DE", 47.3, 5.9, 55.1, 15.0),
+    ("NL", 50.8, 3.4, 53.6, 7.2),
+    ("BE", 49.5, 2.5, 51.5, 6.4),
+    ("LU", 49.4, 5.7, 50.2, 6.5),
+    ("CH", 45.8, 5.9, 47.8, 10.5),
+    ("AT", 46.4, 9.5, 49.0, 17.2),
+    ("IT", 36.6, 6.6, 47.1, 18.5),
+    ("DK", 54.6, 8.1, 57.8, 15.2),
+    ("NO", 58.0, 4.6, 71.2, 31.1),
+    ("SE", 55.3, 11.1, 69.1, 24.2),
+    ("FI", 59.8, 20.6, 70.1, 31.6),
+    ("IS", 63.3, -24.5, 66.6, -13.5),
+    ("PL", 49.0, 14.1, 54.8, 24.2),
+    ("CZ", 48.6, 12.1, 51.1, 18.9),
+    ("SK", 47.7, 16.8, 49.6, 22.6),
+    ("HU", 45.7, 16.1, 48.6, 22.9),
+    ("RO", 43.6, 20.3, 48.3, 29.7),
+    ("BG", 41.2, 22.4, 44.2, 28.6),
+    ("GR", 34.8, 19.4, 41.7, 28.2),
+    ("RS", 42.2, 18.8, 46.2, 23.0),
+    ("HR", 42.4, 13.5, 46.6, 19.4),
+    ("SI", 45.4, 13.4, 46.9, 16.6),
+    ("EE", 57.5, 21.8, 59.7, 28.2),
+    ("LV", 55.7, 21.0, 58.1, 28.2),
+    ("LT", 53.9, 21.0, 56.5, 26.8),
+    ("UA", 44.4, 22.1, 52.4, 40.2),
+    ("BY", 51.3, 23.2, 56.2, 32.8),
+    ("RU", 41.2, 19.6, 81.9, 180.0),
+    ("TR", 35.8, 26.0, 42.1, 44.8),
+    # Middle East and Africa
+    ("IL", 29.5, 34.3, 33.3, 35.9),
+    ("SA", 16.4, 34.5, 32.2, 55.7),
+    ("AE", 22.6, 51.6, 26.1, 56.4),
+    ("IR", 25.1, 44.0, 39.8, 63.3),
+    ("IQ", 29.1, 38.8, 37.4, 48.6),
+    ("EG", 22.0, 24.7, 31.7, 36.9),
+    ("MA", 27.7, -13.2, 35.9, -1.0),
+    ("DZ", 19.0, -8.7, 37.1, 12.0),
+    ("TN", 30.2, 7.5, 37.3, 11.6),
+    ("NG", 4.3, 2.7, 13.9, 14.7),
+    ("GH", 4.7, -3.3, 11.2, 1.2),
+    ("KE", -4.7, 33.9, 5.0, 41.9),
+    ("ET", 3.4, 33.0, 14.9, 48.0),
+    ("TZ", -11.7, 29.3, -1.0, 40.4),
+    ("UG", -1.5, 29.6, 4.2, 35.0),
+    ("ZW", -22.4, 25.2, -15.6, 33.1),
+    ("ZA", -34.8, 16.5, -22.1, 32.9),
+    # Asia and Oceania
+    ("IN", 6.7, 68.1, 35.5, 97.4),
+    ("PK", 23.7, 60.9, 37.1, 77.8),
+    ("BD", 20.7, 88.0, 26.6, 92.7),
+    ("LK", 5.9, 79.7, 9.8, 81.9),
+    ("NP", 26.3, 80.1, 30.4, 88.2),
+    ("CN", 18.2, 73.5, 53.6, 134.8),
+    ("HK", 22.15, 113.8, 22.6, 114.4),
+    ("TW", 21.9, 120.0, 25.3, 122.0),
+    ("JP", 24.0, 122.9, 45.6, 145.8),
+    ("KR", 33.1, 124.6, 38.6, 131.9),
+    ("PH", 4.6, 116.9, 21.1, 126.6),
+    ("VN", 8.6, 102.1, 23.4, 109.5),
+    ("TH", 5.6, 97.3, 20.5, 105.6),
+    ("MY", 0.9, 99.6, 7.4, 119.3),
+    ("SG", 1.16, 103.6, 1.47, 104.1),
+    ("ID", -11.0, 95.0, 6.1, 141.0),
+    ("AU", -43.7, 113.3, -10.7, 153.6),
+    ("NZ", -47.3, 166.4, -34.4, 178.6),
+)
+
+CITY_POINTS = (
+    ("US", 40.71, -74.01), ("US", 34.05, -118.24), ("US", 41.88, -87.63), ("US", 29.76, -95.37),
+    ("US", 47.61, -122.33), ("US", 42.36, -71.06), ("US", 42.33, -83.05), ("US", 42.89, -78.88),
+    ("US", 48.76, -122.48), ("US", 32.72, -117.16), ("US", 31.76, -106.49), ("US", 25.76, -80.19),
+    ("US", 44.98, -93.27), ("US", 47.92, -97.03), ("US", 48.23, -101.30), ("US", 44.48, -73.21),
+    ("US", 39.74, -104.99), ("US", 33.45, -112.07), ("US", 61.22, -149.90),
+    ("US", 21.31, -157.86), ("US", 41.50, -81.69), ("US", 43.05, -76.15), ("US", 45.52, -122.68), ("US", 29.42, -98.49), ("US", 27.51, -99.51),
+    ("CA", 43.65, -79.38), ("CA", 45.50, -73.57), ("CA", 49.28, -123.12), ("CA", 45.42, -75.70),
+    ("CA", 51.05, -114.07), ("CA", 53.55, -113.49), ("CA", 49.90, -97.14), ("CA", 46.81, -71.21),
+    ("CA", 44.65, -63.58), ("CA", 42.32, -83.04), ("CA", 43.26, -79.87), ("CA", 42.98, -81.25),
+    ("CA", 43.09, -79.08), ("CA", 48.43, -123.37), ("CA", 52.13, -106.67), ("CA", 47.56, -52.71),
+    ("MX", 19.43, -99.13), ("MX", 20.67, -103.35), ("MX", 25.69, -100.32), ("MX", 32.51, -117.04),
+    ("MX", 31.69, -106.42), ("MX", 21.16, -86.85), ("GT", 14.63, -90.51), ("CU", 23.11, -82.37),
+    ("BR", -23.55, -46.63), ("BR", -22.91, -43.17), ("BR", -15.79, -47.88), ("BR", -12.97, -38.50),
+    ("BR", -3.12, -60.02), ("BR", -30.03, -51.23), ("BR", -25.43, -49.27), ("BR", -8.05, -34.88),
+    ("AR", -34.60, -58.38), ("AR", -31.42, -64.18), ("AR", -32.95, -60.65), ("AR", -32.89, -68.84),
+    ("CL", -33.45, -70.67), ("CL", -23.65, -70.40), ("CL", -36.83, -73.05), ("CO", 4.71, -74.07),
+    ("CO", 6.24, -75.58), ("CO", 3.45, -76.53), ("CO", 7.89, -72.50), ("PE", -12.05, -77.04), ("PE", -16.41, -71.54), ("PE", -5.19, -80.63),
+    ("VE", 10.48, -66.90), ("VE", 10.65, -71.64), ("EC", -0.18, -78.47), ("EC", -2.19, -79.89),
+    ("BO", -16.50, -68.15), ("BO", -17.78, -63.18), ("PY", -25.26, -57.58), ("UY", -34.90, -56.16), ("UY", -31.38, -57.96),
+    ("GB", 51.51, -0.13), ("GB", 52.49, -1.89), ("GB", 53.48, -2.24), ("GB", 55.95, -3.19),
+    ("GB", 55.86, -4.25), ("GB", 54.60, -5.93), ("GB", 51.48, -3.18), ("GB", 53.80, -1.55),
+    ("GB", 50.37, -4.14), ("GB", 51.13, 1.31), ("GB", 54.99, -7.32),
+    ("IE", 53.35, -6.26), ("IE", 51.90, -8.47), ("IE", 53.27, -9.05), ("IE", 52.66, -8.63),
+    ("IE", 54.27, -8.47), ("IE", 54.95, -7.73),
+    ("FR", 48.86, 2.35), ("FR", 45.76, 4.84), ("FR", 43.30, 5.37), ("FR", 43.60, 1.44),
+    ("FR", 48.57, 7.75), ("FR", 50.63, 3.06), ("FR", 47.22, -1.55), ("FR", 44.84, -0.58),
+    ("FR", 43.70, 7.27), ("FR", 47.24, 6.02), ("FR", 45.90, 6.13), ("FR", 49.12, 6.18),
+    ("FR", 42.70, 2.90), ("FR", 43.48, -1.56), ("FR", 48.39, -4.49), ("FR", 41.93, 8.74), ("FR", 47.75, 7.34), ("FR", 50.95, 1.86),
+    ("ES", 40.42, -3.70), ("ES", 41.39, 2.17), ("ES", 39.47, -0.38), ("ES", 37.39, -5.98),
+    ("ES", 43.26, -2.93), ("ES", 42.24, -8.72), ("ES", 41.65, -0.89), ("ES", 39.57, 2.65),
+    ("ES", 42.27, 2.96), ("ES", 43.32, -1.98),
+    ("PT", 38.72, -9.14), ("PT", 41.15, -8.61), ("PT", 37.02, -7.93), ("PT", 40.21, -8.43),
+    ("DE", 52.52, 13.40), ("DE", 53.55, 9.99), ("DE", 48.14, 11.58), ("DE", 50.94, 6.96),
+    ("DE", 50.11, 8.68), ("DE", 48.78, 9.18), ("DE", 51.34, 12.37), ("DE", 51.05, 13.74),
+    ("DE", 47.99, 7.84), ("DE", 49.01, 8.40), ("DE", 47.56, 10.70), ("DE", 48.57, 13.43),
+    ("DE", 54.32, 10.12), ("DE", 50.78, 6.08), ("DE", 49.23, 7.00), ("DE", 47.66, 9.18), ("DE", 54.79, 9.44),
+    ("NL", 52.37, 4.90), ("NL", 51.92, 4.48), ("NL", 52.08, 4.30), ("NL", 52.09, 5.12),
+    ("NL", 51.44, 5.48), ("NL", 53.22, 6.57), ("NL", 50.85, 5.69),
+    ("BE", 50.85, 4.35), ("BE", 51.22, 4.40), ("BE", 51.05, 3.72), ("BE", 50.63, 5.57),
+    ("BE", 50.41, 4.44), ("BE", 50.83, 3.26), ("LU", 49.61, 6.13),
+    ("CH", 47.37, 8.54), ("CH", 46.20, 6.14), ("CH", 46.95, 7.45), ("CH", 47.56, 7.59),
+    ("CH", 46.52, 6.63), ("CH", 46.00, 8.95), ("CH", 47.42, 9.37),
+    ("AT", 48.21, 16.37), ("AT", 47.07, 15.44), ("AT", 48.31, 14.29), ("AT", 47.81, 13.04),
+    ("AT", 47.27, 11.39), ("AT", 46.62, 14.31), ("AT", 47.50, 9.75),
+    ("IT", 41.90, 12.50), ("IT", 45.46, 9.19), ("IT", 40.85, 14.27), ("IT", 45.07, 7.69),
+    ("IT", 44.49, 11.34), ("IT", 43.77, 11.26), ("IT", 45.44, 12.32), ("IT", 38.12, 13.36),
+    ("IT", 45.65, 13.78), ("IT", 46.50, 11.35), ("IT", 39.22, 9.12), ("IT", 41.12, 16.87), ("IT", 45.81, 9.08),
+    ("DK", 55.68, 12.57), ("DK", 56.16, 10.20), ("DK", 55.40, 10.39), ("DK", 57.05, 9.92),
+    ("DK", 54.91, 9.79),
+    ("NO", 59.91, 10.75), ("NO", 60.39, 5.32), ("NO", 63.43, 10.40), ("NO", 58.97, 5.73),
+    ("NO", 69.65, 18.96),
+    ("SE", 59.33, 18.07), ("SE", 57.71, 11.97), ("SE", 55.60, 13.00), ("SE", 59.86, 17.64),
+    ("SE", 63.83, 20.26), ("SE", 65.58, 22.15), ("SE", 65.84, 24.14), ("SE", 56.05, 12.69),
+    ("FI", 60.17, 24.94), ("FI", 61.50, 23.79), ("FI", 60.45, 22.27), ("FI", 65.01, 25.47),
+    ("FI", 62.89, 27.68),
+    ("IS", 64.15, -21.94), ("IS", 65.68, -18.09),
+    ("PL", 52.23, 21.01), ("PL", 50.06, 19.94), ("PL", 51.76, 19.46), ("PL", 51.11, 17.04),
+    ("PL", 52.41, 16.93), ("PL", 54.35, 18.65), ("PL", 53.43, 14.55), ("PL", 50.26, 19.02),
+    ("PL", 53.13, 23.16),
+    ("CZ", 50.08, 14.44), ("CZ", 49.20, 16.61), ("CZ", 49.82, 18.26), ("CZ", 49.74, 13.38),
+    ("SK", 48.15, 17.11), ("SK", 48.72, 21.26), ("SK", 49.22, 18.74),
+    ("HU", 47.50, 19.04), ("HU", 47.53, 21.63), ("HU", 46.25, 20.15), ("HU", 46.07, 18.23),
+    ("HU", 47.69, 17.63),
+    ("RO", 44.43, 26.10), ("RO", 46.77, 23.60), ("RO", 45.75, 21.23), ("RO", 47.16, 27.59),
+    ("RO", 44.18, 28.63), ("RO", 47.06, 21.93),
+    ("BG", 42.70, 23.32), ("BG", 42.14, 24.75), ("BG", 43.21, 27.91),
+    ("GR", 37.98, 23.73), ("GR", 40.64, 22.94), ("GR", 35.34, 25.14), ("GR", 38.25, 21.73),
+    ("RS", 44.79, 20.45), ("RS", 45.27, 19.83), ("RS", 43.32, 21.90),
+    ("HR", 45.81, 15.98), ("HR", 43.51, 16.44), ("HR", 45.33, 14.44), ("HR", 42.65, 18.09), ("HR", 45.55, 18.69),
+    ("SI", 46.06, 14.51), ("SI", 46.55, 15.65),
+    ("EE", 59.44, 24.75), ("EE", 58.38, 26.72),
+    ("LV", 56.95, 24.11), ("LV", 55.87, 26.54),
+    ("LT", 54.69, 25.28), ("LT", 54.90, 23.90), ("LT", 55.70, 21.14),
+    ("UA", 50.45, 30.52), ("UA", 49.99, 36.23), ("UA", 46.48, 30.72), ("UA", 49.84, 24.03),
+    ("UA", 48.46, 35.05),
+    ("BY", 53.90, 27.56), ("BY", 52.42, 31.01), ("BY", 53.68, 23.83), ("BY", 52.10, 23.69),
+    ("RU", 55.76, 37.62), ("RU", 59.93, 30.34), ("RU", 55.03, 82.92), ("RU", 56.84, 60.61),
+    ("RU", 55.80, 49.11), ("RU", 43.12, 131.89), ("RU", 54.71, 20.51), ("RU", 47.24, 39.71),
+    ("TR", 41.01, 28.98), ("TR", 39.93, 32.86), ("TR", 38.42, 27.14), ("TR", 36.90, 30.70), ("TR", 41.68, 26.56),
+    ("IL", 32.09, 34.78), ("IL", 31.77, 35.21), ("IL", 32.79, 34.99),
+    ("SA", 24.71, 46.68), ("SA", 21.49, 39.19), ("SA", 26.42, 50.09),
+    ("AE", 25.20, 55.27), ("AE", 24.45, 54.38),
+    ("IR", 35.69, 51.39), ("IR", 36.30, 59.60), ("IR", 32.65, 51.67), ("IR", 38.08, 46.29),
+    ("IQ", 33.31, 44.37), ("IQ", 30.51, 47.78), ("IQ", 36.19, 44.01),
+    ("EG", 30.04, 31.24), ("EG", 31.20, 29.92), ("EG", 25.69, 32.64),
+    ("MA", 33.57, -7.59), ("MA", 34.02, -6.84), ("MA", 31.63, -8.01), ("MA", 35.76, -5.83),
+    ("DZ", 36.75, 3.06), ("DZ", 35.70, -0.63), ("DZ", 36.37, 6.61),
+    ("TN", 36.81, 10.18), ("TN", 34.74, 10.76),
+    ("NG", 6.52, 3.38), ("NG", 9.08, 7.40), ("NG", 12.00, 8.52), ("NG", 4.82, 7.03),
+    ("GH", 5.60, -0.19), ("GH", 6.69, -1.62),
+    ("KE", -1.29, 36.82), ("KE", -4.04, 39.67), ("KE", -0.09, 34.77),
+    ("ET", 9.03, 38.74), ("ET", 11.59, 37.39),
+    ("TZ", -6.79, 39.21), ("TZ", -3.37, 36.68), ("TZ", -2.52, 32.90),
+    ("UG", 0.35, 32.58), ("UG", 2.77, 32.30),
+    ("ZW", -17.83, 31.05), ("ZW", -20.15, 28.58),
+    ("ZA", -26.20, 28.05), ("ZA", -33.92, 18.42), ("ZA", -29.86, 31.02), ("ZA", -25.75, 28.19),
+    ("ZA", -33.96, 25.60),
+    ("IN", 28.61, 77.21), ("IN", 19.08, 72.88), ("IN", 12.97, 77.59), ("IN", 13.08, 80.27),
+    ("IN", 22.57, 88.36), ("IN", 17.39, 78.49), ("IN", 23.02, 72.57), ("IN", 18.52, 73.86),
+    ("IN", 26.91, 75.79), ("IN", 30.73, 76.78), ("IN", 31.63, 74.87), ("IN", 34.08, 74.80),
+    ("IN", 26.14, 91.74), ("IN", 9.93, 76.27), ("IN", 26.85, 80.95), ("IN", 25.59, 85.14),
+    ("IN", 8.52, 76.94), ("IN", 24.82, 93.94), ("IN", 26.73, 88.40), ("IN", 26.76, 83.37),
+    ("PK", 24.86, 67.01), ("PK", 31.55, 74.34), ("PK", 33.68, 73.05), ("PK", 34.01, 71.58),
+    ("PK", 30.18, 66.97), ("PK", 31.42, 73.08), ("PK", 32.49, 74.53),
+    ("BD", 23.81, 90.41), ("BD", 22.36, 91.78), ("BD", 24.89, 91.87), ("BD", 22.85, 89.54),
+    ("LK", 6.93, 79.86), ("LK", 7.29, 80.63), ("LK", 9.66, 80.02),
+    ("NP", 27.72, 85.32), ("NP", 28.21, 83.99), ("NP", 26.45, 87.27),
+    ("CN", 39.90, 116.40), ("CN", 31.23, 121.47), ("CN", 23.13, 113.26), ("CN", 22.54, 114.06),
+    ("CN", 30.57, 104.07), ("CN", 29.56, 106.55), ("CN", 30.59, 114.31), ("CN", 34.34, 108.94),
+    ("CN", 43.83, 87.62), ("CN", 29.65, 91.11), ("CN", 45.80, 126.53), ("CN", 25.04, 102.71),
+    ("CN", 26.07, 119.30), ("CN", 24.48, 118.09), ("CN", 22.82, 108.32), ("CN", 22.27, 113.58),
+    ("HK", 22.32, 114.17), ("HK", 22.28, 114.16),
+    ("TW", 25.03, 121.57), ("TW", 22.63, 120.30), ("TW", 24.15, 120.67),
+    ("JP", 35.68, 139.69), ("JP", 34.69, 135.50), ("JP", 43.06, 141.35), ("JP", 33.59, 130.40),
+    ("JP", 26.21, 127.68), ("JP", 35.18, 136.91),
+    ("KR", 37.57, 126.98), ("KR", 35.18, 129.08), ("KR", 35.87, 128.60), ("KR", 33.50, 126.53),
+    ("PH", 14.60, 120.98), ("PH", 10.32, 123.89), ("PH", 7.19, 125.46),
+    ("VN", 21.03, 105.85), ("VN", 10.82, 106.63), ("VN", 16.05, 108.21), ("VN", 22.34, 103.84),
+    ("TH", 13.76, 100.50), ("TH", 18.79, 98.98), ("TH", 7.88, 98.39), ("TH", 14.97, 102.10),
+    ("TH", 6.87, 101.25),
+    ("MY", 3.14, 101.69), ("MY", 5.41, 100.33), ("MY", 1.49, 103.74), ("MY", 1.55, 110.34),
+    ("MY", 5.98, 116.07), ("MY", 6.12, 102.24),
+    ("SG", 1.35, 103.82), ("SG", 1.29, 103.85),
+    ("ID", -6.21, 106.85), ("ID", -7.25, 112.75), ("ID", 3.60, 98.67), ("ID", -8.65, 115.22),
+    ("ID", -5.15, 119.43), ("ID", -2.99, 104.76), ("ID", 1.13, 104.05), ("ID", -2.53, 140.72),
+    ("AU", -33.87, 151.21), ("AU", -37.81, 144.96), ("AU", -27.47, 153.03), ("AU", -31.95, 115.86),
+    ("AU", -34.93, 138.60), ("AU", -12.46, 130.84), ("AU", -42.88, 147.33), ("AU", -35.28, 149.13),
+    ("NZ", -36.85, 174.76), ("NZ", -41.29, 174.78), ("NZ", -43.53, 172.64),
+)
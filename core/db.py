@@ -0,0 +1,177 @@
+"""
+Shared SQLite connection manager.
+
+Every database file gets one long-lived connection per thread. Pragmas are
+applied once when that connection is opened, schemas registered with
+:func:`ensure_schema` run once per process, and sqlite3's statement cache is
+enlarged so repeated queries reuse their prepared statements.
+
+Connections run in autocommit mode; group writes with :func:`transaction`::
+
+    with db.transaction(db.FEEDBACK_DB) as conn:
+        conn.execute("INSERT ...", params)
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+FEEDBACK_DB = "feedback.db"
+USERS_DB = "users.db"
+JOURNALS_DB = "journals.db"
+
+# Prepared statements kept per connection (sqlite3 defaults to 128).
+STATEMENT_CACHE_SIZE = 256
+BUSY_TIMEOUT_MS = 5000
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA temp_store=MEMORY",
+)
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_applied_schemas = set()
+
+
+def _connections():
+    conns = getattr(_local, "connections", None)
+    if conns is None:
+        conns = _local.connections = {}
+    return conns
+
+
+def _depths():
+    depths = getattr(_local, "depths", None)
+    if depths is None:
+        depths = _local.depths = {}
+    return depths
+
+
+def get_connection(path):
+    """
+    Get this thread's connection to a database, opening it on first use.
+    Args:
+        path (str): Path of the SQLite database file.
+    Returns:
+        sqlite3.Connection: A connection in autocommit mode with pragmas applied.
+    """
+    key = os.path.abspath(path)
+    conns = _connections()
+    conn = conns.get(key)
+    if conn is None:
+        directory = os.path.dirname(key)
+        os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(
+            key,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            isolation_level=None,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        conns[key] = conn
+    return conn
+
+
+def ensure_schema(path, script):
+    """
+    Run a schema script against a database once per process.
+    Args:
+        path (str): Path of the SQLite database file.
+        script (str): SQL script (CREATE ... IF NOT EXISTS statements).
+    """
+    key = (os.path.abspath(path), script)
+    if key in _applied_schemas:
+        return
+    with _schema_lock:
+        if key in _applied_schemas:
+            return
+        get_connection(path).executescript(script)
+        _applied_schemas.add(key)
+
+
+def migrate(path, version, upgrade):
+    """
+    Bring a database up to a schema version tracked in ``PRAGMA user_version``.
+    ``upgrade(conn, current_version)`` runs inside one transaction and only
+    when the stored version is lower; the check itself happens once per process.
+    Args:
+        path (str): Path of the SQLite database file.
+        version (int): Target schema version.
+        upgrade (callable): Function applying the changes.
+    """
+    key = (os.path.abspath(path), "user_version", version)
+    if key in _applied_schemas:
+        return
+    with _schema_lock:
+        if key in _applied_schemas:
+            return
+        with transaction(path) as conn:
+            current = conn.execute("PRAGMA user_version").fetchone()[0]
+            if current < version:
+                upgrade(conn, current)
+                conn.execute(f"PRAGMA user_version = {int(version)}")
+        _applied_schemas.add(key)
+
+
+@contextmanager
+def transaction(path, immediate=True):
+    """
+    Run a block of statements in one transaction on this thread's connection.
+    Nested calls join the outermost transaction.
+    Args:
+        path (str): Path of the SQLite database file.
+        immediate (bool): Take the write lock up front (BEGIN IMMEDIATE) so
+            concurrent writers wait on busy_timeout instead of failing mid-way.
+    Yields:
+        sqlite3.Connection: The connection to run statements on.
+    """
+    conn = get_connection(path)
+    depth = _depths()
+    key = os.path.abspath(path)
+    if depth.get(key, 0):
+        depth[key] += 1
+        try:
+            yield conn
+        finally:
+            depth[key] -= 1
+        return
+
+    conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    depth[key] = 1
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    else:
+        conn.execute("COMMIT")
+    finally:
+        depth[key] = 0
+
+
+def execute(path, sql, params=()):
+    """
+    Run a single statement on this thread's connection.
+    Args:
+        path (str): Path of the SQLite database file.
+        sql (str): The SQL statement.
+        params (tuple): Statement parameters.
+    Returns:
+        sqlite3.Cursor: The cursor, ready for fetchone()/fetchall().
+    """
+    return get_connection(path).execute(sql, params)
+
+
+def close_all():
+    """Close every connection opened by the current thread."""
+    conns = _connections()
+    for conn in conns.values():
+        conn.close()
+    conns.clear()
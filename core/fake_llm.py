@@ -0,0 +1,87 @@
+"""
+Offline stand-in for ``google.generativeai.GenerativeModel``.
+
+Supports the parts of the API the app uses - ``generate_content(prompt)``
+returning an object with ``.text`` and ``generate_content(prompt, stream=True)``
+returning an iterable of chunks - so chat flows can run and be tested without
+network access or an API key. Set ``TALKHEAL_FAKE_LLM=1`` to have
+``core.config.configure_gemini`` return one.
+"""
+
+import time
+
+
+class FakeResponse:
+    """A complete or partial response carrying ``.text``."""
+
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeStreamResponse:
+    """Iterable of chunk responses, like a streamed ``GenerateContentResponse``."""
+
+    def __init__(self, chunks, delay=0.0, error=None):
+        self._chunks = chunks
+        self._delay = delay
+        self._error = error
+        self._consumed = []
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            if self._delay:
+                time.sleep(self._delay)
+            self._consumed.append(chunk)
+            yield FakeResponse(chunk)
+        if self._error is not None:
+            raise self._error
+
+    def resolve(self):
+        for _ in self:
+            pass
+
+    @property
+    def text(self):
+        return "".join(self._consumed)
+
+
+class FakeGenerativeModel:
+    """
+    Deterministic fake model.
+    Args:
+        reply (str or callable, optional): Fixed reply, or ``reply(prompt) -> str``.
+        chunk_size (int): Characters per streamed chunk.
+        delay (float): Seconds to wait before each streamed chunk.
+        error (Exception, optional): Raised from ``generate_content`` instead of replying.
+        error_after (int, optional): With ``error``, stream this many chunks
+            first and raise mid-stream instead.
+    """
+
+    model_name = "models/fake"
+
+    def __init__(self, reply=None, chunk_size=12, delay=0.0, error=None, error_after=None):
+        self.reply = reply
+        self.chunk_size = chunk_size
+        self.delay = delay
+        self.error = error
+        self.error_after = error_after
+        self.calls = []
+
+    def _text_for(self, prompt):
+        if callable(self.reply):
+            return self.reply(prompt)
+        if self.reply is not None:
+            return self.reply
+        return "I'm here with you. Thank you for sharing that with me - how are you feeling right now?"
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.calls.append({"prompt": prompt, "stream": stream, **kwargs})
+        if self.error is not None and (self.error_after is None or not stream):
+            raise self.error
+        text = self._text_for(prompt)
+        if not stream:
+            return FakeResponse(text)
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        if self.error is not None:
+            return FakeStreamResponse(chunks[:self.error_after], delay=self.delay, error=self.error)
+        return FakeStreamResponse(chunks, delay=self.delay)
@@ -0,0 +1,278 @@
+"""
+Daily multi-source feature matrix and a one-pass correlation engine.
+
+The insight panels used to each rebuild a daily mood frame, merge in one
+source and call ``Series.corr`` variable by variable. Here every source is
+reduced to one row per calendar day and joined into a single date-indexed
+matrix:
+
+* ``mood_numeric`` (daily mean) and ``mood_entries`` from the mood entries;
+* ``activity:<name>`` - 1 on days the activity was logged, 0 on other days
+  with mood entries;
+* the daily weather fields (``temp_avg``, ``precipitation``, ...); and
+* the wearable metrics, from the daily rollups of :mod:`core.wearable_store`.
+
+:func:`correlate` computes every pairwise Pearson correlation, its two-sided
+p-value and its sample count from a few matrix products over the
+missing-value mask. :func:`cross_correlate` does the same for one target
+against every feature shifted by 0..``max_lag`` days. Correlations with
+fewer than ``min_samples`` overlapping days are NaN.
+
+:func:`correlation_report` memoizes both on the callers' data versions
+(e.g. ``MoodTracker.data_version``), so reruns on unchanged data are free.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from core.lazy import lazy_import
+from core.mood_frame import MOOD_NUMERIC
+from core.wearable_store import MEAN_METRICS, METRICS, SUM_METRICS
+from core.weather_store import FIELDS as WEATHER_FIELDS
+
+special = lazy_import("scipy.special")
+
+
+TARGET = "mood_numeric"
+ACTIVITY_PREFIX = "activity:"
+MIN_SAMPLES = 7
+MAX_LAG = 3
+# Reports kept in memory across reruns
+MAX_CACHED_REPORTS = 256
+
+
+def _empty():
+    return pd.DataFrame(index=pd.DatetimeIndex([], name="date"))
+
+
+def _days(values):
+    days = pd.to_datetime(values, errors="coerce")
+    if getattr(days.dt, "tz", None) is not None:
+        days = days.dt.tz_localize(None)
+    return days.dt.normalize()
+
+
+def daily_mood(mood_df):
+    """
+    Reduce mood entries to one row per day.
+    Args:
+        mood_df (pd.DataFrame): Entries with ``date`` or ``timestamp`` and
+            ``mood_numeric`` or ``mood_level``; ``activities`` (lists) is optional.
+    Returns:
+        pd.DataFrame: ``mood_numeric``, ``mood_entries`` and one
+        ``activity:<name>`` column per logged activity, indexed by date.
+    """
+    if mood_df is None or mood_df.empty:
+        return _empty()
+    if TARGET in mood_df.columns:
+        scores = pd.to_numeric(mood_df[TARGET], errors="coerce")
+    else:
+        scores = mood_df["mood_level"].map(MOOD_NUMERIC)
+    days = _days(mood_df["date"] if "date" in mood_df.columns else mood_df["timestamp"]).to_numpy()
+    grouped = pd.Series(scores.to_numpy(dtype=float), index=days).groupby(level=0)
+    frame = pd.DataFrame({TARGET: grouped.mean(), "mood_entries": grouped.size()})
+
+    if "activities" in mood_df.columns:
+        activities = pd.Series(mood_df["activities"].to_numpy(), index=days).explode()
+        activities = activities[activities.notna() & (activities != "")]
+        if not activities.empty:
+            done = pd.crosstab(activities.index, activities.to_numpy().astype(str)).clip(upper=1)
+            done.columns = [ACTIVITY_PREFIX + name for name in done.columns]
+            frame = frame.join(done)
+            frame[done.columns] = frame[done.columns].fillna(0)
+    frame = frame[frame.index.notna()]
+    frame.index.name = "date"
+    return frame
+
+
+def daily_weather(weather_df):
+    """
+    Reduce weather rows to one row per day.
+    Args:
+        weather_df (pd.DataFrame): Rows with ``time`` or ``date`` and the
+            :data:`core.weather_store.FIELDS` columns.
+    Returns:
+        pd.DataFrame: Daily means of the weather fields, indexed by date.
+    """
+    if weather_df is None or weather_df.empty:
+        return _empty()
+    days = _days(weather_df["time"] if "time" in weather_df.columns else weather_df["date"]).to_numpy()
+    fields = [field for field in WEATHER_FIELDS if field in weather_df.columns]
+    values = weather_df[fields].apply(pd.to_numeric, errors="coerce")
+    frame = values.set_axis(days).groupby(level=0).mean()
+    frame = frame[frame.index.notna()]
+    frame.index.name = "date"
+    return frame
+
+
+def daily_wearables(days):
+    """
+    Reduce wearable data to one row per day.
+    Args:
+        days (list): Rollups from :func:`core.wearable_store.load_daily`, or
+            raw records (averaged and summed per day here).
+    Returns:
+        pd.DataFrame: The wearable metrics, indexed by date.
+    """
+    if not days:
+        return _empty()
+    df = pd.DataFrame(days)
+    present = [metric for metric in METRICS if metric in df.columns]
+    values = df[present].apply(pd.to_numeric, errors="coerce")
+    if "date" in df.columns:
+        frame = values.set_axis(_days(df["date"]).to_numpy())
+    else:
+        grouped = values.set_axis(_days(df["timestamp"]).to_numpy()).groupby(level=0)
+        means = grouped[[m for m in MEAN_METRICS if m in present]].mean()
+        sums = grouped[[m for m in SUM_METRICS if m in present]].sum(min_count=1)
+        frame = pd.concat([means, sums], axis=1)[present]
+    frame = frame[frame.index.notna()]
+    frame.index.name = "date"
+    return frame
+
+
+def build_feature_matrix(mood_df=None, weather_df=None, wearable_days=None):
+    """
+    Join every source into one matrix with a row per calendar day.
+    Days missing from a source are NaN in its columns, and the index has no
+    gaps, so shifting a column by k rows shifts it by k days.
+    Args:
+        mood_df (pd.DataFrame, optional): Mood entries (see :func:`daily_mood`).
+        weather_df (pd.DataFrame, optional): Daily weather (see :func:`daily_weather`).
+        wearable_days (list, optional): Wearable rollups or records (see :func:`daily_wearables`).
+    Returns:
+        pd.DataFrame: Float columns indexed by date.
+    """
+    parts = [daily_mood(mood_df), daily_weather(weather_df), daily_wearables(wearable_days)]
+    parts = [part for part in parts if not part.empty]
+    if not parts:
+        return _empty()
+    matrix = pd.concat(parts, axis=1, sort=True)
+    calendar = pd.date_range(matrix.index.min(), matrix.index.max(), freq="D", name="date")
+    return matrix.reindex(calendar).astype(float)
+
+
+def _pairwise(x, y, min_samples):
+    # Pearson r, p and n between every column of x (T, a) and of y (T, b),
+    # each over the rows where both values are present
+    x_mask, y_mask = ~np.isnan(x), ~np.isnan(y)
+    x, y = np.where(x_mask, x, 0.0), np.where(y_mask, y, 0.0)
+    x_mask, y_mask = x_mask.astype(float), y_mask.astype(float)
+    # Centering first keeps the sums of squares from cancelling out
+    x = (x - x.sum(axis=0) / np.maximum(x_mask.sum(axis=0), 1)) * x_mask
+    y = (y - y.sum(axis=0) / np.maximum(y_mask.sum(axis=0), 1)) * y_mask
+    n = x_mask.T @ y_mask
+    sum_x, sum_y = x.T @ y_mask, x_mask.T @ y
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = x.T @ y - sum_x * sum_y / n
+        var_x = (x * x).T @ y_mask - sum_x ** 2 / n
+        var_y = x_mask.T @ (y * y) - sum_y ** 2 / n
+        r = np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0)
+        valid = (n >= max(min_samples, 3)) & (var_x > 1e-12) & (var_y > 1e-12)
+        r = np.where(valid, r, np.nan)
+        # Two-sided t-test of r = 0 with n - 2 degrees of freedom:
+        # p = I(dof / (dof + t^2); dof / 2, 1 / 2), and dof / (dof + t^2) = 1 - r^2
+        dof = np.maximum(n - 2, 1)
+        p = special.betainc(dof / 2, 0.5, np.clip(1 - r * r, 0.0, 1.0))
+    return r, np.where(valid, p, np.nan), n.astype(int)
+
+
+def correlate(matrix, min_samples=MIN_SAMPLES):
+    """
+    Correlate every column of a feature matrix with every other.
+    Args:
+        matrix (pd.DataFrame): From :func:`build_feature_matrix`.
+        min_samples (int): Fewest overlapping days for a correlation.
+    Returns:
+        dict: Square DataFrames ``r`` (NaN where masked), ``p`` and ``n``.
+    """
+    values = matrix.to_numpy(dtype=float)
+    r, p, n = _pairwise(values, values, min_samples)
+    columns = matrix.columns
+    return {
+        "r": pd.DataFrame(r, index=columns, columns=columns),
+        "p": pd.DataFrame(p, index=columns, columns=columns),
+        "n": pd.DataFrame(n, index=columns, columns=columns),
+    }
+
+
+def cross_correlate(matrix, target=TARGET, max_lag=MAX_LAG, min_samples=MIN_SAMPLES):
+    """
+    Correlate a target with every other column at lags of 0..max_lag days.
+    Lag k pairs the target on day t with the feature on day t - k, i.e. the
+    feature leading the target by k days.
+    Args:
+        matrix (pd.DataFrame): From :func:`build_feature_matrix`.
+        target (str): Column to explain.
+        max_lag (int): Largest lag in days.
+        min_samples (int): Fewest overlapping days for a correlation.
+    Returns:
+        dict: DataFrames ``r``, ``p`` and ``n`` indexed by lag, one column per feature.
+    """
+    features = [column for column in matrix.columns if column != target]
+    values = matrix[features].to_numpy(dtype=float)
+    rows = len(values)
+    lags = range(max_lag + 1)
+    shifted = np.full((rows, len(lags) * len(features)), np.nan)
+    for lag in lags:
+        if lag < rows:
+            shifted[lag:, lag * len(features):(lag + 1) * len(features)] = values[:rows - lag]
+    y = matrix[[target]].to_numpy(dtype=float)
+    r, p, n = _pairwise(shifted, y, min_samples)
+    index = pd.Index(lags, name="lag")
+    return {
+        name: pd.DataFrame(result.reshape(len(lags), len(features)), index=index, columns=features)
+        for name, result in (("r", r), ("p", p), ("n", n))
+    }
+
+
+_reports = OrderedDict()
+_reports_lock = threading.Lock()
+
+
+def frame_version(df):
+    """Content fingerprint of a small frame (e.g. fetched weather) for use as a data version."""
+    if df is None or df.empty:
+        return None
+    return int(pd.util.hash_pandas_object(df, index=False).sum())
+
+
+def correlation_report(mood_df=None, weather_df=None, wearable_days=None, versions=None,
+                       min_samples=MIN_SAMPLES, max_lag=MAX_LAG):
+    """
+    Build the feature matrix and correlate it, memoized on the data versions.
+    Args:
+        mood_df, weather_df, wearable_days: Sources, as for :func:`build_feature_matrix`.
+        versions (tuple, optional): Hashable versions identifying the inputs
+            (e.g. the mood tracker's ``data_version``); None disables caching.
+        min_samples (int): Fewest overlapping days for a correlation.
+        max_lag (int): Largest lag for the target cross-correlation.
+    Returns:
+        dict: ``matrix``, ``r``, ``p``, ``n`` (see :func:`correlate`),
+        ``lagged`` (see :func:`cross_correlate`, None without a mood column)
+        and ``target``: r, p and n of each feature against mood at lag 0.
+        Treat it as read-only; it's shared between callers.
+    """
+    key = None if versions is None else (versions, min_samples, max_lag)
+    if key is not None:
+        with _reports_lock:
+            report = _reports.get(key)
+            if report is not None:
+                _reports.move_to_end(key)
+                return report
+
+    matrix = build_feature_matrix(mood_df, weather_df, wearable_days)
+    report = dict(correlate(matrix, min_samples), matrix=matrix, lagged=None, target=None)
+    if TARGET in matrix.columns:
+        report["lagged"] = cross_correlate(matrix, TARGET, max_lag, min_samples)
+        report["target"] = pd.DataFrame({name: report["lagged"][name].loc[0] for name in ("r", "p", "n")})
+
+    if key is not None:
+        with _reports_lock:
+            _reports[key] = report
+            while len(_reports) > MAX_CACHED_REPORTS:
+                _reports.popitem(last=False)
+    return report
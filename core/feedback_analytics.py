@@ -0,0 +1,288 @@
+"""
+Feedback analytics backed by materialized daily rollups.
+
+Triggers on the ``feedback`` table keep two rollup tables in step with every
+insert, update and delete:
+
+* ``feedback_daily_user``  - one row per (user, UTC day)
+* ``feedback_daily_convo`` - one row per (user, conversation, UTC day)
+
+Statistics and trends read the rollups, so their cost depends on the number
+of days (and users) in range rather than on the number of feedback rows.
+Ratings are stored as 'up'/'down'; the legacy 'positive'/'negative' values
+are counted the same way.
+
+The rollups outlive the rows: :func:`purge_before` (the retention cleanup)
+deletes old feedback without touching them, so the history stays complete.
+:func:`delete_user` removes a user's rows and rollups together.
+"""
+
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+
+_POSITIVE = "({ref}.feedback IN ('up', 'positive'))"
+_NEGATIVE = "({ref}.feedback IN ('down', 'negative'))"
+_USER = "COALESCE({ref}.user_email, 'unknown')"
+_DAY = "date({ref}.timestamp)"
+
+
+def _add_rows(ref):
+    values = {
+        "positive": _POSITIVE.format(ref=ref),
+        "negative": _NEGATIVE.format(ref=ref),
+        "user": _USER.format(ref=ref),
+        "day": _DAY.format(ref=ref),
+    }
+    return '''
+    INSERT INTO feedback_daily_user (user_email, day, positive, negative, total)
+    VALUES ({user}, {day}, {positive}, {negative}, 1)
+    ON CONFLICT (user_email, day) DO UPDATE SET
+        positive = positive + excluded.positive,
+        negative = negative + excluded.negative,
+        total = total + 1;
+    INSERT INTO feedback_daily_convo (user_email, convo_id, day, positive, negative, total)
+    VALUES ({user}, {ref}.convo_id, {day}, {positive}, {negative}, 1)
+    ON CONFLICT (user_email, convo_id, day) DO UPDATE SET
+        positive = positive + excluded.positive,
+        negative = negative + excluded.negative,
+        total = total + 1;
+    '''.format(ref=ref, **values)
+
+
+def _remove_rows(ref):
+    values = {
+        "positive": _POSITIVE.format(ref=ref),
+        "negative": _NEGATIVE.format(ref=ref),
+        "user": _USER.format(ref=ref),
+        "day": _DAY.format(ref=ref),
+    }
+    return '''
+    UPDATE feedback_daily_user
+    SET positive = positive - {positive}, negative = negative - {negative}, total = total - 1
+    WHERE user_email = {user} AND day = {day};
+    DELETE FROM feedback_daily_user WHERE user_email = {user} AND day = {day} AND total <= 0;
+    UPDATE feedback_daily_convo
+    SET positive = positive - {positive}, negative = negative - {negative}, total = total - 1
+    WHERE user_email = {user} AND convo_id = {ref}.convo_id AND day = {day};
+    DELETE FROM feedback_daily_convo
+    WHERE user_email = {user} AND convo_id = {ref}.convo_id AND day = {day} AND total <= 0;
+    '''.format(ref=ref, **values)
+
+
+ROLLUP_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS feedback_daily_user (
+    user_email TEXT NOT NULL,
+    day TEXT NOT NULL,
+    positive INTEGER NOT NULL DEFAULT 0,
+    negative INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_email, day)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_feedback_daily_user_day ON feedback_daily_user (day);
+
+CREATE TABLE IF NOT EXISTS feedback_daily_convo (
+    user_email TEXT NOT NULL,
+    convo_id INTEGER,
+    day TEXT NOT NULL,
+    positive INTEGER NOT NULL DEFAULT 0,
+    negative INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_email, convo_id, day)
+) WITHOUT ROWID;
+'''
+
+ROLLUP_TRIGGERS = '''
+-- Holds a row while purge_before runs; deletes then leave the rollups alone
+CREATE TABLE IF NOT EXISTS feedback_retention (active INTEGER);
+
+CREATE TRIGGER feedback_rollup_ai AFTER INSERT ON feedback BEGIN
+''' + _add_rows("NEW") + '''
+END;
+
+CREATE TRIGGER feedback_rollup_ad AFTER DELETE ON feedback
+WHEN NOT EXISTS (SELECT 1 FROM feedback_retention) BEGIN
+''' + _remove_rows("OLD") + '''
+END;
+
+CREATE TRIGGER feedback_rollup_au
+AFTER UPDATE OF user_email, convo_id, feedback, timestamp ON feedback BEGIN
+''' + _remove_rows("OLD") + _add_rows("NEW") + '''
+END;
+'''
+
+
+def install_rollups(conn):
+    """
+    Create the rollup tables and triggers and fill them from existing feedback.
+    Meant to run from a schema migration, inside its transaction.
+    Args:
+        conn (sqlite3.Connection): Connection to the feedback database.
+    """
+    for statement in _split_script(ROLLUP_SCHEMA):
+        conn.execute(statement)
+    install_triggers(conn)
+    conn.execute("DELETE FROM feedback_daily_user")
+    conn.execute("DELETE FROM feedback_daily_convo")
+    conn.execute(f'''
+        INSERT INTO feedback_daily_user (user_email, day, positive, negative, total)
+        SELECT {_USER.format(ref="f")}, {_DAY.format(ref="f")},
+               SUM({_POSITIVE.format(ref="f")}), SUM({_NEGATIVE.format(ref="f")}), COUNT(*)
+        FROM feedback AS f
+        WHERE f.timestamp IS NOT NULL
+        GROUP BY 1, 2
+    ''')
+    conn.execute(f'''
+        INSERT INTO feedback_daily_convo (user_email, convo_id, day, positive, negative, total)
+        SELECT {_USER.format(ref="f")}, f.convo_id, {_DAY.format(ref="f")},
+               SUM({_POSITIVE.format(ref="f")}), SUM({_NEGATIVE.format(ref="f")}), COUNT(*)
+        FROM feedback AS f
+        WHERE f.timestamp IS NOT NULL
+        GROUP BY 1, 2, 3
+    ''')
+
+
+def install_triggers(conn):
+    """
+    (Re)create the triggers that keep the rollups in step with ``feedback``.
+    Meant to run from a schema migration, inside its transaction.
+    Args:
+        conn (sqlite3.Connection): Connection to the feedback database.
+    """
+    for name in ("feedback_rollup_ai", "feedback_rollup_ad", "feedback_rollup_au"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    for statement in _split_script(ROLLUP_TRIGGERS):
+        conn.execute(statement)
+
+
+def purge_before(conn, cutoff):
+    """
+    Delete feedback older than a cutoff, keeping it in the rollups.
+    Run it inside a transaction so other connections never see the marker row.
+    Args:
+        conn (sqlite3.Connection): Connection to the feedback database.
+        cutoff (str): Timestamp; older rows are deleted.
+    Returns:
+        int: Number of rows deleted.
+    """
+    conn.execute("INSERT INTO feedback_retention (active) VALUES (1)")
+    try:
+        return conn.execute("DELETE FROM feedback WHERE timestamp < ?", (cutoff,)).rowcount
+    finally:
+        conn.execute("DELETE FROM feedback_retention")
+
+
+def delete_user(conn, user_email):
+    """
+    Delete a user's feedback and every rollup row counting it.
+    Args:
+        conn (sqlite3.Connection): Connection to the feedback database.
+        user_email (str): Hashed user email.
+    """
+    conn.execute("DELETE FROM feedback WHERE user_email = ?", (user_email,))
+    conn.execute("DELETE FROM feedback_daily_user WHERE user_email = ?", (user_email,))
+    conn.execute("DELETE FROM feedback_daily_convo WHERE user_email = ?", (user_email,))
+
+
+def _split_script(script):
+    # executescript() would commit the caller's transaction; split on complete statements instead
+    statements, buffer = [], ""
+    for line in script.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            if buffer.strip():
+                statements.append(buffer.strip())
+            buffer = ""
+    return statements
+
+
+def _summarize(positive, negative):
+    positive = positive or 0
+    negative = negative or 0
+    rated = positive + negative
+    return {
+        "total": rated,
+        "positive": positive,
+        "negative": negative,
+        "positive_percentage": round(positive / rated * 100, 1) if rated else 0,
+    }
+
+
+def _since(days):
+    return (datetime.now(timezone.utc).date() - timedelta(days=days - 1)).isoformat()
+
+
+def get_statistics(conn, user_email=None, convo_id=None, days=None):
+    """
+    Get positive/negative counts in a single aggregate over the rollups.
+    Args:
+        conn (sqlite3.Connection): Connection to the feedback database.
+        user_email (str, optional): Hashed user email to restrict to.
+        convo_id (int, optional): Conversation ID to restrict to (requires user_email).
+        days (int, optional): Only count the last N days (including today).
+    Returns:
+        dict: total (positive + negative), positive, negative and positive_percentage.
+    """
+    table = "feedback_daily_convo" if convo_id is not None else "feedback_daily_user"
+    clauses, params = [], []
+    if user_email is not None:
+        clauses.append("user_email = ?")
+        params.append(user_email)
+    if convo_id is not None:
+        clauses.append("convo_id = ?")
+        params.append(convo_id)
+    if days is not None:
+        clauses.append("day >= ?")
+        params.append(_since(days))
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    row = conn.execute(
+        f"SELECT SUM(positive), SUM(negative) FROM {table} {where}", params
+    ).fetchone()
+    return _summarize(*row)
+
+
+def get_daily_trend(conn, days=30, user_email=None):
+    """
+    Get per-day feedback counts for the last N days, oldest first.
+    Days without feedback are included with zero counts.
+    Args:
+        conn (sqlite3.Connection): Connection to the feedback database.
+        days (int): Number of days (including today).
+        user_email (str, optional): Hashed user email to restrict to.
+    Returns:
+        list: Dicts with date, total, positive, negative and positive_percentage.
+    """
+    since = _since(days)
+    if user_email is None:
+        rows = conn.execute('''
+            SELECT day, SUM(positive), SUM(negative)
+            FROM feedback_daily_user WHERE day >= ? GROUP BY day
+        ''', (since,)).fetchall()
+    else:
+        rows = conn.execute('''
+            SELECT day, positive, negative
+            FROM feedback_daily_user WHERE user_email = ? AND day >= ?
+        ''', (user_email, since)).fetchall()
+    by_day = {day: _summarize(p, n) for day, p, n in rows}
+
+    start = datetime.fromisoformat(since).date()
+    trend = []
+    for offset in range(days):
+        day = (start + timedelta(days=offset)).isoformat()
+        trend.append({"date": day, **by_day.get(day, _summarize(0, 0))})
+    return trend
+
+
+def get_helpfulness_rate(conn, days=30, user_email=None):
+    """
+    Get the share of positive ratings over the last N days.
+    Args:
+        conn (sqlite3.Connection): Connection to the feedback database.
+        days (int): Number of days (including today).
+        user_email (str, optional): Hashed user email to restrict to.
+    Returns:
+        float: Positive percentage (0-100), or 0 when nothing was rated.
+    """
+    return get_statistics(conn, user_email=user_email, days=days)["positive_percentage"]
@@ -0,0 +1,279 @@
+"""
+Nightly mood forecasts for every user.
+
+Streams each user's daily mean mood (last ``HISTORY_DAYS`` days) out of the
+mood database in one ordered query, fits the forecasts in chunks across a
+process pool, flags dips for all users at once, and writes the results to
+``mood_forecasts`` (:mod:`core.forecast_store`), where the dashboard picks
+them up instead of fitting on the first visit of the day.
+
+Usage:
+    python -m core.forecast_batch                    # all users
+    python -m core.forecast_batch --workers 8 --chunk-size 100
+    python -m core.forecast_batch --benchmark 10000  # synthetic users, nothing is written
+"""
+
+import argparse
+import itertools
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date, datetime, timedelta
+
+from core import db, forecast_store
+from core.forecast_service import HISTORY_DAYS, history_start, series_fingerprint
+from core.mood_store import MOOD_DB, MOOD_SCHEMA
+
+
+FORECAST_DAYS = 7
+# Same threshold as the dashboard's predictive alerts
+ALERT_THRESHOLD = 2.8
+MIN_DAYS = 7
+CHUNK_SIZE = 50
+SAVE_BATCH = 1000
+PROGRESS_SECONDS = 2.0
+
+DAILY_SERIES_SQL = """
+    SELECT user_key, date, AVG(CASE mood_level
+        WHEN 'very_low' THEN 1 WHEN 'low' THEN 2 WHEN 'okay' THEN 3
+        WHEN 'good' THEN 4 WHEN 'great' THEN 5 ELSE 3 END)
+    FROM mood_entries
+    WHERE timestamp >= ?
+    GROUP BY user_key, date
+    ORDER BY user_key, date
+"""
+
+
+def iter_daily_series(db_path=MOOD_DB, since=None, min_days=MIN_DAYS):
+    """
+    Stream every user's daily mean mood, one user at a time.
+    Args:
+        db_path (str): Mood database file.
+        since (datetime, optional): Window start; defaults to :func:`history_start`.
+        min_days (int): Skip users with fewer days of data.
+    Yields:
+        tuple: ``(user_key, dates, values)`` with ISO dates, oldest first.
+    """
+    since = since or history_start()
+    db.ensure_schema(db_path, MOOD_SCHEMA)
+    cursor = db.execute(db_path, DAILY_SERIES_SQL, (since.isoformat(),))
+    for user_key, rows in itertools.groupby(cursor, key=lambda row: row[0]):
+        days = [(row[1], row[2]) for row in rows]
+        if len(days) >= min_days:
+            yield user_key, [day for day, _ in days], [value for _, value in days]
+
+
+def count_users(db_path=MOOD_DB, since=None):
+    """Count the users with entries in the forecast window (for progress output)."""
+    since = since or history_start()
+    db.ensure_schema(db_path, MOOD_SCHEMA)
+    return db.execute(
+        db_path, "SELECT COUNT(DISTINCT user_key) FROM mood_entries WHERE timestamp >= ?", (since.isoformat(),)
+    ).fetchone()[0]
+
+
+def synthetic_series(users, days=HISTORY_DAYS, seed=0):
+    """
+    Generate random-walk daily mood series for benchmarking.
+    Args:
+        users (int): Number of users.
+        days (int): Days per series.
+        seed (int): Random seed.
+    Yields:
+        tuple: ``(user_key, dates, values)`` like :func:`iter_daily_series`.
+    """
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=days - 1)
+    dates = [(start + timedelta(days=offset)).isoformat() for offset in range(days)]
+    for user in range(users):
+        mood, values = rng.uniform(2.0, 4.5), []
+        for _ in dates:
+            mood = min(5.0, max(1.0, mood + rng.gauss(0, 0.4)))
+            values.append(round(mood, 2))
+        yield f"synthetic-{user}", dates, values
+
+
+def fit_chunk(chunk, forecast_days=FORECAST_DAYS, fit=None):
+    """
+    Fit forecasts for a chunk of users (runs in a worker process).
+    Args:
+        chunk (list): ``(user_key, dates, values)`` tuples.
+        forecast_days (int): Forecast horizon.
+        fit (callable, optional): ``fit(dates, values, forecast_days) -> payload``.
+    Returns:
+        list: ``(user_key, fingerprint, payload, historical_avg)`` tuples.
+    """
+    if fit is None:
+        # Imported here so only worker processes load statsmodels/prophet
+        from components.predictive_analytics import forecast_payload as fit
+    results = []
+    for user_key, dates, values in chunk:
+        try:
+            payload = fit(dates, values, forecast_days)
+        except Exception as e:
+            print(f"[forecast_batch] Error: fit failed for {user_key}: {e}")
+            payload = {"model_type": None}
+        fingerprint = series_fingerprint(dates, values, forecast_days)
+        results.append((user_key, fingerprint, payload or {"model_type": None}, sum(values) / len(values)))
+    return results
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_batch(series, forecast_days=FORECAST_DAYS, workers=None, chunk_size=CHUNK_SIZE,
+              executor=None, fit=None, total=None, progress=print):
+    """
+    Fit forecasts for a stream of series.
+    At most two chunks per worker are queued at a time, so the stream is
+    never read far ahead of the fits.
+    Args:
+        series (iterable): ``(user_key, dates, values)`` tuples.
+        forecast_days (int): Forecast horizon.
+        workers (int, optional): Worker processes (defaults to the CPU count).
+        chunk_size (int): Users per task sent to a worker.
+        executor (Executor, optional): Use this instead of a process pool.
+        fit (callable, optional): Passed to :func:`fit_chunk`.
+        total (int, optional): Expected number of users, for progress output.
+        progress (callable, optional): Called with progress lines; None for silence.
+    Returns:
+        tuple: ``(results, report)``. Results are :func:`fit_chunk` tuples;
+        the report has ``users``, ``fitted``, ``seconds`` and ``users_per_second``.
+    """
+    workers = workers or os.cpu_count() or 1
+    owns_executor = executor is None
+    if owns_executor:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+    results, pending = [], set()
+    started = last_report = time.monotonic()
+
+    def collect(done):
+        nonlocal last_report
+        for future in done:
+            try:
+                results.extend(future.result())
+            except Exception as e:
+                print(f"[forecast_batch] Error: {e}")
+        now = time.monotonic()
+        if progress and now - last_report >= PROGRESS_SECONDS:
+            last_report = now
+            of_total = f"/{total}" if total else ""
+            progress(f"[forecast_batch] {len(results)}{of_total} users, "
+                     f"{len(results) / (now - started):.1f} users/s")
+
+    try:
+        for chunk in _chunks(series, chunk_size):
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(executor.submit(fit_chunk, chunk, forecast_days, fit))
+        collect(wait(pending).done)
+    finally:
+        if owns_executor:
+            executor.shutdown(cancel_futures=True)
+
+    seconds = time.monotonic() - started
+    report = {
+        "users": len(results),
+        "fitted": sum(1 for result in results if result[2].get("model_type")),
+        "seconds": round(seconds, 2),
+        "users_per_second": round(len(results) / seconds, 1) if seconds else 0.0,
+    }
+    return results, report
+
+
+def score_forecasts(results, threshold=ALERT_THRESHOLD):
+    """
+    Flag predicted dips for all fitted forecasts at once.
+    Args:
+        results (list): Tuples from :func:`run_batch`.
+        threshold (float): Mood below which a day counts as a dip.
+    Returns:
+        list: ``(user_key, fingerprint, payload, dip_count, alerts)`` rows for
+        :func:`core.forecast_store.save_forecasts`. Users whose fit failed are
+        left out; the dashboard fits those itself.
+    """
+    import numpy as np
+    from components.predictive_analytics import detect_mood_dips_batch, generate_predictive_alerts
+
+    fitted = [result for result in results if result[2].get("model_type") and result[2].get("values")]
+    if not fitted:
+        return []
+    horizon = max(len(result[2]["values"]) for result in fitted)
+    # Shorter forecasts are padded with NaN, which never counts as a dip
+    matrix = np.full((len(fitted), horizon), np.nan)
+    for row, (_, _, payload, _) in enumerate(fitted):
+        matrix[row, :len(payload["values"])] = payload["values"]
+    dips_mask, severe_mask = detect_mood_dips_batch(matrix, threshold)
+    dip_counts = dips_mask.sum(axis=1)
+
+    rows = []
+    for row, (user_key, fingerprint, payload, historical_avg) in enumerate(fitted):
+        alerts = []
+        if dip_counts[row]:
+            intervals = payload.get("confidence_intervals") or []
+            dips = []
+            for day in np.flatnonzero(dips_mask[row]):
+                interval = intervals[day] if day < len(intervals) else None
+                dips.append({
+                    "date": datetime.fromisoformat(payload["dates"][day]),
+                    "predicted_mood": float(matrix[row, day]),
+                    "severity": "severe" if severe_mask[row, day] else "moderate",
+                    "confidence": {"lower": interval[0], "upper": interval[1]} if interval else None,
+                })
+            alerts = generate_predictive_alerts(dips, historical_avg)
+        rows.append((user_key, fingerprint, payload, int(dip_counts[row]), alerts))
+    return rows
+
+
+def save_rows(rows, db_path=MOOD_DB, batch_size=SAVE_BATCH):
+    """Write scored forecasts in batches so no single transaction holds the write lock for long."""
+    for start in range(0, len(rows), batch_size):
+        forecast_store.save_forecasts(rows[start:start + batch_size], db_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute mood forecasts for every user.")
+    parser.add_argument("--db", default=MOOD_DB, help="mood database file")
+    parser.add_argument("--history-days", type=int, default=HISTORY_DAYS, help="days of history per forecast")
+    parser.add_argument("--horizon", type=int, default=FORECAST_DAYS, help="days to forecast")
+    parser.add_argument("--threshold", type=float, default=ALERT_THRESHOLD, help="dip threshold (mood 1-5)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="users per worker task")
+    parser.add_argument("--limit", type=int, help="only forecast the first N users")
+    parser.add_argument("--benchmark", type=int, metavar="USERS",
+                        help="fit N synthetic users instead of the database and write nothing")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        series, total = synthetic_series(args.benchmark, args.history_days), args.benchmark
+    else:
+        since = history_start(args.history_days)
+        series, total = iter_daily_series(args.db, since), count_users(args.db, since)
+    if args.limit:
+        series, total = itertools.islice(series, args.limit), min(total, args.limit)
+
+    results, report = run_batch(series, args.horizon, args.workers, args.chunk_size, total=total)
+    started = time.monotonic()
+    rows = score_forecasts(results, args.threshold)
+    scoring = time.monotonic() - started
+    if not args.benchmark:
+        save_rows(rows, args.db)
+
+    print(f"[forecast_batch] {report['users']} users ({report['fitted']} fitted) in {report['seconds']:.1f}s, "
+          f"{report['users_per_second']:.1f} users/s with {args.workers} workers")
+    print(f"[forecast_batch] dip detection for {len(rows)} forecasts in {scoring * 1000:.1f} ms, "
+          f"{sum(1 for row in rows if row[3])} users with predicted dips")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""
+Background mood forecasting.
+
+Fitting ARIMA/Prophet takes seconds, too long for a Streamlit rerun. The
+dashboard asks :class:`ForecastService` for a forecast instead:
+
+* results are cached under a fingerprint of the daily mood series (and the
+  horizon), so an unchanged series is never refit;
+* a missing result is fitted in a worker process with a timeout, and the
+  call returns at once with the user's last good forecast (or nothing); and
+* once the worker finishes, the next call returns the fresh result. A fit
+  that fails or times out is cached as ``{"model_type": None}``, so that
+  series is not refit until its data changes.
+
+Forecasts precomputed by the nightly batch (:mod:`core.forecast_store`) are
+checked before fitting: a matching fingerprint is used as is, an older one
+is served as the last good forecast while the refit runs.
+
+Workers are started with ``spawn`` and only receive plain lists, so they
+never inherit the Streamlit server's threads or open connections. Each
+worker runs one fit at a time, and its deadline starts when the fit does;
+a worker that overruns or crashes is replaced on its own, without touching
+the fits running in the other workers.
+"""
+
+import hashlib
+import multiprocessing
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import BrokenExecutor, CancelledError, Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from datetime import datetime, timedelta
+
+from core import forecast_store
+
+
+# Days of history a forecast is fitted on (today included)
+HISTORY_DAYS = 30
+FORECAST_WORKERS = 2
+FORECAST_TIMEOUT = 60.0
+CACHE_ENTRIES = 512
+
+
+def history_start(days=HISTORY_DAYS, now=None):
+    """
+    Start of the forecast history window: midnight, ``days - 1`` days ago.
+    The batch job and the dashboard both cut their series here, so a
+    forecast computed overnight matches the series seen the next day.
+    Args:
+        days (int): Window length in days, today included.
+        now (datetime, optional): Defaults to now.
+    Returns:
+        datetime: The window start.
+    """
+    midnight = (now or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight - timedelta(days=days - 1)
+
+
+def series_fingerprint(dates, values, forecast_days):
+    """
+    Fingerprint a daily series and horizon.
+    Only the date part of each entry in ``dates`` is used, so ``"2024-06-01"``
+    and ``"2024-06-01T00:00:00"`` give the same fingerprint.
+    Args:
+        dates (list): ISO dates (or timestamps) of the series.
+        values (list): Mean mood per date.
+        forecast_days (int): Forecast horizon.
+    Returns:
+        str: SHA-256 hex digest.
+    """
+    digest = hashlib.sha256(f"{forecast_days}|".encode())
+    for day, value in zip(dates, values):
+        digest.update(f"{str(day)[:10]}={float(value):.6f};".encode())
+    return digest.hexdigest()
+
+
+def _fit_in_worker(dates, values, forecast_days):
+    # Imported here so only worker processes load statsmodels/prophet
+    from components.predictive_analytics import forecast_payload
+
+    return forecast_payload(dates, values, forecast_days)
+
+
+def _worker_main(conn):
+    # Runs jobs sent by a FitWorkerPool slot until the pipe closes
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        fn, args = job
+        try:
+            conn.send((True, fn(*args)))
+        except Exception as e:
+            # Exceptions may not pickle; send a plain one
+            conn.send((False, RuntimeError(f"{type(e).__name__}: {e}")))
+
+
+class FitWorkerPool:
+    """
+    Fixed set of spawned worker processes, each running one job at a time.
+    Unlike ``ProcessPoolExecutor``, a worker that crashes or overruns its
+    deadline is terminated and replaced on its own; the other workers and
+    their jobs carry on.
+    Args:
+        workers (int): Worker processes.
+        timeout (float): Seconds a job may run, counted from when a worker
+            picks it up.
+    """
+
+    def __init__(self, workers, timeout, context=None):
+        self.timeout = timeout
+        self._context = context or multiprocessing.get_context("spawn")
+        self._jobs = queue.Queue()
+        self._closed = False
+        self._slots = [
+            threading.Thread(target=self._run_slot, daemon=True, name=f"forecast-worker-{i}")
+            for i in range(workers)
+        ]
+        for slot in self._slots:
+            slot.start()
+
+    def submit(self, fn, *args):
+        """
+        Queue a job.
+        Args:
+            fn (callable): Picklable module-level function.
+            *args: Its arguments.
+        Returns:
+            Future: Fails with ``TimeoutError`` past the deadline and with
+            ``BrokenExecutor`` if the worker died during the job.
+        Raises:
+            RuntimeError: If the pool is shut down.
+        """
+        if self._closed:
+            raise RuntimeError("forecast worker pool is shut down")
+        future = Future()
+        self._jobs.put((future, fn, args))
+        return future
+
+    def _start(self):
+        conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        process.start()
+        child_conn.close()
+        return process, conn
+
+    def _stop(self, process, conn):
+        conn.close()
+        process.terminate()
+        process.join(5)
+
+    def _run_slot(self):
+        process, conn = self._start()
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            future, fn, args = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            if not process.is_alive():
+                self._stop(process, conn)
+                process, conn = self._start()
+            try:
+                conn.send((fn, args))
+                # The deadline starts now, not when the job was queued
+                if not conn.poll(self.timeout):
+                    raise FutureTimeout(f"fit exceeded {self.timeout:.0f}s")
+                ok, value = conn.recv()
+            except FutureTimeout as e:
+                self._stop(process, conn)
+                process, conn = self._start()
+                future.set_exception(e)
+            except (EOFError, OSError) as e:
+                # The worker died mid-job (OOM, a native abort): replace just this one
+                self._stop(process, conn)
+                process, conn = self._start()
+                future.set_exception(BrokenExecutor(f"forecast worker exited during a fit: {e!r}"))
+            else:
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+        self._stop(process, conn)
+
+    def shutdown(self):
+        """Cancel queued jobs and stop the workers."""
+        self._closed = True
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                job[0].cancel()
+        for _ in self._slots:
+            self._jobs.put(None)
+
+
+class ForecastService:
+    """
+    Caches forecasts and fits missing ones in the background.
+    Args:
+        workers (int): Worker processes.
+        timeout (float): Seconds a fit may take before it is abandoned.
+        executor (Executor, optional): Use this instead of worker processes;
+            its fits can't be stopped, so a timeout only stops waiting for them.
+        fit (callable, optional): ``fit(dates, values, forecast_days) -> payload``.
+        precomputed (callable, optional): ``precomputed(user_key) -> (fingerprint, payload)`` or None.
+    """
+
+    def __init__(self, workers=FORECAST_WORKERS, timeout=FORECAST_TIMEOUT, executor=None, fit=None,
+                 cache_entries=CACHE_ENTRIES, precomputed=None):
+        self.workers = workers
+        self.timeout = timeout
+        self.fit = fit or _fit_in_worker
+        self.precomputed = precomputed
+        self.cache_entries = cache_entries
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._lock = threading.Lock()
+        self._results = OrderedDict()
+        self._last_good = {}
+        self._inflight = {}
+        self.stats = {"hits": 0, "fits": 0, "timeouts": 0, "errors": 0}
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = FitWorkerPool(self.workers, self.timeout)
+        return self._executor
+
+    def request(self, user_key, dates, values, forecast_days=7):
+        """
+        Get the forecast for a series without waiting for a fit.
+        Args:
+            user_key (str): Whose forecast this is (for the last-good fallback).
+            dates (list): ISO dates of the daily series.
+            values (list): Mean mood per date.
+            forecast_days (int): Forecast horizon.
+        Returns:
+            tuple: ``(payload, status)``. Status is ``"fresh"`` for a result
+            matching the series, or ``"pending"`` while a fit runs; then the
+            payload is the user's last good forecast, or None.
+        """
+        fingerprint = series_fingerprint(dates, values, forecast_days)
+        stored = None
+        if self.precomputed is not None and fingerprint not in self._results:
+            try:
+                stored = self.precomputed(user_key)
+            except Exception as e:
+                print(f"[forecast_service] Error: could not read precomputed forecast: {e}")
+        with self._lock:
+            if stored is not None:
+                if stored[0] == fingerprint:
+                    self._remember(fingerprint, stored[1])
+                else:
+                    self._last_good.setdefault(user_key, stored[1])
+            payload = self._results.get(fingerprint)
+            if payload is not None:
+                self._results.move_to_end(fingerprint)
+                self.stats["hits"] += 1
+                if payload.get("model_type"):
+                    self._last_good[user_key] = payload
+                return payload, "fresh"
+            if fingerprint not in self._inflight:
+                try:
+                    self._submit(fingerprint, user_key, list(dates), list(values), forecast_days)
+                except Exception as e:
+                    # e.g. a broken injected executor; serve what we have and retry next time
+                    print(f"[forecast_service] Error: could not start a fit: {e}")
+                    self.stats["errors"] += 1
+                    self._replace_pool()
+            return self._last_good.get(user_key), "pending"
+
+    def _submit(self, fingerprint, user_key, dates, values, forecast_days):
+        future = self._pool().submit(self.fit, dates, values, forecast_days)
+        self.stats["fits"] += 1
+        self._inflight[fingerprint] = future
+        threading.Thread(
+            target=self._collect, args=(fingerprint, user_key, future), daemon=True, name="forecast-collect"
+        ).start()
+
+    def _collect(self, fingerprint, user_key, future):
+        try:
+            # The owned pool enforces the deadline itself, from when the fit starts
+            payload = future.result(timeout=None if self._owns_executor else self.timeout)
+        except FutureTimeout:
+            print(f"[forecast_service] Error: fit exceeded {self.timeout:.0f}s")
+            # Cached like a failure: the dashboard polls while pending, and a series
+            # that always overruns would otherwise hold a worker on every poll
+            payload = {"model_type": None}
+            with self._lock:
+                self.stats["timeouts"] += 1
+        except CancelledError:
+            # Dropped at shutdown; the next request submits it again
+            with self._lock:
+                self._inflight.pop(fingerprint, None)
+            return
+        except Exception as e:
+            print(f"[forecast_service] Error: {e}")
+            # Cache the failure so the same series is not refit on every rerun
+            payload = {"model_type": None}
+            with self._lock:
+                self.stats["errors"] += 1
+
+        with self._lock:
+            self._inflight.pop(fingerprint, None)
+            self._remember(fingerprint, payload)
+            if payload.get("model_type"):
+                self._last_good[user_key] = payload
+
+    def _remember(self, fingerprint, payload):
+        self._results[fingerprint] = payload
+        while len(self._results) > self.cache_entries:
+            self._results.popitem(last=False)
+
+    def _replace_pool(self):
+        # Called with the lock held; the next submit starts a fresh pool
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def wait(self, timeout=None):
+        """
+        Block until the fits running now have finished (for scripts and tests).
+        Args:
+            timeout (float, optional): Maximum seconds to wait.
+        Returns:
+            bool: True if nothing is still running.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if not self._inflight:
+                    return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        with self._lock:
+            self._replace_pool()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_forecast_service():
+    """
+    Get the process-wide forecast service.
+    Returns:
+        ForecastService: The shared service.
+    """
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = ForecastService(precomputed=forecast_store.load_forecast)
+    return _service
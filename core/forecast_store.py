@@ -0,0 +1,67 @@
+"""
+Precomputed mood forecasts.
+
+The nightly batch job (``python -m core.forecast_batch``) writes one row per
+user to ``mood_forecasts`` in the mood database; the dashboard's
+:class:`core.forecast_service.ForecastService` reads it before fitting
+anything itself. Rows carry the fingerprint of the series they were fitted
+on, so a stale row is only used as the "last good" forecast.
+"""
+
+import json
+import time
+
+from core import db
+from core.mood_store import MOOD_DB
+
+
+FORECAST_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mood_forecasts (
+    user_key TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    generated_at REAL NOT NULL,
+    model_type TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    dips INTEGER NOT NULL DEFAULT 0,
+    alerts TEXT NOT NULL DEFAULT '[]'
+) WITHOUT ROWID;
+"""
+
+
+def save_forecasts(rows, db_path=MOOD_DB):
+    """
+    Insert or replace forecasts in one transaction.
+    Args:
+        rows (list): ``(user_key, fingerprint, payload, dip_count, alerts)`` tuples.
+        db_path (str): Mood database file.
+    """
+    db.ensure_schema(db_path, FORECAST_SCHEMA)
+    now = time.time()
+    with db.transaction(db_path) as conn:
+        conn.executemany('''
+            INSERT INTO mood_forecasts (user_key, fingerprint, generated_at, model_type, payload, dips, alerts)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user_key) DO UPDATE SET
+                fingerprint = excluded.fingerprint, generated_at = excluded.generated_at,
+                model_type = excluded.model_type, payload = excluded.payload,
+                dips = excluded.dips, alerts = excluded.alerts
+        ''', [
+            (user_key, fingerprint, now, payload["model_type"], json.dumps(payload), dips, json.dumps(alerts))
+            for user_key, fingerprint, payload, dips, alerts in rows
+        ])
+
+
+def load_forecast(user_key, db_path=MOOD_DB):
+    """
+    Get a user's precomputed forecast.
+    Args:
+        user_key (str): The user's email or IP.
+        db_path (str): Mood database file.
+    Returns:
+        tuple or None: ``(fingerprint, payload)``.
+    """
+    db.ensure_schema(db_path, FORECAST_SCHEMA)
+    row = db.execute(
+        db_path, "SELECT fingerprint, payload FROM mood_forecasts WHERE user_key = ?", (user_key,)
+    ).fetchone()
+    return (row[0], json.loads(row[1])) if row else None
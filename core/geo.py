@@ -0,0 +1,274 @@
+"""
+Shared user location lookups.
+
+Every place that needs the user's IP, location or country goes through
+here, so the answers are cached once per process instead of per page:
+
+* :func:`user_ip` - the client's IP (see :func:`client_ip` for which
+  proxy headers are trusted), falling back to this machine's public IP
+  (local runs);
+* :func:`lookup_ip` - IP geolocation (ipapi.co), cached per IP for a day;
+* :func:`country_from_coords` - offline coordinates -> country code using
+  the bundled :mod:`core.country_index` index, so browser coordinates
+  resolve without a network call; and
+* :func:`geocode` - place search for the emergency page through one shared
+  Nominatim client, cached per query.
+
+Failed lookups are cached briefly so a dead service isn't retried on every
+rerun.
+"""
+
+import ipaddress
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+import streamlit as st
+
+from core.country_index import CITY_POINTS, COUNTRY_BOXES
+
+
+IP_TTL_SECONDS = 24 * 3600
+PUBLIC_IP_TTL_SECONDS = 3600
+GEOCODE_TTL_SECONDS = 7 * 24 * 3600
+FAILURE_TTL_SECONDS = 10 * 60
+CACHE_ENTRIES = 4096
+HTTP_TIMEOUT = 3
+# Degrees a point may lie outside a country's box (coasts, box rounding)
+BOX_MARGIN = 0.5
+# Reverse proxies in front of the app that append to X-Forwarded-For
+TRUSTED_PROXY_HOPS = int(os.getenv("TALKHEAL_TRUSTED_PROXY_HOPS") or 0)
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory cache whose entries expire.
+    Args:
+        ttl (float): Default lifetime of an entry in seconds.
+        max_entries (int): Oldest entries are dropped beyond this.
+    """
+
+    def __init__(self, ttl, max_entries=CACHE_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Get a live entry, or ``default``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return default
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        """Store an entry for ``ttl`` seconds (default: the cache's TTL)."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+
+_MISSING = object()
+_ip_locations = TTLCache(IP_TTL_SECONDS)
+_public_ip = TTLCache(PUBLIC_IP_TTL_SECONDS, max_entries=1)
+_geocoded = TTLCache(GEOCODE_TTL_SECONDS)
+_geocoder = None
+_geocoder_lock = threading.Lock()
+
+
+def _is_public(ip):
+    try:
+        return ipaddress.ip_address(ip).is_global
+    except ValueError:
+        return False
+
+
+def client_ip(trusted_hops=None):
+    """
+    Get the connecting client's IP as Streamlit sees it.
+    This IP is the identity of guests (their conversations and mood data)
+    and their rate-limit key, so client-supplied headers are not trusted:
+    the leftmost ``X-Forwarded-For`` entry can be anything the client sent.
+    Without trusted proxies the socket's peer address is used. Behind
+    ``TALKHEAL_TRUSTED_PROXY_HOPS`` proxies that each append the address
+    they received from, the entry the outermost one appended is used.
+    Args:
+        trusted_hops (int, optional): Defaults to ``TRUSTED_PROXY_HOPS``.
+    Returns:
+        str or None: The client's public address; None for local or private
+        connections, a header shorter than the proxy chain, or Streamlit
+        versions without ``st.context``.
+    """
+    hops = TRUSTED_PROXY_HOPS if trusted_hops is None else trusted_hops
+    context = getattr(st, "context", None)
+    if context is None:
+        return None
+    try:
+        if hops <= 0:
+            ip = getattr(context, "ip_address", None) or ""
+        else:
+            forwarded = [entry.strip() for entry in ((context.headers or {}).get("X-Forwarded-For") or "").split(",")]
+            forwarded = [entry for entry in forwarded if entry]
+            ip = forwarded[-hops] if len(forwarded) >= hops else ""
+    except Exception:
+        return None
+    return ip if _is_public(ip) else None
+
+
+def public_ip():
+    """
+    Get this machine's public IP (what a local run's user appears as).
+    Returns:
+        str or None: The IP, or None when it can't be determined.
+    """
+    ip = _public_ip.get("ip", _MISSING)
+    if ip is not _MISSING:
+        return ip
+    try:
+        ip = requests.get("https://api.ipify.org", timeout=HTTP_TIMEOUT).text.strip() or None
+    except requests.RequestException as e:
+        print(f"[geo] Error: could not get public IP: {e}")
+        ip = None
+    _public_ip.set("ip", ip, None if ip else FAILURE_TTL_SECONDS)
+    return ip
+
+
+def user_ip():
+    """
+    Get the current user's IP.
+    Returns:
+        str or None: The client IP, else this machine's public IP.
+    """
+    return client_ip() or public_ip()
+
+
+def lookup_ip(ip):
+    """
+    Geolocate an IP address.
+    Args:
+        ip (str or None): The address; None locates this machine.
+    Returns:
+        dict or None: ``latitude``, ``longitude``, ``country_code`` and ``city``.
+    """
+    key = ip or "self"
+    location = _ip_locations.get(key, _MISSING)
+    if location is not _MISSING:
+        return location
+    url = f"https://ipapi.co/{ip}/json/" if ip else "https://ipapi.co/json/"
+    location = None
+    try:
+        response = requests.get(url, timeout=HTTP_TIMEOUT)
+        if response.status_code == 200:
+            data = response.json()
+            if data.get("latitude") is not None and data.get("longitude") is not None:
+                location = {
+                    "latitude": float(data["latitude"]),
+                    "longitude": float(data["longitude"]),
+                    "country_code": (data.get("country_code") or "").upper() or None,
+                    "city": data.get("city"),
+                }
+    except (requests.RequestException, ValueError) as e:
+        print(f"[geo] Error: could not locate {key}: {e}")
+    _ip_locations.set(key, location, None if location else FAILURE_TTL_SECONDS)
+    return location
+
+
+def country_from_coords(latitude, longitude):
+    """
+    Find the country at a point without any network call.
+    Args:
+        latitude (float): Latitude in degrees.
+        longitude (float): Longitude in degrees.
+    Returns:
+        str or None: ISO 3166 alpha-2 code, or None outside every known box.
+    """
+    candidates = {
+        code for code, south, west, north, east in COUNTRY_BOXES
+        if south - BOX_MARGIN <= latitude <= north + BOX_MARGIN
+        and west - BOX_MARGIN <= longitude <= east + BOX_MARGIN
+    }
+    if len(candidates) <= 1:
+        return next(iter(candidates), None)
+    # Overlapping boxes: the country of the nearest listed city wins
+    scale = math.cos(math.radians(latitude)) ** 2
+    best, best_distance = None, None
+    for code, city_lat, city_lon in CITY_POINTS:
+        if code in candidates:
+            distance = (latitude - city_lat) ** 2 + scale * (longitude - city_lon) ** 2
+            if best_distance is None or distance < best_distance:
+                best, best_distance = code, distance
+    return best
+
+
+def user_location():
+    """
+    Get the current user's approximate location from their IP.
+    Returns:
+        tuple or None: ``(latitude, longitude)``.
+    """
+    location = lookup_ip(user_ip())
+    return (location["latitude"], location["longitude"]) if location else None
+
+
+def user_country(coords=None):
+    """
+    Get the current user's country.
+    Args:
+        coords (dict, optional): Browser coordinates with ``latitude`` and
+            ``longitude``; resolved offline when given.
+    Returns:
+        str or None: ISO 3166 alpha-2 code.
+    """
+    if coords and coords.get("latitude") is not None and coords.get("longitude") is not None:
+        country = country_from_coords(float(coords["latitude"]), float(coords["longitude"]))
+        if country:
+            return country
+    location = lookup_ip(user_ip())
+    if not location:
+        return None
+    return location["country_code"] or country_from_coords(location["latitude"], location["longitude"])
+
+
+def _get_geocoder():
+    global _geocoder
+    if _geocoder is None:
+        with _geocoder_lock:
+            if _geocoder is None:
+                from geopy.geocoders import Nominatim
+
+                _geocoder = Nominatim(user_agent="talkheal_app")
+    return _geocoder
+
+
+def geocode(query):
+    """
+    Search for a place by name.
+    Geocoder errors (timeouts, quota) are raised for the caller to report
+    and are not cached.
+    Args:
+        query (str): City, region or country.
+    Returns:
+        dict or None: ``lat``, ``lon`` and ``name`` of the best match.
+    """
+    key = " ".join(query.lower().split())
+    result = _geocoded.get(key, _MISSING)
+    if result is not _MISSING:
+        return result
+    location = _get_geocoder().geocode(query)
+    result = {"lat": location.latitude, "lon": location.longitude, "name": location.address} if location else None
+    _geocoded.set(key, result)
+    return result
@@ -0,0 +1,72 @@
+"""
+Deferred imports for heavy optional dependencies.
+
+``px = lazy_import("plotly.express")`` binds a placeholder module; the real
+import happens on the first attribute access (``px.line(...)``). Modules
+that only need plotly, statsmodels, prophet, meteostat or pygame inside a
+single tab use this so that loading a page does not pay for them.
+
+Annotations and default arguments are evaluated when a function is defined,
+so keep a lazy module out of signatures or it is imported right away.
+"""
+
+import importlib
+import sys
+import threading
+import types
+
+
+_import_lock = threading.Lock()
+
+
+class LazyModule(types.ModuleType):
+    """Module placeholder that imports the real module on first attribute access."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            with _import_lock:
+                module = self.__dict__["_lazy_module"]
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_lazy_module"] is not None else "not loaded"
+        return f"<lazy module {self.__name__!r} ({state})>"
+
+
+def lazy_import(name):
+    """
+    Get a module that is imported on first use.
+    Args:
+        name (str): Absolute module name, e.g. ``"plotly.express"``.
+    Returns:
+        module: The module itself if it is already imported, otherwise a :class:`LazyModule`.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
+
+
+def is_loaded(name):
+    """
+    Check whether a module has really been imported (by anyone).
+    Args:
+        name (str): Absolute module name.
+    Returns:
+        bool: True if it is in ``sys.modules``.
+    """
+    return name in sys.modules
@@ -0,0 +1,56 @@
+"""
+Prompt construction and streaming helpers for the chat model.
+
+Kept free of Streamlit so they can be used from background code and tested
+with :class:`core.fake_llm.FakeGenerativeModel`.
+"""
+
+
+SUPPORT_INSTRUCTIONS = """You are a compassionate mental health support chatbot named TalkHeal. Your role is to:
+1. Provide empathetic, supportive responses
+2. Encourage professional help when needed
+3. Never diagnose or provide medical advice
+4. Be warm, understanding, and non-judgmental
+5. Ask follow-up questions to better understand the user's situation
+6. Provide coping strategies and resources when appropriate
+7. Not assume that the user is always in overwhelming states. Sometimes he/she might also be in joyful or curious moods and ask questions not related to mental health
+
+IMPORTANT: Respond with PLAIN TEXT ONLY. Do not include any HTML tags, markdown formatting, or special characters. Just provide a natural, conversational response.
+Respond in a caring, supportive manner (keep response under 150 words)."""
+
+SUPPORT_PROMPT = SUPPORT_INSTRUCTIONS + """
+
+User message: {user_message}
+"""
+
+
+def build_support_prompt(user_message):
+    """
+    Wrap a user message in the TalkHeal support instructions.
+    Args:
+        user_message (str): The user's message (or prepared conversation context).
+    Returns:
+        str: The full prompt.
+    """
+    return SUPPORT_PROMPT.format(user_message=user_message)
+
+
+def stream_text(model, prompt):
+    """
+    Stream a completion from the model as text chunks.
+    Errors from the model are raised to the caller, possibly after some chunks.
+    Args:
+        model: A ``GenerativeModel`` (or compatible fake).
+        prompt (str): The full prompt.
+    Yields:
+        str: Non-empty pieces of the reply, in order.
+    """
+    response = model.generate_content(prompt, stream=True)
+    for chunk in response:
+        try:
+            text = chunk.text
+        except ValueError:
+            # Chunks without text parts (e.g. a trailing safety-ratings chunk)
+            continue
+        if text:
+            yield text
@@ -0,0 +1,367 @@
+"""
+Content-addressed cache for LLM responses.
+
+Entries are keyed by a hash of (owner, model name, prompt, generation
+parameters), so identical requests made on later reruns by the same user
+are answered without calling the model. The generation parameters include
+the ones fixed on the model object (``generation_config``,
+``system_instruction``), not just the per-call ones. The owner is the user
+key the prompt came from; entries are never shared between users and
+:meth:`LLMCache.purge_owner` removes a user's entries. Two tiers:
+
+* an in-process LRU of recent entries, and
+* a SQLite table (``data/llm_cache.db``) with a TTL and a total-size cap;
+  the least recently used rows are evicted first.
+
+Use :func:`cached_generate_content` for ``GenerativeModel.generate_content``
+and :func:`cached_invoke` for LangChain chat models such as
+``ChatGoogleGenerativeAI``. Only successful (and, when a ``parse`` function is
+given, parseable) responses are stored.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from core import db
+
+
+CACHE_DB = os.path.join("data", "llm_cache.db")
+MEMORY_ENTRIES = 256
+TTL_SECONDS = 7 * 24 * 3600
+MAX_DISK_BYTES = 50 * 1024 * 1024
+LLM_CACHE_SCHEMA_VERSION = 1
+# Run disk eviction once every this many writes
+EVICT_EVERY = 50
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    owner TEXT,
+    model TEXT,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    expires REAL NOT NULL,
+    last_access REAL NOT NULL
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_llm_cache_expires ON llm_cache (expires);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access);
+"""
+
+
+def _normalize_prompt(prompt):
+    if isinstance(prompt, str):
+        return prompt
+    if isinstance(prompt, (list, tuple)):
+        return [_normalize_prompt(part) for part in prompt]
+    if isinstance(prompt, dict):
+        return {key: _normalize_prompt(value) for key, value in prompt.items()}
+    if hasattr(prompt, "content"):
+        # LangChain messages: the role matters as much as the text
+        return {"type": getattr(prompt, "type", type(prompt).__name__), "content": prompt.content}
+    return str(prompt)
+
+
+def owner_id(owner):
+    """
+    Stored form of an owner: a hash, so the cache holds no emails or IPs.
+    Args:
+        owner (str, optional): The user's email or IP.
+    Returns:
+        str or None: SHA-256 hex digest, or None for shared entries.
+    """
+    if owner is None:
+        return None
+    return hashlib.sha256(str(owner).encode("utf-8")).hexdigest()
+
+
+def cache_key(model_name, prompt, params=None, owner=None):
+    """
+    Build the cache key for a request.
+    Args:
+        model_name (str): Model identifier.
+        prompt: Prompt string, list of parts or list of chat messages.
+        params (dict, optional): Generation parameters that change the output.
+        owner (str, optional): The user the prompt belongs to.
+    Returns:
+        str: SHA-256 hex digest.
+    """
+    payload = json.dumps(
+        {"owner": owner_id(owner), "model": model_name, "prompt": _normalize_prompt(prompt), "params": params or {}},
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _model_settings(model):
+    # generation_config / system_instruction given to GenerativeModel(...);
+    # gateways and backends wrap the model, so look through them
+    for _ in range(4):
+        if model is None or isinstance(model, str):
+            break
+        if hasattr(model, "_generation_config") or hasattr(model, "_system_instruction"):
+            return {
+                "generation_config": getattr(model, "_generation_config", None),
+                "system_instruction": getattr(model, "_system_instruction", None),
+            }
+        model = getattr(model, "backend", None) or getattr(model, "model", None)
+    return {}
+
+
+class LLMCache:
+    """Two-tier (memory LRU + SQLite) response cache with hit/miss counters."""
+
+    def __init__(self, db_path=CACHE_DB, memory_entries=MEMORY_ENTRIES,
+                 ttl_seconds=TTL_SECONDS, max_disk_bytes=MAX_DISK_BYTES):
+        self.db_path = db_path
+        self.memory_entries = memory_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        if db_path:
+            db.ensure_schema(db_path, CACHE_SCHEMA)
+            db.migrate(db_path, LLM_CACHE_SCHEMA_VERSION, self._upgrade)
+
+    def _upgrade(self, conn, current_version):
+        if current_version < 1:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(llm_cache)")}
+            if "owner" not in columns:
+                # Older entries have no owner and can't be purged per user; drop them
+                conn.execute("DELETE FROM llm_cache")
+                conn.execute("ALTER TABLE llm_cache ADD COLUMN owner TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_owner ON llm_cache (owner)")
+
+    def get(self, key):
+        """
+        Look up a cached value.
+        Args:
+            key (str): Key from :func:`cache_key`.
+        Returns:
+            str or None: The cached value, or None on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires, _ = entry
+                if expires > now:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+        if self.db_path:
+            row = db.execute(
+                self.db_path, "SELECT value, expires, owner FROM llm_cache WHERE key = ? AND expires > ?", (key, now)
+            ).fetchone()
+            if row:
+                db.execute(self.db_path, "UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+                with self._lock:
+                    self._remember(key, row[0], row[1], row[2])
+                    self.counters["disk_hits"] += 1
+                return row[0]
+
+        with self._lock:
+            self.counters["misses"] += 1
+        return None
+
+    def set(self, key, value, model_name=None, ttl_seconds=None, owner=None):
+        """
+        Store a value in both tiers.
+        Args:
+            key (str): Key from :func:`cache_key`.
+            value (str): Response text.
+            model_name (str, optional): Stored for inspection only.
+            ttl_seconds (float, optional): Override the default TTL.
+            owner (str, optional): The user the entry belongs to (see :meth:`purge_owner`).
+        """
+        now = time.time()
+        expires = now + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        owner = owner_id(owner)
+        with self._lock:
+            self._remember(key, value, expires, owner)
+            self.counters["stores"] += 1
+            self._writes += 1
+            evict = self._writes % EVICT_EVERY == 0
+
+        if self.db_path:
+            db.execute(self.db_path, '''
+                INSERT INTO llm_cache (key, owner, model, value, size, created, expires, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    value = excluded.value, size = excluded.size, created = excluded.created,
+                    expires = excluded.expires, last_access = excluded.last_access
+            ''', (key, owner, model_name, value, len(value.encode("utf-8")), now, expires, now))
+            if evict:
+                self.evict()
+
+    def evict(self):
+        """
+        Drop expired rows, then the least recently used rows beyond the size cap.
+        Returns:
+            int: Number of rows removed from disk.
+        """
+        if not self.db_path:
+            return 0
+        with db.transaction(self.db_path) as conn:
+            removed = conn.execute("DELETE FROM llm_cache WHERE expires <= ?", (time.time(),)).rowcount
+            removed += conn.execute('''
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(size) OVER (ORDER BY last_access DESC, key) AS running
+                        FROM llm_cache
+                    ) WHERE running > ?
+                )
+            ''', (self.max_disk_bytes,)).rowcount
+        with self._lock:
+            self.counters["evictions"] += removed
+        return removed
+
+    def purge_owner(self, owner):
+        """
+        Remove every entry belonging to a user from both tiers.
+        Args:
+            owner (str): The user's email or IP.
+        Returns:
+            int: Number of rows removed from disk.
+        """
+        owner = owner_id(owner)
+        with self._lock:
+            for key in [key for key, entry in self._memory.items() if entry[2] == owner]:
+                del self._memory[key]
+        if not self.db_path:
+            return 0
+        return db.execute(self.db_path, "DELETE FROM llm_cache WHERE owner = ?", (owner,)).rowcount
+
+    def clear(self):
+        """Empty both tiers."""
+        with self._lock:
+            self._memory.clear()
+        if self.db_path:
+            db.execute(self.db_path, "DELETE FROM llm_cache")
+
+    def stats(self):
+        """
+        Get hit/miss counters.
+        Returns:
+            dict: Counters plus the overall hit rate (0-1).
+        """
+        with self._lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def get_or_compute(self, model_name, prompt, params, compute, parse=None, owner=None):
+        """
+        Return the cached response for a request, computing and storing it on a miss.
+        Args:
+            model_name (str): Model identifier.
+            prompt: Prompt passed to the model.
+            params (dict): Generation parameters that change the output.
+            compute (callable): ``compute() -> str`` calling the model.
+            parse (callable, optional): Applied to the text before returning;
+                if it raises, the response is not cached.
+            owner (str, optional): The user the prompt belongs to.
+        Returns:
+            The response text, or ``parse(text)`` when parse is given.
+        """
+        key = cache_key(model_name, prompt, params, owner)
+        text = self.get(key)
+        if text is not None:
+            try:
+                return parse(text) if parse else text
+            except Exception:
+                self._discard(key)
+
+        text = compute()
+        result = parse(text) if parse else text
+        self.set(key, text, model_name=model_name, owner=owner)
+        return result
+
+    def _remember(self, key, value, expires, owner=None):
+        self._memory[key] = (value, expires, owner)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _discard(self, key):
+        with self._lock:
+            self._memory.pop(key, None)
+        if self.db_path:
+            db.execute(self.db_path, "DELETE FROM llm_cache WHERE key = ?", (key,))
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """
+    Get the process-wide LLM response cache.
+    Returns:
+        LLMCache: The shared cache.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMCache()
+    return _cache
+
+
+def cached_generate_content(model, prompt, cache=None, parse=None, owner=None, **params):
+    """
+    Cached ``model.generate_content(prompt, **params)`` returning the response text.
+    Args:
+        model: A ``GenerativeModel`` (or compatible fake), possibly behind a gateway.
+        prompt: The prompt.
+        cache (LLMCache, optional): Defaults to the shared cache.
+        parse (callable, optional): See :meth:`LLMCache.get_or_compute`.
+        owner (str, optional): The user the prompt belongs to.
+        **params: Extra arguments for generate_content (part of the key).
+    Returns:
+        str: The response text (or its parsed form).
+    """
+    cache = cache or get_llm_cache()
+    model_name = getattr(model, "model_name", type(model).__name__)
+    key_params = {**_model_settings(model), **params}
+    return cache.get_or_compute(
+        model_name, prompt, key_params,
+        lambda: model.generate_content(prompt, **params).text,
+        parse=parse, owner=owner,
+    )
+
+
+def cached_invoke(chat_model, messages, cache=None, parse=None, owner=None):
+    """
+    Cached ``chat_model.invoke(messages)`` for LangChain chat models.
+    Args:
+        chat_model: e.g. ``ChatGoogleGenerativeAI``.
+        messages (list): LangChain messages.
+        cache (LLMCache, optional): Defaults to the shared cache.
+        parse (callable, optional): See :meth:`LLMCache.get_or_compute`.
+        owner (str, optional): The user the prompt belongs to.
+    Returns:
+        str: The response content (or its parsed form).
+    """
+    cache = cache or get_llm_cache()
+    model_name = getattr(chat_model, "model", None) or getattr(chat_model, "model_name", type(chat_model).__name__)
+    params = {
+        name: getattr(chat_model, name, None)
+        for name in ("temperature", "top_p", "top_k", "max_output_tokens")
+    }
+    return cache.get_or_compute(
+        model_name, messages, params,
+        lambda: chat_model.invoke(messages).content,
+        parse=parse, owner=owner,
+    )
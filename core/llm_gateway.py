@@ -0,0 +1,364 @@
+"""
+Resilient, process-wide access to the chat model.
+
+:class:`LLMGateway` wraps one backend model (a ``GenerativeModel`` built once
+per process, or a fake) and exposes the same ``generate_content`` method, so
+it can be handed to any code that expects a model. Every call gets:
+
+* a deadline - each attempt runs in a worker thread and the caller stops
+  waiting when the time is up;
+* jittered exponential backoff for retryable errors (timeouts, connection
+  problems, 429/5xx from the API); and
+* a circuit breaker - after repeated failures calls fail fast with
+  :class:`CircuitOpenError` until a cool-down passes and a trial call succeeds.
+
+Callers turn :class:`GatewayError` into their usual fallback text.
+"""
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+TIMEOUT_SECONDS = 20.0
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 4.0
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 30.0
+WORKER_THREADS = 8
+
+# Upstream errors worth retrying, matched by class name so google.api_core and
+# requests need not be importable here.
+RETRYABLE_ERROR_NAMES = {
+    "ServiceUnavailable", "ResourceExhausted", "InternalServerError", "TooManyRequests",
+    "GatewayTimeout", "DeadlineExceeded", "RetryError", "ConnectionError", "Timeout",
+    "ReadTimeout", "ConnectTimeout",
+}
+
+
+class GatewayError(Exception):
+    """Base class for errors raised by the gateway itself."""
+
+
+class CircuitOpenError(GatewayError):
+    """The upstream has been failing; the call was not attempted."""
+
+
+class DeadlineExceeded(GatewayError):
+    """The call did not finish before its deadline."""
+
+
+def is_retryable(error):
+    """
+    Decide whether an error is transient and worth retrying.
+    Args:
+        error (Exception): The raised exception.
+    Returns:
+        bool: True for timeouts, connection problems and 429/5xx API errors.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError, DeadlineExceeded, FutureTimeout)):
+        return True
+    return any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__)
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+    Args:
+        failure_threshold (int): Failures in a row that open the circuit.
+        reset_timeout (float): Seconds to stay open before letting one trial call through.
+    """
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        """
+        Check whether a call may go ahead.
+        Returns:
+            bool: False while open, or while a half-open trial call is running.
+        """
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def release(self):
+        """Give up a half-open trial without an outcome, so the next call may try again."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+
+    @property
+    def failures(self):
+        return self._failures
+
+
+class GeminiBackend:
+    """Builds the ``GenerativeModel`` once and forwards calls with a request timeout."""
+
+    def __init__(self, api_key, model_name=DEFAULT_MODEL):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+        self.model_name = model_name
+
+    def generate_content(self, prompt, stream=False, timeout=None, **kwargs):
+        if timeout is not None:
+            kwargs.setdefault("request_options", {"timeout": timeout})
+        return self.model.generate_content(prompt, stream=stream, **kwargs)
+
+
+class FakeBackend:
+    """Adapts a :class:`core.fake_llm.FakeGenerativeModel` (or any model) to the backend interface."""
+
+    def __init__(self, model=None):
+        if model is None:
+            from core.fake_llm import FakeGenerativeModel
+
+            model = FakeGenerativeModel()
+        self.model = model
+        self.model_name = getattr(model, "model_name", "models/fake")
+
+    def generate_content(self, prompt, stream=False, timeout=None, **kwargs):
+        return self.model.generate_content(prompt, stream=stream, **kwargs)
+
+
+class LLMGateway:
+    """
+    Model-compatible wrapper adding deadlines, retries and a circuit breaker.
+    Args:
+        backend: Object with ``generate_content(prompt, stream=False, timeout=None, **kwargs)``.
+        timeout (float): Deadline in seconds for a whole call, retries included.
+        max_attempts (int): Attempts for retryable errors.
+        breaker (CircuitBreaker, optional): Defaults to a new breaker.
+    """
+
+    _executor = ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix="llm-gateway")
+
+    def __init__(self, backend, timeout=TIMEOUT_SECONDS, max_attempts=MAX_ATTEMPTS, breaker=None,
+                 backoff_base=BACKOFF_BASE, backoff_cap=BACKOFF_CAP):
+        self.backend = backend
+        self.model_name = getattr(backend, "model_name", type(backend).__name__)
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.breaker = breaker or CircuitBreaker()
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._stats_lock = threading.Lock()
+        self.stats = {"calls": 0, "retries": 0, "failures": 0, "short_circuits": 0, "timeouts": 0}
+        self.last_error = None
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def generate_content(self, prompt, stream=False, timeout=None, **kwargs):
+        """
+        Call the backend like ``GenerativeModel.generate_content``.
+        Args:
+            prompt: The prompt.
+            stream (bool): Return an iterable of chunks instead of one response.
+            timeout (float, optional): Override the gateway deadline for this call.
+            **kwargs: Passed through to the backend.
+        Returns:
+            The backend response (or a guarded chunk iterator when streaming).
+        Raises:
+            CircuitOpenError: The circuit is open.
+            DeadlineExceeded: The deadline passed before a response arrived.
+            Exception: Non-retryable backend errors, or the last retryable one.
+        """
+        self._count("calls")
+        if not self.breaker.allow():
+            self._count("short_circuits")
+            raise CircuitOpenError(f"LLM upstream unhealthy, retrying after {self.breaker.reset_timeout:.0f}s")
+
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        attempt = 0
+        while True:
+            attempt += 1
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise DeadlineExceeded("LLM call deadline exceeded")
+                response = self._attempt(prompt, stream, remaining, kwargs)
+            except Exception as e:
+                retryable = is_retryable(e)
+                if isinstance(e, DeadlineExceeded):
+                    self._count("timeouts")
+                delay = self._backoff(attempt)
+                if retryable and attempt < self.max_attempts and time.monotonic() + delay < deadline:
+                    self._count("retries")
+                    time.sleep(delay)
+                    continue
+                self._fail(e, retryable)
+                raise
+            if stream:
+                return self._guard_stream(response)
+            self.breaker.record_success()
+            return response
+
+    def _attempt(self, prompt, stream, remaining, kwargs):
+        future = self._executor.submit(
+            self.backend.generate_content, prompt, stream=stream, timeout=remaining, **kwargs
+        )
+        try:
+            return future.result(timeout=remaining)
+        except FutureTimeout:
+            future.cancel()
+            raise DeadlineExceeded(f"LLM call exceeded {remaining:.1f}s")
+
+    def _backoff(self, attempt):
+        # Full jitter keeps concurrent sessions from retrying in lockstep
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** (attempt - 1)))
+
+    def _fail(self, error, upstream):
+        self.last_error = f"{type(error).__name__}: {str(error)[:200]}"
+        if upstream:
+            self._count("failures")
+            self.breaker.record_failure()
+        else:
+            # The upstream answered (e.g. a blocked prompt); that is not an outage
+            self.breaker.record_success()
+
+    def _guard_stream(self, response):
+        return _GuardedStream(self, response)
+
+    def health(self):
+        """
+        Report the gateway's state without calling the upstream.
+        Returns:
+            dict: Circuit state, consecutive failures, last error and call counters.
+        """
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {
+            "model": self.model_name,
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "last_error": self.last_error,
+            **stats,
+        }
+
+
+class _GuardedStream:
+    """
+    Chunk iterator that reports a stream's outcome to the gateway's breaker.
+    A stream that finishes records a success and one that raises records a
+    failure. One that is closed or dropped early (a Streamlit rerun during
+    ``st.write_stream``, or never iterated) releases a half-open trial, so
+    the breaker can't stay stuck waiting for an outcome.
+    """
+
+    def __init__(self, gateway, response):
+        self._gateway = gateway
+        self._response = response
+        self._chunks = None
+        self._done = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._done:
+            raise StopIteration
+        try:
+            if self._chunks is None:
+                self._chunks = iter(self._response)
+            return next(self._chunks)
+        except StopIteration:
+            self._done = True
+            self._gateway.breaker.record_success()
+            raise
+        except BaseException as e:
+            self._done = True
+            if isinstance(e, Exception):
+                self._gateway._fail(e, is_retryable(e))
+            else:
+                self._gateway.breaker.release()
+            raise
+
+    def close(self):
+        """Stop early; releases a half-open trial and closes the upstream stream."""
+        if self._done:
+            return
+        self._done = True
+        self._gateway.breaker.release()
+        close = getattr(self._chunks, "close", None)
+        if close is not None:
+            close()
+
+    def __del__(self):
+        self.close()
+
+
+_gateways = {}
+_gateways_lock = threading.Lock()
+
+
+def get_gateway(api_key=None, model_name=DEFAULT_MODEL):
+    """
+    Get the process-wide gateway for a model, building its client on first use.
+    Returns a fake-backed gateway when ``TALKHEAL_FAKE_LLM`` is set.
+    Args:
+        api_key (str, optional): Gemini API key (required unless using the fake).
+        model_name (str): Gemini model name.
+    Returns:
+        LLMGateway: The shared gateway.
+    """
+    fake = bool(os.getenv("TALKHEAL_FAKE_LLM"))
+    key = ("fake" if fake else api_key, model_name)
+    gateway = _gateways.get(key)
+    if gateway is None:
+        with _gateways_lock:
+            gateway = _gateways.get(key)
+            if gateway is None:
+                backend = FakeBackend() if fake else GeminiBackend(api_key, model_name)
+                gateway = _gateways[key] = LLMGateway(backend)
+    return gateway
+
+
+def set_gateway(gateway, api_key=None, model_name=DEFAULT_MODEL):
+    """Install a gateway (e.g. one over a :class:`FakeBackend`) for a key/model pair."""
+    with _gateways_lock:
+        _gateways[(api_key, model_name)] = gateway
@@ -0,0 +1,152 @@
+"""
+Cached, datetime-indexed mood DataFrames.
+
+Building a DataFrame from the stored entries parses every timestamp, so the
+dashboard used to pay that cost once per tab on every rerun. :class:`MoodFrame`
+builds a user's frame once with vectorized parsing, precomputes the columns
+the charts use (``datetime``, ``date``, ``hour``, ``mood_numeric``,
+``mood_label``), and takes new entries through :meth:`MoodFrame.append`.
+Window queries are slices of the sorted index.
+
+``MoodFrame.version`` changes with every change. Versions come from one
+process-wide counter, so a frame rebuilt after LRU eviction never reuses a
+version and derived results can be memoized on ``(user_key, version)``.
+"""
+
+import itertools
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from core.mood_store import COLUMNS
+
+
+MOOD_NUMERIC = {"very_low": 1, "low": 2, "okay": 3, "good": 4, "great": 5}
+MOOD_LABELS = {
+    "very_low": "😔 Very Low",
+    "low": "😐 Low",
+    "okay": "😊 Okay",
+    "good": "😄 Good",
+    "great": "🌟 Great",
+}
+# Users whose frames are kept in memory
+MAX_CACHED_USERS = 128
+
+# Shared by every frame; next() on a count is atomic under the GIL
+_versions = itertools.count(1)
+
+
+def entries_to_frame(entries):
+    """
+    Convert stored entries to a sorted, datetime-indexed DataFrame.
+    Args:
+        entries (list): Entry dicts from :class:`core.mood_store.MoodStore`.
+    Returns:
+        pd.DataFrame: One row per entry with the derived chart columns.
+    """
+    df = pd.DataFrame.from_records(entries, columns=list(COLUMNS))
+    moments = pd.to_datetime(df["timestamp"], format="ISO8601")
+    df["datetime"] = moments
+    df["date"] = moments.dt.normalize()
+    df["hour"] = moments.dt.hour
+    df["mood_numeric"] = df["mood_level"].map(MOOD_NUMERIC).fillna(3).astype(int)
+    df["mood_label"] = df["mood_level"].map(MOOD_LABELS).fillna(df["mood_level"])
+    df.index = pd.DatetimeIndex(moments.values)
+    return df.sort_index(kind="stable")
+
+
+class MoodFrame:
+    """
+    One user's mood entries as an in-memory DataFrame.
+    Args:
+        store (MoodStore): Where the entries are loaded from.
+        user_key (str): The user's email or IP.
+    """
+
+    def __init__(self, store, user_key):
+        self.store = store
+        self.user_key = user_key
+        self.version = next(_versions)
+        self._frame = None
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def frame(self):
+        """
+        Get the full frame, loading it on first use and folding in appended entries.
+        Returns:
+            pd.DataFrame: All entries, oldest first. Treat it as read-only.
+        """
+        with self._lock:
+            if self._frame is None:
+                self._frame = entries_to_frame(self.store.entries(self.user_key))
+                self._pending = []
+            elif self._pending:
+                new = entries_to_frame(self._pending)
+                self._pending = []
+                frame = pd.concat([self._frame, new])
+                if not frame.index.is_monotonic_increasing:
+                    # Back-dated entry
+                    frame = frame.sort_index(kind="stable")
+                self._frame = frame
+            return self._frame
+
+    def append(self, entry):
+        """
+        Record an entry that was just added to the store.
+        Args:
+            entry (dict): The stored entry.
+        """
+        with self._lock:
+            if self._frame is not None:
+                self._pending.append(entry)
+            self.version = next(_versions)
+
+    def window(self, days=None, now=None):
+        """
+        Slice the entries from the last N days.
+        Args:
+            days (int, optional): Window length; None for everything.
+            now (datetime, optional): End of the window (defaults to now).
+        Returns:
+            pd.DataFrame: A slice of the cached frame. Copy it before adding columns.
+        """
+        frame = self.frame()
+        if days is None:
+            return frame
+        cutoff = (now or datetime.now()) - timedelta(days=days)
+        return frame.iloc[frame.index.searchsorted(pd.Timestamp(cutoff)):]
+
+    def invalidate(self):
+        """Drop the cached frame so the next read reloads it from the store."""
+        with self._lock:
+            self._frame = None
+            self._pending = []
+            self.version = next(_versions)
+
+
+_frames = OrderedDict()
+_frames_lock = threading.Lock()
+
+
+def get_mood_frame(store, user_key):
+    """
+    Get the process-wide cached frame for a user.
+    Args:
+        store (MoodStore): The mood store.
+        user_key (str): The user's email or IP.
+    Returns:
+        MoodFrame: The shared frame for this store and user.
+    """
+    key = (store.db_path, user_key)
+    with _frames_lock:
+        frame = _frames.get(key)
+        if frame is None:
+            frame = _frames[key] = MoodFrame(store, user_key)
+            while len(_frames) > MAX_CACHED_USERS:
+                _frames.popitem(last=False)
+        else:
+            _frames.move_to_end(key)
+        return frame
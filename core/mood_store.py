@@ -0,0 +1,209 @@
+"""
+Per-user mood entry storage.
+
+Entries live in one SQLite table keyed by user (email, or IP for guests) with
+an index on (user, timestamp), so adding an entry is a single INSERT and
+"last N days" reads only that user's rows in the window.
+
+The old shared ``data/mood_data.json`` is imported once, tracked by the
+database's schema version. It had no owner, so its entries go to
+``TALKHEAL_MOOD_LEGACY_OWNER`` when that is set (single-user installs set it
+to their email) and to the ``"legacy"`` key otherwise. The JSON file is left
+in place untouched.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+
+from core import db
+
+
+MOOD_DB = os.path.join("data", "mood.db")
+LEGACY_FILE = os.path.join("data", "mood_data.json")
+LEGACY_USER_KEY = "legacy"
+MOOD_SCHEMA_VERSION = 1
+
+MOOD_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mood_entries (
+    id INTEGER PRIMARY KEY,
+    user_key TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    mood_level TEXT NOT NULL,
+    notes TEXT NOT NULL DEFAULT '',
+    context_reason TEXT NOT NULL DEFAULT '',
+    activities TEXT NOT NULL DEFAULT '[]',
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    day_of_week TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_mood_user_timestamp ON mood_entries (user_key, timestamp);
+"""
+
+COLUMNS = ("timestamp", "mood_level", "notes", "context_reason", "activities", "date", "time", "day_of_week")
+INSERT_SQL = (
+    f"INSERT INTO mood_entries (user_key, {', '.join(COLUMNS)}) "
+    f"VALUES ({', '.join('?' * (len(COLUMNS) + 1))})"
+)
+
+
+def build_entry(mood_level, notes="", context_reason="", activities=None, timestamp=None):
+    """
+    Build a mood entry with its derived date fields.
+    Args:
+        mood_level (str): One of very_low, low, okay, good, great.
+        notes (str): Free-text notes.
+        context_reason (str): What the mood relates to.
+        activities (list, optional): Activities done that day.
+        timestamp (str, optional): ISO timestamp; defaults to now.
+    Returns:
+        dict: The entry.
+    """
+    timestamp = timestamp or datetime.now().isoformat()
+    moment = datetime.fromisoformat(timestamp)
+    return {
+        "timestamp": timestamp,
+        "mood_level": mood_level,
+        "notes": notes or "",
+        "context_reason": context_reason or "",
+        "activities": list(activities) if isinstance(activities, (list, tuple)) else [],
+        "date": moment.strftime("%Y-%m-%d"),
+        "time": moment.strftime("%H:%M"),
+        "day_of_week": moment.strftime("%A"),
+    }
+
+
+def _row(user_key, entry):
+    return (
+        user_key, entry["timestamp"], entry["mood_level"], entry.get("notes") or "",
+        entry.get("context_reason") or "", json.dumps(entry.get("activities") or []),
+        entry["date"], entry["time"], entry["day_of_week"],
+    )
+
+
+def _entry(row):
+    entry = dict(zip(COLUMNS, row))
+    entry["activities"] = json.loads(entry["activities"])
+    return entry
+
+
+def _cutoff(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class MoodStore:
+    """
+    Mood entries for all users in one indexed table.
+    Args:
+        db_path (str): SQLite database file.
+        legacy_file (str, optional): Shared JSON file to import on first use.
+    """
+
+    def __init__(self, db_path=MOOD_DB, legacy_file=LEGACY_FILE):
+        self.db_path = db_path
+        self.legacy_file = legacy_file
+        db.ensure_schema(db_path, MOOD_SCHEMA)
+        db.migrate(db_path, MOOD_SCHEMA_VERSION, self._upgrade)
+
+    def _upgrade(self, conn, current_version):
+        if current_version < 1:
+            self._import_legacy(conn)
+
+    def _import_legacy(self, conn):
+        if not self.legacy_file or not os.path.exists(self.legacy_file):
+            return
+        try:
+            with open(self.legacy_file, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[mood_store] Error: could not import {self.legacy_file}: {e}")
+            return
+        owner = os.getenv("TALKHEAL_MOOD_LEGACY_OWNER") or LEGACY_USER_KEY
+        rows = []
+        for item in legacy if isinstance(legacy, list) else []:
+            try:
+                entry = build_entry(
+                    item["mood_level"], item.get("notes", ""),
+                    item.get("context_reason") or "No specific reason",
+                    item.get("activities"), item["timestamp"],
+                )
+            except (KeyError, TypeError, ValueError):
+                continue
+            rows.append(_row(owner, entry))
+        conn.executemany(INSERT_SQL, rows)
+
+    def add(self, user_key, entry):
+        """
+        Append one entry for a user.
+        Args:
+            user_key (str): The user's email or IP.
+            entry (dict): Entry from :func:`build_entry`.
+        """
+        self.add_many(user_key, [entry])
+
+    def add_many(self, user_key, entries):
+        """
+        Append several entries for a user in one transaction.
+        Args:
+            user_key (str): The user's email or IP.
+            entries (list): Entries from :func:`build_entry`.
+        """
+        with db.transaction(self.db_path) as conn:
+            conn.executemany(INSERT_SQL, [_row(user_key, entry) for entry in entries])
+
+    def entries(self, user_key, since=None, until=None):
+        """
+        Get a user's entries, oldest first.
+        Args:
+            user_key (str): The user's email or IP.
+            since (datetime or str, optional): Only entries at or after this time.
+            until (datetime or str, optional): Only entries before this time.
+        Returns:
+            list: Entry dicts.
+        """
+        sql = f"SELECT {', '.join(COLUMNS)} FROM mood_entries WHERE user_key = ?"
+        params = [user_key]
+        if since is not None:
+            sql += " AND timestamp >= ?"
+            params.append(_cutoff(since))
+        if until is not None:
+            sql += " AND timestamp < ?"
+            params.append(_cutoff(until))
+        rows = db.execute(self.db_path, sql + " ORDER BY timestamp, id", params).fetchall()
+        return [_entry(row) for row in rows]
+
+    def summary(self, user_key, since=None):
+        """
+        Count a user's entries and find their time span without loading them.
+        Args:
+            user_key (str): The user's email or IP.
+            since (datetime or str, optional): Only entries at or after this time.
+        Returns:
+            tuple: (count, first timestamp, last timestamp); timestamps are None when empty.
+        """
+        sql = "SELECT COUNT(*), MIN(timestamp), MAX(timestamp) FROM mood_entries WHERE user_key = ?"
+        params = [user_key]
+        if since is not None:
+            sql += " AND timestamp >= ?"
+            params.append(_cutoff(since))
+        return tuple(db.execute(self.db_path, sql, params).fetchone())
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_mood_store():
+    """
+    Get the process-wide mood store.
+    Returns:
+        MoodStore: The shared store.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = MoodStore()
+    return _store
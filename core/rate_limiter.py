@@ -0,0 +1,206 @@
+"""
+Token-bucket rate limiting shared by every session in the process.
+
+Each key (user email or IP) gets a bucket holding up to ``max_requests``
+tokens that refills continuously at ``max_requests / window`` tokens per
+second. A check reads one bucket, refills it for the elapsed time and takes a
+token, so every call is O(1) regardless of history.
+
+Buckets live in memory by default. Set ``RATE_LIMIT_DB`` (or pass a
+:class:`SQLiteBucketStore`) to keep them in SQLite so limits survive restarts
+and are shared between Streamlit worker processes.
+"""
+
+import heapq
+import math
+import os
+import threading
+import time
+from collections import Counter
+
+from core import db
+
+
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB")
+# Full buckets are pruned from memory once this many keys are tracked
+MAX_MEMORY_KEYS = 10000
+
+RATE_LIMIT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_limits (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def _refill(tokens, updated, now, capacity, rate):
+    return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+
+def _full_at(tokens, updated, capacity, rate):
+    # When a bucket will have refilled completely
+    if tokens >= capacity:
+        return updated
+    return updated + (capacity - tokens) / rate if rate > 0 else math.inf
+
+
+class MemoryBucketStore:
+    """
+    In-process bucket store guarded by a lock.
+
+    Each bucket keeps the capacity and rate it was last used with, and a
+    min-heap orders buckets by the time they will be full again. Once more
+    than ``max_keys`` are tracked, each call drops the buckets that have
+    refilled, popping them off the heap, so pruning costs O(log n) per
+    removed bucket instead of a scan of every key.
+    """
+
+    def __init__(self, max_keys=MAX_MEMORY_KEYS):
+        self.max_keys = max_keys
+        self._buckets = {}     # key -> (tokens, updated, capacity, rate)
+        self._full_at = []     # heap of (time the bucket is full, key); stale entries are skipped
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, cost=1, now=None):
+        """
+        Refill a bucket and try to take ``cost`` tokens from it.
+        Returns:
+            tuple: (allowed, tokens_left)
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, updated, _, _ = self._buckets.get(key, (capacity, now, capacity, rate))
+            tokens = _refill(tokens, updated, now, capacity, rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now, capacity, rate)
+            heapq.heappush(self._full_at, (_full_at(tokens, now, capacity, rate), key))
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+            if len(self._full_at) > 2 * len(self._buckets) + self.max_keys:
+                # Mostly superseded entries; rebuilding costs O(n) once per O(n) calls
+                self._full_at = [(_full_at(*bucket), key) for key, bucket in self._buckets.items()]
+                heapq.heapify(self._full_at)
+            return allowed, tokens
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+            self._full_at.clear()
+
+    def _prune(self, now):
+        # A bucket that has refilled completely is indistinguishable from a missing one
+        heap = self._full_at
+        while heap and heap[0][0] <= now:
+            _, key = heapq.heappop(heap)
+            bucket = self._buckets.get(key)
+            if bucket is not None and _full_at(*bucket) <= now:
+                del self._buckets[key]
+
+
+class SQLiteBucketStore:
+    """Bucket store in a SQLite table, safe across threads and processes."""
+
+    def __init__(self, path):
+        self.path = path
+        db.ensure_schema(path, RATE_LIMIT_SCHEMA)
+
+    def take(self, key, capacity, rate, cost=1, now=None):
+        """
+        Refill a bucket and try to take ``cost`` tokens from it.
+        Returns:
+            tuple: (allowed, tokens_left)
+        """
+        now = time.time() if now is None else now
+        with db.transaction(self.path) as conn:
+            row = conn.execute("SELECT tokens, updated FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = _refill(tokens, updated, now, capacity, rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            conn.execute('''
+                INSERT INTO rate_limits (key, tokens, updated) VALUES (?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated
+            ''', (key, tokens, now))
+        return allowed, tokens
+
+    def reset(self):
+        db.execute(self.path, "DELETE FROM rate_limits")
+
+
+class RateLimiter:
+    """Token-bucket limiter with counters for allowed and throttled calls."""
+
+    def __init__(self, store=None):
+        self.store = store or MemoryBucketStore()
+        self._metrics_lock = threading.Lock()
+        self._allowed = 0
+        self._throttled = Counter()
+
+    def check(self, key, max_requests=50, window_seconds=3600, cost=1):
+        """
+        Take ``cost`` tokens from the key's bucket if it has enough.
+        Args:
+            key (str): User identifier (email or IP).
+            max_requests (int): Bucket capacity (burst size).
+            window_seconds (float): Time for an empty bucket to refill completely.
+            cost (int): Tokens this call uses.
+        Returns:
+            tuple: (bool, int) - (is_allowed, requests_remaining)
+        """
+        rate = max_requests / window_seconds
+        # Different limits on the same key get separate buckets
+        bucket_key = f"{max_requests}/{window_seconds}:{key}"
+        allowed, tokens = self.store.take(bucket_key, max_requests, rate, cost)
+
+        with self._metrics_lock:
+            if allowed:
+                self._allowed += 1
+            else:
+                self._throttled[key] += 1
+        return allowed, int(tokens)
+
+    def metrics(self, top=10):
+        """
+        Get counters for this process.
+        Args:
+            top (int): Number of most-throttled keys to include.
+        Returns:
+            dict: allowed and throttled totals plus the most throttled keys.
+        """
+        with self._metrics_lock:
+            return {
+                "allowed": self._allowed,
+                "throttled": sum(self._throttled.values()),
+                "top_throttled": self._throttled.most_common(top),
+            }
+
+    def reset(self):
+        """Forget every bucket and counter."""
+        self.store.reset()
+        with self._metrics_lock:
+            self._allowed = 0
+            self._throttled.clear()
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """
+    Get the process-wide rate limiter.
+    Uses SQLite when ``RATE_LIMIT_DB`` is set, memory otherwise.
+    Returns:
+        RateLimiter: The shared limiter.
+    """
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                store = SQLiteBucketStore(RATE_LIMIT_DB) if RATE_LIMIT_DB else MemoryBucketStore()
+                _limiter = RateLimiter(store)
+    return _limiter
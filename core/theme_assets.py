@@ -0,0 +1,283 @@
+"""
+Theme background images, prepared once per process and served by URL.
+
+Pages used to read a 1-2 MB PNG from ``static_files/`` on every rerun and
+inline it as base64 CSS. Instead, :func:`background_image_css` converts each
+background to downscaled WebP variants the first time it is needed, writes
+them to ``static/backgrounds/`` (served by Streamlit at ``app/static/...``
+when ``server.enableStaticServing`` is on) and returns CSS that references
+them by URL. The browser fetches and caches the image once.
+
+Images already built by ``python -m core.assets`` are resolved through its
+manifest first; the on-demand build only covers images missing from it. The
+variants it writes are named by a digest of the source and recorded per
+source in ``static/backgrounds/manifest.json``, so editing an image removes
+the variants of its previous version.
+
+When Pillow or static serving is unavailable it falls back to a data URI,
+still encoded only once per process (from the built WebP when there is one).
+
+:func:`set_background_for_theme` renders the background block the pages
+share (translucent sidebar, transparent header, hidden sidebar arrows).
+"""
+
+import base64
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+from core import assets
+
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+STATIC_DIR = ROOT_DIR / "static"
+BACKGROUND_DIR = STATIC_DIR / "backgrounds"
+VARIANTS_MANIFEST = "manifest.json"
+STATIC_URL = "app/static"
+
+# Desktop and mobile widths for background variants
+BACKGROUND_WIDTHS = (1920, 960)
+MOBILE_BREAKPOINT = 768
+WEBP_QUALITY = 80
+
+PALETTE_BACKGROUNDS = {
+    "light": "static_files/pink.png",
+    "calm blue": "static_files/blue.png",
+    "mint": "static_files/mint.png",
+    "lavender": "static_files/lavender.png",
+    "pink": "static_files/pink.png",
+}
+DEFAULT_BACKGROUND = "static_files/pink.png"
+DARK_BACKGROUND = "static_files/dark.png"
+
+_build_lock = threading.Lock()
+
+
+def palette_background_path(selected_palette="pink", is_dark=False):
+    """
+    Pick the background image for a palette.
+    Args:
+        selected_palette (str): Palette name (case-insensitive).
+        is_dark (bool): Whether the dark theme is active.
+    Returns:
+        str: Path of the source image, relative to the project root.
+    """
+    if is_dark:
+        return DARK_BACKGROUND
+    return PALETTE_BACKGROUNDS.get((selected_palette or "").lower(), DEFAULT_BACKGROUND)
+
+
+def _resolve(image_path):
+    return Path(image_path) if os.path.isabs(image_path) else ROOT_DIR / image_path
+
+
+def _static_serving_enabled():
+    try:
+        import streamlit as st
+
+        return bool(st.get_option("server.enableStaticServing"))
+    except Exception:
+        return False
+
+
+def _source_digest(path):
+    stat = os.stat(path)
+    return hashlib.sha1(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:10]
+
+
+def _build_variants(image_path):
+    """Write WebP variants for an image; returns {width: url} or None if impossible."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+
+    source = _resolve(image_path)
+    digest = _source_digest(source)
+    stem = source.stem.replace(" ", "_")
+    urls = {}
+    with _build_lock:
+        BACKGROUND_DIR.mkdir(parents=True, exist_ok=True)
+        image = None
+        for width in BACKGROUND_WIDTHS:
+            name = f"{stem}-{digest}-{width}.webp"
+            target = BACKGROUND_DIR / name
+            if not target.exists():
+                if image is None:
+                    image = Image.open(source)
+                    image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+                variant = image
+                if image.width > width:
+                    variant = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+                tmp = target.with_suffix(".tmp")
+                variant.save(tmp, "WEBP", quality=WEBP_QUALITY, method=6)
+                os.replace(tmp, target)
+            urls[width] = f"{STATIC_URL}/backgrounds/{name}"
+        _record_variants(assets.source_key(source, ROOT_DIR), [url.rsplit("/", 1)[1] for url in urls.values()])
+    return urls
+
+
+def _record_variants(key, names):
+    # Called with _build_lock held: remember this source's variants and delete
+    # the ones its previous version left behind
+    manifest_file = BACKGROUND_DIR / VARIANTS_MANIFEST
+    try:
+        manifest = json.loads(manifest_file.read_text())
+    except (OSError, ValueError):
+        manifest = {}
+    previous = manifest.get(key, [])
+    if previous == names:
+        return
+    for name in set(previous) - set(names):
+        path = BACKGROUND_DIR / Path(name).name
+        if path.is_file():
+            path.unlink()
+    manifest[key] = names
+    assets._write_atomic(manifest_file, lambda tmp: tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True)))
+
+
+@lru_cache(maxsize=None)
+def background_urls(image_path):
+    """
+    Get URLs for an image's background variants, building them on first use.
+    Args:
+        image_path (str): Source image path relative to the project root.
+    Returns:
+        dict: width -> URL, or None when variants cannot be served.
+    """
+    if not _static_serving_enabled():
+        return None
+    built = assets.image_variants(image_path)
+    if built:
+        return {width: built[assets.pick_variant(built, width)[0]] for width in BACKGROUND_WIDTHS}
+    try:
+        return _build_variants(image_path)
+    except Exception as e:
+        print(f"[theme_assets] Could not build variants for {image_path}: {e}")
+        return None
+
+
+@lru_cache(maxsize=None)
+def data_uri(image_path):
+    """
+    Encode an image as a data URI once per process.
+    Args:
+        image_path (str): Path of the image.
+    Returns:
+        str: ``data:<mime>;base64,...``
+    """
+    mime = mimetypes.guess_type(image_path)[0] or "image/png"
+    with open(_resolve(image_path), "rb") as f:
+        return f"data:{mime};base64,{base64.b64encode(f.read()).decode()}"
+
+
+def background_image_css(image_path):
+    """
+    CSS declarations that set an image as the background.
+    Uses served WebP variants (with a smaller one on narrow screens) when
+    possible, otherwise a cached data URI.
+    Args:
+        image_path (str): Source image path relative to the project root.
+    Returns:
+        str: CSS to place inside a rule block.
+    """
+    urls = background_urls(image_path)
+    if not urls:
+        # image_path() takes CSS pixels and doubles them for high-DPI screens
+        source = assets.image_path(image_path, BACKGROUND_WIDTHS[0] // 2)
+        return f'background-image: url("{data_uri(source)}");'
+    large, small = max(urls), min(urls)
+    css = f'background-image: url("{urls[large]}");'
+    if urls[small] != urls[large]:
+        # Nested rule; the trailing ";" lets browsers without CSS nesting skip just this part
+        css += f' @media (max-width: {MOBILE_BREAKPOINT}px) {{ background-image: url("{urls[small]}"); }};'
+    return css
+
+
+def theme_background_css(selected_palette="pink", is_dark=False):
+    """
+    Background declarations for a palette (see :func:`background_image_css`).
+    Args:
+        selected_palette (str): Palette name.
+        is_dark (bool): Whether the dark theme is active.
+    Returns:
+        str: CSS to place inside a rule block.
+    """
+    return background_image_css(palette_background_path(selected_palette, is_dark))
+
+
+def page_background_css(image_css, is_dark=False, text_selectors="span", extra_css=""):
+    """
+    The ``<style>`` block pages use to put an image behind the whole app.
+    Args:
+        image_css (str): Background declarations (see :func:`background_image_css`).
+        is_dark (bool): Whether the dark theme is active.
+        text_selectors (str, optional): Selectors recoloured for the theme; None to leave text alone.
+        extra_css (str): Page-specific rules, placed last so they take precedence.
+    Returns:
+        str: HTML for ``st.markdown(..., unsafe_allow_html=True)``.
+    """
+    text_css = ""
+    if text_selectors:
+        text_css = f"""
+        {text_selectors} {{
+            color: {'#f0f0f0' if is_dark else 'rgba(49, 51, 63, 0.8)'} !important;
+            transition: color 0.3s ease;
+        }}
+"""
+    return f"""
+        <style>
+        /* Entire app background */
+        html, body, [data-testid="stApp"] {{
+            {image_css}
+            background-size: cover;
+            background-position: center;
+            background-repeat: no-repeat;
+            background-attachment: fixed;
+        }}
+
+        /* Main content transparency */
+        .block-container {{
+            background-color: rgba(255, 255, 255, 0);
+        }}
+
+        /* Sidebar: brighter translucent background */
+        [data-testid="stSidebar"] {{
+            background-color: rgba(255, 255, 255, 0.6);
+            color: {'black' if is_dark else 'rgba(49, 51, 63, 0.8)'};
+        }}
+{text_css}
+        /* Header bar: fully transparent */
+        [data-testid="stHeader"] {{
+            background-color: rgba(0, 0, 0, 0);
+        }}
+
+        /* Hide left/right arrow at sidebar bottom */
+        button[title="Close sidebar"],
+        button[title="Open sidebar"] {{
+            display: none !important;
+        }}
+        {extra_css}
+        </style>
+        """
+
+
+def set_background_for_theme(selected_palette="pink", text_selectors="span", extra_css=""):
+    """
+    Render the palette's background for the current theme on this page.
+    Args:
+        selected_palette (str): Palette name.
+        text_selectors (str, optional): See :func:`page_background_css`.
+        extra_css (str): Page-specific rules.
+    """
+    import streamlit as st
+    from core.theme import get_current_theme
+
+    current_theme = st.session_state.get("current_theme") or get_current_theme()
+    is_dark = current_theme["name"] == "Dark"
+    css = page_background_css(theme_background_css(selected_palette, is_dark), is_dark, text_selectors, extra_css)
+    st.markdown(css, unsafe_allow_html=True)
@@ -1,4 +1,3 @@
-import sqlite3
 import streamlit as st
 import hashlib
 from datetime import datetime, timedelta, timezone
@@ -7,6 +6,12 @@ import re
 import json
 import os
 import google.generativeai
+from core import activity_log, conversation_store, db, feedback_analytics, geo, llm, llm_cache, llm_gateway, rate_limiter
+from core.conversation_repository import get_repository
+
+
+# Conversations loaded into the sidebar per page
+CONVERSATION_PAGE = 20
 
 
 def get_current_time():
@@ -91,9 +96,9 @@ def create_new_conversation(initial_message=None):
 
     user_key = user_email if user_email else ip
 
-    user_convos = [c for c in st.session_state.conversations if c.get("user_key") == user_key]
-
-    new_id = len(user_convos) + 1
+    repository = get_repository()
+    # Indexed MAX(id) lookup; ids stay unique after deletions
+    new_id = repository.next_conversation_id(user_key)
 
     new_convo = {
         "id": new_id,
@@ -110,6 +115,7 @@ def create_new_conversation(initial_message=None):
             "time": get_current_time()
         })
 
+    repository.create_conversation(user_key, new_convo)
     st.session_state.conversations.insert(0, new_convo)
     st.session_state.active_conversation = new_id
     return new_id
@@ -118,15 +124,19 @@ def create_new_conversation(initial_message=None):
 def get_conversation_by_id(convo_id):
     """
     Get a specific conversation by its ID.
+    Looked up by primary key in the conversation repository, so it also finds
+    conversations outside the sidebar's loaded pages.
     Args:
         convo_id (int): The conversation ID.
     Returns:
-        dict or None: The conversation dict if found, None otherwise.
+        dict or None: The conversation dict (messages load on first use), None if not found.
     """
-    for convo in st.session_state.conversations:
-        if convo.get("id") == convo_id:
-            return convo
-    return None
+    return get_repository().open_conversation(get_user_key(), convo_id)
+
+
+def _loaded_conversations(convo_id):
+    # Copies of a conversation in this session's loaded pages (at most a few pages)
+    return [c for c in st.session_state.get("conversations", []) if c.get("id") == convo_id]
 
 
 def delete_conversation(convo_id):
@@ -137,22 +147,14 @@ def delete_conversation(convo_id):
     Returns:
         bool: True if deleted successfully, False otherwise.
     """
-    user_email = st.session_state.get("user_profile", {}).get("email", None)
-    ip = cached_user_ip()
-    user_key = user_email if user_email else ip
-    
-    initial_count = len(st.session_state.conversations)
+    # Only ids deleted explicitly are removed from storage
+    deleted = get_repository().delete_conversation(get_user_key(), convo_id)
     st.session_state.conversations = [
-        c for c in st.session_state.conversations 
-        if not (c.get("id") == convo_id and c.get("user_key") == user_key)
+        c for c in st.session_state.get("conversations", []) if c.get("id") != convo_id
     ]
-    
-    if len(st.session_state.conversations) < initial_count:
-        save_conversations(st.session_state.conversations)
-        if st.session_state.get("active_conversation") == convo_id:
-            st.session_state.active_conversation = None
-        return True
-    return False
+    if deleted and st.session_state.get("active_conversation") == convo_id:
+        st.session_state.active_conversation = None
+    return deleted
 
 
 def update_conversation_title(convo_id, new_title):
@@ -167,7 +169,10 @@ def update_conversation_title(convo_id, new_title):
     convo = get_conversation_by_id(convo_id)
     if convo:
         convo["title"] = new_title
-        save_conversations(st.session_state.conversations)
+        save_conversations([convo])
+        # Keep loaded copies in step so their next save doesn't restore the old title
+        for loaded in _loaded_conversations(convo_id):
+            loaded["title"] = new_title
         return True
     return False
 
@@ -186,7 +191,7 @@ def export_conversation(convo_id, format_type="json"):
         return None
     
     if format_type == "json":
-        return json.dumps(convo, indent=2)
+        return json.dumps({**convo, "messages": list(convo.get("messages", []))}, indent=2)
     
     elif format_type == "txt":
         output = f"Conversation: {convo['title']}\n"
@@ -256,6 +261,29 @@ def sanitize_input(user_input, max_length=5000):
     return user_input
 
 
+def _ai_error_message(error):
+    """
+    Map an exception from the model to a supportive reply.
+    Args:
+        error (Exception): The exception raised while generating.
+    Returns:
+        str: Text to show the user instead of a response.
+    """
+    genai_types = google.generativeai.types
+    if isinstance(error, llm_gateway.GatewayError):
+        # Upstream unhealthy or too slow: answer right away instead of making the user wait
+        return "I'm having trouble generating a response right now. Please try again in a moment."
+    if isinstance(error, ValueError):
+        return "I'm having trouble understanding your message. Could you please rephrase it?"
+    if isinstance(error, getattr(genai_types, "BlockedPromptException", ())):
+        return "I understand you're going through something difficult. Let's focus on how you're feeling and what might help you feel better."
+    if isinstance(error, getattr(genai_types, "GenerationException", ())):
+        return "I'm having trouble generating a response right now. Please try again in a moment."
+    if isinstance(error, requests.RequestException):
+        return "I'm having trouble connecting to my services. Please check your internet connection and try again."
+    return "I'm here to listen and support you. Sometimes I have trouble connecting, but I want you to know that your feelings are valid and you're not alone. Would you like to share more about what you're experiencing?"
+
+
 def get_ai_response(user_message, model):
     """
     Generate an AI response to the user's message using the provided model.
@@ -269,36 +297,44 @@ def get_ai_response(user_message, model):
     if model is None:
         return "I'm sorry, I can't connect right now. Please check the API configuration."
 
-    mental_health_prompt = f"""
-    You are a compassionate mental health support chatbot named TalkHeal. Your role is to:
-    1. Provide empathetic, supportive responses
-    2. Encourage professional help when needed
-    3. Never diagnose or provide medical advice
-    4. Be warm, understanding, and non-judgmental
-    5. Ask follow-up questions to better understand the user's situation
-    6. Provide coping strategies and resources when appropriate
-    7. Not assume that the user is always in overwhelming states. Sometimes he/she might also be in joyful or curious moods and ask questions not related to mental health
-    
-    IMPORTANT: Respond with PLAIN TEXT ONLY. Do not include any HTML tags, markdown formatting, or special characters. Just provide a natural, conversational response.
-    
-    User message: {user_message}
-    
-    Respond in a caring, supportive manner (keep response under 150 words):
-    """
     try:
-        response = model.generate_content(mental_health_prompt)
+        response = model.generate_content(llm.build_support_prompt(user_message))
         cleaned_response = clean_ai_response(response.text)
         return cleaned_response
-    except ValueError:
-        return "I'm having trouble understanding your message. Could you please rephrase it?"
-    except google.generativeai.types.BlockedPromptException:
-        return "I understand you're going through something difficult. Let's focus on how you're feeling and what might help you feel better."
-    except google.generativeai.types.GenerationException:
-        return "I'm having trouble generating a response right now. Please try again in a moment."
-    except requests.RequestException:
-        return "I'm having trouble connecting to my services. Please check your internet connection and try again."
-    except Exception:
-        return "I'm here to listen and support you. Sometimes I have trouble connecting, but I want you to know that your feelings are valid and you're not alone. Would you like to share more about what you're experiencing?"
+    except Exception as e:
+        return _ai_error_message(e)
+
+
+def stream_ai_response(user_message, model, prompt=None, status=None):
+    """
+    Stream an AI response chunk by chunk, for use with st.write_stream.
+    An error before the first chunk yields the same supportive reply as
+    get_ai_response instead. An error after it ends the stream with just the
+    partial reply and sets ``status["interrupted"]``.
+    Args:
+        user_message (str): The user's message.
+        model: The AI model instance.
+        prompt (str, optional): A complete prompt (e.g. from core.context_builder)
+            to send instead of wrapping user_message in the support prompt.
+        status (dict, optional): Receives ``interrupted`` = True when the reply was cut off.
+    Yields:
+        str: Pieces of the raw reply; pass the joined text to clean_ai_response before saving.
+    """
+    if model is None:
+        yield "I'm sorry, I can't connect right now. Please check the API configuration."
+        return
+
+    streamed = False
+    try:
+        for text in llm.stream_text(model, prompt or llm.build_support_prompt(user_message)):
+            streamed = True
+            yield text
+    except Exception as e:
+        print(f"[stream_ai_response] Error: {e}")
+        if not streamed:
+            yield _ai_error_message(e)
+        elif status is not None:
+            status["interrupted"] = True
 
 
 def get_conversation_summary(convo_id, model=None):
@@ -323,8 +359,8 @@ def get_conversation_summary(convo_id, model=None):
         try:
             message_text = "\n".join([f"{m['sender']}: {m['message']}" for m in messages[:5]])
             prompt = f"Summarize this conversation in 5-7 words:\n{message_text}"
-            response = model.generate_content(prompt)
-            return clean_ai_response(response.text)[:50]
+            # Same messages, same summary: reuse it across reruns
+            return clean_ai_response(llm_cache.cached_generate_content(model, prompt, owner=get_user_key()))[:50]
         except:
             pass
     
@@ -343,71 +379,94 @@ def cached_user_ip():
         cache_age = datetime.now() - st.session_state.ip_cache_time
         if cache_age < timedelta(hours=1):
             return st.session_state.cached_ip
-    try:
-        response = requests.get("https://api.ipify.org", timeout=5)
-        ip = response.text.strip()
+    ip = geo.user_ip()
+    if ip:
         st.session_state.cached_ip = ip
         st.session_state.ip_cache_time = datetime.now()
         return ip
-    except (requests.RequestException, requests.Timeout, Exception):
-        fallback_id = f"session_{hash(str(st.session_state)) % 100000}"
-        if not hasattr(st.session_state, 'cached_ip'):
-            st.session_state.cached_ip = fallback_id
-            st.session_state.ip_cache_time = datetime.now()
-        return st.session_state.cached_ip
+    fallback_id = f"session_{hash(str(st.session_state)) % 100000}"
+    if not hasattr(st.session_state, 'cached_ip'):
+        st.session_state.cached_ip = fallback_id
+        st.session_state.ip_cache_time = datetime.now()
+    return st.session_state.cached_ip
 
 
 def get_user_ip():
     """
-    Get the user's public IP address (no caching).
+    Get the user's public IP address (see :func:`core.geo.user_ip`).
     Returns:
         str: The user's IP address or 'unknown_ip'.
     """
-    try:
-        return requests.get("https://api.ipify.org").text
-    except:
-        return "unknown_ip"
+    return geo.user_ip() or "unknown_ip"
 
 
-def get_memory_file():
+def get_user_key():
     """
-    Get the filename for storing conversation history, based on user email or IP.
+    Get the key that identifies the current user's data (email, or IP for guests).
     Returns:
-        str: The path to the memory file.
+        str: The user's email or IP address.
     """
     user_email = st.session_state.get("user_profile", {}).get("email")
-    if user_email:
-        safe_email = user_email.replace("@", "_at_").replace(".", "_dot_")
-        filename = f"data/conversations_{safe_email}.json"
-    else:
-        ip = cached_user_ip()
-        filename = f"data/conversations_{ip}.json"
-    os.makedirs("data", exist_ok=True)
-    return filename
+    return user_email if user_email else cached_user_ip()
+
+
+def get_memory_file():
+    """
+    Get the legacy single-file conversation path, based on user email or IP.
+    Conversations now live in the SQLite conversation repository; this file is
+    only read once to migrate old history.
+    Returns:
+        str: The path to the legacy memory file.
+    """
+    return conversation_store.legacy_path(get_user_key())
 
 
 def save_conversations(conversations):
     """
-    Save the list of conversations to the user's memory file.
+    Save conversations to the conversation repository.
+    Only new messages and changed metadata are written, so the cost per call
+    does not grow with the length of the history. Conversations missing from
+    the list are kept; use delete_conversation to remove one.
     Args:
         conversations (list): List of conversation dicts.
     """
-    memory_file = get_memory_file()
-    with open(memory_file, 'w', encoding="utf-8") as f:
-        json.dump(conversations, f, indent=4)
+    get_repository().save_conversations(get_user_key(), conversations)
 
 
-def load_conversations():
+def load_conversations(limit=CONVERSATION_PAGE, before_id=None):
     """
-    Load the user's conversation history from file.
+    Load a page of the user's conversation titles and metadata, newest first.
+    Message bodies are fetched from the repository when a conversation is opened.
+    Args:
+        limit (int): Page size.
+        before_id (int, optional): Load the page of conversations older than this id.
     Returns:
         list: List of conversation dicts, or empty list if none exist.
     """
-    memory_file = get_memory_file()
-    if not os.path.exists(memory_file):
-        return []
-    with open(memory_file, 'r', encoding="utf-8") as f:
-        return json.load(f)
+    return get_repository().load_conversations(get_user_key(), limit=limit, before_id=before_id)
+
+
+def has_more_conversations():
+    """
+    Check whether the user has conversations beyond the loaded pages.
+    Returns:
+        bool: True if another page can be loaded.
+    """
+    loaded = st.session_state.get("conversations", [])
+    return get_repository().count_conversations(get_user_key()) > len(loaded)
+
+
+def load_more_conversations():
+    """
+    Append the next page of conversations to ``st.session_state.conversations``.
+    Returns:
+        int: Number of conversations loaded.
+    """
+    loaded = st.session_state.setdefault("conversations", [])
+    oldest = min((c["id"] for c in loaded if isinstance(c.get("id"), int)), default=None)
+    page = load_conversations(before_id=oldest)
+    loaded.extend(page)
+    return len(page)
 
 
 def backup_conversations():
@@ -417,27 +476,19 @@ def backup_conversations():
         str: Path to backup file, or None if backup failed.
     """
     try:
-        memory_file = get_memory_file()
-        if not os.path.exists(memory_file):
+        conversations = get_repository().snapshot(get_user_key())
+        if not conversations:
             return None
         
         backup_dir = "data/backups"
         os.makedirs(backup_dir, exist_ok=True)
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        user_email = st.session_state.get("user_profile", {}).get("email")
-        if user_email:
-            safe_email = user_email.replace("@", "_at_").replace(".", "_dot_")
-            backup_file = f"{backup_dir}/backup_{safe_email}_{timestamp}.json"
-        else:
-            ip = cached_user_ip()
-            backup_file = f"{backup_dir}/backup_{ip}_{timestamp}.json"
-        
-        with open(memory_file, 'r', encoding="utf-8") as src:
-            data = json.load(src)
+        safe_key = conversation_store.safe_user_key(get_user_key())
+        backup_file = f"{backup_dir}/backup_{safe_key}_{timestamp}.json"
         
         with open(backup_file, 'w', encoding="utf-8") as dst:
-            json.dump(data, dst, indent=4)
+            json.dump(conversations, dst, indent=4)
         
         return backup_file
     except Exception as e:
@@ -445,60 +496,126 @@ def backup_conversations():
         return None
 
 
+FEEDBACK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_email TEXT,
+    convo_id INTEGER,
+    message TEXT,
+    feedback TEXT,
+    comment TEXT,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+    message_hash TEXT
+);
+"""
+FEEDBACK_SCHEMA_VERSION = 3
+# Owner of feedback rows saved before owners were recorded; no session maps to it
+FEEDBACK_UNOWNED_KEY = "unknown"
+
+
+def feedback_user_key(user_key):
+    """
+    Key feedback rows are stored under; saves, lookups and deletes all use it.
+    Args:
+        user_key (str): The user's email, or IP for guests (see :func:`get_user_key`).
+    Returns:
+        str: The hashed key, or ``FEEDBACK_UNOWNED_KEY`` without one.
+    """
+    return hash_email(user_key) if user_key else FEEDBACK_UNOWNED_KEY
+
+
+def _session_feedback_key():
+    return feedback_user_key(get_user_key())
+
+
+def message_hash(message):
+    """
+    Hash a message body so feedback can be keyed without comparing full texts.
+    Args:
+        message (str): The message text.
+    Returns:
+        str: SHA-256 hex digest of the message.
+    """
+    return hashlib.sha256((message or "").encode("utf-8")).hexdigest()
+
+
+def _upgrade_feedback_db(conn, current_version):
+    """
+    Migrate the feedback database.
+    Version 1 backfills ``message_hash``, drops duplicate rows (keeping the
+    newest) and adds a unique index on (user_email, convo_id, message_hash).
+    Version 2 adds the daily rollups used by core.feedback_analytics.
+    Version 3 recreates their triggers so retention deletes keep the rollups.
+    """
+    if current_version < 1:
+        _upgrade_feedback_hashes(conn)
+    if current_version < 2:
+        feedback_analytics.install_rollups(conn)
+    elif current_version < 3:
+        feedback_analytics.install_triggers(conn)
+
+
+def _upgrade_feedback_hashes(conn):
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(feedback)")]
+    if "user_email" not in columns:
+        conn.execute("ALTER TABLE feedback ADD COLUMN user_email TEXT")
+    if "message_hash" not in columns:
+        conn.execute("ALTER TABLE feedback ADD COLUMN message_hash TEXT")
+
+    # NULLs never conflict in a unique index; give ownerless rows a placeholder owner
+    conn.execute("UPDATE feedback SET user_email = ? WHERE user_email IS NULL", (FEEDBACK_UNOWNED_KEY,))
+    rows = conn.execute("SELECT id, message FROM feedback WHERE message_hash IS NULL").fetchall()
+    conn.executemany(
+        "UPDATE feedback SET message_hash = ? WHERE id = ?",
+        [(message_hash(message), row_id) for row_id, message in rows]
+    )
+    conn.execute('''
+        DELETE FROM feedback WHERE id NOT IN (
+            SELECT MAX(id) FROM feedback GROUP BY user_email, convo_id, message_hash
+        )
+    ''')
+    conn.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_feedback_user_convo_message
+        ON feedback (user_email, convo_id, message_hash)
+    ''')
+
+
+def get_feedback_db():
+    """
+    Get this thread's pooled connection to the feedback database.
+    The schema and migrations are applied once per process rather than on every call.
+    Returns:
+        sqlite3.Connection: The feedback database connection.
+    """
+    db.ensure_schema(db.FEEDBACK_DB, FEEDBACK_SCHEMA)
+    db.migrate(db.FEEDBACK_DB, FEEDBACK_SCHEMA_VERSION, _upgrade_feedback_db)
+    return db.get_connection(db.FEEDBACK_DB)
+
+
 def save_feedback(convo_id, message, feedback, comment=None):
     """
     Save user feedback for a specific message in a conversation.
+    A single upsert on (user, conversation, message hash) replaces any earlier rating.
     Args:
         convo_id (int): Conversation ID.
         message (str): The message being rated.
         feedback (str): The feedback value.
         comment (str, optional): Optional user comment.
     """
-    user_email = st.session_state.get("user_profile", {}).get("email")
-    hashed_email = hash_email(user_email) if user_email else "unknown"
-
-    print(f"""
-    [save_feedback]
-    User: {hashed_email}
-    Convo ID: {convo_id}
-    Message: {message}
-    Feedback: {feedback}
-    Comment: {comment if comment else "No comment"}
-    """)
-
-    conn = None
-    try:
-        conn = sqlite3.connect("feedback.db")
-        c = conn.cursor()
-
-        c.execute('''
-            SELECT id FROM feedback WHERE user_email = ? AND convo_id = ? AND message = ?
-        ''', (hashed_email, convo_id, message))
-        row = c.fetchone()
-
-        if row:
-            c.execute('''
-                UPDATE feedback
-                SET feedback = ?, comment = ?, timestamp = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (feedback, comment, row[0]))
-            print(f"[save_feedback] Updated existing feedback (id={row[0]})")
-        else:
-            c.execute('''
-                INSERT INTO feedback (user_email, convo_id, message, feedback, comment)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (hashed_email, convo_id, message, feedback, comment))
-            print("[save_feedback] Inserted new feedback")
-
-        conn.commit()
+    hashed_email = _session_feedback_key()
 
+    try:
+        get_feedback_db().execute('''
+            INSERT INTO feedback (user_email, convo_id, message_hash, message, feedback, comment)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user_email, convo_id, message_hash) DO UPDATE SET
+                feedback = excluded.feedback,
+                comment = excluded.comment,
+                timestamp = CURRENT_TIMESTAMP
+        ''', (hashed_email, convo_id, message_hash(message), message, feedback, comment))
     except Exception as e:
         print(f"[save_feedback] Exception while saving feedback: {e}")
 
-    finally:
-        if conn:
-            conn.close()
-
 
 def get_feedback(convo_id, message):
     """
@@ -509,20 +626,12 @@ def get_feedback(convo_id, message):
     Returns:
         str or None: The feedback value, or None if not found.
     """
-    user_email = st.session_state.get("user_profile", {}).get("email")
-    if not user_email:
-        print("[get_feedback] No user email found in session. Cannot retrieve feedback.")
-        return None
-
-    hashed_email = hash_email(user_email)
+    hashed_email = _session_feedback_key()
 
     try:
-        conn = sqlite3.connect("feedback.db")
-        c = conn.cursor()
-        c.execute('''
-            SELECT feedback FROM feedback WHERE user_email = ? AND convo_id = ? AND message = ?
-        ''', (hashed_email, convo_id, message))
-        row = c.fetchone()
+        row = get_feedback_db().execute('''
+            SELECT feedback FROM feedback WHERE user_email = ? AND convo_id = ? AND message_hash = ?
+        ''', (hashed_email, convo_id, message_hash(message))).fetchone()
         if row:
             return row[0]
         else:
@@ -530,8 +639,6 @@ def get_feedback(convo_id, message):
     except Exception as e:
         print(f"[get_feedback] Exception while fetching feedback: {e}")
         return None
-    finally:
-        conn.close()
 
 
 def get_feedback_per_message(convo_id=None):
@@ -542,8 +649,7 @@ def get_feedback_per_message(convo_id=None):
     Returns:
         list: List of feedback dicts.
     """
-    conn = sqlite3.connect("feedback.db")
-    c = conn.cursor()
+    c = get_feedback_db().cursor()
 
     if convo_id is None:
         c.execute('''
@@ -560,7 +666,6 @@ def get_feedback_per_message(convo_id=None):
         ''', (convo_id,))
 
     rows = c.fetchall()
-    conn.close()
 
     return [
         {
@@ -575,38 +680,38 @@ def get_feedback_per_message(convo_id=None):
     ]
 
 
-def get_feedback_statistics():
+def get_feedback_statistics(user_email=None, days=None):
     """
     Get statistics about feedback (positive/negative counts).
+    Args:
+        user_email (str, optional): Hashed user email to restrict to.
+        days (int, optional): Only count the last N days.
     Returns:
         dict: Statistics including total, positive, negative counts and percentage.
     """
     try:
-        conn = sqlite3.connect("feedback.db")
-        c = conn.cursor()
-        
-        c.execute("SELECT COUNT(*) FROM feedback WHERE feedback = 'positive'")
-        positive = c.fetchone()[0]
-        
-        c.execute("SELECT COUNT(*) FROM feedback WHERE feedback = 'negative'")
-        negative = c.fetchone()[0]
-        
-        total = positive + negative
-        positive_pct = (positive / total * 100) if total > 0 else 0
-        
-        conn.close()
-        
-        return {
-            "total": total,
-            "positive": positive,
-            "negative": negative,
-            "positive_percentage": round(positive_pct, 1)
-        }
+        return feedback_analytics.get_statistics(get_feedback_db(), user_email=user_email, days=days)
     except Exception as e:
         print(f"[get_feedback_statistics] Error: {e}")
         return {"total": 0, "positive": 0, "negative": 0, "positive_percentage": 0}
 
 
+def get_feedback_trend(days=30, user_email=None):
+    """
+    Get daily feedback counts and helpfulness rate for the last N days.
+    Args:
+        days (int): Number of days to include.
+        user_email (str, optional): Hashed user email to restrict to.
+    Returns:
+        list: One dict per day (date, total, positive, negative, positive_percentage).
+    """
+    try:
+        return feedback_analytics.get_daily_trend(get_feedback_db(), days=days, user_email=user_email)
+    except Exception as e:
+        print(f"[get_feedback_trend] Error: {e}")
+        return []
+
+
 def is_authenticated():
     """
     Check if the user is authenticated in the current session.
@@ -727,14 +832,18 @@ def format_message_time(timestamp_str):
 def search_conversations(query, conversations=None):
     """
     Search through conversations for matching messages.
+    Uses the repository's full-text index for the current user's history; an
+    explicit list of conversations is scanned directly instead.
     Args:
         query (str): Search query.
         conversations (list, optional): List of conversations to search.
     Returns:
-        list: List of matching conversation IDs and message snippets.
+        list: List of matching conversation IDs and message snippets, best match first.
+              Indexed results also carry a ``score`` and, per match, a ``snippet``
+              with ``highlights`` as (start, end) offsets.
     """
     if conversations is None:
-        conversations = st.session_state.get("conversations", [])
+        return get_repository().search(get_user_key(), query)
     
     query_lower = query.lower()
     results = []
@@ -765,16 +874,12 @@ def get_user_statistics():
     Returns:
         dict: Statistics including total conversations, messages, etc.
     """
-    conversations = st.session_state.get("conversations", [])
-    
-    total_conversations = len(conversations)
-    total_messages = sum(len(c.get("messages", [])) for c in conversations)
+    # Counted in SQL; the session only holds a page of titles
+    stats = get_repository().statistics(get_user_key())
     
-    user_messages = sum(
-        1 for c in conversations 
-        for m in c.get("messages", []) 
-        if m.get("sender") == "user"
-    )
+    total_conversations = stats["conversations"]
+    total_messages = stats["messages"]
+    user_messages = stats["user_messages"]
     
     ai_messages = total_messages - user_messages
     
@@ -1021,37 +1126,21 @@ def get_crisis_resources():
 def log_user_activity(activity_type, details=None):
     """
     Log user activity for analytics and debugging.
+    Events are queued and appended to logs/activity_YYYYMMDD.jsonl by a background writer.
     Args:
         activity_type (str): Type of activity (e.g., 'login', 'new_conversation', 'feedback').
         details (dict, optional): Additional details about the activity.
     """
     try:
-        log_dir = "logs"
-        os.makedirs(log_dir, exist_ok=True)
-        
         user_email = st.session_state.get("user_profile", {}).get("email", "anonymous")
         hashed_email = hash_email(user_email) if user_email != "anonymous" else "anonymous"
         
-        log_entry = {
+        activity_log.get_activity_logger().log({
             "timestamp": datetime.now().isoformat(),
             "user": hashed_email,
             "activity": activity_type,
             "details": details or {}
-        }
-        
-        log_file = f"{log_dir}/activity_{datetime.now().strftime('%Y%m%d')}.json"
-        
-        # Append to daily log file
-        logs = []
-        if os.path.exists(log_file):
-            with open(log_file, 'r', encoding='utf-8') as f:
-                logs = json.load(f)
-        
-        logs.append(log_entry)
-        
-        with open(log_file, 'w', encoding='utf-8') as f:
-            json.dump(logs, f, indent=2)
-            
+        })
     except Exception as e:
         print(f"[log_user_activity] Error logging activity: {e}")
 
@@ -1059,6 +1148,7 @@ def log_user_activity(activity_type, details=None):
 def rate_limit_check(user_key, max_requests=50, time_window_minutes=60):
     """
     Check if user has exceeded rate limit for API calls.
+    Uses the process-wide token bucket, so the limit holds across tabs and sessions.
     Args:
         user_key (str): User identifier (email or IP).
         max_requests (int): Maximum number of requests allowed.
@@ -1066,40 +1156,13 @@ def rate_limit_check(user_key, max_requests=50, time_window_minutes=60):
     Returns:
         tuple: (bool, int) - (is_allowed, requests_remaining)
     """
-    if 'rate_limit_data' not in st.session_state:
-        st.session_state.rate_limit_data = {}
-    
-    now = datetime.now()
-    
-    if user_key not in st.session_state.rate_limit_data:
-        st.session_state.rate_limit_data[user_key] = {
-            'requests': [],
-            'reset_time': now + timedelta(minutes=time_window_minutes)
-        }
-    
-    user_data = st.session_state.rate_limit_data[user_key]
-    
-    # Reset if time window expired
-    if now > user_data['reset_time']:
-        user_data['requests'] = []
-        user_data['reset_time'] = now + timedelta(minutes=time_window_minutes)
-    
-    # Filter requests within time window
-    cutoff_time = now - timedelta(minutes=time_window_minutes)
-    user_data['requests'] = [
-        req_time for req_time in user_data['requests'] 
-        if req_time > cutoff_time
-    ]
-    
-    # Check limit
-    if len(user_data['requests']) >= max_requests:
-        return False, 0
-    
-    # Add current request
-    user_data['requests'].append(now)
-    requests_remaining = max_requests - len(user_data['requests'])
-    
-    return True, requests_remaining
+    try:
+        return rate_limiter.get_rate_limiter().check(
+            user_key, max_requests=max_requests, window_seconds=time_window_minutes * 60
+        )
+    except Exception as e:
+        print(f"[rate_limit_check] Error: {e}")
+        return True, max_requests
 
 
 def generate_session_id():
@@ -1204,21 +1267,16 @@ def get_welcome_message():
 def clean_database():
     """
     Clean up old entries from feedback database (older than 90 days).
+    The daily rollups keep counting them, so statistics and trends don't change.
     Returns:
         int: Number of entries deleted.
     """
     try:
-        conn = sqlite3.connect("feedback.db")
-        c = conn.cursor()
-        
         cutoff_date = (datetime.now() - timedelta(days=90)).isoformat()
         
-        c.execute("SELECT COUNT(*) FROM feedback WHERE timestamp < ?", (cutoff_date,))
-        count = c.fetchone()[0]
-        
-        c.execute("DELETE FROM feedback WHERE timestamp < ?", (cutoff_date,))
-        conn.commit()
-        conn.close()
+        get_feedback_db()
+        with db.transaction(db.FEEDBACK_DB) as conn:
+            count = feedback_analytics.purge_before(conn, cutoff_date)
         
         return count
     except Exception as e:
@@ -1244,31 +1302,26 @@ def export_user_data():
     }
     
     # Get conversations
-    user_key = user_email
-    data_package["conversations"] = [
-        c for c in st.session_state.get("conversations", [])
-        if c.get("user_key") == user_key
-    ]
+    data_package["conversations"] = get_repository().snapshot(user_email)
     
     # Get feedback
-    hashed_email = hash_email(user_email)
+    hashed_email = feedback_user_key(user_email)
     try:
-        conn = sqlite3.connect("feedback.db")
-        c = conn.cursor()
-        c.execute("SELECT * FROM feedback WHERE user_email = ?", (hashed_email,))
-        rows = c.fetchall()
+        rows = get_feedback_db().execute(
+            "SELECT convo_id, message, feedback, comment, timestamp FROM feedback WHERE user_email = ?",
+            (hashed_email,)
+        ).fetchall()
         
         data_package["feedback"] = [
             {
-                "convo_id": r[2],
-                "message": r[3],
-                "feedback": r[4],
-                "comment": r[5],
-                "timestamp": r[6]
+                "convo_id": r[0],
+                "message": r[1],
+                "feedback": r[2],
+                "comment": r[3],
+                "timestamp": r[4]
             }
             for r in rows
         ]
-        conn.close()
     except Exception as e:
         print(f"[export_user_data] Error: {e}")
     
@@ -1286,18 +1339,20 @@ def delete_user_data():
         return False
     
     try:
-        # Delete conversations file
+        # Delete stored conversations (and any unmigrated legacy file)
+        get_repository().delete_user(user_email)
         memory_file = get_memory_file()
         if os.path.exists(memory_file):
             os.remove(memory_file)
         
         # Delete feedback
-        hashed_email = hash_email(user_email)
-        conn = sqlite3.connect("feedback.db")
-        c = conn.cursor()
-        c.execute("DELETE FROM feedback WHERE user_email = ?", (hashed_email,))
-        conn.commit()
-        conn.close()
+        hashed_email = feedback_user_key(user_email)
+        get_feedback_db()
+        with db.transaction(db.FEEDBACK_DB) as conn:
+            feedback_analytics.delete_user(conn, hashed_email)
+        
+        # Delete cached model replies to this user's prompts
+        llm_cache.get_llm_cache().purge_owner(user_email)
         
         # Clear session state
         st.session_state.conversations = []
@@ -1332,11 +1387,13 @@ def get_conversation_count_by_date(days=30):
     return date_counts
 
 
-def check_api_health(api_key=None):
+def check_api_health(api_key=None, probe=False):
     """
     Check if the AI API is healthy and responsive.
+    Reports the shared gateway's circuit state; only calls the model when probe is True.
     Args:
         api_key (str, optional): API key to test.
+        probe (bool): Send a one-token request through the gateway.
     Returns:
         tuple: (bool, str) - (is_healthy, status_message)
     """
@@ -1344,9 +1401,12 @@ def check_api_health(api_key=None):
         return False, "No API key provided"
     
     try:
-        google.generativeai.configure(api_key=api_key)
-        model = google.generativeai.GenerativeModel('gemini-pro')
-        response = model.generate_content("Hello")
+        gateway = llm_gateway.get_gateway(api_key)
+        health = gateway.health()
+        if health["state"] == "open":
+            return False, f"API unavailable: {health['last_error'] or 'circuit open'}"
+        if probe:
+            gateway.generate_content("Hello", timeout=5, generation_config={"max_output_tokens": 1})
         return True, "API is healthy"
     except Exception as e:
-        return False, f"API error: {str(e)[:100]}"
\ No newline at end of file
+        return False, f"API error: {str(e)[:100]}"
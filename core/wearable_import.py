@@ -0,0 +1,239 @@
+"""
+Chunked, vectorized CSV import for wearable exports.
+
+Fitbit and Oura exports run to hundreds of thousands of rows. The header is
+matched against :data:`COLUMN_ALIASES` once. The file is then read
+``chunk_size`` rows at a time, reading only the columns that matched. Each
+chunk has its timestamps parsed and its metrics coerced as whole columns and
+is upserted in one transaction through :func:`core.wearable_store.upsert_rows`.
+Memory stays bounded by the chunk size, whatever the file size.
+
+Usage:
+    python -m core.wearable_import export.csv --email me@example.com --provider fitbit
+    python -m core.wearable_import --benchmark 1000000   # synthetic file, temporary database
+"""
+
+import argparse
+import os
+import re
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from core import db, wearable_store
+from core.wearable_store import METRICS, normalize_timestamp
+
+
+CHUNK_SIZE = 100_000
+
+# Normalized header (lowercase, letters and digits only) -> stored field
+COLUMN_ALIASES = {
+    "timestamp": "timestamp", "datetime": "timestamp", "date": "timestamp", "time": "timestamp",
+    "day": "timestamp", "summarydate": "timestamp", "startdate": "timestamp",
+    "hrvms": "hrv_ms", "hrv": "hrv_ms", "rmssd": "hrv_ms", "averagehrv": "hrv_ms",
+    "restinghr": "resting_hr", "restingheartrate": "resting_hr", "rhr": "resting_hr",
+    "sleepminutes": "sleep_minutes", "minutesasleep": "sleep_minutes", "totalsleepminutes": "sleep_minutes",
+    "sleepefficiency": "sleep_efficiency", "efficiency": "sleep_efficiency",
+    "steps": "steps", "stepcount": "steps", "totalsteps": "steps",
+    "activeminutes": "active_minutes", "veryactiveminutes": "active_minutes",
+}
+
+
+def _normalize_header(name):
+    return re.sub(r"[^a-z0-9]", "", str(name).lower())
+
+
+def map_columns(columns):
+    """
+    Match CSV headers to stored fields.
+    The first header matching a field wins.
+    Args:
+        columns (list): Header names as they appear in the file.
+    Returns:
+        dict: Original header -> field name.
+    """
+    mapping, taken = {}, set()
+    for column in columns:
+        field = COLUMN_ALIASES.get(_normalize_header(column))
+        if field and field not in taken:
+            mapping[column] = field
+            taken.add(field)
+    return mapping
+
+
+def read_header(source):
+    """
+    Read a CSV's header and rewind the source.
+    Args:
+        source (file): Seekable file-like object.
+    Returns:
+        dict: :func:`map_columns` result for the file.
+    """
+    source.seek(0)
+    columns = list(pd.read_csv(source, nrows=0).columns)
+    source.seek(0)
+    return map_columns(columns)
+
+
+def format_timestamps(values):
+    """
+    Parse a column of timestamps and format them as the store does.
+    Matches :func:`core.wearable_store.normalize_timestamp`. Naive values
+    stay naive, offsets are kept as ``+HH:MM``, and fractional seconds are
+    only written when present.
+    Args:
+        values (pd.Series): Raw timestamp strings.
+    Returns:
+        pd.Series: ISO strings, None where a value doesn't parse.
+    """
+    try:
+        parsed = pd.to_datetime(values, format="ISO8601", errors="coerce")
+    except (ValueError, TypeError):
+        parsed = None
+    if parsed is None or not pd.api.types.is_datetime64_any_dtype(parsed):
+        # Mixed offsets in one column: fall back to parsing value by value
+        return values.map(lambda v: None if pd.isna(v) else normalize_timestamp(v))
+
+    text = parsed.dt.strftime("%Y-%m-%dT%H:%M:%S")
+    fraction = parsed.dt.microsecond.to_numpy() != 0
+    if fraction.any():
+        text = text.where(~fraction, parsed.dt.strftime("%Y-%m-%dT%H:%M:%S.%f"))
+    if parsed.dt.tz is not None:
+        offset = parsed.dt.strftime("%z")
+        text = text + offset.str[:3] + ":" + offset.str[3:]
+    return text.where(parsed.notna(), None)
+
+
+def normalize_chunk(chunk, mapping):
+    """
+    Turn a raw CSV chunk into rows for :func:`core.wearable_store.upsert_rows`.
+    Args:
+        chunk (pd.DataFrame): Rows as read from the CSV.
+        mapping (dict): :func:`map_columns` result.
+    Returns:
+        tuple: ``(rows, skipped)`` where rows is a list of
+        ``(timestamp, *METRICS)`` tuples and skipped counts rows without a
+        usable timestamp.
+    """
+    chunk = chunk.rename(columns=mapping)
+    frame = pd.DataFrame({"timestamp": format_timestamps(chunk["timestamp"])})
+    for metric in METRICS:
+        if metric in chunk.columns:
+            frame[metric] = pd.to_numeric(chunk[metric], errors="coerce")
+        else:
+            frame[metric] = np.nan
+    valid = frame["timestamp"].notna().to_numpy()
+    frame = frame[valid]
+    # NaN -> None so SQLite stores NULL
+    values = frame.to_numpy(dtype=object)
+    values[pd.isna(values)] = None
+    return list(map(tuple, values)), int((~valid).sum())
+
+
+def import_csv(source, user_email, provider, chunk_size=CHUNK_SIZE, progress=None, anon_id=None):
+    """
+    Import a wearable CSV in chunks.
+    Args:
+        source (str or file): Path or file-like object (e.g. a Streamlit upload).
+        user_email (str): The user's email.
+        provider (str): Provider the export came from.
+        chunk_size (int): Rows per chunk and per transaction.
+        progress (callable, optional): ``progress(rows_done, fraction)``;
+            fraction is None when the source size is unknown.
+        anon_id (str, optional): Identifier for users without an email.
+    Returns:
+        dict: ``rows``, ``imported``, ``skipped`` and ``seconds``.
+    Raises:
+        ValueError: If no timestamp column is found.
+        PermissionError: If the user hasn't consented.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as handle:
+            return import_csv(handle, user_email, provider, chunk_size, progress, anon_id)
+    started = time.monotonic()
+    mapping = read_header(source)
+    if "timestamp" not in mapping.values():
+        raise ValueError("CSV must include a timestamp column (e.g. 'timestamp' or 'date').")
+    timestamp_column = next(column for column, field in mapping.items() if field == "timestamp")
+    size = _size(source)
+    report = {"rows": 0, "imported": 0, "skipped": 0}
+    reader = pd.read_csv(source, usecols=list(mapping), chunksize=chunk_size, dtype={timestamp_column: str})
+    for chunk in reader:
+        rows, skipped = normalize_chunk(chunk, mapping)
+        report["rows"] += len(chunk)
+        report["skipped"] += skipped
+        if rows:
+            report["imported"] += wearable_store.upsert_rows(user_email, provider, rows, anon_id)
+        if progress:
+            progress(report["rows"], min(source.tell() / size, 1.0) if size else None)
+    report["seconds"] = round(time.monotonic() - started, 2)
+    return report
+
+
+def _size(source):
+    # Streamlit uploads have .size; real files have a descriptor
+    if getattr(source, "size", None):
+        return source.size
+    try:
+        return os.fstat(source.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def write_synthetic_csv(path, rows, seed=0):
+    """Write a minute-level synthetic export with Fitbit-style headers (for benchmarking)."""
+    rng = np.random.default_rng(seed)
+    stamps = pd.date_range("2020-01-01", periods=rows, freq="min")
+    pd.DataFrame({
+        "Date Time": stamps.strftime("%Y-%m-%dT%H:%M:%S"),
+        "HRV": rng.normal(55, 12, rows).round(1),
+        "Resting Heart Rate": rng.normal(62, 6, rows).round(),
+        "Minutes Asleep": rng.integers(0, 2, rows),
+        "Efficiency": rng.uniform(70, 98, rows).round(1),
+        "Steps": rng.integers(0, 150, rows),
+        "Very Active Minutes": rng.integers(0, 2, rows),
+    }).to_csv(path, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import a wearable CSV export.")
+    parser.add_argument("csv", nargs="?", help="CSV file to import")
+    parser.add_argument("--email", help="user to import for")
+    parser.add_argument("--provider", default="unknown", help="provider the export came from")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows per chunk")
+    parser.add_argument("--benchmark", type=int, metavar="ROWS",
+                        help="import N synthetic rows into a temporary database")
+    args = parser.parse_args(argv)
+
+    def report_progress(rows, fraction):
+        share = f" ({fraction:.0%})" if fraction is not None else ""
+        print(f"[wearable_import] {rows} rows{share}")
+
+    if not args.benchmark:
+        if not args.csv or not args.email:
+            parser.error("csv and --email are required unless --benchmark is given")
+        report = import_csv(args.csv, args.email, args.provider, args.chunk_size, report_progress)
+    else:
+        workdir = tempfile.mkdtemp()
+        saved_db = wearable_store.WEARABLE_DB
+        try:
+            path = os.path.join(workdir, "export.csv")
+            write_synthetic_csv(path, args.benchmark)
+            wearable_store.WEARABLE_DB = os.path.join(workdir, "wearables.db")
+            wearable_store.set_consent("benchmark", True)
+            report = import_csv(path, "benchmark", "fitbit", args.chunk_size, report_progress)
+        finally:
+            wearable_store.WEARABLE_DB = saved_db
+            db.close_all()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    rate = report["rows"] / report["seconds"] if report["seconds"] else 0.0
+    print(f"[wearable_import] {report['imported']} imported, {report['skipped']} skipped "
+          f"of {report['rows']} rows in {report['seconds']:.1f}s ({rate:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,94 @@
+"""
+Wearable records and settings per user.
+
+Records live in ``data/wearables.db``, clustered by (user, month) so a
+user's recent months are contiguous on disk, and each (timestamp, provider)
+pair is stored once: importing it again upserts the row, keeping stored
+values for any metric the new record leaves empty. Consent, provider
+connections and goals are a separate small row per user, so changing them
+never touches the records.
+
+``wearable_daily`` keeps one aggregate row per user and day (mean HRV,
+resting HR and sleep efficiency with their sample counts; summed sleep,
+steps and active minutes). Every write recomputes just the days it touched,
+in the same transaction, so dashboards read :func:`load_daily` instead of
+aggregating raw records.
+
+The old per-user ``data/wearables/wearables_<id>.json`` files are imported
+the first time their user is accessed and then left in place.
+"""
+
 import os
 import json
+import threading
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core import db
 
 
 DATA_DIR = "data"
 WEARABLE_DIR = os.path.join(DATA_DIR, "wearables")
+WEARABLE_DB = os.path.join(DATA_DIR, "wearables.db")
+METRICS = ("hrv_ms", "resting_hr", "sleep_minutes", "sleep_efficiency", "steps", "active_minutes")
+# How each metric rolls up into a day
+MEAN_METRICS = ("hrv_ms", "resting_hr", "sleep_efficiency")
+SUM_METRICS = ("sleep_minutes", "steps", "active_minutes")
+WEARABLE_SCHEMA_VERSION = 1
+
+WEARABLE_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS wearable_records (
+	user_key TEXT NOT NULL,
+	month TEXT NOT NULL,
+	timestamp TEXT NOT NULL,
+	provider TEXT NOT NULL,
+	{', '.join(f'{metric} REAL' for metric in METRICS)},
+	PRIMARY KEY (user_key, month, timestamp, provider)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS wearable_settings (
+	user_key TEXT PRIMARY KEY,
+	consent INTEGER NOT NULL DEFAULT 0,
+	consent_updated_at TEXT,
+	providers TEXT NOT NULL DEFAULT '{{}}',
+	goals TEXT NOT NULL DEFAULT '{{}}',
+	goals_updated_at TEXT,
+	updated_at TEXT
+) WITHOUT ROWID;
 
+CREATE TABLE IF NOT EXISTS wearable_daily (
+	user_key TEXT NOT NULL,
+	date TEXT NOT NULL,
+	records INTEGER NOT NULL,
+	{', '.join(f'{metric} REAL, {metric}_n INTEGER NOT NULL' for metric in MEAN_METRICS)},
+	{', '.join(f'{metric} REAL' for metric in SUM_METRICS)},
+	PRIMARY KEY (user_key, date)
+) WITHOUT ROWID;
+"""
 
-def _ensure_dirs() -> None:
-	os.makedirs(WEARABLE_DIR, exist_ok=True)
+DAILY_COLUMNS = (
+	("records",) + tuple(column for metric in MEAN_METRICS for column in (metric, f"{metric}_n")) + SUM_METRICS
+)
+# Recomputes the rollups of the records matched by the WHERE clause
+ROLLUP_SQL = f"""
+	INSERT OR REPLACE INTO wearable_daily (user_key, date, {', '.join(DAILY_COLUMNS)})
+	SELECT user_key, substr(timestamp, 1, 10), COUNT(*),
+		{', '.join(f'AVG({metric}), COUNT({metric})' for metric in MEAN_METRICS)},
+		{', '.join(f'SUM({metric})' for metric in SUM_METRICS)}
+	FROM wearable_records
+	WHERE timestamp GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*' AND {{where}}
+	GROUP BY user_key, substr(timestamp, 1, 10)
+"""
+
+UPSERT_SQL = f"""
+	INSERT INTO wearable_records (user_key, month, timestamp, provider, {', '.join(METRICS)})
+	VALUES ({', '.join('?' * (len(METRICS) + 4))})
+	ON CONFLICT (user_key, month, timestamp, provider) DO UPDATE SET
+	{', '.join(f'{metric} = COALESCE(excluded.{metric}, {metric})' for metric in METRICS)}
+"""
+
+_migrated = set()
+_migrate_lock = threading.Lock()
 
 
 def _safe_id(user_email: Optional[str], anon_id: Optional[str]) -> str:
@@ -18,91 +97,315 @@ def _safe_id(user_email: Optional[str], anon_id: Optional[str]) -> str:
 	return (anon_id or "anonymous").replace(":", "_")
 
 
+def _user_key(user_email: Optional[str], anon_id: Optional[str]) -> str:
+	return user_email or anon_id or "anonymous"
+
+
 def user_wearable_path(user_email: Optional[str], anon_id: Optional[str] = None) -> str:
-	_ensure_dirs()
+	"""Path of the user's legacy JSON file (only read for the one-time import)."""
 	return os.path.join(WEARABLE_DIR, f"wearables_{_safe_id(user_email, anon_id)}.json")
 
 
+def _now() -> str:
+	return datetime.utcnow().isoformat()
+
+
+def _number(value: Any) -> Optional[float]:
+	if value is None or isinstance(value, bool):
+		return None
+	try:
+		number = float(value)
+	except (TypeError, ValueError):
+		return None
+	return None if number != number else number
+
+
+def normalize_timestamp(value: Any) -> str:
+	"""ISO timestamp as stored; values that don't parse are kept as given."""
+	try:
+		return datetime.fromisoformat(str(value).replace("Z", "+00:00")).isoformat()
+	except ValueError:
+		return str(value)
+
+
+def _row(user_key: str, timestamp: str, provider: str, values: Iterable[Any]) -> Tuple:
+	return (user_key, timestamp[:7], timestamp, provider, *values)
+
+
+def _db() -> str:
+	db.ensure_schema(WEARABLE_DB, WEARABLE_SCHEMA)
+	db.migrate(WEARABLE_DB, WEARABLE_SCHEMA_VERSION, _upgrade)
+	return WEARABLE_DB
+
+
+def _upgrade(conn, current_version: int) -> None:
+	if current_version < 1:
+		# Databases from before the rollups: build them for every user once
+		conn.execute(ROLLUP_SQL.format(where="1"))
+
+
+def _refresh_daily(conn, user_key: str, batch: List[Tuple]) -> None:
+	# Recompute the days a batch touched: per month, from its first to its last day
+	spans: Dict[str, List[str]] = {}
+	for row in batch:
+		day = row[2][:10]
+		span = spans.setdefault(row[1], [day, day])
+		span[0], span[1] = min(span[0], day), max(span[1], day)
+	where = "user_key = ? AND month = ? AND timestamp >= ? AND timestamp < ?"
+	conn.executemany(
+		ROLLUP_SQL.format(where=where),
+		[(user_key, month, first, last + "~") for month, (first, last) in spans.items()],
+	)
+
+
+def _ensure_user(user_email: Optional[str], anon_id: Optional[str]) -> str:
+	user_key = _user_key(user_email, anon_id)
+	path = _db()
+	if (path, user_key) in _migrated:
+		return user_key
+	with _migrate_lock:
+		if (path, user_key) in _migrated:
+			return user_key
+		exists = db.execute(path, "SELECT 1 FROM wearable_settings WHERE user_key = ?", (user_key,)).fetchone()
+		legacy = user_wearable_path(user_email, anon_id)
+		if not exists and os.path.exists(legacy):
+			try:
+				with open(legacy, "r", encoding="utf-8") as f:
+					_replace_user(user_key, json.load(f))
+			except (OSError, ValueError) as e:
+				print(f"[wearable_store] Error: could not import {legacy}: {e}")
+		_migrated.add((path, user_key))
+	return user_key
+
+
+def _replace_user(user_key: str, data: Dict[str, Any]) -> None:
+	rows = [
+		_row(user_key, normalize_timestamp(rec["timestamp"]), rec.get("provider") or "unknown",
+			(_number(rec.get(metric)) for metric in METRICS))
+		for rec in data.get("records", []) if rec.get("timestamp") is not None
+	]
+	with db.transaction(WEARABLE_DB) as conn:
+		conn.execute("DELETE FROM wearable_records WHERE user_key = ?", (user_key,))
+		conn.execute("DELETE FROM wearable_daily WHERE user_key = ?", (user_key,))
+		conn.executemany(UPSERT_SQL, rows)
+		_refresh_daily(conn, user_key, rows)
+		conn.execute(
+			"INSERT OR REPLACE INTO wearable_settings "
+			"(user_key, consent, consent_updated_at, providers, goals, goals_updated_at, updated_at) "
+			"VALUES (?, ?, ?, ?, ?, ?, ?)",
+			(
+				user_key, int(bool(data.get("consent"))), data.get("consent_updated_at"),
+				json.dumps(data.get("providers") or {}), json.dumps(data.get("goals") or {}),
+				data.get("goals_updated_at"), data.get("updated_at"),
+			),
+		)
+
+
+def load_settings(user_email: Optional[str], anon_id: Optional[str] = None) -> Dict[str, Any]:
+	"""
+	Get a user's consent, provider connections and goals (no records).
+	Args:
+		user_email (str): The user's email.
+		anon_id (str, optional): Identifier for users without an email.
+	Returns:
+		dict: ``consent``, ``providers`` and ``goals`` plus their timestamps.
+	"""
+	user_key = _ensure_user(user_email, anon_id)
+	row = db.execute(
+		WEARABLE_DB,
+		"SELECT consent, consent_updated_at, providers, goals, goals_updated_at, updated_at "
+		"FROM wearable_settings WHERE user_key = ?",
+		(user_key,),
+	).fetchone()
+	if row is None:
+		return {"consent": False, "providers": {}, "goals": {}}
+	settings = {"consent": bool(row[0]), "providers": json.loads(row[2]), "goals": json.loads(row[3])}
+	for name, value in (("consent_updated_at", row[1]), ("goals_updated_at", row[4]), ("updated_at", row[5])):
+		if value:
+			settings[name] = value
+	return settings
+
+
+def _update_settings(user_key: str, **changes: Any) -> None:
+	columns = ", ".join(changes)
+	updates = ", ".join(f"{column} = excluded.{column}" for column in changes)
+	with db.transaction(WEARABLE_DB) as conn:
+		conn.execute(
+			f"INSERT INTO wearable_settings (user_key, {columns}) VALUES ({', '.join('?' * (len(changes) + 1))}) "
+			f"ON CONFLICT (user_key) DO UPDATE SET {updates}",
+			(user_key, *changes.values()),
+		)
+
+
+def load_records(user_email: Optional[str], since: Optional[str] = None, until: Optional[str] = None,
+				anon_id: Optional[str] = None) -> List[Dict[str, Any]]:
+	"""
+	Get a user's records, oldest first, optionally within a time range.
+	Args:
+		user_email (str): The user's email.
+		since (str, optional): ISO timestamp; only records at or after it.
+		until (str, optional): ISO timestamp; only records before it.
+		anon_id (str, optional): Identifier for users without an email.
+	Returns:
+		list: Record dicts with ``timestamp``, ``provider`` and the metrics.
+	"""
+	user_key = _ensure_user(user_email, anon_id)
+	sql = f"SELECT timestamp, provider, {', '.join(METRICS)} FROM wearable_records WHERE user_key = ?"
+	params: List[Any] = [user_key]
+	if since is not None:
+		# The month bound lets SQLite skip whole partitions
+		sql += " AND month >= ? AND timestamp >= ?"
+		params += [since[:7], since]
+	if until is not None:
+		sql += " AND month <= ? AND timestamp < ?"
+		params += [until[:7], until]
+	rows = db.execute(WEARABLE_DB, sql + " ORDER BY timestamp, provider", params).fetchall()
+	return [dict(zip(("timestamp", "provider") + METRICS, row)) for row in rows]
+
+
+def load_daily(user_email: Optional[str], since: Optional[str] = None, until: Optional[str] = None,
+				anon_id: Optional[str] = None) -> List[Dict[str, Any]]:
+	"""
+	Get a user's daily rollups, oldest first.
+	Args:
+		user_email (str): The user's email.
+		since (str, optional): ISO date; only days on or after it.
+		until (str, optional): ISO date; only days on or before it.
+		anon_id (str, optional): Identifier for users without an email.
+	Returns:
+		list: Dicts with ``date``, ``records``, the metrics (daily mean or
+		total, None without data) and ``<metric>_n`` sample counts for the
+		averaged metrics.
+	"""
+	user_key = _ensure_user(user_email, anon_id)
+	sql = f"SELECT date, {', '.join(DAILY_COLUMNS)} FROM wearable_daily WHERE user_key = ?"
+	params: List[Any] = [user_key]
+	if since is not None:
+		sql += " AND date >= ?"
+		params.append(since[:10])
+	if until is not None:
+		sql += " AND date <= ?"
+		params.append(until[:10])
+	rows = db.execute(WEARABLE_DB, sql + " ORDER BY date", params).fetchall()
+	return [dict(zip(("date",) + DAILY_COLUMNS, row)) for row in rows]
+
+
+def data_version(user_email: Optional[str], anon_id: Optional[str] = None) -> Optional[str]:
+	"""
+	Get a token that changes whenever the user's records change.
+	Args:
+		user_email (str): The user's email.
+		anon_id (str, optional): Identifier for users without an email.
+	Returns:
+		str or None: Time of the last write, for memoizing derived results.
+	"""
+	row = db.execute(
+		WEARABLE_DB, "SELECT updated_at FROM wearable_settings WHERE user_key = ?", (_ensure_user(user_email, anon_id),)
+	).fetchone()
+	return row[0] if row else None
+
+
+def summarize_days(days: List[Dict[str, Any]]) -> Dict[str, Optional[float]]:
+	"""
+	Combine daily rollups into one summary over their whole span.
+	Averaged metrics are weighted by their sample counts, so the result
+	equals the mean over the raw records; summed metrics are totals.
+	Args:
+		days (list): Rows from :func:`load_daily`.
+	Returns:
+		dict: Metric -> value, None where no day has data.
+	"""
+	summary: Dict[str, Optional[float]] = {}
+	for metric in MEAN_METRICS:
+		count = sum(day[f"{metric}_n"] for day in days)
+		total = sum(day[metric] * day[f"{metric}_n"] for day in days if day[metric] is not None)
+		summary[metric] = total / count if count else None
+	for metric in SUM_METRICS:
+		values = [day[metric] for day in days if day[metric] is not None]
+		summary[metric] = sum(values) if values else None
+	return summary
+
+
 def load_user_wearables(user_email: Optional[str], anon_id: Optional[str] = None) -> Dict[str, Any]:
-	path = user_wearable_path(user_email, anon_id)
-	if not os.path.exists(path):
-		return {"consent": False, "providers": {}, "records": []}
-	with open(path, "r", encoding="utf-8") as f:
-		return json.load(f)
+	"""Settings and every record in the old single-document shape. Prefer :func:`load_records` with a range."""
+	data = load_settings(user_email, anon_id)
+	data["records"] = load_records(user_email, anon_id=anon_id)
+	return data
 
 
 def save_user_wearables(user_email: Optional[str], data: Dict[str, Any], anon_id: Optional[str] = None) -> None:
-	_ensure_dirs()
-	path = user_wearable_path(user_email, anon_id)
-	with open(path, "w", encoding="utf-8") as f:
-		json.dump(data, f, indent=2)
+	"""Replace a user's settings and records with ``data`` (the old document shape)."""
+	_replace_user(_ensure_user(user_email, anon_id), data)
 
 
 def set_consent(user_email: Optional[str], consent: bool, anon_id: Optional[str] = None) -> Dict[str, Any]:
-	data = load_user_wearables(user_email, anon_id)
-	data["consent"] = bool(consent)
-	data["consent_updated_at"] = datetime.utcnow().isoformat()
-	save_user_wearables(user_email, data, anon_id)
-	return data
+	_update_settings(_ensure_user(user_email, anon_id), consent=int(bool(consent)), consent_updated_at=_now())
+	return load_settings(user_email, anon_id)
 
 
 def clear_user_wearables(user_email: Optional[str], anon_id: Optional[str] = None) -> None:
+	user_key = _ensure_user(user_email, anon_id)
+	with db.transaction(WEARABLE_DB) as conn:
+		conn.execute("DELETE FROM wearable_records WHERE user_key = ?", (user_key,))
+		conn.execute("DELETE FROM wearable_daily WHERE user_key = ?", (user_key,))
+		conn.execute("DELETE FROM wearable_settings WHERE user_key = ?", (user_key,))
 	path = user_wearable_path(user_email, anon_id)
 	if os.path.exists(path):
 		os.remove(path)
 
 
-def append_records(user_email: Optional[str], new_records: List[Dict[str, Any]], provider: str, anon_id: Optional[str] = None) -> Dict[str, Any]:
-	data = load_user_wearables(user_email, anon_id)
-	if not data.get("consent"):
+def upsert_rows(user_email: Optional[str], provider: str, rows: Iterable[Tuple], anon_id: Optional[str] = None) -> int:
+	"""
+	Upsert pre-normalized records in one transaction.
+	Args:
+		user_email (str): The user's email.
+		provider (str): Provider the records came from.
+		rows (iterable): ``(timestamp, *METRICS)`` tuples with ISO timestamps
+			and numbers or None.
+		anon_id (str, optional): Identifier for users without an email.
+	Returns:
+		int: Number of rows written.
+	Raises:
+		PermissionError: If the user hasn't consented.
+	"""
+	user_key = _ensure_user(user_email, anon_id)
+	settings = load_settings(user_email, anon_id)
+	if not settings.get("consent"):
 		raise PermissionError("Consent is required before storing wearable data.")
-	# Normalize timestamps and provider
-	normalized: List[Dict[str, Any]] = []
-	for rec in new_records:
-		if "timestamp" not in rec:
-			continue
-		try:
-			parsed = datetime.fromisoformat(str(rec["timestamp"]).replace("Z", "+00:00"))
-			rec_ts = parsed.isoformat()
-		except Exception:
-			rec_ts = str(rec["timestamp"])
-		normalized.append({
-			"timestamp": rec_ts,
-			"provider": provider,
-			"hrv_ms": rec.get("hrv_ms"),
-			"resting_hr": rec.get("resting_hr"),
-			"sleep_minutes": rec.get("sleep_minutes"),
-			"sleep_efficiency": rec.get("sleep_efficiency"),
-			"steps": rec.get("steps"),
-			"active_minutes": rec.get("active_minutes"),
-		})
-	existing = {(r.get("timestamp"), r.get("provider")): i for i, r in enumerate(data.get("records", []))}
-	for rec in normalized:
-		key = (rec.get("timestamp"), rec.get("provider"))
-		if key in existing:
-			idx = existing[key]
-			merged = {**data["records"][idx], **{k: v for k, v in rec.items() if v is not None}}
-			data["records"][idx] = merged
-		else:
-			data.setdefault("records", []).append(rec)
-	data.setdefault("providers", {}).setdefault(provider, {"connected": False})
-	data["updated_at"] = datetime.utcnow().isoformat()
-	save_user_wearables(user_email, data, anon_id)
-	return data
+	batch = [_row(user_key, row[0], provider, row[1:]) for row in rows]
+	providers = settings["providers"]
+	providers.setdefault(provider, {"connected": False})
+	with db.transaction(WEARABLE_DB) as conn:
+		conn.executemany(UPSERT_SQL, batch)
+		_refresh_daily(conn, user_key, batch)
+		_update_settings(user_key, providers=json.dumps(providers), updated_at=_now())
+	return len(batch)
+
+
+def append_records(user_email: Optional[str], new_records: List[Dict[str, Any]], provider: str, anon_id: Optional[str] = None) -> int:
+	"""
+	Add or update records; one row per (timestamp, provider).
+	Returns:
+		int: Number of records written.
+	Raises:
+		PermissionError: If the user hasn't consented.
+	"""
+	rows = [
+		(normalize_timestamp(rec["timestamp"]), *(_number(rec.get(metric)) for metric in METRICS))
+		for rec in new_records if "timestamp" in rec
+	]
+	return upsert_rows(user_email, provider, rows, anon_id)
 
 
 def set_provider_connection(user_email: Optional[str], provider: str, connected: bool, anon_id: Optional[str] = None) -> Dict[str, Any]:
-	data = load_user_wearables(user_email, anon_id)
-	data.setdefault("providers", {}).setdefault(provider, {})["connected"] = bool(connected)
-	data["updated_at"] = datetime.utcnow().isoformat()
-	save_user_wearables(user_email, data, anon_id)
-	return data
+	user_key = _ensure_user(user_email, anon_id)
+	providers = load_settings(user_email, anon_id)["providers"]
+	providers.setdefault(provider, {})["connected"] = bool(connected)
+	_update_settings(user_key, providers=json.dumps(providers), updated_at=_now())
+	return load_settings(user_email, anon_id)
 
 
 def set_goals(email: str, goals: dict, anon_id: Optional[str] = None) -> Dict[str, Any]:
     """Saves user-defined goals."""
-    user_data = load_user_wearables(email, anon_id)
-    user_data["goals"] = goals
-    user_data["goals_updated_at"] = datetime.utcnow().isoformat()
-    save_user_wearables(email, user_data, anon_id)
-    return user_data
+    _update_settings(_ensure_user(email, anon_id), goals=json.dumps(goals), goals_updated_at=_now())
+    return load_settings(email, anon_id)
@@ -0,0 +1,262 @@
+"""
+Local cache of daily weather history.
+
+Weather for a past day doesn't change, so each day is fetched once and kept
+in ``data/weather.db``. Locations are snapped to a grid of
+``GRID_DEGREES`` cells (about 25 km) and the cell centre is what gets
+fetched, so users in the same city share one cached series. A request only
+fetches the days it is missing, grouped into contiguous ranges.
+
+Days the provider has no data for are stored as empty rows, so repeat
+requests don't ask again. The last ``RECENT_DAYS`` days are retried after
+``RETRY_SECONDS``, since stations report with a delay; older empty days are
+retried after ``EMPTY_RETRY_SECONDS``, so days lost to an outage that
+looked like "no data" are filled in eventually. A fetch that raises is not
+stored and the next request asks again.
+
+Providers are callables ``provider(latitude, longitude, start, end)``
+returning day dicts (see :data:`FIELDS`). :func:`meteostat_provider` is the
+default; set ``TALKHEAL_FAKE_WEATHER=1`` to use :class:`StubWeatherProvider`
+and make no network calls.
+"""
+
+import math
+import os
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from core import db
+
+
+WEATHER_DB = os.path.join("data", "weather.db")
+GRID_DEGREES = 0.25
+RECENT_DAYS = 3
+RETRY_SECONDS = 6 * 3600
+EMPTY_RETRY_SECONDS = 7 * 24 * 3600
+FIELDS = ("temp_avg", "temp_min", "temp_max", "precipitation", "wind_speed", "pressure")
+
+WEATHER_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS weather_days (
+    cell TEXT NOT NULL,
+    date TEXT NOT NULL,
+    {', '.join(f'{field} REAL' for field in FIELDS)},
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (cell, date)
+) WITHOUT ROWID;
+"""
+
+# meteostat Daily columns -> our field names
+METEOSTAT_COLUMNS = {
+    "tavg": "temp_avg", "tmin": "temp_min", "tmax": "temp_max",
+    "prcp": "precipitation", "wspd": "wind_speed", "pres": "pressure",
+}
+
+
+def grid_cell(latitude, longitude, degrees=GRID_DEGREES):
+    """
+    Snap a location to its grid cell.
+    Args:
+        latitude (float): Latitude in degrees.
+        longitude (float): Longitude in degrees.
+        degrees (float): Cell size.
+    Returns:
+        tuple: ``(key, latitude, longitude)`` of the cell centre.
+    """
+    lat = (math.floor(latitude / degrees) + 0.5) * degrees
+    lon = (math.floor(longitude / degrees) + 0.5) * degrees
+    return f"{lat:.3f},{lon:.3f}", lat, lon
+
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _ranges(days):
+    # Contiguous runs of sorted dates as (first, last) pairs
+    runs = []
+    for day in days:
+        if runs and day - runs[-1][1] == timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return [tuple(run) for run in runs]
+
+
+def meteostat_provider(latitude, longitude, start, end):
+    """
+    Fetch daily weather from meteostat.
+    Args:
+        latitude (float): Latitude in degrees.
+        longitude (float): Longitude in degrees.
+        start (date): First day.
+        end (date): Last day (inclusive).
+    Returns:
+        list: Day dicts with ``date`` and :data:`FIELDS` (None where missing).
+    """
+    from meteostat import Daily, Point
+
+    frame = Daily(
+        Point(latitude, longitude),
+        datetime.combine(start, datetime.min.time()),
+        datetime.combine(end, datetime.min.time()),
+    ).fetch()
+    days = []
+    for moment, row in frame.iterrows():
+        day = {"date": moment.date().isoformat()}
+        for column, field in METEOSTAT_COLUMNS.items():
+            value = row.get(column)
+            day[field] = None if value is None or value != value else float(value)
+        days.append(day)
+    return days
+
+
+class StubWeatherProvider:
+    """
+    Deterministic offline weather for tests and development.
+    The same cell and day always give the same values.
+    Attributes:
+        calls (list): ``(latitude, longitude, start, end)`` of every fetch.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, latitude, longitude, start, end):
+        self.calls.append((latitude, longitude, start, end))
+        days = []
+        day = start
+        while day <= end:
+            rng = random.Random(f"{latitude:.3f},{longitude:.3f},{day.isoformat()}")
+            seasonal = 12 - 10 * math.cos(2 * math.pi * day.timetuple().tm_yday / 365)
+            temp_avg = round(seasonal + rng.gauss(0, 3), 1)
+            days.append({
+                "date": day.isoformat(),
+                "temp_avg": temp_avg,
+                "temp_min": round(temp_avg - rng.uniform(2, 6), 1),
+                "temp_max": round(temp_avg + rng.uniform(2, 6), 1),
+                "precipitation": round(max(0.0, rng.gauss(0, 4)), 1),
+                "wind_speed": round(rng.uniform(3, 30), 1),
+                "pressure": round(rng.gauss(1015, 8), 1),
+            })
+            day += timedelta(days=1)
+        return days
+
+
+class WeatherStore:
+    """
+    Daily weather per grid cell, fetched on demand.
+    Args:
+        db_path (str): SQLite database file.
+        provider (callable): Fetches days that aren't cached.
+    """
+
+    def __init__(self, db_path=WEATHER_DB, provider=meteostat_provider):
+        self.db_path = db_path
+        self.provider = provider
+        self._lock = threading.Lock()
+        self._cell_locks = {}
+        db.ensure_schema(db_path, WEATHER_SCHEMA)
+
+    def _cell_lock(self, cell):
+        with self._lock:
+            return self._cell_locks.setdefault(cell, threading.Lock())
+
+    def _cached(self, cell, start, end):
+        rows = db.execute(
+            self.db_path,
+            f"SELECT date, {', '.join(FIELDS)}, fetched_at FROM weather_days "
+            "WHERE cell = ? AND date BETWEEN ? AND ? ORDER BY date",
+            (cell, start.isoformat(), end.isoformat()),
+        ).fetchall()
+        return {row[0]: row for row in rows}
+
+    def _missing(self, cached, start, end):
+        recent = date.today() - timedelta(days=RECENT_DAYS)
+        now = time.time()
+        missing = []
+        day = start
+        while day <= end:
+            row = cached.get(day.isoformat())
+            if row is None:
+                missing.append(day)
+            elif all(value is None for value in row[1:-1]):
+                # No data when last asked; a recent day's station may have reported since
+                retry_after = RETRY_SECONDS if day >= recent else EMPTY_RETRY_SECONDS
+                if row[-1] < now - retry_after:
+                    missing.append(day)
+            day += timedelta(days=1)
+        return missing
+
+    def _fetch(self, cell, latitude, longitude, missing):
+        now = time.time()
+        rows = []
+        for first, last in _ranges(missing):
+            try:
+                fetched = {day["date"]: day for day in self.provider(latitude, longitude, first, last)}
+            except Exception as e:
+                print(f"[weather_store] Error: could not fetch {first}..{last} for {cell}: {e}")
+                continue
+            day = first
+            while day <= last:
+                values = fetched.get(day.isoformat(), {})
+                rows.append((cell, day.isoformat(), *(values.get(field) for field in FIELDS), now))
+                day += timedelta(days=1)
+        if rows:
+            with db.transaction(self.db_path) as conn:
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO weather_days (cell, date, {', '.join(FIELDS)}, fetched_at) "
+                    f"VALUES ({', '.join('?' * (len(FIELDS) + 3))})",
+                    rows,
+                )
+
+    def daily(self, latitude, longitude, start, end):
+        """
+        Get daily weather near a location, fetching only uncached days.
+        Args:
+            latitude (float): Latitude in degrees.
+            longitude (float): Longitude in degrees.
+            start (date or datetime): First day.
+            end (date or datetime): Last day (inclusive).
+        Returns:
+            list: Day dicts with ``date`` and :data:`FIELDS`, oldest first.
+            Days with no data at all are left out.
+        """
+        start, end = _as_date(start), _as_date(end)
+        cell, cell_lat, cell_lon = grid_cell(latitude, longitude)
+        cached = self._cached(cell, start, end)
+        if self._missing(cached, start, end):
+            # One fetch per cell at a time; others wait and then read the cache
+            with self._cell_lock(cell):
+                cached = self._cached(cell, start, end)
+                missing = self._missing(cached, start, end)
+                if missing:
+                    self._fetch(cell, cell_lat, cell_lon, missing)
+                    cached = self._cached(cell, start, end)
+        days = []
+        for row in cached.values():
+            values = dict(zip(FIELDS, row[1:-1]))
+            if any(value is not None for value in values.values()):
+                days.append({"date": row[0], **values})
+        return days
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_weather_store():
+    """
+    Get the process-wide weather store.
+    Uses :class:`StubWeatherProvider` when ``TALKHEAL_FAKE_WEATHER`` is set.
+    Returns:
+        WeatherStore: The shared store.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                fake = bool(os.getenv("TALKHEAL_FAKE_WEATHER"))
+                _store = WeatherStore(provider=StubWeatherProvider() if fake else meteostat_provider)
+    return _store
@@ -1,10 +1,5 @@
 import streamlit as st
-import base64
-
-def get_base64_of_bin_file(bin_file):
-    with open(bin_file, 'rb') as f:
-        data = f.read()
-    return base64.b64encode(data).decode()
+from core.theme_assets import background_image_css
 
 def apply_custom_css():
     from core.theme import get_current_theme
@@ -31,7 +26,7 @@ def apply_custom_css():
     theme_config.update(theme_overrides)
 
     background_image_path = theme_config.get('background_image', 'static_files/Background.jpg')
-    base64_image = get_base64_of_bin_file(background_image_path) if background_image_path else None
+    background_css = background_image_css(background_image_path) if background_image_path else ""
     st.markdown(f"""
     <style>
         /* Font imports */
@@ -70,7 +65,7 @@ def apply_custom_css():
         
         /* Main app background and styling */
         .stApp {{
-            background-image: url("data:image/jpeg;base64,{base64_image}");
+            {background_css}
             background-size: cover;
             background-repeat: no-repeat;
             background-attachment: fixed;
@@ -1,10 +1,13 @@
-import json
-import os
+import sys
 from datetime import datetime, timedelta
 import random
 
-# Create data directory if it doesn't exist
-os.makedirs("data", exist_ok=True)
+from core.mood_store import build_entry, get_mood_store
+
+# Entries are stored for this user (email, or IP for guests)
+if len(sys.argv) < 2:
+    sys.exit("Usage: python generate_sample_mood_data.py <user email>")
+user_key = sys.argv[1]
 
 # Generate sample mood data for the last 30 days
 mood_data = []
@@ -45,25 +48,15 @@ for i in range(30):
         context_reason = random.choice(context_reasons)
         activities = random.sample(activities_options, random.randint(0, 3))
 
-        entry = {
-            "timestamp": entry_time.isoformat(),
-            "mood_level": mood_level,
-            "notes": note,
-            "context_reason": context_reason,
-            "activities": activities,
-            "date": entry_time.strftime("%Y-%m-%d"),
-            "time": entry_time.strftime("%H:%M"),
-            "day_of_week": entry_time.strftime("%A")
-        }
+        entry = build_entry(mood_level, note, context_reason, activities, entry_time.isoformat())
 
         mood_data.append(entry)
 
-# Save to JSON file
-with open("data/mood_data.json", "w") as f:
-    json.dump(mood_data, f, indent=2)
+# Save to the mood store
+get_mood_store().add_many(user_key, mood_data)
 
 print(f"✅ Generated {len(mood_data)} sample mood entries")
-print("📁 Saved to data/mood_data.json")
+print(f"📁 Saved to data/mood.db for {user_key}")
 print("\n📊 Sample entries created:")
 for i, entry in enumerate(mood_data[:5]):
     print(f"  {i+1}. {entry['date']} - {entry['mood_level']} - {entry['notes'][:30]}...")
\ No newline at end of file
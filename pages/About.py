@@ -1,18 +1,11 @@
 import streamlit as st
-import base64
+from core.theme_assets import theme_background_css
 import json
 from streamlit_lottie import st_lottie
 
 st.set_page_config(page_title="About TalkHeal", layout="wide")
 
 # --- Asset Loading ---
-def get_base64_of_bin_file(image_path):
-    try:
-        with open(image_path, "rb") as f:
-            return base64.b64encode(f.read()).decode()
-    except FileNotFoundError:
-        return "R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7" # Transparent pixel
-
 def load_lottiefile(filepath: str):
     try:
         with open(filepath, "r") as f:
@@ -27,13 +20,7 @@ def set_page_theme_and_style():
     is_dark = current_theme["name"] == "Dark"
     selected_palette = st.session_state.get("palette_name", "Pink")
 
-    palette_map = {
-        "light": "static_files/pink.png", "calm blue": "static_files/blue.png",
-        "mint": "static_files/mint.png", "lavender": "static_files/lavender.png",
-        "pink": "static_files/pink.png"
-    }
-    background_image_path = "static_files/dark.png" if is_dark else palette_map.get(selected_palette.lower(), "static_files/pink.png")
-    encoded_string = get_base64_of_bin_file(background_image_path)
+    background_css = theme_background_css(selected_palette, is_dark)
 
     st.markdown(f'''
         <style>
@@ -42,7 +29,7 @@ def set_page_theme_and_style():
 
         /* --- Base and Background --- */
         html, body, [data-testid="stApp"] {{
-            background-image: url("data:image/png;base64,{encoded_string}");
+            {background_css}
             background-size: cover; background-position: center; background-repeat: no-repeat; background-attachment: fixed;
         }}
         .block-container {{ background-color: transparent; }}
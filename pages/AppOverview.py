@@ -1,5 +1,6 @@
 import streamlit as st
-import base64
+from core.assets import image_path
+from core.theme_assets import theme_background_css
 
 st.set_page_config(page_title="App Overview", layout="wide")
 
@@ -10,18 +11,14 @@ def set_page_theme_and_style():
     is_dark = current_theme["name"] == "Dark"
     selected_palette = st.session_state.get("palette_name", "Pink")
 
-    try:
-        with open(f"static_files/{'dark.png' if is_dark else selected_palette.lower() + '.png'}", "rb") as f:
-            encoded_string = base64.b64encode(f.read()).decode()
-    except FileNotFoundError:
-        encoded_string = ""
+    background_css = theme_background_css(selected_palette, is_dark)
 
     st.markdown(f'''
         <style>
         @keyframes fadeInUp {{ from {{ opacity: 0; transform: translateY(20px); }} to {{ opacity: 1; transform: translateY(0); }} }}
 
         html, body, [data-testid="stApp"] {{
-            background-image: url("data:image/png;base64,{encoded_string}");
+            {background_css}
             background-size: cover; background-position: center; background-repeat: no-repeat; background-attachment: fixed;
         }}
         .block-container {{ background-color: transparent; }}
@@ -59,7 +56,7 @@ st.title("Welcome to TalkHeal")
 
 header_col1, header_col2 = st.columns([1.5, 2])
 with header_col1:
-    st.image("static_files/Home_Pink.png", use_column_width=True)
+    st.image(image_path("static_files/Home_Pink.png", 720), use_column_width=True)
 
 with header_col2:
     st.markdown("### Your trusted companion for mental wellness, designed to empower you on your journey to emotional health.")
@@ -1,5 +1,6 @@
 import streamlit as st
-import base64
+from core.assets import image_path
+from core.theme_assets import set_background_for_theme
 from datetime import datetime
 import json
 import math
@@ -12,88 +13,16 @@ def get_reading_time(content):
         return "1 min read"
     return f"{minutes} min read"
 
-def get_base64_of_bin_file(image_path):
-    with open(image_path, "rb") as f:
-        return base64.b64encode(f.read()).decode()
-
-def set_background_for_theme(selected_palette="pink"):
-    from core.theme import get_current_theme
-
-    # --- Get current theme info ---
-    current_theme = st.session_state.get("current_theme", None)
-    if not current_theme:
-        current_theme = get_current_theme()
-    
-    is_dark = current_theme["name"] == "Dark"
-
-    # --- Map light themes to background images ---
-    palette_color = {
-        "light": "static_files/pink.png",
-        "calm blue": "static_files/blue.png",
-        "mint": "static_files/mint.png",
-        "lavender": "static_files/lavender.png",
-        "pink": "static_files/pink.png"
-    }
-
-    # --- Select background based on theme ---
-    if is_dark:
-        background_image_path = "static_files/dark.png"
-    else:
-        background_image_path = palette_color.get(selected_palette.lower(), "static_files/pink.png")
-
-    encoded_string = get_base64_of_bin_file(background_image_path)
-    st.markdown(
-        f"""
-        <style>
-        /* Entire app background */
-        html, body, [data-testid="stApp"] {{
-            
-            background-image: url("data:image/png;base64,{encoded_string}");
-            background-size: cover;
-            background-position: center;
-            background-repeat: no-repeat;
-            background-attachment: fixed;
-        }}
-
-        /* Main content transparency */
-        .block-container {{
-            background-color: rgba(255, 255, 255, 0);
-        }}
-
-        /* Sidebar: brighter translucent background */
-        [data-testid="stSidebar"] {{
-            background-color: rgba(255, 255, 255, 0.6);  /* Brighter and translucent */
-            color: {'black' if is_dark else 'rgba(49, 51, 63, 0.8)'} ;  /* Adjusted for light background */
-        }}
-        
-        h1 {{
-            color: rgb(214, 51, 108) !important;
-            text-shadow: 1px 1px 2px rgba(0,0,0,0.2);
-        }}
-
-        h2, h3, h4, h5, h6, p, span, strong, div, label {{
-            color: {'#f0f0f0' if is_dark else 'rgba(49, 51, 63, 0.8)'} !important;
-            transition: color 0.3s ease;
-        }}
-
-        /* Header bar: fully transparent */
-        [data-testid="stHeader"] {{
-            background-color: rgba(0, 0, 0, 0);
-        }}
-
-        /* Hide left/right arrow at sidebar bottom */
-        button[title="Close sidebar"],
-        button[title="Open sidebar"] {{
-            display: none !important;
-        }}
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
+HEADING_CSS = """
+h1 {
+    color: rgb(214, 51, 108) !important;
+    text-shadow: 1px 1px 2px rgba(0,0,0,0.2);
+}
+"""
 
 # ✅ Set your background image
 selected_palette = st.session_state.get("palette_name", "Pink")
-set_background_for_theme(selected_palette)
+set_background_for_theme(selected_palette, "h2, h3, h4, h5, h6, p, span, strong, div, label", HEADING_CSS)
 
 # --- Blog Data ---
 # In a real app, this might come from a database or a CMS.
@@ -249,7 +178,7 @@ def show_blog_list():
         reading_time = get_reading_time(post["content"])
         col1, col2 = st.columns([4, 1])
         with col1:
-            st.image(post["featured_image"])
+            st.image(image_path(post["featured_image"], 960))
             st.subheader(post["title"])
             st.caption(f"By {post['author']} on {post['date'].strftime('%B %d, %Y')} · {reading_time}")
             st.write(post["excerpt"])
@@ -272,7 +201,7 @@ def show_full_post(post_id):
     reading_time = get_reading_time(post["content"])
     st.title(post["title"])
     st.caption(f"By {post['author']} on {post['date'].strftime('%B %d, %Y')} · {reading_time}")
-    st.image(post["featured_image"])
+    st.image(image_path(post["featured_image"], 960))
     st.markdown("---")
     st.markdown(post["content"], unsafe_allow_html=True)
     st.markdown("---")
@@ -1,9 +1,9 @@
 import streamlit as st
-import sqlite3
-import base64
+from core.theme_assets import background_image_css, set_background_for_theme
 from uuid import uuid4
 from datetime import date
 from core.utils import require_authentication
+from core import db
 import pandas as pd
 import altair as alt
 import csv
@@ -15,79 +15,6 @@ import random
 
 
 
-def get_base64_of_bin_file(image_path):
-    with open(image_path, "rb") as f:
-        return base64.b64encode(f.read()).decode()
-
-def set_background_for_theme(selected_palette="pink"):
-    from core.theme import get_current_theme
-
-    # --- Get current theme info ---
-    current_theme = st.session_state.get("current_theme", None)
-    if not current_theme:
-        current_theme = get_current_theme()
-    
-    is_dark = current_theme["name"] == "Dark"
-
-    # --- Map light themes to background images ---
-    palette_color = {
-        "light": "static_files/pink.png",
-        "calm blue": "static_files/blue.png",
-        "mint": "static_files/mint.png",
-        "lavender": "static_files/lavender.png",
-        "pink": "static_files/pink.png"
-    }
-
-    # --- Select background based on theme ---
-    if is_dark:
-        background_image_path = "static_files/dark.png"
-    else:
-        background_image_path = palette_color.get(selected_palette.lower(), "static_files/pink.png")
-
-    encoded_string = get_base64_of_bin_file(background_image_path)
-    st.markdown(
-        f"""
-        <style>
-        /* Entire app background */
-        html, body, [data-testid="stApp"] {{
-            background-image: url("data:image/png;base64,{encoded_string}");
-            background-size: cover;
-            background-position: center;
-            background-repeat: no-repeat;
-            background-attachment: fixed;
-        }}
-
-        /* Main content transparency */
-        .block-container {{
-            background-color: rgba(255, 255, 255, 0);
-        }}
-
-        /* Sidebar: brighter translucent background */
-        [data-testid="stSidebar"] {{
-            background-color: rgba(255, 255, 255, 0.6);  /* Brighter and translucent */
-            color: {'black' if is_dark else 'rgba(49, 51, 63, 0.8)'} ;  /* Adjusted for light background */
-        }}
-
-        span {{
-            color: {'#f0f0f0' if is_dark else 'rgba(49, 51, 63, 0.8)'} !important;
-            transition: color 0.3s ease;
-        }}
-
-        /* Header bar: fully transparent */
-        [data-testid="stHeader"] {{
-            background-color: rgba(0, 0, 0, 0);
-        }}
-
-        /* Hide left/right arrow at sidebar bottom */
-        button[title="Close sidebar"],
-        button[title="Open sidebar"] {{
-            display: none !important;
-        }}
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
-
 # ✅ Set your background image
 selected_palette = st.session_state.get("palette_name", "Pink")
 set_background_for_theme(selected_palette)
@@ -100,19 +27,14 @@ if "user_profile" not in st.session_state:
     
 require_authentication()
 
-def get_base64_of_bin_file(bin_file_path):
-    with open(bin_file_path, 'rb') as f:
-        data = f.read()
-    return base64.b64encode(data).decode()
-
 def set_background(main_bg_path, sidebar_bg_path=None):
-    main_bg = get_base64_of_bin_file(main_bg_path)
-    sidebar_bg = get_base64_of_bin_file(sidebar_bg_path) if sidebar_bg_path else main_bg
+    main_bg = background_image_css(main_bg_path)
+    sidebar_bg = background_image_css(sidebar_bg_path) if sidebar_bg_path else main_bg
     st.markdown(
         f"""
         <style>
         .stApp {{
-            background-image: url("data:image/png;base64,{main_bg}");
+            {main_bg}
             background-size: cover;
             background-attachment: fixed;
             background-repeat: no-repeat;
@@ -125,7 +47,7 @@ def set_background(main_bg_path, sidebar_bg_path=None):
             box-shadow: 4px 0 24px rgba(0,0,0,0.15);
         }}
         [data-testid="stSidebar"] > div:first-child {{
-            background-image: url("data:image/png;base64,{sidebar_bg}");
+            {sidebar_bg}
             background-size: cover;
             background-repeat: no-repeat;
             background-attachment: fixed;
@@ -145,37 +67,30 @@ def analyze_sentiment(entry: str) -> str:
     else:
         return "Neutral"
 
-DB_PATH = "journals.db"
+DB_PATH = db.JOURNALS_DB
+
+JOURNAL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal_entries (
+    id TEXT PRIMARY KEY,
+    email TEXT,
+    entry TEXT,
+    sentiment TEXT,
+    date TEXT,
+    tags TEXT
+);
+"""
 
 def init_journal_db():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS journal_entries (
-        id TEXT PRIMARY KEY,
-        email TEXT,
-        entry TEXT,
-        sentiment TEXT,
-        date TEXT,
-        tags TEXT
-    )
-    """)
-    conn.commit()
-    conn.close()
+    # Runs once per process; later reruns reuse the pooled connection
+    db.ensure_schema(DB_PATH, JOURNAL_SCHEMA)
 
 def save_entry(email, entry, sentiment, tags):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
+    db.execute(DB_PATH, """
     INSERT INTO journal_entries (id, email, entry, sentiment, date, tags)
     VALUES (?, ?, ?, ?, ?, ?)
     """, (str(uuid4()), email, entry, sentiment, str(date.today()), tags))
-    conn.commit()
-    conn.close()
 
 def fetch_entries(email, sentiment_filter=None, start_date=None, end_date=None, tag_filter=None, search_query=None):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
     query = """
         SELECT id, entry, sentiment, date, tags FROM journal_entries
         WHERE email = ?
@@ -189,29 +104,21 @@ def fetch_entries(email, sentiment_filter=None, start_date=None, end_date=None,
         params.extend([start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")])
     if tag_filter:
         for tag in tag_filter:
-            query += f" AND tags LIKE '%{tag}%'"
+            query += " AND tags LIKE ?"
+            params.append(f"%{tag}%")
     if search_query:
-        query += f" AND (entry LIKE '%{search_query}%' OR tags LIKE '%{search_query}%')"
+        query += " AND (entry LIKE ? OR tags LIKE ?)"
+        params.extend([f"%{search_query}%", f"%{search_query}%"])
 
     query += " ORDER BY date ASC"
-    rows = cursor.execute(query, params).fetchall()
-    conn.close()
-    return rows
+    return db.execute(DB_PATH, query, params).fetchall()
 
 def update_entry(entry_id, new_text, new_tags):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
     new_sentiment = analyze_sentiment(new_text)
-    cursor.execute("UPDATE journal_entries SET entry = ?, sentiment = ?, tags = ? WHERE id = ?", (new_text, new_sentiment, new_tags, entry_id))
-    conn.commit()
-    conn.close()
+    db.execute(DB_PATH, "UPDATE journal_entries SET entry = ?, sentiment = ?, tags = ? WHERE id = ?", (new_text, new_sentiment, new_tags, entry_id))
 
 def delete_entry(entry_id):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM journal_entries WHERE id = ?", (entry_id,))
-    conn.commit()
-    conn.close()
+    db.execute(DB_PATH, "DELETE FROM journal_entries WHERE id = ?", (entry_id,))
 
 def create_mood_trend_chart(entries):
     if not entries:
@@ -1,5 +1,6 @@
 import streamlit as st
 import os
+from core.assets import image_path
 from datetime import datetime
 
 def show():
@@ -23,13 +24,13 @@ def show():
     st.markdown("<h3 style='text-align: center;'>Meet Our Experts</h3>", unsafe_allow_html=True)
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.image("static_files/pink.png", width=150)
+        st.image(image_path("static_files/pink.png", 150), width=150)
         st.markdown("<p style='text-align: center;'><b>Dr. Rahul Kumar</b><br>Clinical Psychologist</p>", unsafe_allow_html=True)
     with col2:
-        st.image("static_files/mint.png", width=150)
+        st.image(image_path("static_files/mint.png", 150), width=150)
         st.markdown("<p style='text-align: center;'><b>Dr. Manish Kumar</b><br>Licensed Therapist</p>", unsafe_allow_html=True)
     with col3:
-        st.image("static_files/lavender.png", width=150)
+        st.image(image_path("static_files/lavender.png", 150), width=150)
         st.markdown("<p style='text-align: center;'><b>Dr. Rajiv Kumar</b><br>Counseling Psychologist</p>", unsafe_allow_html=True)
 
     st.markdown("---")
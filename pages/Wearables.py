@@ -1,17 +1,18 @@
 import streamlit as st
 import pandas as pd
-from io import StringIO
-from datetime import datetime
+from datetime import datetime, timedelta
 from core.utils import require_authentication
 from core.wearable_store import (
-    load_user_wearables,
-    save_user_wearables,
+    load_settings,
+    load_records,
+    load_daily,
+    summarize_days,
     set_consent,
-    append_records,
     set_provider_connection,
     clear_user_wearables,
     set_goals,
 )
+from core.wearable_import import import_csv, read_header
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -34,7 +35,7 @@ if not email:
     st.error("User email not found. Please re-login.")
     st.stop()
 
-user_data = load_user_wearables(email)
+user_data = load_settings(email)
 
 # --- Page Title ---
 st.title("⌚ Wearables & Physiology")
@@ -95,44 +96,41 @@ if user_data.get("consent"):
         
         if uploaded:
             try:
-                df = pd.read_csv(uploaded)
-                colmap = {c.lower().strip().replace("_", ""): c for c in df.columns}
+                # Only the header is read here; rows are streamed on import
+                mapping = read_header(uploaded)
                 
-                if "timestamp" not in colmap:
+                if "timestamp" not in mapping.values():
                     st.error("CSV must include a 'timestamp' column.")
                 else:
-                    records = []
-                    for _, row in df.iterrows():
-                        rec = {
-                            "timestamp": row[colmap["timestamp"]],
-                            "hrv_ms": row.get(colmap.get("hrvms")),
-                            "resting_hr": row.get(colmap.get("restinghr")),
-                            "sleep_minutes": row.get(colmap.get("sleepminutes")),
-                            "sleep_efficiency": row.get(colmap.get("sleepefficiency")),
-                            "steps": row.get(colmap.get("steps")),
-                            "active_minutes": row.get(colmap.get("activeminutes")),
-                        }
-                        records.append(rec)
-                    
+                    st.caption("Detected columns: " + ", ".join(f"{c} → {f}" for c, f in mapping.items()))
                     provider_guess = st.selectbox("Select the provider for this import:", ["fitbit", "google_fit", "oura", "unknown"])
                     if st.button("Import Data", use_container_width=True):
-                        user_data = append_records(email, records, provider_guess)
-                        st.success(f"Successfully imported {len(records)} records!")
+                        bar = st.progress(0.0, text="Importing...")
+                        report = import_csv(
+                            uploaded, email, provider_guess,
+                            progress=lambda rows, fraction: bar.progress(fraction or 0.0, text=f"Imported {rows:,} rows..."),
+                        )
+                        bar.empty()
+                        st.success(f"Successfully imported {report['imported']:,} records!")
+                        if report["skipped"]:
+                            st.caption(f"Skipped {report['skipped']:,} rows without a valid timestamp.")
             except Exception as e:
                 st.error(f"Failed to parse CSV: {e}")
 
     st.divider()
 
     # --- Data Display and Summaries ---
+    # Summaries and charts read the per-day rollups; raw records are only
+    # loaded for the detailed table of the selected range.
     st.subheader("📊 Recent Records & Summaries")
-    records = user_data.get("records", [])
+    days = load_daily(email)
 
-    if not records:
+    if not days:
         st.info("No wearable records found. Connect a provider or upload a CSV to get started.")
     else:
-        df_view = pd.DataFrame(sorted(records, key=lambda r: r.get("timestamp", ""), reverse=True))
-        df_view["ts"] = pd.to_datetime(df_view["timestamp"], errors="coerce")
-        df_view = df_view.dropna(subset=["ts"]) # Ensure no NaT timestamps
+        df_days = pd.DataFrame(days)
+        df_days["day"] = pd.to_datetime(df_days["date"])
+        today = datetime.utcnow().date()
 
         # --- Today's Goal Progress ---
         st.markdown("##### 🏆 Today's Goal Progress")
@@ -140,12 +138,12 @@ if user_data.get("consent"):
         if not goals:
             st.caption("You haven't set any goals yet. Set them in the 'Set Your Daily Goals' section below.")
         else:
-            today_df = df_view[df_view["ts"].dt.date == datetime.utcnow().date()]
-            if today_df.empty:
+            today_rows = [day for day in days if day["date"] == today.isoformat()]
+            if not today_rows:
                 st.info("No data recorded for today yet to track goal progress.")
             else:
-                today_latest = today_df.iloc[0]
-                goal_metrics_defined = [m for m in goals.keys() if m in today_latest]
+                today_totals = today_rows[0]
+                goal_metrics_defined = [m for m in goals.keys() if today_totals.get(m) is not None]
                 
                 if not goal_metrics_defined:
                     st.caption("Set goals for available metrics (e.g., steps, sleep) to see progress.")
@@ -156,7 +154,7 @@ if user_data.get("consent"):
                         with goal_cols[i]:
                             goal_data = goals[metric]
                             target = goal_data.get("target", 0)
-                            current_value = today_latest.get(metric, 0)
+                            current_value = today_totals[metric]
                             
                             st.markdown(f"**{metric.replace('_', ' ').title()}**")
                             progress = min(current_value / target, 1.0) if target > 0 else 0
@@ -170,48 +168,44 @@ if user_data.get("consent"):
 
         # --- Summaries (Last 7 Days) ---
         st.markdown("##### Last 7 Days at a Glance")
-        cutoff = pd.Timestamp.utcnow().tz_localize(None) - pd.Timedelta(days=7)
-        last7 = df_view[df_view["ts"] >= cutoff]
+        cutoff = (today - timedelta(days=7)).isoformat()
+        last7 = [day for day in days if day["date"] >= cutoff]
 
-        if last7.empty:
+        if not last7:
             st.info("No data recorded in the last 7 days.")
         else:
+            summary = summarize_days(last7)
             summary_cols = st.columns(4)
             metrics = {
-                "Avg HRV (ms)": ("hrv_ms", "mean"),
-                "Avg Resting HR": ("resting_hr", "mean"),
-                "Total Sleep (hrs)": ("sleep_minutes", "sum"),
-                "Total Steps": ("steps", "sum")
+                "Avg HRV (ms)": "hrv_ms",
+                "Avg Resting HR": "resting_hr",
+                "Total Sleep (hrs)": "sleep_minutes",
+                "Total Steps": "steps",
             }
             
-            for i, (label, (col, agg)) in enumerate(metrics.items()):
+            for i, (label, col) in enumerate(metrics.items()):
                 with summary_cols[i]:
-                    if col in last7.columns:
-                        series = last7[col].dropna().astype(float)
-                        if not series.empty:
-                            value = series.agg(agg)
-                            if "sleep" in label:
-                                value /= 60
-                            st.metric(label, f"{value:.1f}")
-                        else:
-                            st.metric(label, "N/A")
+                    value = summary[col]
+                    if value is not None:
+                        if "sleep" in label:
+                            value /= 60
+                        st.metric(label, f"{value:.1f}")
                     else:
                         st.metric(label, "N/A")
 
         # --- Weekly Insights ---
         st.markdown("##### 💡 Weekly Insights")
         
-        cutoff_14_days = pd.Timestamp.utcnow().tz_localize(None) - pd.Timedelta(days=14)
-        last_14_days_df = df_view[df_view["ts"] >= cutoff_14_days]
+        w1_start = pd.Timestamp(today - timedelta(days=7))
+        w2_start = pd.Timestamp(today - timedelta(days=14))
+        last_14_days_df = df_days[df_days["day"] >= w2_start]
 
         insights = []
 
         def generate_weekly_insight(df, metric, name, higher_is_better=True):
-            w1_start = pd.Timestamp.utcnow().tz_localize(None) - pd.Timedelta(days=7)
-            w2_start = pd.Timestamp.utcnow().tz_localize(None) - pd.Timedelta(days=14)
-            
-            week1_df = df[df["ts"] >= w1_start]
-            week2_df = df[(df["ts"] >= w2_start) & (df["ts"] < w1_start)]
+            # Compares the average day of this week with the week before
+            week1_df = df[df["day"] >= w1_start]
+            week2_df = df[(df["day"] >= w2_start) & (df["day"] < w1_start)]
 
             if week1_df.empty or week2_df.empty or metric not in df.columns:
                 return None
@@ -261,8 +255,8 @@ if user_data.get("consent"):
         # --- Interactive Visualization ---
         st.subheader("📈 Visualize Your Data")
 
-        min_date = df_view["ts"].min().date()
-        max_date = df_view["ts"].max().date()
+        min_date = df_days["day"].min().date()
+        max_date = df_days["day"].max().date()
         default_start = max(min_date, max_date - pd.Timedelta(days=29))
 
         date_range = st.date_input(
@@ -276,53 +270,45 @@ if user_data.get("consent"):
         if len(date_range) == 2:
             start_date, end_date = date_range
             start_ts = pd.to_datetime(start_date)
-            end_ts = pd.to_datetime(end_date) + pd.Timedelta(days=1)
+            end_ts = pd.to_datetime(end_date)
 
-            df_filtered = df_view[(df_view["ts"] >= start_ts) & (df_view["ts"] < end_ts)]
+            df_filtered = df_days[(df_days["day"] >= start_ts) & (df_days["day"] <= end_ts)]
 
             if df_filtered.empty:
                 st.info("No data available for the selected date range.")
             else:
-                df_chart = df_filtered.set_index("ts")
+                df_chart = df_filtered.set_index("day")
 
                 st.markdown("##### ❤️ Heart Rate & HRV")
-                hr_cols = ["resting_hr", "hrv_ms"]
-                if all(c in df_chart.columns for c in hr_cols):
-                    hr_data = df_chart[hr_cols].dropna(how='all')
-                    if not hr_data.empty:
-                        st.line_chart(hr_data)
-                    else:
-                        st.caption("No Heart Rate or HRV data in this period.")
+                hr_data = df_chart[["resting_hr", "hrv_ms"]].dropna(how='all')
+                if not hr_data.empty:
+                    st.line_chart(hr_data)
                 else:
-                    st.caption("Heart Rate or HRV data not available.")
+                    st.caption("No Heart Rate or HRV data in this period.")
 
                 st.markdown("##### 😴 Sleep")
-                sleep_cols = ["sleep_minutes", "sleep_efficiency"]
-                if all(c in df_chart.columns for c in sleep_cols):
-                    sleep_data = df_chart[sleep_cols].dropna(how='all')
-                    if not sleep_data.empty:
-                        st.line_chart(sleep_data)
-                    else:
-                        st.caption("No Sleep data in this period.")
+                sleep_data = df_chart[["sleep_minutes", "sleep_efficiency"]].dropna(how='all')
+                if not sleep_data.empty:
+                    st.line_chart(sleep_data)
                 else:
-                    st.caption("Sleep data not available.")
+                    st.caption("No Sleep data in this period.")
 
                 st.markdown("##### 🏃 Activity")
-                activity_cols = ["steps", "active_minutes"]
-                if all(c in df_chart.columns for c in activity_cols):
-                    activity_data = df_chart[activity_cols].dropna(how='all')
-                    if not activity_data.empty:
-                        st.line_chart(activity_data)
-                    else:
-                        st.caption("No Activity data in this period.")
+                activity_data = df_chart[["steps", "active_minutes"]].dropna(how='all')
+                if not activity_data.empty:
+                    st.line_chart(activity_data)
                 else:
-                    st.caption("Activity data not available.")
-        
-        st.divider()
+                    st.caption("No Activity data in this period.")
 
-        # --- Detailed Records ---
-        st.markdown("##### All Recorded Data")
-        st.dataframe(df_view.drop(columns=["ts"]), use_container_width=True, hide_index=True)
+            st.divider()
+
+            # --- Detailed Records ---
+            st.markdown("##### Recorded Data in This Range")
+            records = load_records(email, since=start_date.isoformat(), until=(end_date + timedelta(days=1)).isoformat())
+            if records:
+                st.dataframe(pd.DataFrame(records[::-1]), use_container_width=True, hide_index=True)
+            else:
+                st.caption("No records in this period.")
 
     # --- Goal Setting ---
     with st.expander("🎯 Set Your Daily Goals"):
@@ -1,13 +1,14 @@
 import os
 import streamlit as st
 import json
-import base64
 from streamlit_lottie import st_lottie
 from langchain_core.pydantic_v1 import BaseModel, Field
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.output_parsers import JsonOutputParser
 from typing import List
+from core.llm_cache import cached_invoke
+from core.theme_assets import background_image_css
 
 st.set_page_config(
     page_title="Yoga for Mental Health",
@@ -29,15 +30,6 @@ def load_lottiefile(filepath: str):
         st.error(f"Lottie file not found at {filepath}.")
         return None
 
-def get_base64_of_bin_file(bin_file):
-    try:
-        with open(bin_file, 'rb') as f:
-            data = f.read()
-        return base64.b64encode(data).decode()
-    except FileNotFoundError:
-        st.error(f"Background image not found at {bin_file}. Please check the path.")
-        return ""
-
 lottie_yoga = load_lottiefile("assets/yoga_animation.json")
 
 # --- Load Yoga Data ---
@@ -63,12 +55,16 @@ if is_dark:
 else:
     background_image_path = "static_files/yoga-bg.png"
 
-base64_background_image = get_base64_of_bin_file(background_image_path)
+try:
+    background_css = background_image_css(background_image_path)
+except FileNotFoundError:
+    st.error(f"Background image not found at {background_image_path}. Please check the path.")
+    background_css = ""
 
 st.markdown(f"""
 <style>
 html, body, [data-testid="stAppViewContainer"] {{
-    background-image: url("data:image/jpeg;base64,{base64_background_image}");
+    {background_css}
     background-size: cover;
     background-position: center center;
     background-repeat: no-repeat;
@@ -422,8 +418,9 @@ def generate_yoga_asana_llm(mood_input: str):
     
     for _ in range(3):
         try:
-            response = llm.invoke(messages)
-            return parser.parse(response.content)
+            # Served from the LLM cache when this mood was asked before; only parseable replies are cached
+            return cached_invoke(llm, messages, parse=parser.parse,
+                                 owner=st.session_state.get("user_profile", {}).get("email"))
         except Exception:
             pass
             
@@ -3,70 +3,38 @@ import webbrowser
 from datetime import datetime
 from core.utils import create_new_conversation, get_current_time
 from core.theme import get_current_theme, toggle_theme, set_palette, PALETTES
+from core.assets import audio_file
+from core.theme_assets import background_image_css, page_background_css
 from components.mood_dashboard import render_mood_dashboard, MoodTracker
 from components.profile import initialize_profile_state, render_profile_section
 from components.focus_session import render_focus_session
 from components.quick_coping_cards import render_quick_coping_cards
 from streamlit_js_eval import streamlit_js_eval
-import requests
-import base64
+from core import geo
 import json
 
-def set_background(image_path):
-    with open(image_path, "rb") as image_file:
-        encoded_string = base64.b64encode(image_file.read()).decode()
-
-    css = """
-    <style>
-    /* Entire app background */
-    html, body, [data-testid="stApp"] {
-        background-image: url("data:image/png;base64,{BASE64}");
-        background-size: cover;
-        background-position: center;
-        background-repeat: no-repeat;
-        background-attachment: fixed;
-    }
-
-    /* Main content transparency */
-    .block-container {
-        background-color: rgba(255, 255, 255, 0);
-    }
-
-    /* Sidebar: brighter translucent background */
-    [data-testid="stSidebar"] {
-        background-color: rgba(255, 255, 255, 0.6);
-        color: black;
-    }
-
-    /* Header bar: fully transparent */
-    [data-testid="stHeader"] {
-        background-color: rgba(0, 0, 0, 0);
-    }
-
-    /* Hide left/right arrow at sidebar bottom */
-    button[title="Close sidebar"],
-    button[title="Open sidebar"] {
-        display: none !important;
-    }
-
-    /* 🌟 Custom link styling */
-    a {
-        color: #ffffff !important;   /* White links */
-        font-weight: 500;
-        text-decoration: none;
-    }
-    a:hover {
-        color: #FFD700 !important;   /* Gold hover */
-        text-decoration: underline;
-    }
-    </style>
-    """
-
-    st.markdown(css.replace("{BASE64}", encoded_string), unsafe_allow_html=True)
+LINK_CSS = """
+[data-testid="stSidebar"] {
+    color: black;
+}
 
+/* 🌟 Custom link styling */
+a {
+    color: #ffffff !important;   /* White links */
+    font-weight: 500;
+    text-decoration: none;
+}
+a:hover {
+    color: #FFD700 !important;   /* Gold hover */
+    text-decoration: underline;
+}
+"""
 
 # ✅ Set your background image
-set_background("static_files/lavender.png")
+st.markdown(
+    page_background_css(background_image_css("static_files/lavender.png"), text_selectors=None, extra_css=LINK_CSS),
+    unsafe_allow_html=True,
+)
 
 
 # --- Structured Emergency Resources ---
@@ -84,19 +52,9 @@ GLOBAL_RESOURCES = [
 ]
 
 
-def get_country_from_coords(lat, lon):
-    try:
-        url = f"https://geocode.maps.co/reverse?lat={lat}&lon={lon}"
-        resp = requests.get(url, timeout=5)
-        if resp.status_code == 200:
-            data = resp.json()
-            return data.get("address", {}).get("country_code", "").upper()
-    except:
-        pass
-    return None
-
 def get_user_country():
-    # 1. Try to get user's actual browser location (via JS)
+    # Browser coordinates resolve offline; without them fall back to the
+    # (cached) IP lookup
     coords = streamlit_js_eval(
         js_expressions="""
             new Promise((resolve, reject) => {
@@ -111,21 +69,7 @@ def get_user_country():
         """,
         key="get_coords"
     )
-
-    if coords and "latitude" in coords and "longitude" in coords:
-        country = get_country_from_coords(coords["latitude"], coords["longitude"])
-        if country:
-            return country
-
-    # 2. Fallback to IP-based location using ipapi.co (no key required)
-    try:
-        resp = requests.get("https://ipapi.co/json/", timeout=3)
-        if resp.status_code == 200:
-            return resp.json().get("country_code", "").upper()
-    except:
-        pass
-
-    return None  # final fallback if everything fails
+    return geo.user_country(coords if isinstance(coords, dict) else None)
 
 with open("data/country_helplines.json", "r") as f:
     country_helplines = json.load(f)
@@ -577,7 +521,8 @@ elif st.session_state.active_tool == "grounding_exercise":
 
     if st.session_state.selected_audio != "None":
         try:
-            st.audio(f"audio_files/{st.session_state.selected_audio}")
+            audio_path, audio_format = audio_file(f"audio_files/{st.session_state.selected_audio}")
+            st.audio(audio_path, format=audio_format)
         except FileNotFoundError:
             st.warning(f"Audio file {st.session_state.selected_audio} not found.")
 
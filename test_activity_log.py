@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import date
+from unittest import mock
+
+from core import activity_log
+from core.activity_log import ActivityLogger
+
+
+class TestActivityLogger(unittest.TestCase):
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.log_dir, ignore_errors=True)
+
+    def test_concurrent_writers_lose_nothing(self):
+        logger = ActivityLogger(self.log_dir, queue_size=50)
+
+        def worker(n):
+            for i in range(200):
+                logger.log({"timestamp": "2026-01-02T10:00:00", "user": f"u{n}", "activity": "chat", "details": {"i": i}})
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        logger.close()
+
+        self.assertEqual(logger.count_by_activity()["chat"], 1600)
+        self.assertEqual(len(list(logger.iter_events(user="u3"))), 200)
+
+    def test_rotates_by_day_and_size(self):
+        logger = ActivityLogger(self.log_dir, max_bytes=200, batch_size=1)
+        for i in range(10):
+            logger.log({"timestamp": "2026-01-02T10:00:00", "activity": "login", "details": {"i": i}})
+            logger.flush()
+        logger.log({"timestamp": "2026-01-03T09:00:00", "activity": "logout"})
+        logger.close()
+
+        names = sorted(os.listdir(self.log_dir))
+        self.assertIn("activity_20260103.jsonl", names)
+        self.assertGreater(len([n for n in names if n.startswith("activity_20260102.")]), 2)
+        events = list(logger.iter_events(end=date(2026, 1, 2)))
+        self.assertEqual([e["details"]["i"] for e in events], list(range(10)))
+        self.assertEqual(logger.count_by_day(), {"2026-01-02": 10, "2026-01-03": 1})
+
+    def test_failed_write_is_retried(self):
+        logger = ActivityLogger(self.log_dir, flush_interval=0.05)
+        real_open, calls = os.open, []
+
+        def flaky_open(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 1:
+                raise OSError("disk full")
+            return real_open(*args, **kwargs)
+
+        with mock.patch.object(activity_log, "RETRY_DELAY", 0.05), \
+                mock.patch.object(activity_log.os, "open", side_effect=flaky_open):
+            for i in range(5):
+                logger.log({"timestamp": "2026-01-02T10:00:00", "activity": "chat", "details": {"i": i}})
+            logger._queue.join()
+            for _ in range(100):
+                if not logger._retry:
+                    break
+                threading.Event().wait(0.02)
+            # Retried by the writer thread, not just at close
+            self.assertEqual(logger._retry, [])
+        logger.close()
+
+        self.assertGreater(len(calls), 1)
+        events = list(logger.iter_events())
+        self.assertEqual([e["details"]["i"] for e in events], list(range(5)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from core import assets
+
+
+class TestAssetBuild(unittest.TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.out = self.root / "static" / "assets"
+        (self.root / "static_files").mkdir()
+        (self.root / "assets").mkdir()
+        (self.root / "static_files" / "icon.svg").write_text("<svg/>")
+        (self.root / "assets" / "icon copy.svg").write_text("<svg/>")
+        (self.root / "assets" / "anim.json").write_text('{"v": 1}')
+        self.manifest = self.out / assets.MANIFEST_NAME
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def build(self):
+        return assets.build(root=self.root, out_dir=self.out)
+
+    def test_duplicates_share_one_output(self):
+        report = self.build()
+        self.assertEqual((report["built"], report["duplicates"]), (2, 1))
+        first = assets.lookup("static_files/icon.svg", self.manifest)
+        self.assertEqual(first, assets.lookup("assets/icon copy.svg", self.manifest))
+        self.assertTrue((self.out / first["file"]).exists())
+
+    def test_rebuild_is_incremental_and_prunes(self):
+        self.build()
+        old = assets.lookup("assets/anim.json", self.manifest)["file"]
+        report = self.build()
+        self.assertEqual((report["built"], report["reused"]), (0, 2))
+
+        path = self.root / "assets" / "anim.json"
+        path.write_text('{"v": 2}')
+        os.utime(path, ns=(0, 1))
+        report = self.build()
+        self.assertEqual((report["built"], report["reused"]), (1, 1))
+        new = assets.lookup("assets/anim.json", self.manifest)["file"]
+        self.assertNotEqual(old, new)
+        self.assertFalse((self.out / old).exists())
+
+    def test_prune_only_removes_previous_outputs(self):
+        self.out.mkdir(parents=True)
+        (self.out / "README.txt").write_text("not ours")
+        self.build()
+        (self.out / "notes.json").write_text("{}")
+        old = assets.lookup("assets/anim.json", self.manifest)["file"]
+        (self.root / "assets" / "anim.json").unlink()
+        self.build()
+        self.assertFalse((self.out / old).exists())
+        self.assertTrue((self.out / "README.txt").exists())
+        self.assertTrue((self.out / "notes.json").exists())
+
+    def test_unbuilt_sources_resolve_to_themselves(self):
+        self.build()
+        self.assertEqual(assets.image_path("static_files/missing.png", 150, self.manifest), "static_files/missing.png")
+        self.assertEqual(assets.audio_file("audio_files/rain.wav", self.manifest), ("audio_files/rain.wav", "audio/wav"))
+        self.assertIsNone(assets.image_url("static_files/missing.png", manifest_path=self.manifest))
+
+    def test_pick_variant_prefers_smallest_wide_enough(self):
+        variants = {"1920": "a", "960": "b", "320": "c"}
+        self.assertEqual(assets.pick_variant(variants, 300), (320, "c"))
+        self.assertEqual(assets.pick_variant(variants, 961), (1920, "a"))
+        self.assertEqual(assets.pick_variant(variants), (1920, "a"))
+        self.assertEqual(assets.pick_variant(variants, 4000), (1920, "a"))
+
+    def test_images_become_webp_variants(self):
+        try:
+            from PIL import Image
+        except ImportError:
+            self.skipTest("Pillow is not installed")
+        Image.new("RGB", (1000, 500), "pink").save(self.root / "static_files" / "bg.png")
+        self.build()
+        entry = assets.lookup("static_files/bg.png", self.manifest)
+        self.assertEqual(sorted(entry["variants"], key=int), ["320", "640", "960", "1000"])
+        path = assets.image_path("static_files/bg.png", 150, self.manifest)
+        self.assertTrue(path.endswith("-320.webp"))
+
+
+if __name__ == "__main__":
+    unittest.main()
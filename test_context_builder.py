@@ -0,0 +1,87 @@
+import unittest
+
+from core import llm
+from core.context_builder import ContextBuilder, build_chat_prompt, count_tokens, refine_chat_summary
+from core.fake_llm import FakeGenerativeModel
+
+
+def _conversation(turns):
+    messages = []
+    for n in range(turns):
+        messages.append({"sender": "user", "message": f"user message number {n} " + "x" * 60})
+        messages.append({"sender": "bot", "message": f"bot reply number {n} " + "y" * 60})
+    return {"id": 1, "messages": messages}
+
+
+class TestContextBuilder(unittest.TestCase):
+    def test_short_chat_is_sent_verbatim(self):
+        convo = _conversation(2)
+        convo["messages"].append({"sender": "user", "message": "how are you?"})
+        prompt = ContextBuilder(budget_tokens=1000).build(convo, "Be kind.", "how are you?")
+
+        self.assertEqual(prompt.count("how are you?"), 1)
+        self.assertIn("user message number 0", prompt)
+        self.assertNotIn("context_summary", convo)
+
+    def test_long_chat_stays_within_budget_and_folds_incrementally(self):
+        calls = []
+
+        def summarizer(summary, messages, max_tokens):
+            calls.append(len(messages))
+            return f"{summary} +{len(messages)}".strip()
+
+        builder = ContextBuilder(budget_tokens=400, summarizer=summarizer)
+        convo = _conversation(20)
+        prompt = builder.build(convo, "Be kind.", "next")
+        self.assertLessEqual(count_tokens(prompt), 400)
+        self.assertIn("bot reply number 19", prompt)
+        self.assertNotIn("user message number 0 ", prompt)
+        upto = convo["context_summary"]["upto"]
+        self.assertEqual(calls, [upto])
+
+        # One more turn fits without summarizing again
+        convo["messages"].append({"sender": "user", "message": "next"})
+        convo["messages"].append({"sender": "bot", "message": "ok"})
+        builder.build(convo, "Be kind.", "again")
+        self.assertEqual(len(calls), 1)
+
+    def test_support_rules_appear_once(self):
+        convo = _conversation(40)
+        prompt = build_chat_prompt(convo, "You are a wise friend.", "hello")
+        self.assertEqual(prompt.count(llm.SUPPORT_INSTRUCTIONS), 1)
+
+    def test_model_summary_is_written_after_the_prompt(self):
+        model = FakeGenerativeModel(reply="User is stressed about exams.")
+        convo = _conversation(40)
+        prompt = build_chat_prompt(convo, "Be kind.", "hello")
+        self.assertEqual(model.calls, [])
+        self.assertIn("User said: user message number", prompt)
+        upto = convo["context_summary"]["upto"]
+
+        self.assertTrue(refine_chat_summary(convo, model))
+        self.assertEqual(len(model.calls), 1)
+        self.assertIn("user message number 0", model.calls[0]["prompt"])
+        self.assertEqual(convo["context_summary"], {"text": "User is stressed about exams.", "upto": upto})
+        self.assertFalse(refine_chat_summary(convo, model))
+
+        convo["messages"].append({"sender": "user", "message": "hello"})
+        prompt = build_chat_prompt(convo, "Be kind.", "again")
+        self.assertIn("User is stressed about exams.", prompt)
+
+    def test_refine_covers_every_draft_fold(self):
+        model = FakeGenerativeModel(reply="Summary.")
+        convo = _conversation(20)
+        builder = ContextBuilder(budget_tokens=400)
+        builder.build(convo, "Be kind.", "next")
+        first = convo["context_summary"]["upto"]
+        convo["messages"].extend(_conversation(10)["messages"])
+        builder.build(convo, "Be kind.", "next")
+        self.assertGreater(convo["context_summary"]["upto"], first)
+        self.assertEqual(convo["context_summary"]["draft"], {"text": "", "from": 0})
+
+        refine_chat_summary(convo, model, budget_tokens=400)
+        self.assertIn("user message number 0 ", model.calls[0]["prompt"])
+
+
+if __name__ == "__main__":
+    unittest.main()
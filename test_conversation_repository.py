@@ -0,0 +1,226 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from core import db
+from core.conversation_repository import SCHEMA, ConversationRepository
+from core.conversation_store import LazyMessages
+
+
+USER = "test@example.com"
+
+
+def _message(text, sender="user"):
+    return {"sender": sender, "message": text, "time": "10:00 AM"}
+
+
+class TestConversationRepository(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.repo = ConversationRepository(os.path.join(self.base_dir, "conversations.db"))
+
+    def tearDown(self):
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def test_save_and_load_round_trip(self):
+        convos = [
+            {"id": 1, "user_key": USER, "title": "First", "date": "today", "session_ended": True,
+             "messages": [_message("hi"), _message("hello", "bot")]},
+        ]
+        self.repo.save_conversations(USER, convos)
+
+        loaded = self.repo.load_conversations(USER)
+        self.assertEqual(loaded[0]["title"], "First")
+        self.assertTrue(loaded[0]["session_ended"])
+        self.assertIsInstance(loaded[0]["messages"], LazyMessages)
+        self.assertFalse(loaded[0]["messages"].is_loaded)
+        self.assertEqual(list(loaded[0]["messages"]), convos[0]["messages"])
+
+    def test_incremental_save_and_delete(self):
+        convo = {"id": 1, "user_key": USER, "title": "Chat", "date": "today", "messages": [_message("one")]}
+        other = {"id": 2, "user_key": USER, "title": "Other", "date": "today", "messages": []}
+        self.repo.save_conversations(USER, [other, convo])
+        convo["messages"].append(_message("two", "bot"))
+        self.repo.save_conversations(USER, [other, convo])
+        self.assertEqual([m["message"] for m in self.repo.get_messages(USER, 1)], ["one", "two"])
+
+        # Leaving a conversation out of the list (e.g. one created in another tab) keeps it
+        self.repo.save_conversations(USER, [convo])
+        self.assertIsNotNone(self.repo.get_conversation(USER, 2))
+
+        self.assertTrue(self.repo.delete_conversation(USER, 2))
+        self.assertFalse(self.repo.delete_conversation(USER, 2))
+        self.assertIsNone(self.repo.get_conversation(USER, 2))
+        self.assertEqual(self.repo.next_conversation_id(USER), 2)
+
+    def test_second_session_keeps_other_sessions_conversations(self):
+        self.repo.save_conversations(USER, [{"id": 1, "title": "tab one", "messages": []}])
+        other_tab = ConversationRepository(self.repo.db_path)
+        other_tab.create_conversation(USER, {"id": 2, "title": "tab two", "messages": [_message("hi")]})
+
+        first_tab = self.repo.load_conversations(USER, limit=1, before_id=2)
+        first_tab[0]["title"] = "renamed"
+        self.repo.save_conversations(USER, first_tab)
+        self.assertEqual(self.repo.count_conversations(USER), 2)
+        self.assertEqual(self.repo.get_conversation(USER, 1)["title"], "renamed")
+
+    def test_two_tabs_appending_to_one_conversation_keep_both(self):
+        self.repo.save_conversations(USER, [{"id": 1, "title": "Chat", "messages": [_message("one")]}])
+        tab_a = self.repo.load_conversations(USER)
+        tab_b = ConversationRepository(self.repo.db_path).load_conversations(USER)
+        self.assertEqual(len(tab_a[0]["messages"][:]), 1)
+
+        # Tab B saves first and ends up longer than tab A
+        tab_b[0]["messages"].extend([_message("b1"), _message("b2")])
+        self.repo.save_conversations(USER, tab_b)
+        tab_a[0]["messages"].append(_message("a1"))
+        self.repo.save_conversations(USER, tab_a)
+        # ... then tab A catches up to tab B's length
+        tab_a[0]["messages"].append(_message("a2"))
+        self.repo.save_conversations(USER, tab_a)
+
+        self.assertEqual([m["message"] for m in self.repo.get_messages(USER, 1)], ["one", "b1", "b2", "a1", "a2"])
+        self.assertEqual(self.repo.get_conversation(USER, 1)["message_count"], 5)
+        self.repo.save_conversations(USER, tab_a)
+        self.assertEqual(len(self.repo.get_messages(USER, 1)), 5)
+
+    def test_replace_messages(self):
+        self.repo.create_conversation(USER, {"id": 1, "title": "Chat", "messages": [_message("one"), _message("two")]})
+        self.repo.replace_messages(USER, 1, [_message("two")])
+        self.assertEqual([m["message"] for m in self.repo.get_messages(USER, 1)], ["two"])
+        self.assertEqual(self.repo.get_conversation(USER, 1)["message_count"], 1)
+
+    def test_pagination(self):
+        convos = [{"id": i, "user_key": USER, "title": f"c{i}", "date": "today", "messages": []} for i in range(1, 26)]
+        self.repo.save_conversations(USER, convos)
+
+        first_page = self.repo.list_conversations(USER, limit=10)
+        second_page = self.repo.list_conversations(USER, limit=10, offset=10)
+        self.assertEqual([c["id"] for c in first_page], list(range(25, 15, -1)))
+        self.assertEqual(second_page[0]["id"], 15)
+        self.assertEqual(self.repo.count_conversations(USER), 25)
+        after = self.repo.list_conversations(USER, limit=10, before_id=first_page[-1]["id"])
+        self.assertEqual([c["id"] for c in after], list(range(15, 5, -1)))
+        self.assertEqual([c["id"] for c in self.repo.list_conversations(USER, before_id=3)], [2, 1])
+
+        messages = [_message(str(n)) for n in range(30)]
+        self.repo.create_conversation(USER, {"id": 26, "user_key": USER, "title": "long", "date": "today", "messages": messages})
+        page = self.repo.get_messages(USER, 26, limit=5, offset=10)
+        self.assertEqual([m["message"] for m in page], [str(n) for n in range(10, 15)])
+
+    def test_open_conversation_by_id(self):
+        self.repo.save_conversations(USER, [{"id": 7, "title": "deep", "messages": [_message("hi")]}])
+        convo = self.repo.open_conversation(USER, 7)
+        self.assertEqual(convo["title"], "deep")
+        self.assertNotIn("message_count", convo)
+        self.assertEqual(len(convo["messages"]), 1)
+        self.assertFalse(convo["messages"].is_loaded)
+        self.assertIsNone(self.repo.open_conversation(USER, 8))
+        self.assertIsNone(self.repo.open_conversation("someone@else.com", 7))
+
+    def test_statistics(self):
+        self.repo.save_conversations(USER, [
+            {"id": 1, "title": "a", "messages": [_message("hi"), _message("hello", "bot")]},
+            {"id": 2, "title": "b", "messages": [_message("again")]},
+        ])
+        self.assertEqual(self.repo.statistics(USER), {"conversations": 2, "messages": 3, "user_messages": 2})
+
+    def test_users_are_isolated(self):
+        self.repo.save_conversations(USER, [{"id": 1, "title": "mine", "messages": []}])
+        self.repo.save_conversations("10.0.0.1", [{"id": 1, "title": "guest", "messages": []}])
+        self.assertEqual(self.repo.get_conversation(USER, 1)["title"], "mine")
+        self.repo.delete_user("10.0.0.1")
+        self.assertEqual(self.repo.count_conversations(USER), 1)
+
+    def test_search_is_ranked_and_highlighted(self):
+        convo = {"id": 1, "user_key": USER, "title": "Work", "date": "today",
+                 "messages": [_message("I feel anxious about my exam tomorrow"), _message("Breathing helps", "bot")]}
+        self.repo.save_conversations(USER, [convo])
+        # Appended messages are indexed incrementally
+        convo["messages"].append(_message("Still anxious, very anxious"))
+        self.repo.save_conversations(USER, [convo])
+        self.repo.save_conversations("someone@else.com", [{"id": 1, "title": "x", "messages": [_message("anxious too")]}])
+
+        results = self.repo.search(USER, "anxi")
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]["title"], "Work")
+        matches = results[0]["matches"]
+        self.assertEqual(len(matches), 2)
+        self.assertIn("Still anxious", matches[0]["snippet"])
+        start, end = matches[0]["highlights"][0]
+        self.assertEqual(matches[0]["snippet"][start:end].lower(), "anxious")
+
+        self.assertEqual(self.repo.search(USER, "work")[0]["matches"], [])
+        self.assertEqual(self.repo.search(USER, '"*'), [])
+
+    def test_search_index_is_scoped_by_owner(self):
+        self.repo.save_conversations(USER, [{"id": 1, "title": "a", "messages": [_message("calm"), _message("calm again")]}])
+        self.repo.save_conversations("10.0.0.1", [{"id": 1, "title": "b", "messages": [_message("calm")]}])
+        if not self.repo.has_fts:
+            self.skipTest("FTS5 is not available")
+        owned = db.execute(
+            self.repo.db_path, "SELECT COUNT(*) FROM messages_fts WHERE messages_fts MATCH ?",
+            ('owner : "%s"' % USER.encode().hex().upper(),),
+        ).fetchone()[0]
+        self.assertEqual(owned, 2)
+        self.assertEqual(len(self.repo.search("10.0.0.1", "calm")[0]["matches"]), 1)
+        self.repo.delete_user("10.0.0.1")
+        self.assertEqual(self.repo.search("10.0.0.1", "calm"), [])
+        self.assertEqual(len(self.repo.search(USER, "calm")[0]["matches"]), 2)
+
+    def test_old_search_index_is_rebuilt_with_owner(self):
+        path = os.path.join(self.base_dir, "old.db")
+        conn = db.get_connection(path)
+        conn.executescript(SCHEMA)
+        try:
+            conn.execute("CREATE VIRTUAL TABLE messages_fts USING fts5(message, content='messages', content_rowid='rowid')")
+        except sqlite3.OperationalError:
+            self.skipTest("FTS5 is not available")
+        conn.execute("INSERT INTO messages (user_key, convo_id, seq, message) VALUES (?, 1, 0, 'hopeful')", (USER,))
+        conn.execute(
+            "INSERT INTO conversations (user_key, id, title, created_at, updated_at) VALUES (?, 1, 't', '', '')", (USER,)
+        )
+
+        repo = ConversationRepository(path)
+        self.assertEqual(len(repo.search(USER, "hope")[0]["matches"]), 1)
+
+    def test_like_fallback_matches_wildcards_literally(self):
+        self.repo.has_fts = False
+        self.repo.save_conversations(USER, [
+            {"id": 1, "title": "50% better", "messages": [_message("about 100% sure")]},
+            {"id": 2, "title": "5000 steps", "messages": [_message("1000 times"), _message("snake_case")]},
+        ])
+        self.assertEqual([r["convo_id"] for r in self.repo.search(USER, "100%")], [1])
+        self.assertEqual([r["convo_id"] for r in self.repo.search(USER, "50%")], [1])
+        self.assertEqual(len(self.repo.search(USER, "e_c")[0]["matches"]), 1)
+        self.assertEqual(self.repo.search(USER, "0_0"), [])
+
+    def test_migrates_legacy_json(self):
+        legacy = os.path.join(self.base_dir, "conversations_test_at_example_dot_com.json")
+        with open(legacy, "w", encoding="utf-8") as f:
+            json.dump([{"id": 3, "title": "Old", "messages": [_message("x")]}], f)
+
+        self.repo.migrate_user(USER, base_dir=self.base_dir)
+        loaded = self.repo.load_conversations(USER)
+        self.assertEqual(loaded[0]["title"], "Old")
+        self.assertEqual(self.repo.get_messages(USER, 3)[0]["message"], "x")
+        self.assertFalse(os.path.exists(legacy))
+
+    def test_migrates_log_directory(self):
+        log_dir = os.path.join(self.base_dir, "conversations_test_at_example_dot_com")
+        os.makedirs(log_dir)
+        with open(os.path.join(log_dir, "meta.jsonl"), "w", encoding="utf-8") as f:
+            f.write(json.dumps({"op": "put", "id": 1, "meta": {"id": 1, "title": "Logged"}, "count": 1}) + "\n")
+        with open(os.path.join(log_dir, "1.jsonl"), "w", encoding="utf-8") as f:
+            f.write(json.dumps(_message("kept")) + "\n" + json.dumps(_message("uncommitted")) + "\n")
+
+        self.repo.migrate_user(USER, base_dir=self.base_dir)
+        self.assertEqual([m["message"] for m in self.repo.get_messages(USER, 1)], ["kept"])
+        self.assertTrue(os.path.isdir(log_dir + ".migrated"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from core import conversation_store
+from core.conversation_store import LazyMessages
+
+
+USER = "test@example.com"
+
+
+def _message(text, sender="user"):
+    return {"sender": sender, "message": text, "time": "10:00 AM"}
+
+
+def _write_jsonl(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+class TestLazyMessages(unittest.TestCase):
+    def test_messages_load_lazily(self):
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return [_message("a"), _message("b")]
+
+        messages = LazyMessages(loader, 2)
+        self.assertEqual(len(messages), 2)
+        self.assertTrue(messages)
+        self.assertFalse(messages.is_loaded)
+        self.assertEqual(messages[-1]["message"], "b")
+        self.assertTrue(messages.is_loaded)
+        messages.append(_message("c"))
+        self.assertEqual(len(messages), 3)
+        self.assertEqual(len(calls), 1)
+        self.assertIsInstance(messages[1:], list)
+
+
+class TestReadHistory(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def test_reads_legacy_json(self):
+        legacy = conversation_store.legacy_path(USER, self.base_dir)
+        with open(legacy, "w", encoding="utf-8") as f:
+            json.dump([{"id": 1, "title": "Old", "messages": [_message("x")]}, {"title": "No id"}], f)
+
+        self.assertTrue(conversation_store.has_history(USER, self.base_dir))
+        history = conversation_store.read_history(USER, self.base_dir)
+        self.assertEqual([c["id"] for c in history], [1, 2])
+        self.assertEqual(history[1]["messages"], [])
+
+        conversation_store.retire_history(USER, self.base_dir)
+        self.assertFalse(conversation_store.has_history(USER, self.base_dir))
+        self.assertTrue(os.path.exists(legacy + ".migrated"))
+
+    def test_reads_log_directory_up_to_the_recorded_count(self):
+        path = conversation_store.log_dir(USER, self.base_dir)
+        os.makedirs(path)
+        _write_jsonl(os.path.join(path, "meta.jsonl"), [
+            {"op": "put", "id": 1, "meta": {"id": 1, "title": "Chat"}, "count": 2},
+            {"op": "put", "id": 2, "meta": {"id": 2, "title": "Gone"}, "count": 0},
+            {"op": "delete", "id": 2},
+        ])
+        # "two" was appended again after a crash before its metadata record
+        _write_jsonl(os.path.join(path, "1.jsonl"), [_message("one"), _message("two"), _message("two")])
+
+        history = conversation_store.read_history(USER, self.base_dir)
+        self.assertEqual(len(history), 1)
+        self.assertEqual([m["message"] for m in history[0]["messages"]], ["one", "two"])
+
+    def test_no_history(self):
+        self.assertFalse(conversation_store.has_history(USER, self.base_dir))
+        self.assertEqual(conversation_store.read_history(USER, self.base_dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from core import db
+
+
+class TestConnectionManager(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.base_dir, "test.db")
+        db.ensure_schema(self.path, "CREATE TABLE IF NOT EXISTS items (name TEXT UNIQUE);")
+
+    def tearDown(self):
+        db.close_all()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def test_connection_is_reused_and_configured(self):
+        conn = db.get_connection(self.path)
+        self.assertIs(conn, db.get_connection(self.path))
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        self.assertEqual(conn.execute("PRAGMA busy_timeout").fetchone()[0], db.BUSY_TIMEOUT_MS)
+
+    def test_threads_get_their_own_connection(self):
+        main_conn = db.get_connection(self.path)
+        seen = []
+
+        def worker():
+            seen.append(db.get_connection(self.path))
+            db.execute(self.path, "INSERT INTO items VALUES ('from thread')")
+            db.close_all()
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        self.assertIsNot(seen[0], main_conn)
+        self.assertEqual(db.execute(self.path, "SELECT COUNT(*) FROM items").fetchone()[0], 1)
+
+    def test_transaction_commits_and_rolls_back(self):
+        with db.transaction(self.path) as conn:
+            conn.execute("INSERT INTO items VALUES ('a')")
+            with db.transaction(self.path) as inner:
+                inner.execute("INSERT INTO items VALUES ('b')")
+
+        with self.assertRaises(Exception):
+            with db.transaction(self.path) as conn:
+                conn.execute("INSERT INTO items VALUES ('c')")
+                conn.execute("INSERT INTO items VALUES ('a')")  # violates UNIQUE
+
+        names = [r[0] for r in db.execute(self.path, "SELECT name FROM items ORDER BY name")]
+        self.assertEqual(names, ["a", "b"])
+
+    def test_migrate_runs_upgrade_once(self):
+        calls = []
+
+        def upgrade(conn, current_version):
+            calls.append(current_version)
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_items_name ON items (name)")
+
+        db.migrate(self.path, 1, upgrade)
+        db.migrate(self.path, 1, upgrade)
+        self.assertEqual(calls, [0])
+        self.assertEqual(db.execute(self.path, "PRAGMA user_version").fetchone()[0], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+
+try:
+    import numpy as np
+    import pandas as pd
+    import scipy  # noqa: F401
+    HAS_DEPS = True
+except ImportError:
+    HAS_DEPS = False
+
+
+@unittest.skipUnless(HAS_DEPS, "numpy, pandas and scipy are not installed")
+class TestFeatureMatrix(unittest.TestCase):
+    def setUp(self):
+        from core import feature_matrix
+
+        self.fm = feature_matrix
+        rng = np.random.default_rng(0)
+        self.dates = pd.date_range("2024-06-01", periods=40, freq="D")
+        self.mood = pd.DataFrame({
+            "timestamp": self.dates + pd.Timedelta(hours=9),
+            "mood_numeric": rng.integers(1, 6, 40),
+            "activities": [["Walk"] if i % 3 else [] for i in range(40)],
+        }).drop(index=[5, 6])
+        self.weather = pd.DataFrame({
+            "time": self.dates,
+            "temp_avg": rng.normal(15, 5, 40),
+            "pressure": 1013.0,
+        })
+        self.weather.loc[10:14, "temp_avg"] = np.nan
+        self.wearables = [
+            {"date": day.date().isoformat(), "hrv_ms": float(rng.normal(50, 8)), "steps": None}
+            for day in self.dates[::2]
+        ]
+
+    def test_matrix_joins_sources_on_calendar_days(self):
+        matrix = self.fm.build_feature_matrix(self.mood, self.weather, self.wearables)
+        self.assertEqual(len(matrix), 40)
+        self.assertTrue(np.isnan(matrix.loc["2024-06-06", "mood_numeric"]))
+        self.assertEqual(matrix["activity:Walk"].sum(), sum(1 for i in range(40) if i % 3 and i not in (5, 6)))
+        self.assertTrue(np.isnan(matrix.loc["2024-06-02", "hrv_ms"]))
+
+    def test_correlations_match_pairwise_pandas(self):
+        matrix = self.fm.build_feature_matrix(self.mood, self.weather, self.wearables)
+        result = self.fm.correlate(matrix, min_samples=7)
+        expected = matrix.corr(min_periods=7)
+        self.assertLess((result["r"] - expected).abs().max().max(), 1e-9)
+        # Constant columns and too few samples are masked
+        self.assertTrue(np.isnan(result["r"].loc["mood_numeric", "pressure"]))
+        self.assertTrue(np.isnan(self.fm.correlate(matrix, min_samples=30)["r"].loc["mood_numeric", "hrv_ms"]))
+
+    def test_p_values_match_t_test(self):
+        from scipy import stats
+
+        matrix = self.fm.build_feature_matrix(self.mood, self.weather)
+        pair = matrix[["mood_numeric", "temp_avg"]].dropna()
+        r, p = stats.pearsonr(pair["mood_numeric"], pair["temp_avg"])
+        result = self.fm.correlate(matrix)
+        self.assertAlmostEqual(result["r"].loc["mood_numeric", "temp_avg"], r)
+        self.assertAlmostEqual(result["p"].loc["mood_numeric", "temp_avg"], p)
+        self.assertEqual(result["n"].loc["mood_numeric", "temp_avg"], len(pair))
+
+    def test_lagged_correlation_shifts_by_days(self):
+        matrix = self.fm.build_feature_matrix(self.mood, self.weather)
+        lagged = self.fm.cross_correlate(matrix, max_lag=3)
+        pair = pd.concat([matrix["mood_numeric"], matrix["temp_avg"].shift(2)], axis=1).dropna()
+        self.assertAlmostEqual(lagged["r"].loc[2, "temp_avg"], pair.corr().iloc[0, 1])
+        self.assertEqual(lagged["n"].loc[2, "temp_avg"], len(pair))
+
+    def test_reports_are_cached_by_version(self):
+        first = self.fm.correlation_report(self.mood, self.weather, versions=("a@x.com", 1))
+        self.assertIs(self.fm.correlation_report(self.mood, versions=("a@x.com", 1)), first)
+        self.assertIsNot(self.fm.correlation_report(self.mood, self.weather, versions=("a@x.com", 2)), first)
+        self.assertIn("temp_avg", first["target"].index)
+
+
+if __name__ == "__main__":
+    unittest.main()
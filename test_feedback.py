@@ -0,0 +1,92 @@
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from core import db
+
+try:
+    from core import utils
+    HAS_DEPS = True
+except ImportError:
+    HAS_DEPS = False
+
+
+LEGACY_FEEDBACK_TABLE = """
+CREATE TABLE feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    convo_id INTEGER,
+    message TEXT,
+    feedback TEXT,
+    comment TEXT,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+
+@unittest.skipUnless(HAS_DEPS, "streamlit and the app dependencies are not installed")
+class TestFeedback(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.base_dir, "feedback.db")
+        self.session = {"user_profile": {"email": "a@x.com"}}
+        self.ip = "10.0.0.1"
+        for patcher in (
+            mock.patch.object(db, "FEEDBACK_DB", self.path),
+            mock.patch.object(utils, "st", SimpleNamespace(session_state=self.session)),
+            mock.patch.object(utils, "cached_user_ip", lambda: self.ip),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        db.close_all()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def _rows(self):
+        return db.execute(self.path, "SELECT user_email, convo_id, feedback, comment FROM feedback").fetchall()
+
+    def test_repeated_save_updates_one_row(self):
+        utils.save_feedback(1, "Take a breath.", "positive")
+        utils.save_feedback(1, "Take a breath.", "negative", "too short")
+        self.assertEqual(self._rows(), [(utils.hash_email("a@x.com"), 1, "negative", "too short")])
+        self.assertEqual(utils.get_feedback(1, "Take a breath."), "negative")
+
+    def test_guest_feedback_is_per_guest(self):
+        self.session["user_profile"] = {}
+        utils.save_feedback(1, "Hello", "positive")
+        self.assertEqual(self._rows()[0][0], utils.hash_email("10.0.0.1"))
+        self.assertEqual(utils.get_feedback(1, "Hello"), "positive")
+
+        # Another guest's conversation 1 is a different conversation
+        self.ip = "10.0.0.2"
+        self.assertIsNone(utils.get_feedback(1, "Hello"))
+        utils.save_feedback(1, "Hello", "negative")
+        self.ip = "10.0.0.1"
+        self.assertEqual(utils.get_feedback(1, "Hello"), "positive")
+        self.assertEqual(len(self._rows()), 2)
+
+    def test_migration_dedupes_existing_rows(self):
+        conn = db.get_connection(self.path)
+        conn.executescript(LEGACY_FEEDBACK_TABLE)
+        conn.executemany(
+            "INSERT INTO feedback (convo_id, message, feedback) VALUES (?, ?, ?)",
+            [(1, "Hello", "positive"), (1, "Hello", "negative"), (1, "Bye", "positive"), (2, "Hello", "positive")],
+        )
+
+        utils.get_feedback_db()
+        rows = db.execute(self.path, "SELECT user_email, convo_id, message, feedback FROM feedback ORDER BY id").fetchall()
+        self.assertEqual(rows, [
+            ("unknown", 1, "Hello", "negative"),
+            ("unknown", 1, "Bye", "positive"),
+            ("unknown", 2, "Hello", "positive"),
+        ])
+        # Ownerless rows aren't shown to guests
+        self.session["user_profile"] = {}
+        self.assertIsNone(utils.get_feedback(1, "Hello"))
+
+
+if __name__ == "__main__":
+    unittest.main()
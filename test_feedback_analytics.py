@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from core import db, feedback_analytics
+
+
+FEEDBACK_TABLE = """
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_email TEXT,
+    convo_id INTEGER,
+    message TEXT,
+    feedback TEXT,
+    comment TEXT,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+    message_hash TEXT
+);
+"""
+
+
+class TestFeedbackAnalytics(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.base_dir, "feedback.db")
+        self.conn = db.get_connection(self.path)
+        self.conn.executescript(FEEDBACK_TABLE)
+        # Rows written before the rollups existed are backfilled
+        self._rate("alice", 1, "a", "positive", "2020-01-01 10:00:00")
+        with db.transaction(self.path) as conn:
+            feedback_analytics.install_rollups(conn)
+
+    def tearDown(self):
+        db.close_all()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def _rate(self, user, convo_id, message_hash, value, timestamp=None):
+        self.conn.execute('''
+            INSERT INTO feedback (user_email, convo_id, message_hash, feedback, timestamp)
+            VALUES (?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+        ''', (user, convo_id, message_hash, value, timestamp))
+
+    def test_statistics_follow_inserts_updates_and_deletes(self):
+        self._rate("alice", 1, "b", "up")
+        self._rate("alice", 2, "c", "down")
+        self._rate("bob", 1, "d", "up")
+        self.assertEqual(feedback_analytics.get_statistics(self.conn),
+                         {"total": 4, "positive": 3, "negative": 1, "positive_percentage": 75.0})
+
+        self.conn.execute("UPDATE feedback SET feedback = 'up' WHERE message_hash = 'c'")
+        self.conn.execute("DELETE FROM feedback WHERE user_email = 'bob'")
+        stats = feedback_analytics.get_statistics(self.conn, user_email="alice")
+        self.assertEqual((stats["positive"], stats["negative"]), (3, 0))
+        self.assertEqual(feedback_analytics.get_statistics(self.conn, "alice", convo_id=2)["positive"], 1)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM feedback_daily_user WHERE user_email = 'bob'").fetchone()[0], 0)
+
+    def test_trend_covers_recent_days_only(self):
+        self._rate("alice", 1, "b", "up")
+        self._rate("alice", 1, "c", "down")
+
+        trend = feedback_analytics.get_daily_trend(self.conn, days=7)
+        self.assertEqual(len(trend), 7)
+        self.assertEqual(sum(day["total"] for day in trend), 2)
+        self.assertEqual(trend[-1]["positive_percentage"], 50.0)
+        self.assertEqual(feedback_analytics.get_helpfulness_rate(self.conn, days=7), 50.0)
+        self.assertEqual(feedback_analytics.get_statistics(self.conn)["total"], 3)
+
+    def test_retention_purge_keeps_the_rollups(self):
+        self._rate("alice", 1, "b", "down")
+        before = feedback_analytics.get_statistics(self.conn)
+        with db.transaction(self.path) as conn:
+            removed = feedback_analytics.purge_before(conn, "2021-01-01")
+        self.assertEqual(removed, 1)
+        self.assertEqual(feedback_analytics.get_statistics(self.conn), before)
+
+        # Ordinary deletes still come off the rollups
+        self.conn.execute("DELETE FROM feedback WHERE message_hash = 'b'")
+        self.assertEqual(feedback_analytics.get_statistics(self.conn)["negative"], 0)
+        self.assertEqual(feedback_analytics.get_statistics(self.conn)["total"], 1)
+
+    def test_delete_user_removes_purged_history_too(self):
+        with db.transaction(self.path) as conn:
+            feedback_analytics.purge_before(conn, "2021-01-01")
+            feedback_analytics.delete_user(conn, "alice")
+        self.assertEqual(feedback_analytics.get_statistics(self.conn, user_email="alice")["total"], 0)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM feedback_daily_convo").fetchone()[0], 0)
+
+    def test_total_counts_only_rated_feedback(self):
+        self._rate("alice", 1, "b", "meh")
+        stats = feedback_analytics.get_statistics(self.conn, user_email="alice")
+        self.assertEqual((stats["total"], stats["positive"], stats["negative"]), (1, 1, 0))
+        self.assertEqual(feedback_analytics.get_daily_trend(self.conn, days=1)[0]["total"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
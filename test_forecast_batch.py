@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from core import db, forecast_store
+from core.forecast_batch import iter_daily_series, run_batch, save_rows
+from core.forecast_service import ForecastService, history_start, series_fingerprint
+from core.mood_store import MoodStore, build_entry
+
+
+def fake_fit(dates, values, forecast_days):
+    return {"model_type": "Fake", "dates": dates[-forecast_days:], "values": values[-forecast_days:]}
+
+
+class TestForecastBatch(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.dir, "mood.db")
+        self.store = MoodStore(self.db_path, legacy_file=None)
+        today = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        for day in range(10):
+            moment = today - timedelta(days=day)
+            self.store.add_many("a@x.com", [
+                build_entry("good", timestamp=moment.isoformat()),
+                build_entry("low", timestamp=(moment + timedelta(hours=1)).isoformat()),
+            ])
+        for day in range(3):
+            self.store.add("short@x.com", build_entry("great", timestamp=(today - timedelta(days=day)).isoformat()))
+        self.store.add("a@x.com", build_entry("very_low", timestamp=(today - timedelta(days=60)).isoformat()))
+
+    def tearDown(self):
+        db.close_all()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_streams_daily_means_in_window(self):
+        series = list(iter_daily_series(self.db_path))
+        self.assertEqual([user for user, _, _ in series], ["a@x.com"])
+        _, dates, values = series[0]
+        self.assertEqual(len(dates), 10)
+        self.assertEqual(dates, sorted(dates))
+        self.assertTrue(all(value == 3.0 for value in values))
+        self.assertGreaterEqual(dates[0], history_start().date().isoformat())
+
+    def test_batch_results_are_served_by_forecast_service(self):
+        series = list(iter_daily_series(self.db_path))
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results, report = run_batch(series, 7, workers=2, chunk_size=1, executor=executor,
+                                        fit=fake_fit, progress=None)
+        self.assertEqual((report["users"], report["fitted"]), (1, 1))
+        user_key, fingerprint, payload, _ = results[0]
+        save_rows([(user_key, fingerprint, payload, 0, [])], self.db_path)
+
+        service = ForecastService(
+            executor=ThreadPoolExecutor(max_workers=1), fit=fake_fit,
+            precomputed=lambda key: forecast_store.load_forecast(key, self.db_path),
+        )
+        # The dashboard sends timestamps rather than dates
+        _, dates, values = series[0]
+        self.assertEqual(series_fingerprint([f"{d}T00:00:00" for d in dates], values, 7), fingerprint)
+        served, status = service.request(user_key, [f"{d}T00:00:00" for d in dates], values, 7)
+        self.assertEqual((served, status), (payload, "fresh"))
+        self.assertEqual(service.stats["fits"], 0)
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from core.forecast_service import ForecastService, series_fingerprint
+
+
+DATES = [f"2024-06-{day:02d}" for day in range(1, 11)]
+VALUES = [3.0, 3.5, 4.0, 2.0, 3.0, 3.5, 4.0, 4.5, 3.0, 2.5]
+
+
+def fake_fit(dates, values, forecast_days):
+    return {"model_type": "Fake", "dates": dates[-forecast_days:], "values": values[-forecast_days:]}
+
+
+def crashing_fit(dates, values, forecast_days):
+    # Runs in a worker process: a negative first value stands for an OOM kill
+    if values[0] < 0:
+        os._exit(1)
+    if values[0] > 10:
+        time.sleep(values[0] - 10)
+    return fake_fit(dates, values, forecast_days)
+
+
+class TestForecastService(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+        def fit(dates, values, forecast_days):
+            self.calls.append(list(values))
+            return fake_fit(dates, values, forecast_days)
+
+        self.service = ForecastService(executor=ThreadPoolExecutor(max_workers=1), fit=fit, timeout=5)
+
+    def test_fingerprint_tracks_series_and_horizon(self):
+        base = series_fingerprint(DATES, VALUES, 7)
+        self.assertEqual(base, series_fingerprint(list(DATES), list(VALUES), 7))
+        self.assertNotEqual(base, series_fingerprint(DATES, VALUES[:-1] + [5.0], 7))
+        self.assertNotEqual(base, series_fingerprint(DATES, VALUES, 14))
+
+    def test_pending_then_fresh_and_cached(self):
+        payload, status = self.service.request("a", DATES, VALUES, 7)
+        self.assertEqual((payload, status), (None, "pending"))
+        self.assertTrue(self.service.wait(timeout=5))
+
+        payload, status = self.service.request("a", DATES, VALUES, 7)
+        self.assertEqual(status, "fresh")
+        self.assertEqual(payload["model_type"], "Fake")
+        self.service.request("a", DATES, VALUES, 7)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_new_data_serves_last_good_while_refitting(self):
+        self.service.request("a", DATES, VALUES, 7)
+        self.service.wait(timeout=5)
+        first, _ = self.service.request("a", DATES, VALUES, 7)
+
+        payload, status = self.service.request("a", DATES + ["2024-06-11"], VALUES + [4.0], 7)
+        self.assertEqual(status, "pending")
+        self.assertIs(payload, first)
+        self.service.wait(timeout=5)
+        payload, status = self.service.request("a", DATES + ["2024-06-11"], VALUES + [4.0], 7)
+        self.assertEqual((status, payload["values"][-1]), ("fresh", 4.0))
+
+    def test_timed_out_series_is_not_resubmitted(self):
+        release = threading.Event()
+
+        def slow_fit(dates, values, forecast_days):
+            release.wait(2)
+            return fake_fit(dates, values, forecast_days)
+
+        service = ForecastService(executor=ThreadPoolExecutor(max_workers=1), fit=slow_fit, timeout=0.05)
+        service.request("a", DATES, VALUES, 7)
+        self.assertTrue(service.wait(timeout=2))
+        release.set()
+        for _ in range(3):
+            payload, status = service.request("a", DATES, VALUES, 7)
+        self.assertEqual((status, payload), ("fresh", {"model_type": None}))
+        self.assertEqual((service.stats["fits"], service.stats["timeouts"]), (1, 1))
+
+
+class TestFitWorkerPool(unittest.TestCase):
+    def setUp(self):
+        self.service = ForecastService(workers=1, fit=crashing_fit, timeout=1.5)
+
+    def tearDown(self):
+        self.service.shutdown()
+
+    def test_worker_crash_does_not_break_later_requests(self):
+        self.service.request("a", DATES, [-1.0] + VALUES[1:], 7)
+        self.assertTrue(self.service.wait(timeout=30))
+        self.assertEqual(self.service.stats["errors"], 1)
+
+        self.assertEqual(self.service.request("b", DATES, VALUES, 7)[1], "pending")
+        self.assertTrue(self.service.wait(timeout=30))
+        payload, status = self.service.request("b", DATES, VALUES, 7)
+        self.assertEqual((status, payload["model_type"]), ("fresh", "Fake"))
+
+    def test_deadline_starts_when_the_fit_does(self):
+        # Two 1s fits on one worker: the second waits 1s in the queue but
+        # still finishes inside its own 1.5s deadline
+        for user, first in (("a", 11.0), ("b", 11.1)):
+            self.service.request(user, DATES, [first] + VALUES[1:], 7)
+        self.assertTrue(self.service.wait(timeout=30))
+        self.assertEqual((self.service.stats["fits"], self.service.stats["timeouts"]), (2, 0))
+        self.assertEqual(self.service.request("b", DATES, [11.1] + VALUES[1:], 7)[1], "fresh")
+
+    def test_overrunning_fit_is_stopped(self):
+        self.service.request("a", DATES, [15.0] + VALUES[1:], 7)
+        self.assertTrue(self.service.wait(timeout=30))
+        self.assertEqual(self.service.stats["timeouts"], 1)
+        self.service.request("b", DATES, VALUES, 7)
+        self.assertTrue(self.service.wait(timeout=30))
+        self.assertEqual(self.service.request("b", DATES, VALUES, 7)[1], "fresh")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+try:
+    import requests  # noqa: F401
+    import streamlit  # noqa: F401
+    HAS_DEPS = True
+except ImportError:
+    HAS_DEPS = False
+
+
+@unittest.skipUnless(HAS_DEPS, "requests and streamlit are not installed")
+class TestGeo(unittest.TestCase):
+    def setUp(self):
+        from core import geo
+
+        self.geo = geo
+        geo._ip_locations.clear()
+
+    def test_country_from_coords_offline(self):
+        cities = {
+            (51.51, -0.13): "GB", (53.35, -6.26): "IE", (47.37, 8.54): "CH", (48.58, 7.75): "FR",
+            (48.14, 11.58): "DE", (22.32, 114.17): "HK", (1.35, 103.82): "SG", (28.61, 77.21): "IN",
+            (31.55, 74.34): "PK", (43.65, -79.38): "CA", (47.61, -122.33): "US", (-33.87, 151.21): "AU",
+        }
+        with mock.patch.object(self.geo.requests, "get") as get:
+            for (lat, lon), code in cities.items():
+                self.assertEqual(self.geo.country_from_coords(lat, lon), code, (lat, lon))
+            self.assertIsNone(self.geo.country_from_coords(-60.0, -140.0))
+        get.assert_not_called()
+
+    def test_ip_lookups_are_cached(self):
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {"latitude": 52.52, "longitude": 13.4, "country_code": "de", "city": "Berlin"}
+        with mock.patch.object(self.geo.requests, "get", return_value=response) as get:
+            first = self.geo.lookup_ip("203.0.113.7")
+            self.assertEqual(self.geo.lookup_ip("203.0.113.7"), first)
+        self.assertEqual(first["country_code"], "DE")
+        self.assertEqual(get.call_count, 1)
+
+    def test_browser_coords_skip_the_network(self):
+        with mock.patch.object(self.geo.requests, "get") as get:
+            self.assertEqual(self.geo.user_country({"latitude": 48.86, "longitude": 2.35}), "FR")
+        get.assert_not_called()
+
+    def test_forwarded_header_is_only_trusted_from_proxies(self):
+        context = SimpleNamespace(headers={"X-Forwarded-For": "8.8.8.8, 1.1.1.1"}, ip_address="9.9.9.9")
+        with mock.patch.object(self.geo.st, "context", context, create=True):
+            self.assertEqual(self.geo.client_ip(trusted_hops=0), "9.9.9.9")
+            self.assertEqual(self.geo.client_ip(trusted_hops=1), "1.1.1.1")
+            self.assertEqual(self.geo.client_ip(trusted_hops=2), "8.8.8.8")
+            self.assertIsNone(self.geo.client_ip(trusted_hops=3))
+
+    def test_ttl_cache_expires(self):
+        cache = self.geo.TTLCache(ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=0.01)
+        time.sleep(0.02)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+
+
+if __name__ == "__main__":
+    unittest.main()
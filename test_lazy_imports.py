@@ -0,0 +1,69 @@
+import os
+import sys
+import tempfile
+import textwrap
+import unittest
+
+import bench_import_time
+from core.lazy import LazyModule, is_loaded, lazy_import
+
+
+class TestLazyImport(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        with open(os.path.join(self.dir, "talkheal_heavy_mod.py"), "w") as f:
+            f.write("VALUE = 42\n")
+        sys.path.insert(0, self.dir)
+
+    def tearDown(self):
+        sys.path.remove(self.dir)
+        sys.modules.pop("talkheal_heavy_mod", None)
+
+    def test_imports_on_first_attribute_access(self):
+        module = lazy_import("talkheal_heavy_mod")
+        self.assertIsInstance(module, LazyModule)
+        self.assertFalse(is_loaded("talkheal_heavy_mod"))
+        self.assertEqual(module.VALUE, 42)
+        self.assertTrue(is_loaded("talkheal_heavy_mod"))
+
+    def test_returns_already_imported_module(self):
+        self.assertIs(lazy_import("json"), sys.modules["json"])
+
+    def test_missing_module_fails_on_use(self):
+        module = lazy_import("talkheal_no_such_module")
+        with self.assertRaises(ImportError):
+            module.anything
+
+
+class TestImportTimeBenchmark(unittest.TestCase):
+    def test_module_imports_skips_function_bodies(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as f:
+            f.write(textwrap.dedent("""
+                import json
+                try:
+                    import plotly.express as px
+                except ImportError:
+                    px = None
+
+                def render():
+                    import pandas
+            """))
+        try:
+            self.assertEqual(bench_import_time.module_imports(f.name), ["import json", "import plotly.express as px"])
+        finally:
+            os.unlink(f.name)
+
+    def test_parse_importtime(self):
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   _json\n"
+            "import time:       300 |        420 | json\n"
+        )
+        self.assertEqual(
+            bench_import_time.parse_importtime(stderr),
+            [("_json", 120, 120, 1), ("json", 300, 420, 0)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from core import db
+from core.fake_llm import FakeGenerativeModel
+from core.llm_cache import LLMCache, cache_key, cached_generate_content
+
+
+class TestLLMCache(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.base_dir, "cache.db")
+
+    def tearDown(self):
+        db.close_all()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def test_identical_calls_hit_the_cache(self):
+        cache = LLMCache(self.path)
+        model = FakeGenerativeModel(reply="Calm evening talk")
+        first = cached_generate_content(model, "Summarize: hi", cache=cache)
+        second = cached_generate_content(model, "Summarize: hi", cache=cache)
+        cached_generate_content(model, "Summarize: bye", cache=cache)
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(model.calls), 2)
+        stats = cache.stats()
+        self.assertEqual((stats["memory_hits"], stats["misses"]), (1, 2))
+
+    def test_disk_tier_survives_new_instance(self):
+        key = cache_key("m", "prompt", {"temperature": 0.5})
+        self.assertNotEqual(key, cache_key("m", "prompt", {"temperature": 0.2}))
+        LLMCache(self.path).set(key, "value")
+
+        fresh = LLMCache(self.path)
+        self.assertEqual(fresh.get(key), "value")
+        self.assertEqual(fresh.stats()["disk_hits"], 1)
+
+    def test_expiry_and_size_eviction(self):
+        cache = LLMCache(self.path, memory_entries=1, max_disk_bytes=25)
+        cache.set("old", "x" * 10, ttl_seconds=-1)
+        for n in range(4):
+            cache.set(f"k{n}", "y" * 10)
+        cache.evict()
+        self.assertIsNone(cache.get("old"))
+        remaining = [r[0] for r in db.execute(self.path, "SELECT key FROM llm_cache")]
+        self.assertEqual(len(remaining), 2)
+        self.assertNotIn("old", remaining)
+
+    def test_entries_are_scoped_and_purged_per_owner(self):
+        cache = LLMCache(self.path)
+        model = FakeGenerativeModel(reply="summary")
+        cached_generate_content(model, "Summarize: hi", cache=cache, owner="a@x.com")
+        cached_generate_content(model, "Summarize: hi", cache=cache, owner="b@x.com")
+        self.assertEqual(len(model.calls), 2)
+        owners = [r[0] for r in db.execute(self.path, "SELECT owner FROM llm_cache")]
+        self.assertNotIn("a@x.com", owners)
+
+        self.assertEqual(cache.purge_owner("a@x.com"), 1)
+        cached_generate_content(model, "Summarize: hi", cache=cache, owner="b@x.com")
+        self.assertEqual(len(model.calls), 2)
+        cached_generate_content(model, "Summarize: hi", cache=LLMCache(self.path), owner="a@x.com")
+        self.assertEqual(len(model.calls), 3)
+
+    def test_model_generation_config_is_part_of_the_key(self):
+        cache = LLMCache(self.path)
+        cold = FakeGenerativeModel(reply="cold")
+        cold._generation_config = {"temperature": 0.1}
+        warm = FakeGenerativeModel(reply="warm")
+        warm._generation_config = {"temperature": 0.9}
+        self.assertEqual(cached_generate_content(cold, "p", cache=cache), "cold")
+        self.assertEqual(cached_generate_content(warm, "p", cache=cache), "warm")
+
+    def test_upgrade_drops_unowned_entries(self):
+        db.execute(self.path, """
+            CREATE TABLE llm_cache (key TEXT PRIMARY KEY, model TEXT, value TEXT NOT NULL, size INTEGER NOT NULL,
+                                    created REAL NOT NULL, expires REAL NOT NULL, last_access REAL NOT NULL)
+        """)
+        db.execute(self.path, "INSERT INTO llm_cache VALUES ('k', 'm', 'v', 1, 0, 9e12, 0)")
+        cache = LLMCache(self.path)
+        self.assertIsNone(cache.get("k"))
+        cache.set("k2", "v", owner="a@x.com")
+        self.assertEqual(cache.purge_owner("a@x.com"), 1)
+
+    def test_unparseable_responses_are_not_cached(self):
+        cache = LLMCache(self.path)
+        model = FakeGenerativeModel(reply="not json")
+        with self.assertRaises(ValueError):
+            cached_generate_content(model, "p", cache=cache, parse=json.loads)
+        self.assertEqual(cache.stats()["stores"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import time
+import unittest
+
+from core import llm
+from core.fake_llm import FakeGenerativeModel
+from core.llm_gateway import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceeded, FakeBackend, LLMGateway,
+)
+
+
+class FlakyModel(FakeGenerativeModel):
+    """Fails with a retryable error a given number of times, then replies."""
+
+    def __init__(self, failures, error=ConnectionError("reset"), **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+        self.failure = error
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        if self.failures > 0:
+            self.failures -= 1
+            self.calls.append({"prompt": prompt})
+            raise self.failure
+        return super().generate_content(prompt, stream=stream, **kwargs)
+
+
+class SlowModel(FakeGenerativeModel):
+    def generate_content(self, prompt, stream=False, **kwargs):
+        time.sleep(0.5)
+        return super().generate_content(prompt, stream=stream, **kwargs)
+
+
+def _gateway(model, **kwargs):
+    kwargs.setdefault("backoff_base", 0.001)
+    return LLMGateway(FakeBackend(model), **kwargs)
+
+
+class TestLLMGateway(unittest.TestCase):
+    def test_retries_transient_errors(self):
+        model = FlakyModel(failures=2, reply="ok")
+        gateway = _gateway(model)
+        self.assertEqual(gateway.generate_content("hi").text, "ok")
+        self.assertEqual(gateway.health()["retries"], 2)
+        self.assertEqual(gateway.health()["state"], "closed")
+
+    def test_non_retryable_errors_are_raised_once(self):
+        model = FlakyModel(failures=5, error=ValueError("blocked"))
+        gateway = _gateway(model)
+        with self.assertRaises(ValueError):
+            gateway.generate_content("hi")
+        self.assertEqual(len(model.calls), 1)
+        self.assertEqual(gateway.breaker.failures, 0)
+
+    def test_deadline(self):
+        gateway = _gateway(SlowModel(), timeout=0.1, max_attempts=1)
+        start = time.monotonic()
+        with self.assertRaises(DeadlineExceeded):
+            gateway.generate_content("hi")
+        self.assertLess(time.monotonic() - start, 0.4)
+
+    def test_circuit_opens_and_recovers(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+        model = FlakyModel(failures=2, reply="back")
+        gateway = _gateway(model, max_attempts=1, breaker=breaker)
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                gateway.generate_content("hi")
+
+        with self.assertRaises(CircuitOpenError):
+            gateway.generate_content("hi")
+        self.assertEqual(len(model.calls), 2)
+
+        now[0] = 11.0
+        self.assertEqual(gateway.generate_content("hi").text, "back")
+        self.assertEqual(breaker.state, "closed")
+
+    def test_abandoned_half_open_stream_releases_the_trial(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        gateway = _gateway(FlakyModel(failures=1, reply="back again", chunk_size=2), max_attempts=1, breaker=breaker)
+        with self.assertRaises(ConnectionError):
+            gateway.generate_content("hi")
+        now[0] = 11.0
+
+        stream = gateway.generate_content("hi", stream=True)
+        next(iter(stream))
+        stream.close()
+        self.assertEqual(breaker.state, "half_open")
+        # Never iterated at all
+        gateway.generate_content("hi", stream=True).close()
+
+        chunks = gateway.generate_content("hi", stream=True)
+        self.assertEqual("".join(chunk.text for chunk in chunks), "back again")
+        self.assertEqual(breaker.state, "closed")
+
+    def test_streams_through_the_gateway(self):
+        gateway = _gateway(FakeGenerativeModel(reply="streamed reply", chunk_size=4))
+        self.assertEqual("".join(llm.stream_text(gateway, "hi")), "streamed reply")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import time
+import unittest
+
+from core import llm
+from core.fake_llm import FakeGenerativeModel
+
+try:
+    from core import utils
+    HAS_DEPS = True
+except ImportError:
+    HAS_DEPS = False
+
+
+class TestStreaming(unittest.TestCase):
+    def test_stream_yields_chunks_in_order(self):
+        model = FakeGenerativeModel(reply="Breathe in slowly, then breathe out.", chunk_size=5)
+        chunks = list(llm.stream_text(model, llm.build_support_prompt("I feel tense")))
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual("".join(chunks), "Breathe in slowly, then breathe out.")
+        self.assertTrue(model.calls[0]["stream"])
+        self.assertIn("User message: I feel tense", model.calls[0]["prompt"])
+
+    def test_first_chunk_arrives_before_generation_finishes(self):
+        model = FakeGenerativeModel(reply="x" * 50, chunk_size=10, delay=0.02)
+        start = time.perf_counter()
+        stream = llm.stream_text(model, "hi")
+        next(stream)
+        first_chunk = time.perf_counter() - start
+        list(stream)
+        total = time.perf_counter() - start
+        self.assertLess(first_chunk, total / 2)
+
+    def test_errors_propagate(self):
+        model = FakeGenerativeModel(error=ValueError("blocked"))
+        with self.assertRaises(ValueError):
+            list(llm.stream_text(model, "hi"))
+
+
+@unittest.skipUnless(HAS_DEPS, "streamlit and the app dependencies are not installed")
+class TestStreamAiResponse(unittest.TestCase):
+    def test_error_before_first_chunk_yields_fallback(self):
+        status = {}
+        model = FakeGenerativeModel(error=ValueError("blocked"))
+        reply = "".join(utils.stream_ai_response("hi", model, status=status))
+        self.assertEqual(reply, utils._ai_error_message(ValueError()))
+        self.assertEqual(status, {})
+
+    def test_error_mid_stream_keeps_only_the_partial_reply(self):
+        status = {}
+        model = FakeGenerativeModel(reply="Breathe in slowly, then out.", chunk_size=5,
+                                    error=ConnectionError("reset"), error_after=2)
+        reply = "".join(utils.stream_ai_response("hi", model, status=status))
+        self.assertEqual(reply, "Breathe in")
+        self.assertTrue(status["interrupted"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,25 +5,33 @@ Test script for the Mood Tracking Dashboard
 
 import sys
 import os
+import shutil
+import tempfile
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from components.mood_dashboard import MoodTracker
-import json
+from core import db
+from core.mood_store import MoodStore
 
 def test_mood_tracker():
     """Test the MoodTracker class functionality"""
     print("🧪 Testing Mood Tracking Dashboard...")
     
-    # Initialize tracker
-    tracker = MoodTracker()
-    print("✅ MoodTracker initialized successfully")
-    
+    # Initialize tracker on a throwaway store, not the app's data/mood.db
+    tmpdir = tempfile.mkdtemp()
+    try:
+        store = MoodStore(os.path.join(tmpdir, "mood.db"), legacy_file=None)
+        tracker = MoodTracker(user_key="test@example.com", store=store)
+        print("✅ MoodTracker initialized successfully")
+        _check_tracker(tracker)
+    finally:
+        db.close_all()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+def _check_tracker(tracker):
     # Test mood data loading
-    if hasattr(tracker, 'data_file') and os.path.exists(tracker.data_file):
-        print(f"✅ Found existing mood data at {tracker.data_file}")
-        print(f"📊 Loaded {len(st.session_state.mood_data)} mood entries")
-    else:
-        print("ℹ️ No existing mood data found (this is normal for first run)")
+    entries = tracker.get_entries()
+    print(f"📊 Loaded {len(entries)} mood entries")
     
     # Test mood level mapping
     test_mood = "good"
@@ -32,11 +40,8 @@ def test_mood_tracker():
     print(f"✅ Mood mapping test: '{test_mood}' -> {numeric_value} -> '{label}'")
     
     # Test adding a new entry
-    test_entry = {
-        "mood_level": "great",
-        "notes": "Test entry for dashboard verification",
-        "timestamp": "2024-01-29T12:00:00"
-    }
+    tracker.add_mood_entry("great", notes="Test entry for dashboard verification", timestamp="2024-01-29T12:00:00")
+    assert [e["mood_level"] for e in tracker.get_entries()] == ["great"]
     
     print("✅ All tests passed! The mood dashboard is ready to use.")
     print("\n📋 Features implemented:")
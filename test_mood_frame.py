@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+try:
+    import pandas  # noqa: F401
+    HAS_PANDAS = True
+except ImportError:
+    HAS_PANDAS = False
+
+from core import db
+from core.mood_store import MoodStore, build_entry
+
+
+@unittest.skipUnless(HAS_PANDAS, "pandas is not installed")
+class TestMoodFrame(unittest.TestCase):
+    def setUp(self):
+        from core.mood_frame import MoodFrame
+
+        self.dir = tempfile.mkdtemp()
+        self.store = MoodStore(os.path.join(self.dir, "mood.db"), legacy_file=None)
+        self.now = datetime(2024, 6, 30, 12, 0)
+        for days_ago, level in ((40, "low"), (10, "good"), (1, "great")):
+            stamp = (self.now - timedelta(days=days_ago)).isoformat()
+            self.store.add("a@x.com", build_entry(level, timestamp=stamp))
+        self.frame = MoodFrame(self.store, "a@x.com")
+
+    def tearDown(self):
+        db.close_all()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_window_is_a_slice_with_derived_columns(self):
+        window = self.frame.window(30, now=self.now)
+        self.assertEqual(list(window["mood_level"]), ["good", "great"])
+        self.assertEqual(list(window["mood_numeric"]), [4, 5])
+        self.assertEqual(window["hour"].iloc[0], 12)
+        self.assertEqual(len(self.frame.window(None)), 3)
+
+    def test_append_updates_frame_and_version(self):
+        self.frame.frame()
+        version = self.frame.version
+        entry = build_entry("okay", timestamp=(self.now - timedelta(days=20)).isoformat())
+        self.store.add("a@x.com", entry)
+        self.frame.append(entry)
+
+        self.assertGreater(self.frame.version, version)
+        frame = self.frame.frame()
+        self.assertTrue(frame.index.is_monotonic_increasing)
+        self.assertEqual(list(frame["mood_level"]), ["low", "okay", "good", "great"])
+
+    def test_rebuilt_frame_does_not_reuse_a_version(self):
+        from core import mood_frame
+
+        seen = {self.frame.version}
+        self.frame.append(build_entry("okay"))
+        seen.add(self.frame.version)
+        # Same user after LRU eviction: a fresh frame must not collide with cached results
+        rebuilt = mood_frame.MoodFrame(self.store, "a@x.com")
+        self.assertNotIn(rebuilt.version, seen)
+        self.assertNotEqual(mood_frame.MoodFrame(self.store, "b@x.com").version, rebuilt.version)
+
+
+if __name__ == "__main__":
+    unittest.main()
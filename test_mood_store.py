@@ -0,0 +1,62 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from core import db
+from core.mood_store import LEGACY_USER_KEY, MoodStore, build_entry
+
+
+class TestMoodStore(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.dir, "mood.db")
+        self.legacy = os.path.join(self.dir, "mood_data.json")
+
+    def tearDown(self):
+        db.close_all()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_entries_are_per_user_and_windowed(self):
+        store = MoodStore(self.db_path, legacy_file=None)
+        now = datetime.now()
+        store.add("a@x.com", build_entry("good", timestamp=(now - timedelta(days=40)).isoformat()))
+        store.add("a@x.com", build_entry("low", "tired", activities=["Exercise"]))
+        store.add("b@x.com", build_entry("great"))
+
+        recent = store.entries("a@x.com", since=now - timedelta(days=30))
+        self.assertEqual([e["mood_level"] for e in recent], ["low"])
+        self.assertEqual(recent[0]["activities"], ["Exercise"])
+        self.assertEqual(len(store.entries("a@x.com")), 2)
+        self.assertEqual(store.summary("b@x.com")[0], 1)
+        self.assertEqual(store.summary("nobody"), (0, None, None))
+
+    def test_window_query_uses_index(self):
+        MoodStore(self.db_path, legacy_file=None)
+        plan = db.execute(
+            self.db_path,
+            "EXPLAIN QUERY PLAN SELECT * FROM mood_entries WHERE user_key = ? AND timestamp >= ?",
+            ("a", "2024"),
+        ).fetchall()
+        self.assertIn("idx_mood_user_timestamp", " ".join(str(row) for row in plan))
+
+    def test_legacy_file_is_imported_once(self):
+        with open(self.legacy, "w") as f:
+            json.dump([
+                {"timestamp": "2024-01-29T12:00:00", "mood_level": "good", "notes": "hi"},
+                {"mood_level": "broken"},
+            ], f)
+        MoodStore(self.db_path, legacy_file=self.legacy)
+        db._applied_schemas.clear()
+        store = MoodStore(self.db_path, legacy_file=self.legacy)
+
+        entries = store.entries(LEGACY_USER_KEY)
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]["context_reason"], "No specific reason")
+        self.assertEqual(entries[0]["day_of_week"], "Monday")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from core import db
+from core.rate_limiter import MemoryBucketStore, RateLimiter, SQLiteBucketStore
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_bucket_limits_and_refills(self):
+        store = MemoryBucketStore()
+        for expected in (True, True, True, False):
+            allowed, _ = store.take("k", capacity=3, rate=1.0, now=100.0)
+            self.assertEqual(allowed, expected)
+        allowed, tokens = store.take("k", capacity=3, rate=1.0, now=101.5)
+        self.assertTrue(allowed)
+        self.assertAlmostEqual(tokens, 0.5)
+
+    def test_prune_drops_only_refilled_buckets(self):
+        store = MemoryBucketStore(max_keys=3)
+        store.take("slow", capacity=10, rate=0.01, now=0.0)
+        for n in range(3):
+            store.take(f"fast{n}", capacity=1, rate=1.0, now=0.0)
+        self.assertEqual(len(store._buckets), 4)
+
+        # Each bucket is judged by its own capacity and rate, not the caller's
+        store.take("new", capacity=1, rate=1.0, now=5.0)
+        self.assertEqual(set(store._buckets), {"slow", "new"})
+        allowed, tokens = store.take("slow", capacity=10, rate=0.01, now=5.0)
+        self.assertTrue(allowed)
+        self.assertAlmostEqual(tokens, 8.05)
+
+    def test_heap_stays_bounded_for_hot_keys(self):
+        store = MemoryBucketStore(max_keys=10)
+        for n in range(1000):
+            store.take(f"k{n % 3}", capacity=5, rate=1.0, now=float(n))
+        self.assertLessEqual(len(store._full_at), 2 * 3 + 10 + 1)
+
+    def test_limiter_is_shared_per_key_and_counts_throttles(self):
+        limiter = RateLimiter()
+        results = [limiter.check("a@example.com", max_requests=2)[0] for _ in range(3)]
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(limiter.check("10.0.0.1", max_requests=2), (True, 1))
+
+        metrics = limiter.metrics()
+        self.assertEqual((metrics["allowed"], metrics["throttled"]), (3, 1))
+        self.assertEqual(metrics["top_throttled"], [("a@example.com", 1)])
+
+    def test_sqlite_store_survives_new_limiter(self):
+        base_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(base_dir, "limits.db")
+            first = RateLimiter(SQLiteBucketStore(path))
+            self.assertEqual(first.check("u", max_requests=1), (True, 0))
+            second = RateLimiter(SQLiteBucketStore(path))
+            self.assertFalse(second.check("u", max_requests=1)[0])
+        finally:
+            db.close_all()
+            shutil.rmtree(base_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
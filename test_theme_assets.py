@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from core import theme_assets
+
+
+class TestThemeAssets(unittest.TestCase):
+    def setUp(self):
+        # Variants built during a test go to a temp dir, not the repo's static/backgrounds/
+        self.dir = Path(tempfile.mkdtemp())
+        patcher = mock.patch.object(theme_assets, "BACKGROUND_DIR", self.dir / "backgrounds")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        theme_assets.background_urls.cache_clear()
+        self.addCleanup(theme_assets.background_urls.cache_clear)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_palette_mapping(self):
+        self.assertEqual(theme_assets.palette_background_path("Calm Blue"), "static_files/blue.png")
+        self.assertEqual(theme_assets.palette_background_path("unknown"), theme_assets.DEFAULT_BACKGROUND)
+        self.assertEqual(theme_assets.palette_background_path("mint", is_dark=True), theme_assets.DARK_BACKGROUND)
+
+    def test_data_uri_is_encoded_once(self):
+        theme_assets.data_uri.cache_clear()
+        first = theme_assets.data_uri("static_files/Breathing.png")
+        self.assertTrue(first.startswith("data:image/png;base64,"))
+        self.assertIs(first, theme_assets.data_uri("static_files/Breathing.png"))
+        self.assertEqual(theme_assets.data_uri.cache_info().hits, 1)
+
+    def test_css_without_static_serving_uses_data_uri(self):
+        if theme_assets.background_urls("static_files/Breathing.png"):
+            self.skipTest("static serving is enabled in this environment")
+        css = theme_assets.background_image_css("static_files/Breathing.png")
+        self.assertTrue(css.startswith('background-image: url("data:image/'))
+
+    def test_rebuilt_background_replaces_old_variants(self):
+        try:
+            from PIL import Image
+        except ImportError:
+            self.skipTest("Pillow is not installed")
+        source = self.dir / "bg.png"
+        Image.new("RGB", (1000, 500), "pink").save(source)
+        first = theme_assets._build_variants(str(source))
+        Image.new("RGB", (1200, 600), "blue").save(source)
+        os.utime(source, ns=(0, 1))
+        second = theme_assets._build_variants(str(source))
+
+        names = sorted(p.name for p in (self.dir / "backgrounds").glob("*.webp"))
+        self.assertEqual(names, sorted(url.rsplit("/", 1)[1] for url in second.values()))
+        self.assertNotEqual(first, second)
+
+    def test_page_background_css(self):
+        css = theme_assets.page_background_css('background-image: url("x");', is_dark=True, extra_css="h1 { color: red; }")
+        self.assertIn('background-image: url("x");', css)
+        self.assertIn("span {", css)
+        self.assertIn("#f0f0f0", css)
+        self.assertLess(css.index("Hide left/right arrow"), css.index("h1 { color: red; }"))
+
+        plain = theme_assets.page_background_css("", text_selectors=None)
+        self.assertNotIn("span {", plain)
+        self.assertTrue(plain.strip().startswith("<style>") and plain.strip().endswith("</style>"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    import pandas  # noqa: F401
+    HAS_PANDAS = True
+except ImportError:
+    HAS_PANDAS = False
+
+from core import db, wearable_store
+
+
+CSV = """Date Time,HRV,Resting Heart Rate,Minutes Asleep,Steps,Notes
+2024-06-01T08:00:00Z,52.5,61,420,1000,ok
+2024-06-02 08:00:00+00:00,,63,,n/a,
+not a date,50,60,400,10,
+2024-06-03T08:00:00.250000+00:00,48,62,380,3000,
+"""
+
+
+@unittest.skipUnless(HAS_PANDAS, "pandas is not installed")
+class TestWearableImport(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.saved = wearable_store.WEARABLE_DB, wearable_store.WEARABLE_DIR
+        wearable_store.WEARABLE_DB = os.path.join(self.dir, "wearables.db")
+        wearable_store.WEARABLE_DIR = os.path.join(self.dir, "wearables")
+        wearable_store.set_consent("a@x.com", True)
+
+    def tearDown(self):
+        wearable_store.WEARABLE_DB, wearable_store.WEARABLE_DIR = self.saved
+        db.close_all()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_aliases_are_mapped_once(self):
+        from core.wearable_import import map_columns
+
+        mapping = map_columns(["Date Time", "HRV", "Resting Heart Rate", "Minutes Asleep", "Steps", "Notes"])
+        self.assertEqual(mapping["Date Time"], "timestamp")
+        self.assertEqual(mapping["Minutes Asleep"], "sleep_minutes")
+        self.assertNotIn("Notes", mapping)
+
+    def test_chunked_import_matches_record_by_record_path(self):
+        from core.wearable_import import import_csv
+
+        progress = []
+        report = import_csv(io.BytesIO(CSV.encode()), "a@x.com", "fitbit", chunk_size=2,
+                            progress=lambda rows, fraction: progress.append(rows))
+        self.assertEqual((report["rows"], report["imported"], report["skipped"]), (4, 3, 1))
+        self.assertEqual(progress, [2, 4])
+
+        records = wearable_store.load_records("a@x.com")
+        self.assertEqual([r["timestamp"] for r in records], [
+            wearable_store.normalize_timestamp("2024-06-01T08:00:00Z"),
+            wearable_store.normalize_timestamp("2024-06-02 08:00:00+00:00"),
+            wearable_store.normalize_timestamp("2024-06-03T08:00:00.250000+00:00"),
+        ])
+        self.assertEqual((records[0]["hrv_ms"], records[0]["sleep_minutes"]), (52.5, 420))
+        self.assertIsNone(records[1]["steps"])
+
+        # Re-importing upserts instead of duplicating
+        import_csv(io.BytesIO(CSV.encode()), "a@x.com", "fitbit")
+        self.assertEqual(len(wearable_store.load_records("a@x.com")), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from core import db, wearable_store
+
+
+class TestWearableStore(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.saved = wearable_store.WEARABLE_DB, wearable_store.WEARABLE_DIR
+        wearable_store.WEARABLE_DB = os.path.join(self.dir, "wearables.db")
+        wearable_store.WEARABLE_DIR = os.path.join(self.dir, "wearables")
+
+    def tearDown(self):
+        wearable_store.WEARABLE_DB, wearable_store.WEARABLE_DIR = self.saved
+        db.close_all()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_consent_is_required(self):
+        with self.assertRaises(PermissionError):
+            wearable_store.append_records("a@x.com", [{"timestamp": "2024-06-01T08:00:00"}], "fitbit")
+
+    def test_upsert_on_timestamp_and_provider(self):
+        wearable_store.set_consent("a@x.com", True)
+        wearable_store.append_records("a@x.com", [
+            {"timestamp": "2024-06-01T08:00:00Z", "steps": 1000, "hrv_ms": 50},
+            {"timestamp": "2024-07-01T08:00:00", "steps": 2000},
+        ], "fitbit")
+        written = wearable_store.append_records("a@x.com", [
+            {"timestamp": "2024-06-01T08:00:00+00:00", "steps": 1500, "hrv_ms": None},
+            {"timestamp": "2024-06-01T08:00:00+00:00", "steps": 800},
+        ], "oura")
+        self.assertEqual(written, 2)
+        wearable_store.append_records("a@x.com", [{"timestamp": "2024-06-01T08:00:00Z", "steps": 1200}], "fitbit")
+
+        records = wearable_store.load_records("a@x.com")
+        self.assertEqual(len(records), 3)
+        fitbit = [r for r in records if r["provider"] == "fitbit" and r["timestamp"].startswith("2024-06")][0]
+        self.assertEqual((fitbit["steps"], fitbit["hrv_ms"]), (1200, 50))
+        self.assertEqual(len(wearable_store.load_records("a@x.com", since="2024-06-15")), 1)
+        self.assertEqual(set(wearable_store.load_settings("a@x.com")["providers"]), {"fitbit", "oura"})
+
+    def test_settings_do_not_touch_records(self):
+        wearable_store.set_consent("a@x.com", True)
+        wearable_store.append_records("a@x.com", [{"timestamp": "2024-06-01T08:00:00", "steps": 10}], "fitbit")
+        wearable_store.set_goals("a@x.com", {"steps": {"target": 8000}})
+        settings = wearable_store.set_provider_connection("a@x.com", "fitbit", True)
+        self.assertTrue(settings["providers"]["fitbit"]["connected"])
+        self.assertEqual(settings["goals"]["steps"]["target"], 8000)
+        self.assertNotIn("records", settings)
+        self.assertEqual(len(wearable_store.load_records("a@x.com")), 1)
+
+        wearable_store.clear_user_wearables("a@x.com")
+        self.assertEqual(wearable_store.load_user_wearables("a@x.com")["records"], [])
+        self.assertFalse(wearable_store.load_settings("a@x.com")["consent"])
+
+    def test_daily_rollups_follow_appends(self):
+        wearable_store.set_consent("a@x.com", True)
+        wearable_store.append_records("a@x.com", [
+            {"timestamp": "2024-06-01T08:00:00", "steps": 1000, "hrv_ms": 50},
+            {"timestamp": "2024-06-01T20:00:00", "steps": 500, "hrv_ms": 70},
+            {"timestamp": "2024-06-30T08:00:00", "steps": 10},
+            {"timestamp": "2024-07-01T08:00:00", "steps": 20},
+        ], "fitbit")
+        wearable_store.append_records("a@x.com", [
+            {"timestamp": "2024-06-01T21:00:00", "steps": 250, "hrv_ms": 30},
+            {"timestamp": "2024-06-01T08:00:00", "steps": 300},
+        ], "oura")
+
+        days = {day["date"]: day for day in wearable_store.load_daily("a@x.com")}
+        self.assertEqual(sorted(days), ["2024-06-01", "2024-06-30", "2024-07-01"])
+        self.assertEqual((days["2024-06-01"]["steps"], days["2024-06-01"]["records"]), (2050, 4))
+        self.assertEqual((days["2024-06-01"]["hrv_ms"], days["2024-06-01"]["hrv_ms_n"]), (50, 3))
+        self.assertIsNone(days["2024-06-30"]["hrv_ms"])
+        self.assertEqual(len(wearable_store.load_daily("a@x.com", since="2024-06-30")), 2)
+
+        summary = wearable_store.summarize_days(list(days.values()))
+        self.assertEqual((summary["steps"], summary["hrv_ms"], summary["resting_hr"]), (2080, 50, None))
+
+        wearable_store.clear_user_wearables("a@x.com")
+        self.assertEqual(wearable_store.load_daily("a@x.com"), [])
+
+    def test_legacy_json_is_imported_once(self):
+        os.makedirs(wearable_store.WEARABLE_DIR)
+        legacy = {
+            "consent": True, "providers": {"oura": {"connected": True}}, "goals": {"steps": {"target": 5000}},
+            "records": [{"timestamp": "2024-05-01T07:00:00", "provider": "oura", "sleep_minutes": 420}],
+        }
+        with open(wearable_store.user_wearable_path("b@x.com"), "w", encoding="utf-8") as f:
+            json.dump(legacy, f)
+
+        data = wearable_store.load_user_wearables("b@x.com")
+        self.assertEqual(wearable_store.load_daily("b@x.com")[0]["sleep_minutes"], 420)
+        self.assertTrue(data["consent"])
+        self.assertEqual(data["records"][0]["sleep_minutes"], 420)
+        self.assertEqual(data["goals"]["steps"]["target"], 5000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+
+from core import db, weather_store
+from core.weather_store import StubWeatherProvider, WeatherStore, grid_cell
+
+
+class TestWeatherStore(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.provider = StubWeatherProvider()
+        self.store = WeatherStore(os.path.join(self.dir, "weather.db"), provider=self.provider)
+        self.end = date.today() - timedelta(days=10)
+
+    def tearDown(self):
+        db.close_all()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_nearby_locations_share_a_cell(self):
+        self.assertEqual(grid_cell(40.71, -74.00)[0], grid_cell(40.74, -73.95)[0])
+        self.assertNotEqual(grid_cell(40.71, -74.00)[0], grid_cell(51.50, -0.12)[0])
+
+    def test_repeat_requests_are_served_from_cache(self):
+        first = self.store.daily(40.71, -74.00, self.end - timedelta(days=29), self.end)
+        self.assertEqual(len(first), 30)
+        self.assertEqual(len(self.provider.calls), 1)
+
+        # Another user in the same city
+        again = self.store.daily(40.74, -73.95, self.end - timedelta(days=29), self.end)
+        self.assertEqual(again, first)
+        self.assertEqual(len(self.provider.calls), 1)
+
+    def test_only_missing_days_are_fetched(self):
+        self.store.daily(40.71, -74.00, self.end - timedelta(days=9), self.end)
+        self.store.daily(40.71, -74.00, self.end - timedelta(days=19), self.end + timedelta(days=5))
+        fetched = [(start, end) for _, _, start, end in self.provider.calls[1:]]
+        self.assertEqual(fetched, [
+            (self.end - timedelta(days=19), self.end - timedelta(days=10)),
+            (self.end + timedelta(days=1), self.end + timedelta(days=5)),
+        ])
+
+    def test_days_without_data_are_not_refetched(self):
+        def sparse(latitude, longitude, start, end):
+            self.provider.calls.append((latitude, longitude, start, end))
+            return [{"date": start.isoformat(), "temp_avg": 10.0}]
+
+        self.store.provider = sparse
+        days = self.store.daily(40.71, -74.00, self.end - timedelta(days=4), self.end)
+        self.assertEqual([day["date"] for day in days], [(self.end - timedelta(days=4)).isoformat()])
+        self.store.daily(40.71, -74.00, self.end - timedelta(days=4), self.end)
+        self.assertEqual(len(self.provider.calls), 1)
+
+    def test_empty_results_are_retried_after_a_week(self):
+        def outage(latitude, longitude, start, end):
+            self.provider.calls.append((latitude, longitude, start, end))
+            return []
+
+        self.store.provider = outage
+        self.assertEqual(self.store.daily(40.71, -74.00, self.end - timedelta(days=4), self.end), [])
+        self.store.provider = self.provider
+        self.assertEqual(self.store.daily(40.71, -74.00, self.end - timedelta(days=4), self.end), [])
+        self.assertEqual(len(self.provider.calls), 1)
+
+        with mock.patch.object(weather_store.time, "time", return_value=time.time() + weather_store.EMPTY_RETRY_SECONDS + 1):
+            days = self.store.daily(40.71, -74.00, self.end - timedelta(days=4), self.end)
+        self.assertEqual(len(days), 5)
+        self.assertEqual(len(self.provider.calls), 2)
+
+    def test_lagging_days_are_retried_once_per_window(self):
+        today = date.today()
+
+        def lagging(latitude, longitude, start, end):
+            # The station hasn't reported the last three days yet
+            return [day for day in self.provider(latitude, longitude, start, end)
+                    if day["date"] < (today - timedelta(days=2)).isoformat()]
+
+        self.store.provider = lagging
+        for _ in range(3):
+            days = self.store.daily(40.71, -74.00, today - timedelta(days=9), today)
+        self.assertEqual(len(days), 7)
+        self.assertEqual(len(self.provider.calls), 1)
+
+        later = time.time() + weather_store.RETRY_SECONDS + 1
+        with mock.patch.object(weather_store.time, "time", return_value=later):
+            for _ in range(3):
+                self.store.daily(40.71, -74.00, today - timedelta(days=9), today)
+        self.assertEqual([call[2:] for call in self.provider.calls[1:]], [(today - timedelta(days=2), today)])
+
+if __name__ == "__main__":
+    unittest.main()